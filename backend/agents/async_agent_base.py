@@ -7,7 +7,7 @@ import asyncio
 import logging
 import traceback
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, Union, Set, Callable
+from typing import Dict, Any, Optional, List, Union, Set, Callable, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
@@ -21,6 +21,7 @@ from langchain_openai import ChatOpenAI
 import requests
 
 from services.firebase_service import get_firebase_service, Task, GraphNode, GraphEdge
+from services.task_dispatch import DispatchQueue, TaskLease, get_dispatch_queue, task_message
 
 
 class TaskStatus(str, Enum):
@@ -112,8 +113,9 @@ class AgentCapabilities:
 class AsyncCommunicationProtocol:
     """Enhanced communication protocol with proper async handling"""
 
-    def __init__(self):
+    def __init__(self, dispatch_queue: Optional[DispatchQueue] = None):
         self.firebase_service = get_firebase_service()
+        self.dispatch_queue = dispatch_queue or get_dispatch_queue()
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         self._message_semaphore = asyncio.Semaphore(10)  # Limit concurrent message operations
 
@@ -252,37 +254,104 @@ class AsyncCommunicationProtocol:
     async def get_pending_tasks(self, agent_type: AgentType, limit: int = 10) -> List[TaskDelegation]:
         """Get pending tasks with error handling"""
         try:
-            firebase_tasks = await self.firebase_service.get_tasks_by_agent_type(agent_type.value)
+            firebase_tasks = await self.firebase_service.get_tasks_by_agent_type(
+                agent_type.value, status='pending', limit=limit
+            )
+            return [self._to_delegation(firebase_task, agent_type) for firebase_task in firebase_tasks]
+
+        except Exception as e:
+            self.logger.error(f"Error getting pending tasks: {e}")
+            return []
+
+    async def publish_pending_tasks(self, agent_type: AgentType) -> int:
+        """
+        Push the pending backlog for an agent type onto the dispatch queue,
+        e.g. tasks created before the agent started. Tasks already queued or
+        leased are skipped.
+        """
+        try:
+            firebase_tasks = await self.firebase_service.get_tasks_by_agent_type(agent_type.value, status='pending')
 
-            tasks = []
+            published = 0
             for firebase_task in firebase_tasks:
-                if firebase_task.status == 'pending':
-                    task = TaskDelegation(
-                        id=firebase_task.id,
-                        type=firebase_task.parameters.get('type', 'heavy_task') if firebase_task.parameters else 'heavy_task',
-                        category=TaskType(firebase_task.agent_type),
-                        priority=firebase_task.priority,
-                        title=firebase_task.input_prompt[:100] + '...' if len(firebase_task.input_prompt) > 100 else firebase_task.input_prompt,
-                        description=firebase_task.input_prompt,
-                        parameters=firebase_task.parameters or {},
-                        expectedDuration=firebase_task.parameters.get('expected_duration', 300) if firebase_task.parameters else 300,
-                        complexity=firebase_task.parameters.get('complexity', 5) if firebase_task.parameters else 5,
-                        resourceRequirements=firebase_task.parameters.get('resource_requirements', {}) if firebase_task.parameters else {},
-                        assignedTo=agent_type.value,
-                        status=TaskStatus(firebase_task.status),
-                        createdAt=firebase_task.created_at,
-                        updatedAt=firebase_task.updated_at or datetime.now(),
-                        metadata=firebase_task.parameters.get('metadata', {}) if firebase_task.parameters else {}
-                    )
-                    tasks.append(task)
-                    if len(tasks) >= limit:
-                        break
+                published += await self.dispatch_queue.publish(agent_type.value, task_message(firebase_task))
+            return published
+
+        except Exception as e:
+            self.logger.error(f"Error publishing pending tasks: {e}")
+            return 0
+
+    async def claim_task(
+        self,
+        agent_type: AgentType,
+        lease_seconds: float,
+        timeout: float = 5.0
+    ) -> Optional[Tuple[TaskDelegation, TaskLease]]:
+        """Wait for the next task dispatched to an agent type and lease it"""
+        try:
+            lease = await self.dispatch_queue.claim(agent_type.value, lease_seconds=lease_seconds, timeout=timeout)
+            if lease is None:
+                return None
+        except Exception as e:
+            self.logger.error(f"Error claiming task: {e}")
+            return None
 
-            return tasks
+        try:
+            task_data = dict(lease.task)
+            for key in ('created_at', 'updated_at'):
+                if isinstance(task_data.get(key), str):
+                    task_data[key] = datetime.fromisoformat(task_data[key])
+
+            return self._to_delegation(Task(**task_data), agent_type), lease
 
         except Exception as e:
-            self.logger.error(f"Error getting pending tasks: {e}")
-            return []
+            # A malformed task would fail the same way on every redelivery
+            self.logger.error(f"Dropping undeliverable task {lease.task_id}: {e}")
+            await self.ack_task(lease)
+            return None
+
+    async def ack_task(self, lease: TaskLease):
+        """Acknowledge a processed task so it is not redelivered"""
+        try:
+            await self.dispatch_queue.ack(lease)
+        except Exception as e:
+            self.logger.error(f"Error acknowledging task {lease.task_id}: {e}")
+
+    async def release_task(self, lease: TaskLease):
+        """Hand an unprocessed task back to the dispatch queue"""
+        try:
+            await self.dispatch_queue.release(lease)
+        except Exception as e:
+            self.logger.error(f"Error releasing task {lease.task_id}: {e}")
+
+    @staticmethod
+    def _task_category(firebase_task: Task) -> TaskType:
+        """Task category from its parameters, else its agent type if that names one"""
+        category = (firebase_task.parameters or {}).get('category', firebase_task.agent_type)
+        try:
+            return TaskType(category)
+        except ValueError:
+            return TaskType.DATA_PROCESSING
+
+    def _to_delegation(self, firebase_task: Task, agent_type: AgentType) -> TaskDelegation:
+        """Convert a stored task to a TaskDelegation"""
+        return TaskDelegation(
+            id=firebase_task.id,
+            type=firebase_task.parameters.get('type', 'heavy_task') if firebase_task.parameters else 'heavy_task',
+            category=self._task_category(firebase_task),
+            priority=firebase_task.priority,
+            title=firebase_task.input_prompt[:100] + '...' if len(firebase_task.input_prompt) > 100 else firebase_task.input_prompt,
+            description=firebase_task.input_prompt,
+            parameters=firebase_task.parameters or {},
+            expectedDuration=firebase_task.parameters.get('expected_duration', 300) if firebase_task.parameters else 300,
+            complexity=firebase_task.parameters.get('complexity', 5) if firebase_task.parameters else 5,
+            resourceRequirements=firebase_task.parameters.get('resource_requirements', {}) if firebase_task.parameters else {},
+            assignedTo=agent_type.value,
+            status=TaskStatus(firebase_task.status),
+            createdAt=firebase_task.created_at,
+            updatedAt=firebase_task.updated_at or datetime.now(),
+            metadata=firebase_task.parameters.get('metadata', {}) if firebase_task.parameters else {}
+        )
 
 
 class AsyncAgentBase(ABC):
@@ -297,12 +366,14 @@ class AsyncAgentBase(ABC):
         temperature: float = 0.7,
         max_tokens: int = 4000,
         shutdown_timeout: float = 30.0,
-        task_timeout: float = 300.0  # 5 minutes default task timeout
+        task_timeout: float = 300.0,  # 5 minutes default task timeout
+        pending_reconcile_interval: float = 30.0
     ):
         self.agent_id = agent_id
         self.agent_type = agent_type
         self.shutdown_timeout = shutdown_timeout
         self.task_timeout = task_timeout
+        self.pending_reconcile_interval = pending_reconcile_interval
 
         # Initialize LLM
         self.llm = ChatOpenAI(
@@ -334,6 +405,7 @@ class AsyncAgentBase(ABC):
         self.task_metadata: Dict[str, TaskDelegation] = {}
         self._task_semaphore = asyncio.Semaphore(self.capabilities.maxConcurrentTasks)
         self._shutdown_event = asyncio.Event()
+        self._capacity_available = asyncio.Event()
 
         # Background tasks
         self.background_tasks: Set[asyncio.Task] = set()
@@ -563,40 +635,54 @@ class AsyncAgentBase(ABC):
         """Main loop for processing tasks"""
         self.logger.info("Starting task processing loop")
 
+        loop = asyncio.get_running_loop()
+        next_reconcile = loop.time()
+
         while not self._shutdown_event.is_set():
             try:
+                claimed = None
+
+                # Tasks created before this agent started, or written by another
+                # process without a shared queue, only reach the queue from here
+                if loop.time() >= next_reconcile:
+                    await self.communication.publish_pending_tasks(self.agent_type)
+                    next_reconcile = loop.time() + self.pending_reconcile_interval
+
                 # Check if we can accept more tasks
                 if len(self.current_tasks) < self.capabilities.maxConcurrentTasks:
-                    # Get pending tasks
-                    pending_tasks = await self.communication.get_pending_tasks(
+                    # Block until a task is dispatched to this agent type
+                    claimed = await self.communication.claim_task(
                         self.agent_type,
-                        limit=self.capabilities.maxConcurrentTasks - len(self.current_tasks)
+                        lease_seconds=self.task_timeout + 60.0,
+                        timeout=max(0.0, min(5.0, next_reconcile - loop.time()))
                     )
 
-                    for task in pending_tasks:
+                    if claimed is not None:
+                        task, lease = claimed
                         if self._shutdown_event.is_set():
+                            await self.communication.release_task(lease)
                             break
 
                         # Check if we're already processing this task
                         if task.id not in self.current_tasks:
-                            await self.start_task_processing(task)
+                            await self.start_task_processing(task, lease)
+                        else:
+                            await self.communication.ack_task(lease)
+                else:
+                    # Wait for a running task to finish
+                    self._capacity_available.clear()
+                    try:
+                        await asyncio.wait_for(self._capacity_available.wait(), timeout=5.0)
+                    except asyncio.TimeoutError:
+                        pass
 
                 # Update state
                 self.state = ServiceState.BUSY if self.current_tasks else ServiceState.IDLE
 
-                # Update capabilities
-                self.capabilities.currentLoad = len(self.current_tasks)
-                await self.update_capabilities()
-
-                # Wait before next check
-                try:
-                    await asyncio.wait_for(
-                        self._shutdown_event.wait(),
-                        timeout=5.0
-                    )
-                    break  # Shutdown requested
-                except asyncio.TimeoutError:
-                    continue  # Continue processing
+                # Update capabilities when the load changed or on an idle tick
+                if claimed is None or self.capabilities.currentLoad != len(self.current_tasks):
+                    self.capabilities.currentLoad = len(self.current_tasks)
+                    await self.update_capabilities()
 
             except asyncio.CancelledError:
                 break
@@ -604,7 +690,7 @@ class AsyncAgentBase(ABC):
                 self.logger.error(f"Error in task processing loop: {e}")
                 await asyncio.sleep(5)  # Brief pause before retry
 
-    async def start_task_processing(self, task: TaskDelegation):
+    async def start_task_processing(self, task: TaskDelegation, lease: Optional[TaskLease] = None):
         """Start processing a specific task"""
         try:
             # Update task status
@@ -623,7 +709,7 @@ class AsyncAgentBase(ABC):
                 if self._shutdown_event.is_set():
                     return
 
-                task_coro = self.process_task(task)
+                task_coro = self.process_leased_task(task, lease) if lease else self.process_task(task)
                 task_task = asyncio.create_task(
                     task_coro,
                     name=f"{self.agent_id}_task_{task.id[:8]}"
@@ -631,13 +717,39 @@ class AsyncAgentBase(ABC):
                 self.current_tasks[task.id] = task_task
 
                 # Add cleanup callback
-                task_task.add_done_callback(lambda t: self.current_tasks.pop(task.id, None))
+                task_task.add_done_callback(lambda t: self._on_task_done(task.id))
 
             self.logger.info(f"Started processing task {task.id}")
 
         except Exception as e:
             self.logger.error(f"Error starting task processing: {e}")
             await self.fail_task(task.id, f"Failed to start processing: {e}")
+            if lease and task.id not in self.current_tasks:
+                await self.communication.ack_task(lease)
+
+    async def process_leased_task(self, task: TaskDelegation, lease: TaskLease) -> TaskResult:
+        """
+        Process a dispatched task, then acknowledge its lease; tasks cut
+        short by shutdown are released so another agent picks them up
+        """
+        requeue = False
+        try:
+            result = await self.process_task(task)
+            requeue = self._shutdown_event.is_set() and result.cancellation_reason is not None
+            return result
+        except asyncio.CancelledError:
+            requeue = self._shutdown_event.is_set()
+            raise
+        finally:
+            if requeue:
+                await self.communication.release_task(lease)
+            else:
+                await self.communication.ack_task(lease)
+
+    def _on_task_done(self, task_id: str):
+        """Forget a finished task and wake the processing loop"""
+        self.current_tasks.pop(task_id, None)
+        self._capacity_available.set()
 
     async def cancel_task(self, task_id: str, reason: str):
         """Cancel a specific task"""
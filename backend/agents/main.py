@@ -341,8 +341,13 @@ Please analyze the requirements and execute the task using your specialized capa
         """Clean up resources and connections."""
         logger.info("Cleaning up AutoAdmin Agents system...")
 
-        # Clear file system cache
+        # Persist the graph memory's vector index
+        if self.graph_memory:
+            self.graph_memory.close()
+
+        # Persist the file system's path index and clear its cache
         if self.virtual_fs:
+            self.virtual_fs.close()
             self.virtual_fs.clear_cache()
 
         # Close any open connections
@@ -4,10 +4,20 @@ Memory module for AutoAdmin agents.
 This module provides the memory systems for agents including:
 - Graph Memory: Knowledge graph storage and retrieval
 - Virtual File System: Persistent file storage
+- Vector Index: Local similarity search over node embeddings
+- Embedding Cache: Cached, batched embedding requests
+- Graph Index: In-memory adjacency index for graph traversal
+- Path Index: Directory trie for virtual file system listings
+- File Cache: Byte-budgeted LRU for virtual file system contents
 """
 
 from .graph_memory import GraphMemory, GraphMemoryTools, Node, Edge
 from .virtual_filesystem import VirtualFileSystem, VirtualFileSystemTools, VirtualFile
+from .vector_index import VectorIndex
+from .embedding_cache import EmbeddingCache, EmbeddingBatcher, CachedEmbedder
+from .graph_index import GraphIndex
+from .path_index import PathIndex
+from .file_cache import FileCache
 
 __all__ = [
     "GraphMemory",
@@ -16,5 +26,12 @@ __all__ = [
     "Edge",
     "VirtualFileSystem",
     "VirtualFileSystemTools",
-    "VirtualFile"
+    "VirtualFile",
+    "VectorIndex",
+    "EmbeddingCache",
+    "EmbeddingBatcher",
+    "CachedEmbedder",
+    "GraphIndex",
+    "PathIndex",
+    "FileCache"
 ]
\ No newline at end of file
@@ -0,0 +1,323 @@
+"""
+Embedding cache and request batching for AutoAdmin graph memory.
+
+Embeddings are keyed by a hash of the model name and text, kept in an
+LRU with an optional SQLite store on disk. Concurrent cache misses that
+arrive within a few milliseconds are merged into one aembed_documents call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed embedding cache with LRU eviction.
+
+    When a store path is given, entries are also written to a SQLite file so
+    they survive restarts; memory holds at most max_entries vectors. Disk
+    writes are buffered and committed together, once max_pending_writes are
+    buffered or flush_interval seconds after the first, so the event loop
+    does not wait on a commit per embedding.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        store_path: Optional[str] = None,
+        namespace: str = "",
+        max_pending_writes: int = 256,
+        flush_interval: float = 1.0
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of embeddings kept in memory
+            store_path: Optional SQLite file for persistent entries
+            namespace: Mixed into keys, typically the embedding model name
+            max_pending_writes: Buffered disk writes that trigger a commit
+            flush_interval: Seconds a buffered disk write waits for companions
+        """
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.max_pending_writes = max_pending_writes
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._store: Optional[sqlite3.Connection] = None
+        self._pending_writes: Dict[str, bytes] = {}
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk_commits = 0
+
+        if store_path:
+            directory = os.path.dirname(os.path.abspath(store_path))
+            os.makedirs(directory, exist_ok=True)
+            self._store = sqlite3.connect(store_path, check_same_thread=False)
+            self._store.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._store.commit()
+
+    def key_for(self, text: str) -> str:
+        """Get the cache key for a text."""
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Look up an embedding, falling back to the disk store."""
+        key = self.key_for(text)
+
+        embedding = self._entries.get(key)
+        if embedding is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+        if self._store is not None:
+            vector = self._pending_writes.get(key)
+            if vector is None:
+                row = self._store.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                vector = row[0] if row is not None else None
+            if vector is not None:
+                embedding = np.frombuffer(vector, dtype=np.float32).tolist()
+                self._remember(key, embedding)
+                self.hits += 1
+                self.disk_hits += 1
+                return embedding
+
+        self.misses += 1
+        return None
+
+    def put(self, text: str, embedding: List[float]):
+        """Store an embedding in memory and, if configured, on disk."""
+        key = self.key_for(text)
+        self._remember(key, embedding)
+
+        if self._store is None:
+            return
+
+        self._pending_writes[key] = np.asarray(embedding, dtype=np.float32).tobytes()
+        if len(self._pending_writes) >= self.max_pending_writes:
+            self.flush()
+        elif self._flush_timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()  # No loop to defer to: write through
+                return
+            self._flush_timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        """Commit buffered disk writes in one transaction."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if self._store is None or not self._pending_writes:
+            return
+
+        rows, self._pending_writes = list(self._pending_writes.items()), {}
+        with self._store:
+            self._store.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+        self.disk_commits += 1
+
+    def close(self):
+        """Commit buffered writes and close the disk store."""
+        if self._store is not None:
+            self.flush()
+            self._store.close()
+            self._store = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache hit/miss metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "pending_writes": len(self._pending_writes),
+            "disk_commits": self.disk_commits,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _remember(self, key: str, embedding: List[float]):
+        """Insert into the in-memory LRU, evicting the least recently used."""
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher that merges concurrent embed requests.
+
+    Requests arriving within max_wait_ms of the first pending one are sent
+    together in a single aembed_documents call; identical texts in a batch
+    share one slot.
+    """
+
+    def __init__(self, embedder: Any, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Initialize the batcher.
+
+        Args:
+            embedder: Object providing async aembed_documents(texts)
+            max_batch_size: Flush immediately once this many distinct texts are pending
+            max_wait_ms: Maximum time a request waits for companions
+        """
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()  # Referenced until done, so they are not collected
+
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_observed_batch = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single text as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(text, []).append(future)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get batch-size metrics."""
+        return {
+            "batches": self.batches,
+            "batched_texts": self.batched_texts,
+            "avg_batch_size": self.batched_texts / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "pending": len(self._pending)
+        }
+
+    def _flush(self):
+        """Dispatch all pending requests as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: Dict[str, List[asyncio.Future]]):
+        """Embed a batch and resolve every waiting request."""
+        texts = list(batch)
+        self.batches += 1
+        self.batched_texts += len(texts)
+        self.max_observed_batch = max(self.max_observed_batch, len(texts))
+
+        try:
+            vectors = await self.embedder.aembed_documents(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"Embedder returned {len(vectors)} vectors for {len(texts)} texts"
+                )
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for text, vector in zip(texts, vectors, strict=True):
+            for future in batch[text]:
+                if not future.done():
+                    future.set_result(vector)
+
+
+class CachedEmbedder:
+    """
+    Embeddings front end combining EmbeddingCache and EmbeddingBatcher.
+
+    Exposes the same aembed_query/aembed_documents interface as LangChain
+    embeddings, so a fake embedder can stand in for OpenAI offline.
+    """
+
+    def __init__(
+        self,
+        embedder: Any,
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Initialize the cached embedder.
+
+        Args:
+            embedder: Underlying embeddings object (e.g. OpenAIEmbeddings)
+            cache: Embedding cache (a default in-memory cache if omitted)
+            max_batch_size: Batcher flush size
+            max_wait_ms: Batcher coalescing window
+        """
+        self.embedder = embedder
+        self.cache = cache or EmbeddingCache(namespace=getattr(embedder, 'model', '') or '')
+        self.batcher = EmbeddingBatcher(embedder, max_batch_size, max_wait_ms)
+        # Misses currently being embedded, so concurrent callers share one request
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single text, served from cache when possible."""
+        embedding = self.cache.get(text)
+        if embedding is not None:
+            return embedding
+
+        in_flight = self._in_flight.get(text)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.ensure_future(self.batcher.embed(text))
+        self._in_flight[text] = future
+        try:
+            embedding = await asyncio.shield(future)
+        finally:
+            self._in_flight.pop(text, None)
+
+        self.cache.put(text, embedding)
+        return embedding
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts, batching only the cache misses."""
+        return list(await asyncio.gather(*(self.aembed_query(text) for text in texts)))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get combined cache and batching metrics."""
+        return {
+            "cache": self.cache.get_metrics(),
+            "batching": self.batcher.get_metrics()
+        }
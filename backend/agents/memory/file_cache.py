@@ -0,0 +1,148 @@
+"""
+File content cache for the AutoAdmin virtual file system.
+
+Entries are held in an LRU bounded by total content bytes rather than by
+count, and expire after a TTL so that long-running workers revalidate
+against the stored version instead of serving whatever they read first.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileCache:
+    """
+    Byte-budgeted LRU cache with per-entry TTL.
+
+    Expired entries are kept (until evicted) so callers can revalidate them
+    with a cheap version check and renew them instead of refetching.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of cached contents
+            ttl_seconds: How long an entry is served without revalidation
+            clock: Monotonic time source
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        # path -> (value, size in bytes, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        entry = self._entries.get(path)
+        return entry is not None and entry[2] > self._clock()
+
+    def get(self, path: str) -> Optional[Any]:
+        """Get a fresh entry, or None if missing or expired."""
+        entry = self._entries.get(path)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[2] <= self._clock():
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return entry[0]
+
+    def get_stale(self, path: str) -> Optional[Any]:
+        """Get an entry regardless of expiry, for revalidation."""
+        entry = self._entries.get(path)
+        return entry[0] if entry is not None else None
+
+    def renew(self, path: str) -> bool:
+        """Restart an entry's TTL after it was revalidated."""
+        entry = self._entries.get(path)
+        if entry is None:
+            return False
+
+        self._entries[path] = (entry[0], entry[1], self._clock() + self.ttl_seconds)
+        self._entries.move_to_end(path)
+        self.revalidations += 1
+        return True
+
+    def put(self, path: str, value: Any, size: int):
+        """
+        Cache a value, evicting least recently used entries to fit.
+
+        Args:
+            path: File path
+            value: Cached object
+            size: Size of the value in bytes
+        """
+        self._discard(path)
+        if size > self.max_bytes:
+            return
+
+        self._entries[path] = (value, size, self._clock() + self.ttl_seconds)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, path: str) -> bool:
+        """Drop an entry, e.g. after it changed elsewhere."""
+        if self._discard(path):
+            self.invalidations += 1
+            return True
+        return False
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss metrics."""
+        lookups = self.hits + self.misses + self.expirations
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _discard(self, path: str) -> bool:
+        """Remove an entry and release its bytes."""
+        entry = self._entries.pop(path, None)
+        if entry is None:
+            return False
+        self.current_bytes -= entry[1]
+        return True
@@ -0,0 +1,251 @@
+"""
+In-memory adjacency index for AutoAdmin graph memory.
+
+Node ids and relation names are interned to small integers, edges are kept
+as adjacency lists in both directions, and nodes are indexed by type, so
+neighbor lookups and k-hop expansion never leave the process.
+"""
+
+import logging
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterable, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class GraphIndex:
+    """
+    Adjacency-list index over graph memory nodes and edges.
+
+    Each node gets a dense integer id on first sight; adjacency lists hold
+    (neighbor, relation) integer pairs, so expansion touches only the
+    visited frontier.
+    """
+
+    def __init__(self):
+        """Initialize an empty graph index."""
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._nodes: List[Optional[Dict[str, Any]]] = []
+        self._relations: List[str] = []
+        self._relation_index: Dict[str, int] = {}
+        self._out: List[List[Tuple[int, int]]] = []
+        self._in: List[List[Tuple[int, int]]] = []
+        self._edges: Set[Tuple[int, int, int]] = set()
+        self._by_type: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return sum(1 for node in self._nodes if node is not None)
+
+    def __contains__(self, node_id: str) -> bool:
+        index = self._index.get(node_id)
+        return index is not None and self._nodes[index] is not None
+
+    @property
+    def edge_count(self) -> int:
+        """Number of distinct edges."""
+        return len(self._edges)
+
+    def add_node(self, node_id: str, node_type: str, content: str, **attributes: Any):
+        """
+        Add or replace a node.
+
+        Args:
+            node_id: Node ID
+            node_type: Node type
+            content: Node content
+            **attributes: Extra attributes kept with the node (e.g. created_at)
+        """
+        index = self._intern(node_id)
+
+        previous = self._nodes[index]
+        if previous is not None:
+            self._by_type.get(previous['type'], set()).discard(index)
+
+        self._nodes[index] = {'id': node_id, 'type': node_type, 'content': content, **attributes}
+        self._by_type.setdefault(node_type, set()).add(index)
+
+    def add_edges(self, edges: Iterable[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+        """
+        Add edges in bulk, ignoring duplicates.
+
+        Args:
+            edges: (source_id, target_id, relation) triples
+
+        Returns:
+            The edges that were not already present
+        """
+        added = []
+        for source_id, target_id, relation in edges:
+            source = self._intern(source_id)
+            target = self._intern(target_id)
+            relation_index = self._intern_relation(relation)
+
+            key = (source, target, relation_index)
+            if key in self._edges:
+                continue
+
+            self._edges.add(key)
+            self._out[source].append((target, relation_index))
+            self._in[target].append((source, relation_index))
+            added.append((source_id, target_id, relation))
+
+        return added
+
+    def remove_edges(self, edges: Iterable[Tuple[str, str, str]]):
+        """
+        Remove edges, ignoring ones that are not present.
+
+        Args:
+            edges: (source_id, target_id, relation) triples
+        """
+        for source_id, target_id, relation in edges:
+            source = self._index.get(source_id)
+            target = self._index.get(target_id)
+            relation_index = self._relation_index.get(relation)
+            if source is None or target is None or relation_index is None:
+                continue
+
+            key = (source, target, relation_index)
+            if key not in self._edges:
+                continue
+
+            self._edges.discard(key)
+            self._out[source].remove((target, relation_index))
+            self._in[target].remove((source, relation_index))
+
+    def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Get a node's data by ID."""
+        index = self._index.get(node_id)
+        return self._nodes[index] if index is not None else None
+
+    def get_nodes_by_type(self, node_type: str) -> List[Dict[str, Any]]:
+        """Get all nodes of a type."""
+        return [self._nodes[index] for index in self._by_type.get(node_type, ())]
+
+    def neighbors(
+        self,
+        node_id: str,
+        relations: Optional[Iterable[str]] = None,
+        direction: str = 'both'
+    ) -> List[Tuple[str, str, str]]:
+        """
+        Get the direct neighbors of a node.
+
+        Args:
+            node_id: Node ID
+            relations: Only follow these relations (all if omitted)
+            direction: 'out', 'in' or 'both'
+
+        Returns:
+            (neighbor_id, relation, direction) triples
+        """
+        index = self._index.get(node_id)
+        if index is None:
+            return []
+
+        allowed = self._relation_filter(relations)
+        return [
+            (self._ids[neighbor], self._relations[relation], edge_direction)
+            for neighbor, relation, edge_direction in self._iter_adjacent(index, allowed, direction)
+        ]
+
+    def expand(
+        self,
+        seed_ids: Iterable[str],
+        max_hops: int = 1,
+        relations: Optional[Iterable[str]] = None,
+        max_nodes: int = 100,
+        direction: str = 'both'
+    ) -> List[Dict[str, Any]]:
+        """
+        Bounded breadth-first expansion from a set of seed nodes.
+
+        Args:
+            seed_ids: Node IDs to expand from (not included in the result)
+            max_hops: Maximum path length from any seed
+            relations: Only follow these relations (all if omitted)
+            max_nodes: Stop after this many nodes have been reached
+            direction: 'out', 'in' or 'both'
+
+        Returns:
+            Reached nodes with 'hops', 'relation', 'direction' and 'source_id'
+            describing the edge they were first reached through
+        """
+        allowed = self._relation_filter(relations)
+        if allowed is not None and not allowed:
+            return []
+
+        visited: Set[int] = set()
+        frontier = deque()
+        for seed_id in seed_ids:
+            index = self._index.get(seed_id)
+            if index is not None and index not in visited:
+                visited.add(index)
+                frontier.append((index, 0))
+
+        reached = []
+        while frontier and len(reached) < max_nodes:
+            index, hops = frontier.popleft()
+            if hops >= max_hops:
+                continue
+
+            for neighbor, relation, edge_direction in self._iter_adjacent(index, allowed, direction):
+                if neighbor in visited:
+                    continue
+                visited.add(neighbor)
+
+                node = self._nodes[neighbor]
+                if node is not None:
+                    reached.append({
+                        **node,
+                        'hops': hops + 1,
+                        'relation': self._relations[relation],
+                        'direction': edge_direction,
+                        'source_id': self._ids[index]
+                    })
+                    if len(reached) >= max_nodes:
+                        break
+
+                frontier.append((neighbor, hops + 1))
+
+        return reached
+
+    def _iter_adjacent(self, index: int, allowed: Optional[Set[int]], direction: str):
+        """Yield (neighbor, relation, direction) for one node."""
+        if direction in ('out', 'both'):
+            for neighbor, relation in self._out[index]:
+                if allowed is None or relation in allowed:
+                    yield neighbor, relation, 'out'
+        if direction in ('in', 'both'):
+            for neighbor, relation in self._in[index]:
+                if allowed is None or relation in allowed:
+                    yield neighbor, relation, 'in'
+
+    def _relation_filter(self, relations: Optional[Iterable[str]]) -> Optional[Set[int]]:
+        """Translate relation names to interned ids (None means no filter)."""
+        if relations is None:
+            return None
+        return {self._relation_index[r] for r in relations if r in self._relation_index}
+
+    def _intern(self, node_id: str) -> int:
+        """Get or assign the dense integer id for a node."""
+        index = self._index.get(node_id)
+        if index is None:
+            index = len(self._ids)
+            self._index[node_id] = index
+            self._ids.append(node_id)
+            self._nodes.append(None)
+            self._out.append([])
+            self._in.append([])
+        return index
+
+    def _intern_relation(self, relation: str) -> int:
+        """Get or assign the integer id for a relation name."""
+        index = self._relation_index.get(relation)
+        if index is None:
+            index = len(self._relations)
+            self._relation_index[relation] = index
+            self._relations.append(relation)
+        return index
@@ -11,10 +11,14 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from uuid import uuid4
+from datetime import datetime, timezone
 
 import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from ..services.firebase_service import FirebaseService
+from .vector_index import VectorIndex
+from .embedding_cache import CachedEmbedder, EmbeddingCache
+from .graph_index import GraphIndex
 
 
 @dataclass
@@ -66,10 +70,137 @@ class GraphMemory:
     for agent knowledge storage and retrieval.
     """
 
-    def __init__(self, openai_api_key: str):
-        """Initialize Graph Memory with Firebase service and embeddings."""
+    def __init__(
+        self,
+        openai_api_key: str,
+        index_path: Optional[str] = None,
+        embeddings: Optional[Any] = None,
+        embedding_cache_path: Optional[str] = None
+    ):
+        """
+        Initialize Graph Memory with Firebase service and embeddings.
+
+        Args:
+            openai_api_key: OpenAI API key for embeddings
+            index_path: Where to persist the local vector index
+                (defaults to GRAPH_MEMORY_INDEX_PATH)
+            embeddings: Embeddings backend to use instead of OpenAI
+            embedding_cache_path: SQLite file for persistent embedding cache
+                (defaults to GRAPH_MEMORY_EMBEDDING_CACHE_PATH)
+        """
         self.firebase_service = FirebaseService()
-        self.embeddings = OpenAIEmbeddings(api_key=openai_api_key)
+        self.embeddings = embeddings or OpenAIEmbeddings(api_key=openai_api_key)
+        self.embedder = CachedEmbedder(
+            self.embeddings,
+            cache=EmbeddingCache(
+                store_path=embedding_cache_path or os.getenv('GRAPH_MEMORY_EMBEDDING_CACHE_PATH'),
+                namespace=getattr(self.embeddings, 'model', '') or ''
+            )
+        )
+        self.index_path = index_path or os.getenv('GRAPH_MEMORY_INDEX_PATH')
+        self.vector_index: Optional[VectorIndex] = None
+        self.graph_index: Optional[GraphIndex] = None
+        self._index_dirty = False
+
+    async def load_graph(self) -> GraphIndex:
+        """
+        Load the adjacency index from the Firebase/offline store on first use.
+
+        Returns:
+            The loaded graph index
+        """
+        if self.graph_index is not None:
+            return self.graph_index
+
+        graph = GraphIndex()
+        for node in await self.firebase_service.get_graph_nodes():
+            graph.add_node(
+                node['id'],
+                node.get('type', ''),
+                node.get('content', ''),
+                created_at=node.get('created_at')
+            )
+
+        graph.add_edges(
+            (edge['source_id'], edge['target_id'], edge['relation'])
+            for edge in await self.firebase_service.get_graph_edges()
+        )
+
+        self.graph_index = graph
+        logger.info(f"Loaded graph index with {len(graph)} nodes and {graph.edge_count} edges")
+        return graph
+
+    async def load_index(self) -> VectorIndex:
+        """
+        Load the local vector index, from disk if persisted or else from Firebase.
+
+        A persisted index is stamped with the number of nodes it was built
+        from; it is rebuilt when Firebase holds a different number, e.g.
+        after nodes were added by another worker or since the last save.
+
+        Returns:
+            The loaded vector index
+        """
+        if self.vector_index is not None:
+            return self.vector_index
+
+        if self.index_path and os.path.exists(self.index_path):
+            index = VectorIndex.load(self.index_path)
+            try:
+                node_count = await self.firebase_service.count_graph_nodes()
+            except Exception as e:
+                logger.warning(f"Could not check vector index against Firebase, using it as saved: {e}")
+                node_count = index.metadata.get('node_count')
+            if index.metadata.get('node_count') == node_count:
+                self.vector_index = index
+                return index
+            logger.info(
+                f"Vector index at {self.index_path} was built from "
+                f"{index.metadata.get('node_count')} nodes, Firebase has {node_count}; rebuilding"
+            )
+
+        return await self.rebuild_index()
+
+    async def rebuild_index(self) -> VectorIndex:
+        """
+        Rebuild the local vector index from all nodes stored in Firebase.
+
+        Returns:
+            The rebuilt vector index
+        """
+        index = VectorIndex()
+        all_nodes = await self.firebase_service.get_graph_nodes()
+        index.metadata['node_count'] = len(all_nodes)
+        nodes = [node for node in all_nodes if node.get('embedding')]
+
+        if nodes:
+            index.add(
+                [node['id'] for node in nodes],
+                [node['embedding'] for node in nodes],
+                [{'content': node.get('content', ''), 'type': node.get('type', '')} for node in nodes]
+            )
+
+        self.vector_index = index
+        self.save_index()
+
+        logger.info(f"Rebuilt vector index with {len(index)} nodes")
+        return index
+
+    def get_embedding_metrics(self) -> Dict[str, Any]:
+        """Get embedding cache hit rate and batch-size metrics."""
+        return self.embedder.get_metrics()
+
+    def save_index(self):
+        """Persist the local vector index if an index path is configured."""
+        if self.vector_index is not None and self.index_path:
+            self.vector_index.save(self.index_path)
+            self._index_dirty = False
+
+    def close(self):
+        """Persist nodes added to the vector index since it was last saved, and buffered embeddings."""
+        if self._index_dirty:
+            self.save_index()
+        self.embedder.cache.close()
 
     async def add_node(
         self,
@@ -93,6 +224,9 @@ class GraphMemory:
             embedding = await self._get_embedding(content)
             node_id = str(uuid4())
 
+            # Loaded before the write, so a rebuild does not already count this node
+            index = await self.load_index()
+
             # Create node
             node = Node(
                 id=node_id,
@@ -110,13 +244,29 @@ class GraphMemory:
             }
 
             created_node = await self.firebase_service.add_node(node_data)
-            node_dict = created_node.__dict__.copy()
-            node_dict['id'] = created_node.id
-            result_node = Node(**node_dict)
+            result_node = Node(
+                id=created_node.id,
+                type=node_type,
+                content=content,
+                embedding=embedding
+            )
+
+            # Keep the local indexes in step with the stored node
+            if embedding:
+                index.add([created_node.id], [embedding], [{'content': content, 'type': node_type}])
+            index.metadata['node_count'] = index.metadata.get('node_count', 0) + 1
+            self._index_dirty = True
+
+            # Online writes return the SERVER_TIMESTAMP sentinel, not the stored time
+            created_at = created_node.created_at
+            if not isinstance(created_at, (datetime, str)):
+                created_at = datetime.now(timezone.utc).isoformat()
+            graph = await self.load_graph()
+            graph.add_node(created_node.id, node_type, content, created_at=created_at)
 
             # Create edges to related nodes if provided
             if related_node_ids:
-                await self._create_edges(node_id, related_node_ids)
+                await self._create_edges(created_node.id, related_node_ids)
 
             logger.info(f"Created node {node_id} of type {node_type}")
             return result_node
@@ -147,6 +297,9 @@ class GraphMemory:
             created_edge = await self.firebase_service.add_edge(edge_data)
             edge = Edge(source_id=source_id, target_id=target_id, relation=relation)
 
+            graph = await self.load_graph()
+            graph.add_edges([(source_id, target_id, relation)])
+
             logger.info(f"Created edge: {source_id} -> {target_id} ({relation})")
             return edge
 
@@ -158,7 +311,10 @@ class GraphMemory:
         self,
         question: str,
         match_threshold: float = 0.7,
-        max_results: int = 10
+        max_results: int = 10,
+        max_hops: int = 1,
+        relations: Optional[List[str]] = None,
+        max_neighbors: int = 50
     ) -> List[Dict[str, Any]]:
         """
         Query the graph using vector similarity search.
@@ -167,6 +323,9 @@ class GraphMemory:
             question: Query string
             match_threshold: Minimum similarity threshold
             max_results: Maximum number of results
+            max_hops: How many edges to follow when expanding context
+            relations: Only expand along these relations (all if omitted)
+            max_neighbors: Maximum number of expanded neighbor nodes
 
         Returns:
             List of relevant context from the graph
@@ -175,23 +334,45 @@ class GraphMemory:
             # Get embedding for the query
             query_embedding = await self._get_embedding(question)
 
-            # Perform vector similarity search using Firebase service
-            result = await self.firebase_service.query_graph(query_embedding, match_threshold)
+            if not query_embedding:
+                return []
+
+            # Perform vector similarity search against the local index
+            index = await self.load_index()
+            matches = index.search(query_embedding, k=max_results, match_threshold=match_threshold)[0]
+
+            result = []
+            for node_id, similarity in matches:
+                payload = index.get_payload(node_id) or {}
+                result.append({
+                    'id': node_id,
+                    'content': payload.get('content', ''),
+                    'type': payload.get('type', ''),
+                    'similarity': similarity
+                })
 
             if result:
-                # Expand context with neighboring nodes
-                context = []
-                for node in result:
-                    context.append({
+                context = [
+                    {
                         'type': 'node',
+                        'id': node['id'],
                         'content': node.get('content', ''),
                         'node_type': node.get('type', ''),
                         'similarity': node.get('similarity', 0.0)
-                    })
-
-                    # Get connected nodes
-                    neighbors = await self._get_neighbors(node['id'])
-                    context.extend(neighbors)
+                    }
+                    for node in result
+                ]
+
+                # Expand context with neighboring nodes in one bounded BFS
+                if max_hops > 0:
+                    graph = await self.load_graph()
+                    for neighbor in graph.expand(
+                        [node['id'] for node in result],
+                        max_hops=max_hops,
+                        relations=relations,
+                        max_nodes=max_neighbors
+                    ):
+                        context.append(self._neighbor_context(neighbor))
 
                 logger.info(f"Query returned {len(result)} nodes")
                 return context
@@ -205,10 +386,9 @@ class GraphMemory:
     async def get_node(self, node_id: str) -> Optional[Node]:
         """Get a specific node by ID."""
         try:
-            # This would need to be implemented in Firebase service
-            # For now, return None as placeholder
-            logger.warning(f"get_node not implemented for Firebase: {node_id}")
-            return None
+            graph = await self.load_graph()
+            node = graph.get_node(node_id)
+            return self._to_node(node) if node else None
 
         except Exception as e:
             logger.error(f"Error getting node {node_id}: {str(e)}")
@@ -217,31 +397,37 @@ class GraphMemory:
     async def get_nodes_by_type(self, node_type: str) -> List[Node]:
         """Get all nodes of a specific type."""
         try:
-            # This would need to be implemented in Firebase service
-            # For now, return empty list as placeholder
-            logger.warning(f"get_nodes_by_type not implemented for Firebase: {node_type}")
-            return []
+            graph = await self.load_graph()
+            return [self._to_node(node) for node in graph.get_nodes_by_type(node_type)]
 
         except Exception as e:
             logger.error(f"Error getting nodes by type {node_type}: {str(e)}")
             return []
 
-    async def get_connected_nodes(self, node_id: str, relation: Optional[str] = None) -> List[Node]:
-        """Get nodes connected to a specific node."""
+    async def get_connected_nodes(
+        self,
+        node_id: str,
+        relation: Optional[str] = None,
+        max_nodes: int = 100
+    ) -> List[Node]:
+        """Get up to max_nodes nodes connected to a specific node."""
         try:
-            # This would need to be implemented in Firebase service
-            # For now, return empty list as placeholder
-            logger.warning(f"get_connected_nodes not implemented for Firebase: {node_id}")
-            return []
+            graph = await self.load_graph()
+            relations = [relation] if relation else None
+            nodes = graph.expand([node_id], relations=relations, max_nodes=max_nodes + 1)
+            if len(nodes) > max_nodes:
+                logger.warning(f"Connected nodes for {node_id} truncated to {max_nodes}")
+                nodes = nodes[:max_nodes]
+            return [self._to_node(node) for node in nodes]
 
         except Exception as e:
             logger.error(f"Error getting connected nodes for {node_id}: {str(e)}")
             return []
 
     async def _get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using OpenAI."""
+        """Generate embedding for text, served from cache or a shared batch."""
         try:
-            embedding = await self.embeddings.aembed_query(text)
+            embedding = await self.embedder.aembed_query(text)
             return embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
@@ -250,22 +436,55 @@ class GraphMemory:
 
     async def _create_edges(self, source_id: str, target_ids: List[str], relation: str = 'related_to'):
         """Create edges between a source node and multiple target nodes."""
-        for target_id in target_ids:
-            await self.add_edge(source_id, target_id, relation)
-        logger.info(f"Created {len(target_ids)} edges for node {source_id}")
+        graph = await self.load_graph()
+        new_edges = graph.add_edges((source_id, target_id, relation) for target_id in target_ids)
+
+        if new_edges:
+            try:
+                await self.firebase_service.batch_create_edges([
+                    {'source_id': source, 'target_id': target, 'relation': rel}
+                    for source, target, rel in new_edges
+                ])
+            except Exception:
+                # Unindex the edges so a retry sees them as new and writes them
+                graph.remove_edges(new_edges)
+                raise
+        logger.info(f"Created {len(new_edges)} edges for node {source_id}")
 
     async def _get_neighbors(self, node_id: str) -> List[Dict[str, Any]]:
         """Get neighboring nodes and their relationships."""
         try:
-            # This would need to be implemented in Firebase service
-            # For now, return empty list as placeholder
-            logger.warning(f"_get_neighbors not implemented for Firebase: {node_id}")
-            return []
+            graph = await self.load_graph()
+            return [self._neighbor_context(node) for node in graph.expand([node_id])]
 
         except Exception as e:
             logger.error(f"Error getting neighbors for {node_id}: {str(e)}")
             return []
 
+    @staticmethod
+    def _neighbor_context(node: Dict[str, Any]) -> Dict[str, Any]:
+        """Format an expanded graph node as a context entry."""
+        return {
+            'type': 'neighbor',
+            'id': node['id'],
+            'content': node.get('content', ''),
+            'node_type': node.get('type', ''),
+            'relation': node['relation'],
+            'hops': node['hops'],
+            'source_id': node['source_id']
+        }
+
+    @staticmethod
+    def _to_node(node: Dict[str, Any]) -> Node:
+        """Build a Node from indexed node data."""
+        created_at = node.get('created_at')
+        return Node(
+            id=node['id'],
+            type=node.get('type', ''),
+            content=node.get('content', ''),
+            created_at=created_at.isoformat() if isinstance(created_at, datetime) else created_at
+        )
+
 
 class GraphMemoryTools:
     """
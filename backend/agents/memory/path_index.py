@@ -0,0 +1,287 @@
+"""
+Path index for the AutoAdmin virtual file system.
+
+File paths are kept in a trie of directories, each holding a sorted list of
+child names, so listing, existence checks and stat calls touch only the
+directory being asked about instead of every stored file.
+"""
+
+import bisect
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Directory:
+    """One directory in the path trie."""
+
+    __slots__ = ('dirs', 'files', 'names')
+
+    def __init__(self):
+        self.dirs: Dict[str, '_Directory'] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # Sorted, de-duplicated child names (files and subdirectories)
+        self.names: List[str] = []
+
+    def add_name(self, name: str):
+        position = bisect.bisect_left(self.names, name)
+        if position == len(self.names) or self.names[position] != name:
+            self.names.insert(position, name)
+
+    def discard_name(self, name: str):
+        if name in self.dirs or name in self.files:
+            return
+        position = bisect.bisect_left(self.names, name)
+        if position < len(self.names) and self.names[position] == name:
+            del self.names[position]
+
+
+class PathIndex:
+    """
+    Directory trie over virtual file system paths.
+
+    Leading, trailing and repeated slashes are ignored when splitting a path,
+    so "/a/b.txt" and "a/b.txt" address the same file. Directories exist
+    implicitly while they contain files and are pruned when emptied.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._root = _Directory()
+        self.file_count = 0
+        self.total_size = 0
+
+    def __len__(self) -> int:
+        return self.file_count
+
+    def __contains__(self, path: str) -> bool:
+        return self.stat(path) is not None
+
+    def add(self, path: str, size: int = 0, last_modified: Any = None):
+        """
+        Add or update a file.
+
+        Args:
+            path: File path as stored
+            size: File size in bytes
+            last_modified: Modification time (datetime or ISO string)
+        """
+        parts = self._split(path)
+        if not parts:
+            raise ValueError(f"Invalid file path: {path!r}")
+
+        directory = self._root
+        for name in parts[:-1]:
+            child = directory.dirs.get(name)
+            if child is None:
+                child = directory.dirs[name] = _Directory()
+                directory.add_name(name)
+            directory = child
+
+        name = parts[-1]
+        previous = directory.files.get(name)
+        if previous is not None:
+            self.total_size -= previous['size']
+        else:
+            self.file_count += 1
+            directory.add_name(name)
+
+        directory.files[name] = {
+            'path': path,
+            'size': size,
+            'last_modified': self._timestamp(last_modified)
+        }
+        self.total_size += size
+
+    def remove(self, path: str) -> bool:
+        """
+        Remove a file, pruning directories it leaves empty.
+
+        Args:
+            path: File path
+
+        Returns:
+            True if the file was indexed
+        """
+        parts = self._split(path)
+        if not parts:
+            return False
+
+        trail: List[Tuple[_Directory, str]] = []
+        directory = self._root
+        for name in parts[:-1]:
+            child = directory.dirs.get(name)
+            if child is None:
+                return False
+            trail.append((directory, name))
+            directory = child
+
+        meta = directory.files.pop(parts[-1], None)
+        if meta is None:
+            return False
+
+        directory.discard_name(parts[-1])
+        self.file_count -= 1
+        self.total_size -= meta['size']
+
+        for parent, name in reversed(trail):
+            child = parent.dirs[name]
+            if child.dirs or child.files:
+                break
+            del parent.dirs[name]
+            parent.discard_name(name)
+
+        return True
+
+    def stat(self, path: str) -> Optional[Dict[str, Any]]:
+        """Get a file's metadata (path, size, last_modified)."""
+        parts = self._split(path)
+        if not parts:
+            return None
+        directory = self._find(parts[:-1])
+        return directory.files.get(parts[-1]) if directory else None
+
+    def is_dir(self, path: str) -> bool:
+        """Check whether a directory exists (the root always does)."""
+        return self._find(self._split(path)) is not None
+
+    def exists(self, path: str) -> bool:
+        """Check whether a file or directory exists."""
+        return self.stat(path) is not None or self.is_dir(path)
+
+    def list(
+        self,
+        path: str = "/",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List the entries of one directory in name order.
+
+        Args:
+            path: Directory path
+            limit: Maximum number of names to return (all if omitted)
+            cursor: Name to resume after, as returned by a previous call
+
+        Returns:
+            (entries, next_cursor); next_cursor is None on the last page.
+            Entries carry 'name', 'type' ('file' or 'directory') and, for
+            files, the stored 'path', 'size' and 'last_modified'.
+        """
+        directory = self._find(self._split(path))
+        if directory is None:
+            return [], None
+
+        start = bisect.bisect_right(directory.names, cursor) if cursor is not None else 0
+        end = len(directory.names) if limit is None else min(len(directory.names), start + limit)
+
+        entries = []
+        for name in directory.names[start:end]:
+            if name in directory.dirs:
+                entries.append({'name': name, 'type': 'directory'})
+            meta = directory.files.get(name)
+            if meta is not None:
+                entries.append({'name': name, 'type': 'file', **meta})
+
+        next_cursor = directory.names[end - 1] if end < len(directory.names) else None
+        return entries, next_cursor
+
+    def iter_files(self, path: str = "/") -> Iterator[Dict[str, Any]]:
+        """Iterate over the metadata of every file below a directory."""
+        directory = self._find(self._split(path))
+        if directory is None:
+            return
+
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            yield from directory.files.values()
+            stack.extend(directory.dirs.values())
+
+    def is_current(self, file_count: int, latest: Optional[Dict[str, Any]]) -> bool:
+        """
+        Check the index against the store it was built from.
+
+        Every write moves the store's latest modification time and every
+        delete lowers its count, so an index holding as many files as the
+        store, with the most recently written file at its stored version,
+        has seen every change, including a create paired with a delete.
+
+        Args:
+            file_count: Number of files in the store
+            latest: Metadata of the store's most recently written file,
+                None when it has no files
+
+        Returns:
+            True if the index matches the store
+        """
+        if file_count != self.file_count:
+            return False
+        if latest is None:
+            return self.file_count == 0
+        meta = self.stat(latest['path'])
+        return meta is not None and meta['last_modified'] == self._timestamp(latest.get('last_modified'))
+
+    def save(self, path: str):
+        """
+        Persist the index to disk atomically.
+
+        Args:
+            path: Destination JSON file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': list(self.iter_files())}, f)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Saved path index with {self.file_count} files to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'PathIndex':
+        """
+        Load an index previously written with save().
+
+        Args:
+            path: Source file
+
+        Returns:
+            Loaded index
+        """
+        with open(path) as f:
+            data = json.load(f)
+
+        index = cls()
+        for meta in data.get('files', []):
+            index.add(meta['path'], meta.get('size', 0), meta.get('last_modified'))
+
+        logger.info(f"Loaded path index with {index.file_count} files from {path}")
+        return index
+
+    def _find(self, parts: List[str]) -> Optional[_Directory]:
+        """Walk to a directory, or None if it does not exist."""
+        directory = self._root
+        for name in parts:
+            directory = directory.dirs.get(name)
+            if directory is None:
+                return None
+        return directory
+
+    @staticmethod
+    def _split(path: str) -> List[str]:
+        """Split a path into its non-empty components."""
+        return [part for part in path.split('/') if part]
+
+    @staticmethod
+    def _timestamp(value: Any) -> Optional[str]:
+        """Store modification times as ISO strings."""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value if isinstance(value, str) else None
@@ -0,0 +1,268 @@
+"""
+Local vector index for AutoAdmin graph memory.
+
+This module keeps normalized node embeddings in a contiguous float32 matrix
+so similarity search over the knowledge graph runs in-process instead of
+requiring a Firestore round trip per query.
+"""
+
+import json
+import logging
+import os
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """
+    In-memory cosine similarity index backed by a NumPy matrix.
+
+    Rows are L2-normalized on insert, so cosine similarity is a single
+    matrix product. Deletes swap the last row into the freed slot, keeping
+    the live rows contiguous.
+    """
+
+    def __init__(self, dimension: Optional[int] = None, initial_capacity: int = 1024):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimension: Embedding dimension (inferred from the first add if omitted)
+            initial_capacity: Number of rows to preallocate
+        """
+        self.dimension = dimension
+        self._capacity = max(1, initial_capacity)
+        self._size = 0
+        self._matrix = (
+            np.zeros((self._capacity, dimension), dtype=np.float32)
+            if dimension else None
+        )
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        # JSON-safe values saved with the index, e.g. what it was built from
+        self.metadata: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._rows
+
+    @property
+    def ids(self) -> List[str]:
+        """IDs of indexed vectors in row order."""
+        return list(self._ids)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        payloads: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+    ) -> int:
+        """
+        Add or replace vectors in the index.
+
+        Args:
+            ids: Node IDs, one per embedding
+            embeddings: Array-like of shape (n, dimension)
+            payloads: Optional metadata stored alongside each ID
+
+        Returns:
+            Number of vectors written
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(f"Got {len(ids)} ids for {vectors.shape[0]} embeddings")
+        if vectors.shape[0] == 0:
+            return 0
+
+        if self._matrix is None:
+            self.dimension = vectors.shape[1]
+            self._matrix = np.zeros((self._capacity, self.dimension), dtype=np.float32)
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dimension}"
+            )
+
+        vectors = self._normalize(vectors)
+        self._reserve(self._size + vectors.shape[0])
+
+        for position, node_id in enumerate(ids):
+            row = self._rows.get(node_id)
+            if row is None:
+                row = self._size
+                self._rows[node_id] = row
+                self._ids.append(node_id)
+                self._size += 1
+            self._matrix[row] = vectors[position]
+
+            if payloads is not None and payloads[position] is not None:
+                self._payloads[node_id] = payloads[position]
+
+        return vectors.shape[0]
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """
+        Remove vectors from the index.
+
+        Args:
+            ids: Node IDs to remove
+
+        Returns:
+            Number of vectors removed
+        """
+        removed = 0
+        for node_id in ids:
+            row = self._rows.pop(node_id, None)
+            if row is None:
+                continue
+
+            last = self._size - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+
+            self._ids.pop()
+            self._payloads.pop(node_id, None)
+            self._size -= 1
+            removed += 1
+
+        return removed
+
+    def get_payload(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Get metadata stored with a vector."""
+        return self._payloads.get(node_id)
+
+    def search(
+        self,
+        queries: Any,
+        k: int = 10,
+        match_threshold: Optional[float] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Batched top-k cosine similarity search.
+
+        Args:
+            queries: Array-like of shape (dimension,) or (q, dimension)
+            k: Maximum number of results per query
+            match_threshold: Minimum similarity to include a result
+
+        Returns:
+            One list of (node_id, similarity) per query, best match first
+        """
+        query_matrix = np.asarray(queries, dtype=np.float32)
+        if query_matrix.ndim == 1:
+            query_matrix = query_matrix.reshape(1, -1)
+
+        if self._size == 0 or k <= 0 or query_matrix.shape[1] != self.dimension:
+            return [[] for _ in range(query_matrix.shape[0])]
+
+        scores = self._normalize(query_matrix) @ self._matrix[:self._size].T
+        k = min(k, self._size)
+
+        if k < self._size:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(self._size), (scores.shape[0], self._size))
+
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for rows, row_scores in zip(top, top_scores, strict=True):
+            matches = []
+            for row, score in zip(rows, row_scores, strict=True):
+                if match_threshold is not None and score < match_threshold:
+                    break
+                matches.append((self._ids[row], float(score)))
+            results.append(matches)
+
+        return results
+
+    def save(self, path: str):
+        """
+        Persist the index to disk atomically.
+
+        Args:
+            path: Destination file (NumPy .npz archive)
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                matrix=self._matrix[:self._size] if self._matrix is not None else np.zeros((0, 0), dtype=np.float32),
+                ids=np.array(self._ids, dtype=str),
+                payloads=np.array(json.dumps(self._payloads, default=str)),
+                metadata=np.array(json.dumps(self.metadata, default=str))
+            )
+        os.replace(tmp_path, path)
+
+        logger.info(f"Saved vector index with {self._size} vectors to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'VectorIndex':
+        """
+        Load an index previously written with save().
+
+        Args:
+            path: Source file
+
+        Returns:
+            Loaded index
+        """
+        with np.load(path, allow_pickle=False) as data:
+            matrix = data['matrix']
+            ids = [str(node_id) for node_id in data['ids']]
+            payloads = json.loads(str(data['payloads']))
+            metadata = json.loads(str(data['metadata'])) if 'metadata' in data.files else {}
+
+        index = cls(
+            dimension=matrix.shape[1] if matrix.size else None,
+            initial_capacity=max(1024, len(ids))
+        )
+        if ids:
+            # Stored rows are already normalized
+            index._matrix[:len(ids)] = matrix
+            index._ids = ids
+            index._rows = {node_id: row for row, node_id in enumerate(ids)}
+            index._size = len(ids)
+        index._payloads = payloads
+        index.metadata = metadata
+
+        logger.info(f"Loaded vector index with {len(ids)} vectors from {path}")
+        return index
+
+    def _reserve(self, capacity: int):
+        """Grow the backing matrix geometrically to hold capacity rows."""
+        if capacity <= self._capacity:
+            return
+
+        new_capacity = self._capacity
+        while new_capacity < capacity:
+            new_capacity *= 2
+
+        matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        self._capacity = new_capacity
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows, leaving zero vectors untouched."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
@@ -7,14 +7,17 @@ allowing agents to maintain state across GitHub Actions runs.
 
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import mimetypes
 
-from ..services.firebase_service import FirebaseService
+from ..services.firebase_service import FirebaseService, shared_file_invalidation_enabled
+from .path_index import PathIndex
+from .file_cache import FileCache
 
 
 @dataclass
@@ -31,7 +34,7 @@ class VirtualFile:
         if self.last_modified is None:
             self.last_modified = datetime.utcnow().isoformat()
         if self.size == 0:
-            self.size = len(self.content) if self.content else 0
+            self.size = len(self.content.encode("utf-8")) if self.content else 0
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for storage."""
@@ -58,10 +61,117 @@ class VirtualFileSystem:
     to store files, maintain state, and coordinate between runs.
     """
 
-    def __init__(self):
-        """Initialize the virtual file system with Firebase service."""
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        cache_ttl_seconds: Optional[float] = None,
+        invalidation_hook: Optional[Callable[[str], Any]] = None,
+        shared_invalidation: Optional[bool] = None
+    ):
+        """
+        Initialize the virtual file system with Firebase service.
+
+        Args:
+            index_path: Optional file to persist the path index to, so it can
+                be restored without listing Firebase on startup
+            cache_max_bytes: Content cache budget (default 64 MiB)
+            cache_ttl_seconds: Seconds a cached file is served before it is
+                revalidated against its stored version (default 300)
+            invalidation_hook: Called with the path after every local write
+                or delete, e.g. to publish invalidations to other workers
+            shared_invalidation: Follow changes made by other workers once
+                the path index is loaded (default VFS_SHARED_INVALIDATION,
+                off unless set to true; see enable_shared_invalidation)
+        """
         self.firebase_service = FirebaseService()
-        self._cache: Dict[str, VirtualFile] = {}
+        self._cache = FileCache(
+            max_bytes=cache_max_bytes or int(os.getenv('VFS_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+            ttl_seconds=cache_ttl_seconds or float(os.getenv('VFS_CACHE_TTL_SECONDS', 300))
+        )
+        self.invalidation_hook = invalidation_hook
+        self._watch = None
+        if shared_invalidation is None:
+            shared_invalidation = shared_file_invalidation_enabled()
+        self.shared_invalidation = shared_invalidation
+        self.index_path = index_path or os.getenv('VFS_INDEX_PATH')
+        self.path_index: Optional[PathIndex] = None
+        self._index_dirty = False
+
+    async def load_index(self) -> PathIndex:
+        """
+        Load the path index on first use.
+
+        Restores from index_path when a saved index is current with Firebase
+        (see PathIndex.is_current), otherwise rebuilds from file metadata
+        stored in Firebase. Once loaded, changes from other workers are followed
+        if shared invalidation is turned on.
+
+        Returns:
+            The loaded path index
+        """
+        if self.path_index is not None:
+            return self.path_index
+
+        index = None
+        if self.index_path and os.path.exists(self.index_path):
+            try:
+                index = PathIndex.load(self.index_path)
+            except Exception as e:
+                logger.warning(f"Could not load path index from {self.index_path}: {str(e)}")
+
+        if index is not None:
+            try:
+                current = await self._index_is_current(index)
+            except Exception as e:
+                logger.warning(f"Could not check path index against Firebase, using it as saved: {e}")
+                current = True
+            if current:
+                self.path_index = index
+            else:
+                logger.info(f"Path index at {self.index_path} is out of date with Firebase; rebuilding")
+
+        if self.path_index is None:
+            await self.rebuild_index()
+
+        if self.shared_invalidation:
+            self.enable_shared_invalidation()
+        return self.path_index
+
+    async def _index_is_current(self, index: PathIndex) -> bool:
+        """Check a saved index against the file count and latest write in Firebase."""
+        file_count = await self.firebase_service.count_agent_files()
+        if file_count != index.file_count:
+            return False
+        return index.is_current(file_count, await self.firebase_service.get_latest_agent_file())
+
+    async def rebuild_index(self) -> PathIndex:
+        """
+        Rebuild the path index from file metadata stored in Firebase.
+
+        Returns:
+            The rebuilt path index
+        """
+        index = PathIndex()
+        for file_data in await self.firebase_service.list_agent_files():
+            index.add(file_data['path'], file_data.get('size', 0), file_data.get('last_modified'))
+
+        self.path_index = index
+        self._index_dirty = True
+        logger.info(f"Rebuilt path index with {len(index)} files")
+        return index
+
+    def save_index(self):
+        """Persist the path index to index_path, if configured."""
+        if self.path_index is not None and self.index_path:
+            self.path_index.save(self.index_path)
+            self._index_dirty = False
+
+    def close(self):
+        """Stop following other workers and persist index changes since the last save."""
+        self.disable_shared_invalidation()
+        if self._index_dirty:
+            self.save_index()
 
     async def read_file(self, path: str) -> str:
         """
@@ -78,9 +188,20 @@ class VirtualFileSystem:
         """
         try:
             # Check cache first
-            if path in self._cache:
+            virtual_file = self._cache.get(path)
+            if virtual_file is not None:
                 logger.debug(f"Reading {path} from cache")
-                return self._cache[path].content
+                return virtual_file.content
+
+            # Expired entries are reused if the stored version is unchanged
+            stale_file = self._cache.get_stale(path)
+            if stale_file is not None:
+                version = await self.firebase_service.get_agent_file_version(path)
+                if version is not None and self._etag(version) == stale_file.last_modified:
+                    self._cache.renew(path)
+                    logger.debug(f"Revalidated cached {path}")
+                    return stale_file.content
+                self._cache.invalidate(path)
 
             # Load from Firebase
             file_data = await self.firebase_service.get_agent_file(path)
@@ -92,12 +213,12 @@ class VirtualFileSystem:
                 path=file_data.path,
                 content=file_data.content,
                 content_type="text/plain",
-                last_modified=file_data.last_modified,
-                size=len(file_data.content) if file_data.content else 0
+                last_modified=self._etag(file_data.last_modified),
+                size=len(file_data.content.encode("utf-8")) if file_data.content else 0
             )
 
             # Cache the file
-            self._cache[path] = virtual_file
+            self._cache.put(path, virtual_file, virtual_file.size)
 
             logger.debug(f"Read {len(virtual_file.content)} bytes from {path}")
             return virtual_file.content
@@ -123,10 +244,16 @@ class VirtualFileSystem:
             )
 
             # Store in Firebase
-            await self.firebase_service.store_agent_file(path, content)
-
-            # Update cache
-            self._cache[path] = virtual_file
+            stored_file = await self.firebase_service.store_agent_file(path, content)
+            if isinstance(stored_file.last_modified, datetime):
+                virtual_file.last_modified = stored_file.last_modified.isoformat()
+
+            # Update cache and index
+            self._cache.put(path, virtual_file, virtual_file.size)
+            index = await self.load_index()
+            index.add(path, virtual_file.size, virtual_file.last_modified)
+            self._index_dirty = True
+            await self._publish_invalidation(path)
             logger.debug(f"Wrote {len(content)} bytes to {path}")
 
         except Exception as e:
@@ -148,9 +275,8 @@ class VirtualFileSystem:
             if path in self._cache:
                 return True
 
-            # Check database
-            result = self.supabase.table('agent_files').select('path').eq('path', path).execute()
-            return len(result.data) > 0
+            index = await self.load_index()
+            return index.exists(path)
 
         except Exception as e:
             logger.error(f"Error checking existence of {path}: {str(e)}")
@@ -166,50 +292,63 @@ class VirtualFileSystem:
         Returns:
             List of directory entries
         """
+        entries = []
+        cursor = None
+        while True:
+            page = await self.list_directory_page(path, limit=1000, cursor=cursor)
+            entries.extend(page['entries'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return entries
+
+    async def list_directory_page(
+        self,
+        path: str = "/",
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        List one page of a directory in name order.
+
+        Args:
+            path: Directory path to list
+            limit: Maximum number of names per page
+            cursor: next_cursor from the previous page
+
+        Returns:
+            Dictionary with 'entries' (DirectoryEntry list) and 'next_cursor'
+            (None on the last page)
+        """
         try:
             # Normalize path
             if not path.endswith('/'):
                 path += '/'
 
-            # Query files that start with the path
-            result = self.supabase.table('agent_files').select('path, last_modified').execute()
-
-            if not result.data:
-                return []
-
-            # Group files by directory
-            entries = {}
-            for file_data in result.data:
-                file_path = file_data['path']
-                if file_path.startswith(path):
-                    # Get the relative path from the directory
-                    relative_path = file_path[len(path):]
-                    parts = relative_path.split('/')
-
-                    if len(parts) == 1:
-                        # It's a file in this directory
-                        entries[relative_path] = DirectoryEntry(
-                            path=file_path,
-                            type='file',
-                            size=0,  # Size will be updated when we read the file
-                            last_modified=file_data.get('last_modified')
-                        )
-                    elif len(parts) > 1:
-                        # It's a subdirectory
-                        subdir = parts[0]
-                        if subdir not in entries:
-                            entries[subdir] = DirectoryEntry(
-                                path=f"{path}{subdir}",
-                                type='directory',
-                                size=0,
-                                last_modified=None
-                            )
-
-            return list(entries.values())
+            index = await self.load_index()
+            items, next_cursor = index.list(path, limit=limit, cursor=cursor)
+
+            entries = []
+            for item in items:
+                if item['type'] == 'file':
+                    entries.append(DirectoryEntry(
+                        path=item['path'],
+                        type='file',
+                        size=item['size'],
+                        last_modified=item['last_modified']
+                    ))
+                else:
+                    entries.append(DirectoryEntry(
+                        path=f"{path}{item['name']}",
+                        type='directory',
+                        size=0,
+                        last_modified=None
+                    ))
+
+            return {'entries': entries, 'next_cursor': next_cursor}
 
         except Exception as e:
             logger.error(f"Error listing directory {path}: {str(e)}")
-            return []
+            return {'entries': [], 'next_cursor': None}
 
     async def delete_file(self, path: str) -> bool:
         """
@@ -222,14 +361,18 @@ class VirtualFileSystem:
             True if successful, False otherwise
         """
         try:
-            result = self.supabase.table('agent_files').delete().eq('path', path).execute()
+            deleted = await self.firebase_service.delete_agent_file(path)
+
+            # Remove from cache and index
+            self._cache.invalidate(path)
+            index = await self.load_index()
+            deleted = index.remove(path) or deleted
+            self._index_dirty = True
+            await self._publish_invalidation(path)
 
-            if result.data and len(result.data) > 0:
-                # Remove from cache
-                self._cache.pop(path, None)
+            if deleted:
                 logger.debug(f"Deleted file {path}")
-                return True
-            return False
+            return deleted
 
         except Exception as e:
             logger.error(f"Error deleting file {path}: {str(e)}")
@@ -248,7 +391,7 @@ class VirtualFileSystem:
         try:
             # Check cache first
             if path in self._cache:
-                file_data = self._cache[path]
+                file_data = self._cache.get_stale(path)
                 return DirectoryEntry(
                     path=path,
                     type='file',
@@ -256,20 +399,16 @@ class VirtualFileSystem:
                     last_modified=file_data.last_modified
                 )
 
-            # Check database
-            result = self.supabase.table('agent_files').select('path, last_modified').eq('path', path).single().execute()
-
-            if not result.data:
+            index = await self.load_index()
+            meta = index.stat(path)
+            if meta is None:
                 return None
 
-            # Get file content to determine size
-            content = await self.read_file(path)
-
             return DirectoryEntry(
                 path=path,
                 type='file',
-                size=len(content),
-                last_modified=result.data.get('last_modified')
+                size=meta['size'],
+                last_modified=meta['last_modified']
             )
 
         except Exception as e:
@@ -302,31 +441,20 @@ class VirtualFileSystem:
             Dictionary with file system stats
         """
         try:
-            result = self.supabase.table('agent_files').select('path, last_modified').execute()
-
-            if not result.data:
-                return {
-                    'total_files': 0,
-                    'total_size': 0,
-                    'last_modified': None
-                }
-
-            total_size = 0
-            for file_data in result.data:
-                content = await self.read_file(file_data['path'])
-                total_size += len(content)
+            index = await self.load_index()
 
             # Find most recent modification
             last_modified = max(
-                (file_data.get('last_modified') for file_data in result.data),
+                (meta['last_modified'] for meta in index.iter_files() if meta['last_modified']),
                 default=None
             )
 
             return {
-                'total_files': len(result.data),
-                'total_size': total_size,
+                'total_files': index.file_count,
+                'total_size': index.total_size,
                 'last_modified': last_modified,
-                'cached_files': len(self._cache)
+                'cached_files': len(self._cache),
+                'cache': self._cache.get_metrics()
             }
 
         except Exception as e:
@@ -346,14 +474,11 @@ class VirtualFileSystem:
             Dictionary mapping file paths to contents
         """
         try:
-            result = self.supabase.table('agent_files').select('path').execute()
-
-            if not result.data:
-                return {}
+            index = await self.load_index()
 
             export_data = {}
-            for file_data in result.data:
-                path = file_data['path']
+            for meta in list(index.iter_files()):
+                path = meta['path']
                 # Skip directory marker files
                 if not path.endswith('/.directory_marker'):
                     content = await self.read_file(path)
@@ -370,6 +495,84 @@ class VirtualFileSystem:
         self._cache.clear()
         logger.debug("Cleared file system cache")
 
+    def invalidate(self, path: str) -> None:
+        """
+        Drop a cached file so the next read refetches it.
+
+        Receivers of a shared invalidation channel should call this.
+
+        Args:
+            path: File path that changed elsewhere
+        """
+        if self._cache.invalidate(path):
+            logger.debug(f"Invalidated cached {path}")
+
+    def enable_shared_invalidation(self) -> bool:
+        """
+        Subscribe to the agent_file_versions documents other workers
+        publish, so their writes invalidate this cache and update the path
+        index. Workers only publish while VFS_SHARED_INVALIDATION is true.
+
+        Returns:
+            True if the listener was started
+        """
+        if self._watch is not None:
+            return True
+
+        loop = asyncio.get_running_loop()
+
+        def on_change(path: str, file_data: Optional[Dict[str, Any]]):
+            loop.call_soon_threadsafe(self._apply_remote_change, path, file_data)
+
+        self._watch = self.firebase_service.watch_agent_files(on_change)
+        return self._watch is not None
+
+    def disable_shared_invalidation(self) -> None:
+        """Stop listening for changes from other workers."""
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """Get content cache metrics."""
+        return self._cache.get_metrics()
+
+    def _apply_remote_change(self, path: str, file_data: Optional[Dict[str, Any]]) -> None:
+        """Apply a change reported by the version listener."""
+        cached_file = self._cache.get_stale(path)
+        if file_data is not None and cached_file is not None:
+            # Our own write echoing back leaves the cache valid
+            if self._etag(file_data.get('last_modified')) == cached_file.last_modified:
+                return
+
+        self.invalidate(path)
+
+        if self.path_index is not None:
+            if file_data is None:
+                self.path_index.remove(path)
+            else:
+                self.path_index.add(path, file_data.get('size', 0), file_data.get('last_modified'))
+            self._index_dirty = True
+
+    async def _publish_invalidation(self, path: str) -> None:
+        """Run the invalidation hook, if any, after a local change."""
+        if self.invalidation_hook is None:
+            return
+
+        try:
+            result = self.invalidation_hook(path)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.warning(f"Invalidation hook failed for {path}: {str(e)}")
+
+    @staticmethod
+    def _etag(last_modified: Any) -> Optional[str]:
+        """Normalize a stored modification time for version comparison."""
+        if isinstance(last_modified, datetime):
+            return last_modified.isoformat()
+        return last_modified if isinstance(last_modified, str) else None
+
 
 class VirtualFileSystemTools:
     """
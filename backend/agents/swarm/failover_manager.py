@@ -229,6 +229,7 @@ class HotStandbyManager:
                 self.load_balancer.agent_metrics[
                     standby_id
                 ].status = AgentStatus.HEALTHY
+                self.load_balancer.refresh_agent(standby_id)
 
             self.logger.info(f"Deactivated standby agent: {standby_id}")
             return True
@@ -369,6 +370,8 @@ class HotStandbyManager:
                 self.load_balancer.circuit_breakers[standby_id].state = "CLOSED"
                 self.load_balancer.circuit_breakers[standby_id].failure_count = 0
 
+            self.load_balancer.refresh_agent(standby_id)
+
             self.logger.info(f"Recovery completed for standby agent: {standby_id}")
 
         except Exception as e:
@@ -962,6 +965,7 @@ class FailoverManager:
             if agent_id in load_balancer.circuit_breakers:
                 load_balancer.circuit_breakers[agent_id].state = "CLOSED"
                 load_balancer.circuit_breakers[agent_id].failure_count = 0
+                load_balancer.refresh_agent(agent_id)
 
             self.logger.info(f"Reset circuit breaker for agent: {agent_id}")
             return True
@@ -4,10 +4,11 @@ Provides intelligent task distribution with load-aware routing and failover capa
 """
 
 import asyncio
+import heapq
 import logging
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, field
 import json
 import uuid
@@ -125,6 +126,286 @@ class CircuitBreaker:
             self.state = "OPEN"
 
 
+class AgentSelectionIndex:
+    """
+    Incremental indexes for choosing an agent without scanning the registry
+
+    Agents are grouped by type and by (type, capability). Each group keeps a
+    heap ordered by the strategy's selection key, with registration order as
+    the tie-break. Updates bump the agent's version and push fresh entries;
+    stale entries are dropped lazily when they reach the top of a heap.
+    """
+
+    def __init__(
+        self,
+        strategy: LoadBalancingStrategy,
+        circuit_breakers: Dict[str, CircuitBreaker],
+    ):
+        self.strategy = strategy
+        self.circuit_breakers = circuit_breakers
+
+        self._metrics: Dict[str, AgentMetrics] = {}
+        self._capabilities: Dict[str, Set[str]] = {}
+        self._sequence: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._next_sequence = 0
+
+        # (agent_type, capability or None) -> member agent ids / selection heap
+        self._members: Dict[Tuple[str, Optional[str]], Set[str]] = {}
+        self._heaps: Dict[Tuple[str, Optional[str]], List[Tuple[float, int, int, str]]] = {}
+        self._types_by_task: Dict[str, List[str]] = {}
+
+    def add(self, metrics: AgentMetrics):
+        """Index a newly registered (or re-registered) agent"""
+        agent_id = metrics.agent_id
+        if agent_id in self._metrics:
+            self.remove(agent_id)
+        else:
+            self._sequence[agent_id] = self._next_sequence
+            self._next_sequence += 1
+
+        self._metrics[agent_id] = metrics
+        self._capabilities[agent_id] = set(metrics.capabilities)
+
+        if (metrics.agent_type, None) not in self._members:
+            self._types_by_task.clear()
+        for group in self._groups(agent_id):
+            self._members.setdefault(group, set()).add(agent_id)
+
+        self.update(agent_id)
+
+    def remove(self, agent_id: str):
+        """Drop an agent from every group (its registration order is kept)"""
+        if agent_id not in self._metrics:
+            return
+
+        for group in self._groups(agent_id):
+            members = self._members.get(group)
+            if members is not None:
+                members.discard(agent_id)
+                if not members:
+                    del self._members[group]
+                    self._heaps.pop(group, None)
+                    if group[1] is None:
+                        self._types_by_task.clear()
+
+        del self._metrics[agent_id]
+        del self._capabilities[agent_id]
+        self._versions[agent_id] = self._versions.get(agent_id, 0) + 1
+
+    def update(self, agent_id: str):
+        """Re-key an agent after its load, health or performance changed"""
+        metrics = self._metrics.get(agent_id)
+        if metrics is None:
+            return
+
+        version = self._versions.get(agent_id, 0) + 1
+        self._versions[agent_id] = version
+
+        # Unavailable agents get no entries until their next update
+        if not self.is_available(metrics):
+            return
+
+        sequence = self._sequence[agent_id]
+        for group in self._groups(agent_id):
+            heap = self._heaps.setdefault(group, [])
+            heapq.heappush(heap, (self._key(metrics, group[1]), sequence, version, agent_id))
+            if len(heap) > 2 * len(self._members[group]) + 32:
+                self._compact(group)
+
+    def is_available(self, metrics: AgentMetrics) -> bool:
+        """Check health, circuit breaker and spare capacity"""
+        if metrics.status not in (AgentStatus.HEALTHY, AgentStatus.DEGRADED):
+            return False
+
+        circuit_breaker = self.circuit_breakers.get(metrics.agent_id)
+        if circuit_breaker is not None and circuit_breaker.state == "OPEN":
+            return False
+
+        return metrics.current_load < metrics.max_concurrent_tasks
+
+    def candidates(self, task_type: str, capabilities_required: List[str]) -> List[str]:
+        """
+        Available agents for a task, in registration order
+
+        Scans and sorts every member of the task's groups; only round robin
+        selection uses it, the other strategies read the heaps in select().
+        """
+        agent_ids: Set[str] = set()
+        for group in self._task_groups(task_type, capabilities_required):
+            agent_ids.update(self._members.get(group, ()))
+
+        return sorted(
+            (
+                agent_id
+                for agent_id in agent_ids
+                if self.is_available(self._metrics[agent_id])
+            ),
+            key=self._sequence.__getitem__,
+        )
+
+    def select(self, task_type: str, capabilities_required: List[str]) -> Optional[str]:
+        """Pick the best available agent for a task under the index strategy"""
+        if (
+            capabilities_required
+            and self.strategy == LoadBalancingStrategy.CAPABILITY_BASED
+        ):
+            return self._select_by_capability(task_type, capabilities_required)
+
+        best = None
+        for group in self._task_groups(task_type, capabilities_required):
+            top = self._valid_top(group)
+            if top is not None and (best is None or top[:2] < best[:2]):
+                best = top
+
+        return best[3] if best else None
+
+    def _select_by_capability(
+        self, task_type: str, capabilities_required: List[str]
+    ) -> Optional[str]:
+        """
+        Highest capability score across the (type, capability) heaps
+
+        The heaps are ordered by the score's performance part; the capability
+        part is at most 0.4, so popping stops once no remaining entry can
+        beat the best score found. Popped entries are pushed back afterwards.
+        """
+        groups = self._task_groups(task_type, capabilities_required)
+        popped = []
+        seen: Set[str] = set()
+        best_id = None
+        best_score = 0.0
+        best_sequence = 0
+
+        try:
+            while True:
+                top = None
+                top_group = None
+                for group in groups:
+                    entry = self._valid_top(group)
+                    if entry is not None and (top is None or entry[:2] < top[:2]):
+                        top = entry
+                        top_group = group
+
+                if top is None:
+                    break
+                if best_id is not None and -top[0] + 0.4 < best_score - 1e-9:
+                    break
+
+                popped.append((top_group, heapq.heappop(self._heaps[top_group])))
+
+                agent_id = top[3]
+                if agent_id in seen:
+                    continue
+                seen.add(agent_id)
+
+                score = self._capability_score(agent_id, capabilities_required)
+                if (
+                    best_id is None
+                    or score > best_score
+                    or (score == best_score and top[1] < best_sequence)
+                ):
+                    best_id, best_score, best_sequence = agent_id, score, top[1]
+        finally:
+            for group, entry in popped:
+                heapq.heappush(self._heaps[group], entry)
+
+        return best_id
+
+    def _capability_score(self, agent_id: str, capabilities_required: List[str]) -> float:
+        """Combined capability match and performance score"""
+        metrics = self._metrics[agent_id]
+        capabilities = self._capabilities[agent_id]
+
+        capability_score = sum(
+            1 for cap in capabilities_required if cap in capabilities
+        ) / len(capabilities_required)
+        load_factor = 1.0 - (metrics.current_load / metrics.max_concurrent_tasks)
+
+        return capability_score * 0.4 + metrics.success_rate * 0.3 + load_factor * 0.3
+
+    def _key(self, metrics: AgentMetrics, capability: Optional[str]) -> float:
+        """Heap key for an agent in a group (smaller is better)"""
+        if self.strategy == LoadBalancingStrategy.RESPONSE_TIME_BASED:
+            return metrics.average_response_time
+
+        load_factor = 1.0 - (metrics.current_load / metrics.max_concurrent_tasks)
+        if self.strategy == LoadBalancingStrategy.WEIGHTED_ROUND_ROBIN:
+            return -(metrics.weight * load_factor)
+        if (
+            self.strategy == LoadBalancingStrategy.CAPABILITY_BASED
+            and capability is not None
+        ):
+            return -(metrics.success_rate * 0.3 + load_factor * 0.3)
+
+        return metrics.current_load
+
+    def _valid_top(self, group: Tuple[str, Optional[str]]) -> Optional[Tuple[float, int, int, str]]:
+        """Discard stale entries and return the best current one"""
+        heap = self._heaps.get(group)
+        while heap:
+            key, sequence, version, agent_id = heap[0]
+            metrics = self._metrics.get(agent_id)
+
+            if (
+                metrics is None
+                or self._versions.get(agent_id) != version
+                or not self.is_available(metrics)
+            ):
+                heapq.heappop(heap)
+                continue
+
+            # Metrics changed in place without an update: fix the key
+            live_key = self._key(metrics, group[1])
+            if live_key != key:
+                heapq.heapreplace(heap, (live_key, sequence, version, agent_id))
+                continue
+
+            return heap[0]
+
+        return None
+
+    def _compact(self, group: Tuple[str, Optional[str]]):
+        """Rebuild a heap without stale entries"""
+        heap = [
+            entry
+            for entry in self._heaps[group]
+            if self._versions.get(entry[3]) == entry[2] and entry[3] in self._metrics
+        ]
+        heapq.heapify(heap)
+        self._heaps[group] = heap
+
+    def _groups(self, agent_id: str) -> List[Tuple[str, Optional[str]]]:
+        """Groups an agent belongs to"""
+        agent_type = self._metrics[agent_id].agent_type
+        return [(agent_type, None)] + [
+            (agent_type, cap) for cap in self._capabilities[agent_id]
+        ]
+
+    def _task_groups(
+        self, task_type: str, capabilities_required: List[str]
+    ) -> List[Tuple[str, Optional[str]]]:
+        """Groups holding the agents eligible for a task"""
+        agent_types = self._types_by_task.get(task_type)
+        if agent_types is None:
+            # Agent types are matched by substring, as task types are coarser
+            agent_types = [
+                agent_type
+                for agent_type, capability in self._members
+                if capability is None
+                and (task_type == "general" or task_type in agent_type)
+            ]
+            self._types_by_task[task_type] = agent_types
+
+        capabilities = set(capabilities_required) if capabilities_required else [None]
+        return [
+            (agent_type, capability)
+            for agent_type in agent_types
+            for capability in capabilities
+            if (agent_type, capability) in self._members
+        ]
+
+
 class AgentLoadBalancer:
     """Advanced load balancer for multi-agent system"""
 
@@ -139,11 +420,20 @@ class AgentLoadBalancer:
 
         # Agent registry and metrics
         self.agent_metrics: Dict[str, AgentMetrics] = {}
-        self.task_assignments: Dict[str, TaskAssignment] = {}
+        self.task_assignments: Dict[str, TaskAssignment] = {}  # In assignment order
+
+        # Assignments never completed are dropped after assignment_ttl seconds,
+        # or oldest first once there are more than max_task_assignments
+        self.assignment_ttl = config.get("assignment_ttl", 3600)
+        self.max_task_assignments = config.get("max_task_assignments", 10000)
+        self.expired_assignments = 0
 
         # Circuit breakers for each agent
         self.circuit_breakers: Dict[str, CircuitBreaker] = {}
 
+        # Capability/type indexes and per-group selection heaps
+        self._agent_index = AgentSelectionIndex(self.strategy, self.circuit_breakers)
+
         # Load balancing state
         self.round_robin_index = 0
         self.weighted_round_robin_weights: Dict[str, float] = {}
@@ -209,6 +499,8 @@ class AgentLoadBalancer:
                 recovery_timeout=self.config.get("circuit_breaker_timeout", 60),
             )
 
+            self._agent_index.add(metrics)
+
             # Store in database
             await self._store_agent_metrics(metrics)
 
@@ -226,19 +518,35 @@ class AgentLoadBalancer:
             task_type = task_data.get("type", "general")
             priority = task_data.get("priority", "medium")
             capabilities_required = task_data.get("capabilities_required", [])
+            forced_agent_id = task_data.get("force_agent")
+
+            if forced_agent_id and forced_agent_id in self.agent_metrics:
+                # Failover picks the standby itself
+                selected_agent_id = forced_agent_id
+            elif self.strategy == LoadBalancingStrategy.ROUND_ROBIN:
+                # Round robin rotates over every eligible agent in registration
+                # order, so it still sorts the candidates: O(n log n) per task
+                eligible_agents = await self._get_eligible_agents(
+                    task_type, capabilities_required, priority
+                )
+
+                if not eligible_agents:
+                    self.logger.warning(f"No eligible agents for task {task_id}")
+                    # Try failover to hot standby agents
+                    return await self._attempt_failover_assignment(task_data)
+
+                # Select best agent based on strategy
+                selected_agent_id = await self._select_agent(eligible_agents, task_data)
+            else:
+                # Other strategies pop the best agent straight from the index
+                selected_agent_id = self._agent_index.select(
+                    task_type, capabilities_required
+                )
 
-            # Get eligible agents
-            eligible_agents = await self._get_eligible_agents(
-                task_type, capabilities_required, priority
-            )
-
-            if not eligible_agents:
-                self.logger.warning(f"No eligible agents for task {task_id}")
-                # Try failover to hot standby agents
-                return await self._attempt_failover_assignment(task_data)
-
-            # Select best agent based on strategy
-            selected_agent_id = await self._select_agent(eligible_agents, task_data)
+                if not selected_agent_id:
+                    self.logger.warning(f"No eligible agents for task {task_id}")
+                    # Try failover to hot standby agents
+                    return await self._attempt_failover_assignment(task_data)
 
             if not selected_agent_id:
                 self.logger.warning(f"Failed to select agent for task {task_id}")
@@ -254,10 +562,15 @@ class AgentLoadBalancer:
                 capabilities_required=capabilities_required,
             )
 
+            # Re-insert so the dict stays in assignment order
+            self.task_assignments.pop(task_id, None)
             self.task_assignments[task_id] = assignment
+            if len(self.task_assignments) > self.max_task_assignments:
+                self._expire_task_assignments()
 
             # Update agent load
             self.agent_metrics[selected_agent_id].current_load += 1
+            self._agent_index.update(selected_agent_id)
 
             # Store assignment in database
             await self._store_task_assignment(assignment)
@@ -327,6 +640,7 @@ class AgentLoadBalancer:
 
             # Clean up assignment
             del self.task_assignments[task_id]
+            self._agent_index.update(agent_id)
 
             # Store updated metrics
             await self._store_agent_metrics(metrics)
@@ -338,6 +652,13 @@ class AgentLoadBalancer:
         except Exception as e:
             self.logger.error(f"Failed to complete task {task_id}: {e}")
 
+    def refresh_agent(self, agent_id: str):
+        """
+        Re-index an agent after its metrics or circuit breaker were changed
+        directly (e.g. by the failover manager)
+        """
+        self._agent_index.update(agent_id)
+
     async def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """Get current status of an agent"""
         try:
@@ -392,6 +713,7 @@ class AgentLoadBalancer:
                     if m.status == AgentStatus.UNHEALTHY
                 ),
                 "active_tasks": len(self.task_assignments),
+                "expired_assignments": self.expired_assignments,
                 "total_capacity": sum(
                     m.max_concurrent_tasks for m in self.agent_metrics.values()
                 ),
@@ -439,37 +761,7 @@ class AgentLoadBalancer:
         self, task_type: str, capabilities_required: List[str], priority: str
     ) -> List[str]:
         """Get list of eligible agents for task"""
-        eligible = []
-
-        for agent_id, metrics in self.agent_metrics.items():
-            # Check agent status
-            if metrics.status not in [AgentStatus.HEALTHY, AgentStatus.DEGRADED]:
-                continue
-
-            # Check circuit breaker
-            if agent_id in self.circuit_breakers:
-                cb = self.circuit_breakers[agent_id]
-                if cb.state == "OPEN":
-                    continue
-
-            # Check capacity
-            if metrics.current_load >= metrics.max_concurrent_tasks:
-                continue
-
-            # Check capabilities
-            if capabilities_required:
-                if not any(
-                    cap in metrics.capabilities for cap in capabilities_required
-                ):
-                    continue
-
-            # Check agent type compatibility
-            if task_type != "general" and task_type not in metrics.agent_type:
-                continue
-
-            eligible.append(agent_id)
-
-        return eligible
+        return self._agent_index.candidates(task_type, capabilities_required)
 
     async def _select_agent(
         self, eligible_agents: List[str], task_data: Dict[str, Any]
@@ -614,11 +906,42 @@ class AgentLoadBalancer:
                 self.logger.error(f"Health monitoring error: {e}")
                 await asyncio.sleep(60)
 
+    def _expire_task_assignments(self) -> int:
+        """
+        Drop assignments whose agent never reported back, oldest first,
+        releasing the load they hold
+        """
+        cutoff = datetime.now() - timedelta(seconds=self.assignment_ttl)
+        expired = 0
+        while self.task_assignments:
+            task_id, assignment = next(iter(self.task_assignments.items()))
+            if (
+                assignment.assigned_at >= cutoff
+                and len(self.task_assignments) <= self.max_task_assignments
+            ):
+                break
+
+            del self.task_assignments[task_id]
+            expired += 1
+            metrics = self.agent_metrics.get(assignment.agent_id)
+            if metrics is not None:
+                metrics.current_load = max(0, metrics.current_load - 1)
+                self._agent_index.update(assignment.agent_id)
+
+        if expired:
+            self.expired_assignments += expired
+            self.logger.warning(f"Expired {expired} task assignments without completion")
+        return expired
+
     async def _check_agent_health(self):
         """Check health of all registered agents"""
+        self._expire_task_assignments()
+
         current_time = datetime.now()
 
         for agent_id, metrics in self.agent_metrics.items():
+            previous_status = metrics.status
+
             # Check heartbeat timeout
             if metrics.last_heartbeat:
                 time_since_heartbeat = current_time - metrics.last_heartbeat
@@ -643,6 +966,9 @@ class AgentLoadBalancer:
                         f"Agent {agent_id} marked as unhealthy due to high error rate: {error_rate:.2f}"
                     )
 
+            if metrics.status != previous_status:
+                self._agent_index.update(agent_id)
+
             # Store updated metrics
             await self._store_agent_metrics(metrics)
 
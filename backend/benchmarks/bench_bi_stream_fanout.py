@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark for shared BI stream producers
+Opens several connections per user to the morning briefing and KPI dashboard
+streams against engines with a fixed per-call latency, and compares engine
+calls and bytes sent with the previous per-connection loops. Checks that
+every connection can rebuild the latest payload from its events, whether
+it opted into delta events or not.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+# Import services.business_intelligence.streaming_integration without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["business_intelligence"] = importlib.util.module_from_spec(_spec)
+streaming_integration = importlib.import_module("business_intelligence.streaming_integration")
+
+USERS = 20
+TABS_PER_USER = 5
+REFRESH_INTERVAL = 0.05
+DURATION = 1.0
+ENGINE_LATENCY = 0.01
+
+
+class FakeBriefingEngine:
+    """Briefing whose priorities change on one call in four"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_morning_briefing(self, user_id, date_range=None, include_forecasts=True):
+        self.calls += 1
+        await asyncio.sleep(ENGINE_LATENCY)
+        return SimpleNamespace(
+            id=f"briefing-{user_id}",
+            date="2026-10-16",
+            executive_summary={"headline": f"Summary for {user_id}", "health_score": 82},
+            key_metrics=list(range(12)),
+            alerts=list(range(3)),
+            growth_opportunities=list(range(4)),
+            strategic_priorities=[f"priority-{self.calls // 4 % 3}"]
+        )
+
+
+class FakeKPIEngine:
+    """Dashboard with 40 KPIs, one of which moves on each call"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_kpi_dashboard(self, user_id, dashboard_id, real_time=True):
+        self.calls += 1
+        await asyncio.sleep(ENGINE_LATENCY)
+        values = [{"kpi": f"kpi-{i}", "value": 100 + i} for i in range(40)]
+        values[self.calls % 40]["value"] += random.random()
+        return {
+            "summary": {"healthy": 37, "warning": 2, "critical": 1},
+            "kpi_values": values,
+            "last_updated": f"tick-{self.calls}",
+            "trend_data": {f"kpi-{i}": [1, 2, 3] for i in range(40)},
+            "active_alerts": [1, 2]
+        }
+
+
+class LegacyBIDataStreamManager(streaming_integration.BIDataStreamManager):
+    """Streams as before: every connection runs its own engine loop and sends full payloads"""
+
+    async def _shared_stream(self, session_type, user_id, params, event_type, compute, refresh_interval, deltas=False):
+        connection_id = f"{session_type}_{user_id}"
+        while True:
+            data = await compute()
+            event = streaming_integration.StreamingEvent(
+                event_type=event_type, data=data, user_id=user_id, session_id=connection_id, metadata=dict(params)
+            )
+            yield event.to_sse_format()
+            await self.connection_manager.publish_event(event)
+            await asyncio.sleep(refresh_interval)
+
+
+async def consume(stream, received):
+    """Read SSE messages, rebuilding the payload from full and delta events"""
+    payload = {}
+    async for message in stream:
+        received["bytes"] += len(message)
+        received["events"] += 1
+        event = json.loads(message.split("data: ", 1)[1])
+        if event["type"] == "heartbeat":
+            received["heartbeats"] += 1
+            continue
+        if event["type"].endswith(streaming_integration.DELTA_EVENT_SUFFIX):
+            payload.update(event["data"]["changed"])
+            for key in event["data"]["removed"]:
+                payload.pop(key, None)
+        else:
+            payload = dict(event["data"])
+        received["payload"] = payload
+
+
+async def run(manager_class):
+    manager = manager_class()
+    briefing, kpi = FakeBriefingEngine(), FakeKPIEngine()
+    manager.set_engines(morning_briefing_engine=briefing, kpi_engine=kpi)
+
+    connections = []
+    for user in range(USERS):
+        for _ in range(TABS_PER_USER):
+            for stream in (
+                manager.create_morning_briefing_stream(f"user-{user}", REFRESH_INTERVAL, deltas=True),
+                manager.create_kpi_dashboard_stream("ops", f"user-{user}", REFRESH_INTERVAL, deltas=True)
+            ):
+                received = {"bytes": 0, "events": 0, "heartbeats": 0, "payload": None}
+                connections.append((stream, received, asyncio.create_task(consume(stream, received))))
+
+    await asyncio.sleep(DURATION)
+    for _, _, task in connections:
+        task.cancel()
+    await asyncio.gather(*(task for _, _, task in connections), return_exceptions=True)
+    for stream, _, _ in connections:
+        await stream.aclose()
+    await asyncio.sleep(0)
+    return manager, briefing.calls + kpi.calls, connections
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    random.seed(31)
+    for label, manager_class in (
+        ("legacy", LegacyBIDataStreamManager),
+        ("shared", streaming_integration.BIDataStreamManager)
+    ):
+        manager, calls, connections = await run(manager_class)
+        sent = sum(received["bytes"] for _, received, _ in connections)
+        events = sum(received["events"] for _, received, _ in connections)
+        heartbeats = sum(received["heartbeats"] for _, received, _ in connections)
+        print(
+            f"{label:6s} {len(connections)} connections: {calls:5d} engine calls, {events:5d} events "
+            f"({heartbeats} heartbeats), {sent / 1024:8.0f} KiB sent"
+        )
+
+    # Every connection of a producer ends on the producer's latest payload
+    manager = streaming_integration.BIDataStreamManager()
+    kpi = FakeKPIEngine()
+    manager.set_engines(kpi_engine=kpi)
+    streams = [
+        manager.create_kpi_dashboard_stream("ops", "user-0", REFRESH_INTERVAL, deltas=tab % 2 == 0)
+        for tab in range(TABS_PER_USER)
+    ]
+    received = [{"bytes": 0, "events": 0, "heartbeats": 0, "payload": None} for _ in streams]
+    tasks = [asyncio.create_task(consume(stream, r)) for stream, r in zip(streams, received, strict=True)]
+    await asyncio.sleep(DURATION / 2)
+    (producer,) = manager.stream_producers._producers.values()
+    assert all(r["payload"] == producer.snapshot for r in received)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for stream in streams:
+        await stream.aclose()
+    print(
+        f"consistency: {len(streams)} connections rebuilt the latest payload; "
+        f"producers left after disconnect: {len(manager.stream_producers)}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batched deal health scoring
+Scores a 50k-deal pipeline with CRMIntelligenceEngine's batch path (columns
+loaded once, factors scored as arrays, objects built for the 50 riskiest
+deals and every critical one, recovery strategies for stalled deals) against
+the previous per-deal async helpers, and checks that every deal gets the
+same health score object, stall flag and stall count as before.
+"""
+
+import asyncio
+import gc
+import importlib
+import importlib.util
+import logging
+import os
+import random
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Import services.business_intelligence.crm_intelligence without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["business_intelligence"] = importlib.util.module_from_spec(_spec)
+crm_intelligence = importlib.import_module("business_intelligence.crm_intelligence")
+
+DealHealth = crm_intelligence.DealHealth
+DealHealthScore = crm_intelligence.DealHealthScore
+
+DEALS = 50000
+STAGES = [stage.value for stage in crm_intelligence.DealStage] + ["custom_stage"]
+
+
+def make_deals():
+    """Deals as HubSpot dicts, some without an amount or creation date"""
+    rng = random.Random(11)
+    now = datetime.now(timezone.utc)
+    deals = []
+    for i in range(DEALS):
+        deal = {"dealId": f"deal_{i}", "dealname": f"Deal {i}", "dealstage": rng.choice(STAGES)}
+        if rng.random() < 0.95:
+            deal["amount"] = round(rng.lognormvariate(9.5, 1.2), 2)
+        if rng.random() < 0.97:
+            # At least an hour from a whole day ago, so both paths count the same days in stage
+            created = now - timedelta(days=rng.randrange(120), seconds=rng.uniform(3600, 82800))
+            deal["createdate"] = created.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        deals.append(deal)
+    return deals
+
+
+class LegacyDealScorer:
+    """Previous per-deal scoring: every helper awaited per deal, dates reparsed per helper"""
+
+    def __init__(self, engine):
+        self.health_scoring_config = engine.health_scoring_config
+
+    async def assess_deal_health(self, deals):
+        return [await self.calculate_individual_deal_health(deal) for deal in deals]
+
+    async def calculate_individual_deal_health(self, deal):
+        weights = self.health_scoring_config["weights"]
+        thresholds = self.health_scoring_config["thresholds"]
+        scoring_factors = {
+            "activity_level": await self.assess_activity_level(deal),
+            "engagement_score": await self.assess_deal_engagement(deal),
+            "deal_progression": await self.assess_deal_progression(deal),
+            "timeline_compliance": await self.assess_timeline_compliance(deal),
+            "buyer_signals": await self.assess_buyer_signals(deal)
+        }
+        health_score = (
+            scoring_factors["activity_level"] * weights["activity_level"] +
+            scoring_factors["engagement_score"] * weights["engagement_score"] +
+            scoring_factors["deal_progression"] * weights["deal_progression"] +
+            scoring_factors["timeline_compliance"] * weights["timeline_compliance"] +
+            scoring_factors["buyer_signals"] * weights["buyer_signals"]
+        ) * 100
+        if health_score >= thresholds["healthy"]:
+            health_status = DealHealth.HEALTHY
+        elif health_score >= thresholds["warning"]:
+            health_status = DealHealth.WARNING
+        elif health_score >= thresholds["at_risk"]:
+            health_status = DealHealth.AT_RISK
+        else:
+            health_status = DealHealth.CRITICAL
+        return DealHealthScore(
+            deal_id=deal.get("dealId", ""),
+            deal_name=deal.get("dealname", "Unknown Deal"),
+            health_score=round(health_score, 1),
+            health_status=health_status,
+            risk_factors=await self.identify_deal_risk_factors(deal, scoring_factors),
+            strengths=await self.identify_deal_strengths(deal, scoring_factors),
+            recommended_actions=await self.generate_deal_recommendations(deal, health_status, scoring_factors),
+            next_best_action=await self.determine_next_best_action(deal, health_status),
+            estimated_close_probability=health_score / 100,
+            days_in_current_stage=await self.calculate_days_in_stage(deal),
+            last_activity_days=3,
+            engagement_score=scoring_factors["engagement_score"] * 100,
+            scoring_factors=scoring_factors,
+            last_assessed=datetime.now(timezone.utc)
+        )
+
+    async def assess_activity_level(self, deal):
+        return 0.7
+
+    async def assess_deal_engagement(self, deal):
+        stage = deal.get("dealstage", "")
+        if stage in ["closed_won"]:
+            return 1.0
+        elif stage in ["decision_maker_bought_in", "contract_sent"]:
+            return 0.9
+        elif stage in ["presentation_scheduled", "qualified_to_buy"]:
+            return 0.7
+        elif stage in ["appointment_scheduled"]:
+            return 0.6
+        return 0.4
+
+    async def assess_deal_progression(self, deal):
+        stage_scores = {
+            "appointment_scheduled": 0.2, "qualified_to_buy": 0.4, "presentation_scheduled": 0.6,
+            "decision_maker_bought_in": 0.8, "contract_sent": 0.9, "closed_won": 1.0, "closed_lost": 0.0
+        }
+        return stage_scores.get(deal.get("dealstage", ""), 0.3)
+
+    async def assess_timeline_compliance(self, deal):
+        return 0.6
+
+    async def assess_buyer_signals(self, deal):
+        amount_score = min(1.0, deal.get("amount", 0) / 50000)
+        return (amount_score + await self.assess_deal_progression(deal)) / 2
+
+    async def identify_deal_risk_factors(self, deal, scoring_factors):
+        risk_factors = []
+        if scoring_factors.get("activity_level", 0) < 0.4:
+            risk_factors.append("Low recent activity")
+        if scoring_factors.get("engagement_score", 0) < 0.4:
+            risk_factors.append("Poor customer engagement")
+        if scoring_factors.get("deal_progression", 0) < 0.5:
+            risk_factors.append("Slow pipeline progression")
+        if scoring_factors.get("timeline_compliance", 0) < 0.5:
+            risk_factors.append("Behind schedule")
+        if scoring_factors.get("buyer_signals", 0) < 0.3:
+            risk_factors.append("Weak buying signals")
+        days_in_stage = await self.calculate_days_in_stage(deal)
+        if days_in_stage > 21:
+            risk_factors.append(f"Stalled for {days_in_stage} days")
+        return risk_factors
+
+    async def identify_deal_strengths(self, deal, scoring_factors):
+        strengths = []
+        if scoring_factors.get("activity_level", 0) > 0.8:
+            strengths.append("High engagement activity")
+        if scoring_factors.get("buyer_signals", 0) > 0.8:
+            strengths.append("Strong buying signals")
+        if scoring_factors.get("deal_progression", 0) > 0.7:
+            strengths.append("Good pipeline progression")
+        if deal.get("amount", 0) > 50000:
+            strengths.append("High value opportunity")
+        if scoring_factors.get("timeline_compliance", 0) > 0.8:
+            strengths.append("On track timeline")
+        return strengths
+
+    async def generate_deal_recommendations(self, deal, health_status, scoring_factors):
+        recommendations = {
+            DealHealth.CRITICAL: ["Immediate intervention required", "Re-qualify deal opportunity",
+                                  "Consider closing if no response"],
+            DealHealth.AT_RISK: ["Schedule immediate check-in", "Identify and address objections",
+                                 "Provide additional value proposition"],
+            DealHealth.WARNING: ["Increase touch frequency", "Identify decision makers", "Address timeline concerns"]
+        }.get(health_status, ["Maintain current momentum", "Prepare for next stage", "Identify upsell opportunities"])
+        if scoring_factors.get("activity_level", 0) < 0.5:
+            recommendations.append("Increase engagement activity")
+        if scoring_factors.get("engagement_score", 0) < 0.5:
+            recommendations.append("Improve customer communication")
+        if scoring_factors.get("buyer_signals", 0) < 0.5:
+            recommendations.append("Strengthen value proposition")
+        return recommendations[:4]
+
+    async def determine_next_best_action(self, deal, health_status):
+        if health_status == DealHealth.CRITICAL:
+            return "Schedule executive review call"
+        elif health_status == DealHealth.AT_RISK:
+            return "Conduct discovery call to identify issues"
+        elif health_status == DealHealth.WARNING:
+            return "Send follow-up with value proposition"
+        return {
+            "appointment_scheduled": "Prepare for discovery call",
+            "qualified_to_buy": "Schedule product demonstration",
+            "presentation_scheduled": "Prepare customized proposal",
+            "decision_maker_bought_in": "Send contract for review",
+            "contract_sent": "Follow up on contract review"
+        }.get(deal.get("dealstage", ""), "Maintain regular contact")
+
+    async def calculate_days_in_stage(self, deal):
+        if "createdate" in deal:
+            created_date = datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))
+            return (datetime.now(timezone.utc) - created_date).days
+        return 0
+
+    async def is_deal_stalled(self, deal):
+        if deal.get("dealstage") in ["closed_won", "closed_lost"]:
+            return False
+        if "createdate" in deal:
+            created_date = datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))
+            days_in_stage = (datetime.now(timezone.utc) - created_date).days
+            return days_in_stage > self.health_scoring_config["stall_thresholds"]["days_in_stage"]
+        return False
+
+
+def comparable(score):
+    fields = asdict(score)
+    del fields["last_assessed"]
+    return fields
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    engine = crm_intelligence.CRMIntelligenceEngine(openai_api_key="sk-bench")
+    legacy = LegacyDealScorer(engine)
+    deals = make_deals()
+
+    # Timed with the collector off: both paths allocate tens of thousands of objects
+    gc.collect()
+    gc.disable()
+    started = time.perf_counter()
+    legacy_scores = await legacy.assess_deal_health(deals)
+    legacy_health_seconds = time.perf_counter() - started
+    legacy_stalled = [deal for deal in deals if await legacy.is_deal_stalled(deal)]
+    for deal in legacy_stalled:
+        await engine._create_recovery_strategy(deal, await legacy.calculate_days_in_stage(deal))
+    legacy_seconds = time.perf_counter() - started
+    gc.enable()
+
+    gc.collect()
+    gc.disable()
+    started = time.perf_counter()
+    deal_scores = engine._score_deals(deals)
+    scored_seconds = time.perf_counter() - started
+    reported = await engine._assess_deal_health(deals, deal_scores)
+    summary = await engine._summarize_deal_health(reported, deal_scores)
+    health_seconds = time.perf_counter() - started
+    recoveries = await engine._identify_stalled_deals(deals, deal_scores)
+    batch_seconds = time.perf_counter() - started
+    gc.enable()
+
+    print(f"{DEALS} deals, {len(legacy_stalled)} stalled, {len(reported)} reported (50 riskiest + every critical)")
+    print(f"{'':28s} {'health':>10s} {'+ stalled recovery':>20s}")
+    print(f"{'legacy per-deal':28s} {legacy_health_seconds * 1e3:7.0f} ms {legacy_seconds * 1e3:17.0f} ms")
+    print(f"{'batch':28s} {health_seconds * 1e3:7.0f} ms {batch_seconds * 1e3:17.0f} ms "
+          f"(scoring alone {scored_seconds * 1e3:.0f} ms)")
+
+    # Every deal's object matches the per-deal path, the riskiest come first and totals agree
+    for index, expected in enumerate(legacy_scores):
+        assert comparable(engine._build_deal_health_score(deal_scores, index)) == comparable(expected), index
+    riskiest = sorted(range(DEALS), key=lambda index: (legacy_scores[index].health_score, index))
+    assert [score.deal_id for score in reported[:10]] == [legacy_scores[index].deal_id for index in riskiest[:10]]
+    assert [recovery.deal_id for recovery in recoveries] == [deal["dealId"] for deal in legacy_stalled]
+    assert await engine._count_stalled_deals(deals, deal_scores) == len(legacy_stalled)
+    assert summary["total_deals"] == DEALS
+    assert abs(summary["average_health_score"] - sum(s.health_score for s in legacy_scores) / DEALS) < 0.05
+    assert summary["at_risk_count"] == sum(s.health_status == DealHealth.AT_RISK for s in legacy_scores)
+    assert len(summary["critical_deals"]) == sum(s.health_status == DealHealth.CRITICAL for s in legacy_scores)
+    print("health scores, statuses, stalled deals and summary match the per-deal path")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
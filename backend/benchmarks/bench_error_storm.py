@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ErrorTracker grouping during an error storm
+Replays 5k distinct error messages (variants of a few dozen templates)
+through ErrorTracker._update_error_report, and compares per-error cost
+with the previous scan of every report with SequenceMatcher (replayed for
+the first 500 errors only, as it is quadratic). Checks the similar errors
+found against an exhaustive comparison.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from difflib import SequenceMatcher
+
+# Import monitoring.error_tracking without running the package __init__, which imports every backend client
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'monitoring')
+_spec = importlib.util.spec_from_file_location(
+    "monitoring", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["monitoring"] = importlib.util.module_from_spec(_spec)
+error_tracking = importlib.import_module("monitoring.error_tracking")
+
+ERRORS = 5000
+LEGACY_ERRORS = 500
+WINDOW = 100
+TEMPLATES = 40
+CHECK_SAMPLE = 200
+
+WORDS = [
+    "orders", "users", "invoices", "sessions", "tasks", "agents", "billing", "search", "inventory", "reports",
+    "primary", "replica", "eu-west", "us-east", "cache", "queue", "worker", "gateway", "scheduler", "ledger"
+]
+TEMPLATE_SHAPES = [
+    "Connection to {w}-db.internal:{n} refused after {n} retries",
+    "Timeout after {n}ms waiting for {w} service response from {w}",
+    "KeyError '{w}_{w}_id' while processing {w} batch {n}",
+    "Validation failed for field {w}.{w}: expected {w}, got {w}",
+    "Permission denied for user {n} on resource /{w}/{w}/{n}",
+    "Rate limit exceeded for {w} API key {uuid} ({n} requests in {n}s)",
+    "Task {uuid} for agent {w} failed: {w} {w} unavailable",
+    "Deadlock detected on table {w} while updating {w} rows at {ts}",
+]
+
+
+class LegacyErrorTracker(error_tracking.ErrorTracker):
+    """Grouping as before: every report compared, regexes compiled per call"""
+
+    def __init__(self):
+        super().__init__()
+        self.error_reports = {}
+        self.max_reports = sys.maxsize
+
+    def _normalize_message(self, message):
+        normalized = re.sub(r'\d+', '<NUMBER>', message)
+        normalized = re.sub(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', '<UUID>', normalized)
+        normalized = re.sub(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}', '<TIMESTAMP>', normalized)
+        return re.sub(r'/[^\s]+/[^\s]+/', '<PATH>/', normalized)
+
+    def _find_similar_errors(self, occurrence, message_pattern=None):
+        similar = []
+        current_message = self._normalize_message(occurrence.message)
+        for error_id, report in self.error_reports.items():
+            if error_id == occurrence.error_id:
+                continue
+            if SequenceMatcher(None, current_message, report.message_pattern).ratio() > self.similarity_threshold:
+                similar.append(error_id)
+        return similar[:5]
+
+
+def make_templates():
+    """Per-template fixed word choices, so messages of a template differ only slightly"""
+    random.seed(21)
+    templates = []
+    for i in range(TEMPLATES):
+        shape = TEMPLATE_SHAPES[i % len(TEMPLATE_SHAPES)]
+        words = [random.choice(WORDS) for _ in range(shape.count("{w}"))]
+        templates.append((shape, words))
+    return templates
+
+
+def make_message(template):
+    """A variant of a template: random numbers, IDs, and one word in three swapped"""
+    shape, words = template
+    message = shape
+    for word in words:
+        message = message.replace("{w}", word if random.random() > 0.3 else random.choice(WORDS), 1)
+    while "{n}" in message:
+        message = message.replace("{n}", str(random.randint(1, 99999)), 1)
+    message = message.replace("{uuid}", "%08x-%04x-%04x-%04x-%012x" % tuple(
+        random.getrandbits(bits) for bits in (32, 16, 16, 16, 48)
+    ))
+    return message.replace("{ts}", datetime.utcnow().isoformat(timespec="seconds"))
+
+
+def make_occurrences():
+    templates = make_templates()
+    random.seed(22)
+    occurrences = []
+    for i in range(ERRORS):
+        occurrences.append(error_tracking.ErrorOccurrence(
+            id=f"occ_{i}",
+            error_id=f"err_{i:05d}",  # Distinct origins, so every error gets its own report
+            timestamp=datetime.utcnow(),
+            message=make_message(random.choice(templates)),
+            exception_type="RuntimeError",
+            severity=error_tracking.ErrorSeverity.HIGH,
+            category=error_tracking.ErrorCategory.SYSTEM,
+            context=error_tracking.ErrorContext(),
+            stack_trace=[],
+            system_info={},
+            environment={}
+        ))
+    return occurrences
+
+
+async def replay(tracker, occurrences):
+    """Mean seconds per error over the last WINDOW errors, and total seconds"""
+    times = []
+    for occurrence in occurrences:
+        started = time.perf_counter()
+        await tracker._update_error_report(occurrence)
+        times.append(time.perf_counter() - started)
+    return sum(times[-WINDOW:]) / WINDOW, sum(times)
+
+
+def exhaustive_similar(tracker, report, earlier_ids):
+    """Every earlier report above the threshold"""
+    threshold = tracker.similarity_threshold
+    similar = []
+    for error_id in earlier_ids:
+        matcher = SequenceMatcher(None, report.message_pattern, tracker.error_reports[error_id].message_pattern)
+        # The quick ratios are upper bounds of ratio(), so this prunes without changing the result
+        if matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold and matcher.ratio() > threshold:
+            similar.append(error_id)
+    return similar
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    occurrences = make_occurrences()
+
+    legacy_cost, legacy_total = await replay(LegacyErrorTracker(), occurrences[:LEGACY_ERRORS])
+    tracker = error_tracking.ErrorTracker()
+    indexed_cost, _ = await replay(tracker, occurrences[:LEGACY_ERRORS])
+    print(
+        f"at {LEGACY_ERRORS} reports: legacy {legacy_cost * 1e3:7.3f} ms/error, indexed {indexed_cost * 1e3:6.3f} ms/error "
+        f"(legacy replay took {legacy_total:.1f} s)"
+    )
+    indexed_cost, indexed_total = await replay(tracker, occurrences[LEGACY_ERRORS:])
+    print(
+        f"at {ERRORS} reports: indexed {indexed_cost * 1e3:6.3f} ms/error (replay took {indexed_total:.1f} s), "
+        f"legacy extrapolated {legacy_cost * ERRORS / LEGACY_ERRORS * 1e3:7.3f} ms/error"
+    )
+
+    # Recall: reports found vs min(5, true similar) among earlier reports
+    ids = list(tracker.error_reports)
+    random.seed(23)
+    found = wanted = 0
+    for position in random.sample(range(1, len(ids)), CHECK_SAMPLE):
+        report = tracker.error_reports[ids[position]]
+        truth = set(exhaustive_similar(tracker, report, ids[:position]))
+        assert set(report.similar_errors) <= truth
+        wanted += min(5, len(truth))
+        found += len(report.similar_errors)
+    print(f"similar errors found: {found}/{wanted} ({found / max(wanted, 1):.1%}), all above the threshold")
+
+    # Retention: a storm longer than max_reports keeps the most recent reports
+    bounded = error_tracking.ErrorTracker()
+    bounded.max_reports = 1000
+    await replay(bounded, occurrences)
+    print(
+        f"max_reports=1000: {len(bounded.error_reports)} reports kept, {bounded.evicted_reports} evicted, "
+        f"{len(bounded.fingerprints)} fingerprinted"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Load test for FirebaseService event loop responsiveness
+Runs heavy queries and writes against an in-process Firestore stand-in whose
+calls block like the real client, and measures event loop lag with the
+blocking calls made inline versus on the Firestore executor
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+QUERY_LATENCY = 0.020
+WRITE_LATENCY = 0.005
+DOCS_PER_QUERY = 100
+QUERIES = 200
+WRITES = 400
+TICK = 0.001
+
+
+class FakeDocument:
+    """Query result snapshot"""
+
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = True
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocumentRef:
+    """Document reference whose calls block like a network round trip"""
+
+    def __init__(self, doc_id):
+        self.id = doc_id
+
+    def set(self, data):
+        time.sleep(WRITE_LATENCY)
+
+    def get(self, field_paths=None):
+        time.sleep(WRITE_LATENCY)
+        return FakeDocument(self.id, {"id": self.id, "status": "pending", "input_prompt": ""})
+
+
+class FakeQuery:
+    """Collection/query stand-in returning DOCS_PER_QUERY tasks"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def document(self, doc_id=None):
+        return FakeDocumentRef(doc_id or "generated")
+
+    def stream(self):
+        time.sleep(QUERY_LATENCY)
+        return [
+            FakeDocument(f"task-{i}", {"status": "pending", "input_prompt": "prompt", "agent_type": "strategy"})
+            for i in range(DOCS_PER_QUERY)
+        ]
+
+
+class FakeWriteBatch:
+    """WriteBatch stand-in; commit blocks like one round trip"""
+
+    def set(self, doc_ref, data):
+        pass
+
+    def delete(self, doc_ref):
+        pass
+
+    def commit(self):
+        time.sleep(WRITE_LATENCY)
+
+
+class FakeFirestore:
+    """Firestore client stand-in"""
+
+    def collection(self, name):
+        return FakeQuery(name)
+
+    def batch(self):
+        return FakeWriteBatch()
+
+
+class InlineExecutor:
+    """Runs calls directly on the event loop, as the service did before"""
+
+    def __init__(self, real_executor):
+        self.real_executor = real_executor
+
+    async def run(self, operation_name, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def record(self, *args, **kwargs):
+        self.real_executor.record(*args, **kwargs)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def run_scenario(service, label: str):
+    """Run the mixed workload while sampling loop lag"""
+    from services.firebase_service import HubSpotContact
+
+    lags = []
+    done = asyncio.Event()
+
+    async def monitor():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started - TICK)
+
+    monitor_task = asyncio.create_task(monitor())
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(service.get_tasks_by_agent_type("strategy") for _ in range(QUERIES)),
+        *(service.store_hubspot_contact(HubSpotContact(id=f"contact-{i}")) for i in range(WRITES)),
+    )
+    elapsed = time.perf_counter() - started
+
+    done.set()
+    await monitor_task
+
+    print(
+        f"{label:<10} wall={elapsed:6.2f} s  "
+        f"loop lag p50={statistics.median(lags) * 1000:7.2f} ms  "
+        f"p99={percentile(lags, 99) * 1000:8.2f} ms  "
+        f"max={max(lags) * 1000:8.2f} ms"
+    )
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    from services.firebase_service import FirebaseService, FirebaseMode
+    from services.firestore_executor import FirestoreExecutor
+
+    async def skip_initialization(self):
+        return None
+
+    # Use the stand-in client instead of connecting to Firebase
+    FirebaseService._initialize_with_retry = skip_initialization
+    service = FirebaseService()
+    FirebaseService._db = FakeFirestore()
+    FirebaseService._mode = FirebaseMode.ONLINE
+
+    print(f"queries={QUERIES} ({QUERY_LATENCY * 1000:.0f} ms, {DOCS_PER_QUERY} docs) writes={WRITES} ({WRITE_LATENCY * 1000:.0f} ms)")
+
+    FirebaseService._executor = InlineExecutor(FirestoreExecutor())
+    await run_scenario(service, "inline")
+
+    executor = FirebaseService._executor = FirestoreExecutor()
+    await run_scenario(service, "executor")
+
+    operations = executor.get_metrics()["operations"]
+    for name in ("get_tasks_by_agent_type", "store_hubspot_contact"):
+        histogram = operations[name]["online"]
+        print(f"{name:<24} p50={histogram['p50_ms']:6.0f} ms  p99={histogram['p99_ms']:6.0f} ms  (bucket bounds)")
+
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
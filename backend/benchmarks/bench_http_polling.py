@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for HTTPPollingService long-poll wakeups
+Measures event delivery latency (p50/p99) and CPU use with many idle sessions
+"""
+
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SESSION_COUNTS = [1000, 5000, 10000]
+EVENTS_PER_RUN = 500
+IDLE_SECONDS = 2.0
+POLL_TIMEOUT = 30
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(session_count: int):
+    """Run one benchmark scenario with the given number of idle sessions"""
+    from services.http_polling import HTTPPollingService, EventPriority
+
+    service = HTTPPollingService()
+    service._sessions.clear()
+    service._max_sessions = session_count
+
+    session_ids = [
+        service.create_session(user_id=f"user-{i}", filters={"user_id": f"user-{i}"})
+        for i in range(session_count)
+    ]
+
+    # Drain the welcome events so every session is idle
+    await asyncio.gather(*[
+        service.poll_events(session_id, timeout=1, include_metrics=False)
+        for session_id in session_ids
+    ])
+
+    latencies = []
+    received = asyncio.Event()
+
+    async def poller(session_id: str):
+        while True:
+            response = await service.poll_events(
+                session_id, timeout=POLL_TIMEOUT, include_metrics=False
+            )
+            now = time.perf_counter()
+            for event in response.get("events", []):
+                sent_at = event["data"].get("sent_at")
+                if sent_at is not None:
+                    latencies.append(now - sent_at)
+                    if len(latencies) >= EVENTS_PER_RUN:
+                        received.set()
+
+    tasks = [asyncio.create_task(poller(session_id)) for session_id in session_ids]
+    await asyncio.sleep(0.5)
+
+    # CPU burned while every session is parked in a long poll
+    cpu_start = time.process_time()
+    await asyncio.sleep(IDLE_SECONDS)
+    idle_cpu = (time.process_time() - cpu_start) / IDLE_SECONDS * 100.0
+
+    for _ in range(EVENTS_PER_RUN):
+        target = random.randrange(session_count)
+        service.add_event(
+            event_type="benchmark",
+            data={"sent_at": time.perf_counter()},
+            priority=EventPriority.MEDIUM,
+            user_id=f"user-{target}",
+        )
+        await asyncio.sleep(0.002)
+
+    await asyncio.wait_for(received.wait(), timeout=POLL_TIMEOUT)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(
+        f"sessions={session_count:>6}  "
+        f"p50={statistics.median(latencies) * 1000:8.3f} ms  "
+        f"p99={percentile(latencies, 99) * 1000:8.3f} ms  "
+        f"idle_cpu={idle_cpu:6.1f}%"
+    )
+
+
+async def main():
+    logging.disable(logging.INFO)
+    for session_count in SESSION_COUNTS:
+        await run_scenario(session_count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the columnar KPI history store
+Records 3 years of observations (4 a day) for 300 KPIs into a KPIHistoryStore
+on disk, reopens it, and times daily/weekly/monthly rollups over 2 years for
+every KPI against grouping lists of KPIValue objects. Checks the rollups
+against the list grouping and reports traced heap memory.
+"""
+
+import gc
+import importlib
+import importlib.util
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Import services.business_intelligence.kpi_history without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["business_intelligence"] = importlib.util.module_from_spec(_spec)
+kpi_history = importlib.import_module("business_intelligence.kpi_history")
+kpi_calculator = importlib.import_module("business_intelligence.kpi_calculator")
+
+KPIS = 300
+DAYS = 3 * 365
+PER_DAY = 4
+QUERY_DAYS = 2 * 365
+LEGACY_KPIS = 30  # KPIValue lists for every KPI would take several GB
+
+
+def observations(kpi):
+    """Timestamps and values of one KPI, oldest first"""
+    rng = np.random.default_rng(kpi)
+    start = datetime(2023, 10, 16, tzinfo=timezone.utc).timestamp()
+    timestamps = start + np.arange(DAYS * PER_DAY) * (86400 / PER_DAY)
+    values = 100 + np.cumsum(rng.normal(0.05, 1.0, len(timestamps)))
+    return timestamps, values
+
+
+def kpi_value(kpi_id, timestamp, value):
+    moment = datetime.fromtimestamp(timestamp, timezone.utc)
+    return kpi_calculator.KPIValue(
+        kpi_id=kpi_id, value=value, previous_value=None, target_value=100, achievement_rate=value,
+        trend=kpi_calculator.KPITrend.STABLE, status=kpi_calculator.KPIStatus.GOOD, variance=0,
+        variance_percentage=0, confidence_level=0.9, data_quality_score=90, calculation_timestamp=moment,
+        period_start=moment - timedelta(hours=6), period_end=moment, metadata={}
+    )
+
+
+def legacy_rollup(history, start, end, frequency):
+    """Last value per bucket from a list of KPIValue objects"""
+    buckets = OrderedDict()
+    for value in history:
+        moment = value.period_end
+        if not start <= moment <= end:
+            continue
+        if frequency == "daily":
+            bucket = moment.date()
+        elif frequency == "weekly":
+            bucket = moment.date() - timedelta(days=moment.weekday())
+        else:
+            bucket = moment.date().replace(day=1)
+        buckets[bucket] = value.value
+    return list(buckets.keys()), list(buckets.values())
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="kpi_history_")
+    try:
+        # Write
+        store = kpi_history.KPIHistoryStore(directory, max_open_series=KPIS)
+        started = time.perf_counter()
+        for kpi in range(KPIS):
+            timestamps, values = observations(kpi)
+            for day in range(0, len(timestamps), PER_DAY):
+                store.append_many("user-1", f"kpi_{kpi}", timestamps[day:day + PER_DAY], values[day:day + PER_DAY])
+        store.flush()
+        elapsed = time.perf_counter() - started
+        print(f"append     {store.appended:,} observations in {elapsed:.1f} s ({store.appended / elapsed:,.0f}/s, "
+              f"one day per call), {store.get_stats()['segments']} segments")
+
+        # Reopen and query
+        del store
+        gc.collect()
+        store = kpi_history.KPIHistoryStore(directory, max_open_series=KPIS)
+        end = observations(0)[0][-1]
+        start = end - QUERY_DAYS * 86400
+        started = time.perf_counter()
+        for kpi in range(KPIS):
+            store.range("user-1", f"kpi_{kpi}", end, end)
+        print(f"reopen     {KPIS} series in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+        def query_all(frequency):
+            points = 0
+            for kpi in range(KPIS):
+                buckets, rolled = store.rollup("user-1", f"kpi_{kpi}", frequency, start, end)
+                points += len(rolled)
+            return points
+
+        for frequency in kpi_history.ROLLUP_FREQUENCIES:
+            started = time.perf_counter()
+            points = query_all(frequency)
+            elapsed = time.perf_counter() - started
+            print(f"{frequency:8s}   {KPIS} KPIs x {QUERY_DAYS} days -> {points:,} buckets in {elapsed * 1e3:6.1f} ms "
+                  f"({elapsed / KPIS * 1e6:.0f} us/KPI)")
+
+        tracemalloc.start()
+        query_all("daily")
+        heap = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"peak traced heap during a daily query of all KPIs: {heap / 1024 ** 2:.1f} MiB "
+              f"(columns on disk: {sum(len(files) for _, _, files in os.walk(directory))} files)")
+
+        # Legacy grouping over KPIValue lists
+        histories = {
+            kpi: [kpi_value(f"kpi_{kpi}", t, v) for t, v in zip(*observations(kpi), strict=True)] for kpi in range(LEGACY_KPIS)
+        }
+        start_moment = datetime.fromtimestamp(start, timezone.utc)
+        end_moment = datetime.fromtimestamp(end, timezone.utc)
+        for frequency in kpi_history.ROLLUP_FREQUENCIES:
+            started = time.perf_counter()
+            for kpi in range(LEGACY_KPIS):
+                legacy_rollup(histories[kpi], start_moment, end_moment, frequency)
+            elapsed = time.perf_counter() - started
+            print(f"legacy {frequency:8s} {elapsed / LEGACY_KPIS * 1e6:8.0f} us/KPI")
+
+        # Same buckets and values as the list grouping
+        random.seed(41)
+        for kpi in random.sample(range(LEGACY_KPIS), 5):
+            for frequency in kpi_history.ROLLUP_FREQUENCIES:
+                buckets, rolled = store.rollup("user-1", f"kpi_{kpi}", frequency, start, end)
+                legacy_buckets, legacy_values = legacy_rollup(histories[kpi], start_moment, end_moment, frequency)
+                assert [datetime.fromtimestamp(b, timezone.utc).date() for b in buckets] == legacy_buckets
+                assert np.array_equal(rolled, legacy_values)
+        print("rollups match the KPIValue grouping")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark for incremental KPIEngine.calculate_kpis
+Refreshes 60 KPIs over 10 datasets, each KPI calculation and value store
+costing a fixed latency, and compares a cold refresh, a refresh with no data
+changed, a refresh after one dataset changed and one after a KPI's target
+was edited against the previous serial recompute-everything loop.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Import services.business_intelligence.kpi_calculator without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["business_intelligence"] = importlib.util.module_from_spec(_spec)
+kpi_calculator = importlib.import_module("business_intelligence.kpi_calculator")
+
+KPIS = 60
+DATASETS = 10
+CALCULATION_LATENCY = 0.02
+STORE_LATENCY = 0.005
+
+
+class BenchKPIEngine(kpi_calculator.KPIEngine):
+    """Fixed KPI definitions, and calculations/stores that cost a fixed latency"""
+
+    def __init__(self):
+        super().__init__(openai_api_key="sk-bench")
+        self.calculations = 0
+        self.stores = 0
+        self.definitions = [
+            kpi_calculator.KPIDefinition(
+                kpi_id=f"kpi_{i}",
+                name=f"KPI {i}",
+                description="",
+                category=kpi_calculator.KPICategory.OPERATIONAL,
+                unit="",
+                calculation_method="automated",
+                data_sources=[f"dataset_{i % DATASETS}"],
+                target_value=100,
+                minimum_acceptable=80,
+                stretch_target=120,
+                timeframe=kpi_calculator.KPITimeframe.MONTHLY,
+                owner="System",
+                reporting_frequency="monthly",
+                benchmark_value=None,
+                industry_average=None,
+                created_at=datetime.now(timezone.utc)
+            )
+            for i in range(KPIS)
+        ]
+
+    async def _get_all_kpi_ids(self, user_id):
+        return [definition.kpi_id for definition in self.definitions]
+
+    async def _get_kpi_definitions(self, user_id, kpi_ids=None):
+        return [definition for definition in self.definitions if definition.kpi_id in kpi_ids]
+
+    async def _calculate_generic_kpi(self, kpi_def, start_date, end_date):
+        self.calculations += 1
+        await asyncio.sleep(CALCULATION_LATENCY)
+        return 75.0
+
+    async def _store_kpi_value(self, kpi_value, user_id):
+        self.stores += 1
+        await asyncio.sleep(STORE_LATENCY)
+
+
+class LegacyKPIEngine(BenchKPIEngine):
+    """calculate_kpis as before: every KPI recomputed serially and stored one by one"""
+
+    async def calculate_kpis(self, user_id, kpi_ids=None, timeframe=kpi_calculator.KPITimeframe.MONTHLY, end_date=None):
+        end_date = end_date or datetime.now(timezone.utc)
+        kpi_definitions = await self._get_kpi_definitions(user_id, await self._get_all_kpi_ids(user_id))
+        kpi_values = []
+        for kpi_def in kpi_definitions:
+            kpi_values.append(await self._calculate_single_kpi(kpi_def, timeframe, end_date))
+        for kpi_value in kpi_values:
+            await self._store_kpi_value(kpi_value, user_id)
+        await self._check_kpi_alerts(kpi_values, user_id)
+        return {"kpi_values": [asdict(kpi) for kpi in kpi_values]}
+
+
+def edit_target(engine, index):
+    engine.definitions[index] = replace(engine.definitions[index], target_value=90)
+
+
+async def refresh(engine):
+    """Seconds, calculations and stores for one calculate_kpis call"""
+    calculations, stores = engine.calculations, engine.stores
+    started = time.perf_counter()
+    result = await engine.calculate_kpis("user-1")
+    elapsed = time.perf_counter() - started
+    assert len(result["kpi_values"]) == KPIS
+    return elapsed, engine.calculations - calculations, engine.stores - stores
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    legacy, engine = LegacyKPIEngine(), BenchKPIEngine()
+
+    for label, prepare in (
+        ("cold", lambda: None),
+        ("no data changed", lambda: None),
+        ("1 dataset changed", lambda: engine.mark_data_changed("user-1", "dataset_3")),
+        ("1 target edited", lambda: edit_target(engine, 7))
+    ):
+        prepare()
+        legacy_seconds, legacy_calculations, _ = await refresh(legacy)
+        seconds, calculations, stores = await refresh(engine)
+        print(
+            f"{label:18s} legacy {legacy_seconds * 1e3:7.1f} ms ({legacy_calculations} calculations)   "
+            f"incremental {seconds * 1e3:6.1f} ms ({calculations} calculations, {stores} stores)"
+        )
+
+    print(f"graph: {engine._kpi_graphs['user-1'].get_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark for AgentLoadBalancer task assignment
+Dispatches 100k tasks across 1k registered agents for each strategy, and
+checks a sample of picks against a linear scan of the registry
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+AGENTS = 1000
+TASKS = 100000
+ACTIVE_TASKS = 3000
+CHECK_EVERY = 100
+AGENT_TYPES = ["ceo", "strategy_cmo", "strategy_cfo", "devops"]
+CAPABILITIES = [f"cap-{i}" for i in range(40)]
+STRATEGIES = ["least_connections", "weighted_round_robin", "response_time_based", "capability_based"]
+
+
+def linear_select(balancer, task):
+    """Pick an agent the way the balancer did before indexing: scan, then sort"""
+    from backend.agents.swarm.load_balancer import AgentStatus
+
+    task_type = task["type"]
+    required = task["capabilities_required"]
+    eligible = []
+    for agent_id, metrics in balancer.agent_metrics.items():
+        if metrics.status not in [AgentStatus.HEALTHY, AgentStatus.DEGRADED]:
+            continue
+        if balancer.circuit_breakers[agent_id].state == "OPEN":
+            continue
+        if metrics.current_load >= metrics.max_concurrent_tasks:
+            continue
+        if required and not any(cap in metrics.capabilities for cap in required):
+            continue
+        if task_type != "general" and task_type not in metrics.agent_type:
+            continue
+        eligible.append(agent_id)
+
+    if not eligible:
+        return None
+    if balancer.strategy.value == "least_connections":
+        return balancer._least_connections_select(eligible)
+    if balancer.strategy.value == "weighted_round_robin":
+        return balancer._weighted_round_robin_select(eligible)
+    if balancer.strategy.value == "response_time_based":
+        return balancer._response_time_based_select(eligible)
+    return balancer._capability_based_select(eligible, task)
+
+
+async def run_strategy(strategy: str):
+    """Dispatch TASKS tasks under one strategy"""
+    from backend.agents.swarm.load_balancer import AgentLoadBalancer
+
+    random.seed(11)
+    balancer = AgentLoadBalancer({"strategy": strategy})
+
+    for i in range(AGENTS):
+        await balancer.register_agent(
+            f"agent-{i}",
+            random.choice(AGENT_TYPES),
+            random.sample(CAPABILITIES, 4),
+            max_concurrent_tasks=random.choice([3, 5, 8]),
+            weight=random.choice([0.5, 1.0, 2.0]),
+        )
+
+    tasks = [
+        {
+            "id": f"task-{i}",
+            "type": random.choice(["general", "strategy", "devops", "ceo"]),
+            "capabilities_required": random.sample(CAPABILITIES, random.choice([0, 1, 2])),
+        }
+        for i in range(TASKS)
+    ]
+
+    active = deque()
+    mismatches = 0
+    checked = 0
+    linear_seconds = 0.0
+    start = time.perf_counter()
+
+    for i, task in enumerate(tasks):
+        if i % CHECK_EVERY == 0:
+            check_start = time.perf_counter()
+            expected = linear_select(balancer, task)
+            linear_seconds += time.perf_counter() - check_start
+
+        agent_id = await balancer.assign_task(task)
+
+        if i % CHECK_EVERY == 0:
+            checked += 1
+            mismatches += agent_id != expected
+
+        if agent_id:
+            active.append(task["id"])
+        while len(active) > ACTIVE_TASKS:
+            await balancer.complete_task(
+                active.popleft(), success=random.random() > 0.05,
+                response_time=random.uniform(50, 500),
+            )
+
+    elapsed = time.perf_counter() - start - linear_seconds
+    print(
+        f"{strategy:<22} indexed: {TASKS / elapsed:10.0f} tasks/s  "
+        f"linear scan: {checked / linear_seconds:8.0f} tasks/s  "
+        f"mismatches: {mismatches}/{checked}"
+    )
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    print(f"agents={AGENTS} tasks={TASKS}")
+    for strategy in STRATEGIES:
+        await run_strategy(strategy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the monitoring metrics core
+Measures observations per second for Histogram.observe, Meter.mark and
+labeled MetricsCollector.histogram calls, summary latency, and memory per
+labeled series, against copies of the previous deque-based implementations.
+Also checks sketch quantiles against exact sorted quantiles and times a
+Prometheus text scrape.
+"""
+
+import gc
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+# Import monitoring.metrics without running the package __init__, which imports every backend client
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'monitoring')
+_spec = importlib.util.spec_from_file_location(
+    "monitoring", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["monitoring"] = importlib.util.module_from_spec(_spec)
+metrics = importlib.import_module("monitoring.metrics")
+
+OBSERVATIONS = 500000
+SERIES = 1000
+POINTS_PER_SERIES = 200
+SUMMARIES = 200
+SCRAPE_ENDPOINTS = 300  # x 3 statuses, under the default per-metric series cap
+SCRAPES = 20
+
+
+class LegacyHistogram:
+    """Histogram as before: 10k value deque, sorted per summary"""
+
+    def __init__(self):
+        self.buckets = [1, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf')]
+        self.counts = defaultdict(int)
+        self.sum = 0
+        self.count = 0
+        self.values = deque(maxlen=10000)
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        self.values.append(value)
+        for bucket in self.buckets:
+            if value <= bucket:
+                self.counts[bucket] += 1
+
+    def get_summary(self):
+        sorted_values = sorted(self.values)
+        n = len(sorted_values)
+        return {q: sorted_values[int(n * q)] for q in (0.5, 0.75, 0.9, 0.95, 0.99)}
+
+
+class LegacyMeter:
+    """Meter as before: one timestamp per event"""
+
+    def __init__(self):
+        self.events = deque()
+        self.count = 0
+
+    def mark(self, count=1):
+        timestamp = time.time()
+        for _ in range(count):
+            self.events.append(timestamp)
+        self.count += count
+
+
+@dataclass
+class LegacyMetricValue:
+    timestamp: datetime
+    value: float
+    labels: Dict[str, str]
+    metadata: Optional[Dict] = None
+
+
+class LegacySeries:
+    """Time series recording as before: JSON key and a MetricValue per point"""
+
+    def __init__(self):
+        self.time_series = defaultdict(lambda: deque(maxlen=10000))
+
+    def record(self, name, value, labels=None):
+        metric_value = LegacyMetricValue(timestamp=datetime.utcnow(), value=value, labels=labels or {})
+        self.time_series[f"{name}:{json.dumps(labels or {}, sort_keys=True)}"].append(metric_value)
+
+
+def rate(func, values):
+    """Calls per second of func over values"""
+    started = time.perf_counter()
+    for value in values:
+        func(value)
+    return len(values) / (time.perf_counter() - started)
+
+
+def series_bytes(record):
+    """Traced bytes per series after SERIES x POINTS_PER_SERIES labeled points"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    holder = record()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del holder
+    return used / SERIES
+
+
+def main():
+    random.seed(11)
+    values = [random.lognormvariate(3, 1.5) for _ in range(OBSERVATIONS)]
+    labels = [{"endpoint": f"/api/{i % 50}", "method": "GET", "status": str(200 + i % 3)} for i in range(OBSERVATIONS)]
+
+    # Observation throughput
+    legacy, histogram = LegacyHistogram(), metrics.Histogram()
+    print(f"histogram.observe  legacy {rate(legacy.observe, values):10,.0f}/s  "
+          f"sketch {rate(histogram.observe, values):10,.0f}/s")
+
+    legacy_meter, meter = LegacyMeter(), metrics.Meter()
+    batches = [100] * (OBSERVATIONS // 100)
+    print(f"meter.mark(100)    legacy {rate(legacy_meter.mark, batches):10,.0f}/s  "
+          f"ring   {rate(meter.mark, batches):10,.0f}/s")
+
+    legacy_series, collector = LegacySeries(), metrics.MetricsCollector()
+    pairs = list(zip(values, labels, strict=True))
+    legacy_rate = rate(lambda pair: legacy_series.record("http_request_duration_ms", *pair), pairs)
+    collector_rate = rate(lambda pair: collector.histogram("http_request_duration_ms", *pair), pairs)
+    print(f"labeled histogram  legacy {legacy_rate:10,.0f}/s  collector {collector_rate:7,.0f}/s "
+          f"(collector also updates the histogram)")
+
+    # Summary latency
+    started = time.perf_counter()
+    for _ in range(SUMMARIES):
+        legacy.get_summary()
+    legacy_us = (time.perf_counter() - started) / SUMMARIES * 1e6
+    started = time.perf_counter()
+    for _ in range(SUMMARIES):
+        histogram.get_summary()
+    sketch_us = (time.perf_counter() - started) / SUMMARIES * 1e6
+    print(f"get_summary        legacy {legacy_us:8.0f} us   sketch {sketch_us:8.0f} us")
+
+    # Accuracy over every observation (the legacy deque only sees the last 10k)
+    exact = sorted(values)
+    summary = histogram.get_summary()
+    worst = 0.0
+    for name, q in metrics.Histogram.QUANTILES:
+        truth = exact[int(q * (len(exact) - 1))]
+        worst = max(worst, abs(summary[name] - truth) / truth)
+    print(f"sketch quantiles   worst relative error {worst:.4f} (bound {metrics.DEFAULT_RELATIVE_ACCURACY})")
+
+    # Memory per labeled series
+    def legacy_record():
+        holder = LegacySeries()
+        for i in range(SERIES):
+            series_labels = {"agent_id": f"agent-{i}", "task_type": "report"}
+            for j in range(POINTS_PER_SERIES):
+                holder.record("agent_task_duration_ms", float(j), series_labels)
+        return holder
+
+    def collector_record():
+        holder = metrics.MetricsCollector()
+        for i in range(SERIES):
+            series_labels = {"agent_id": f"agent-{i}", "task_type": "report"}
+            for j in range(POINTS_PER_SERIES):
+                holder.gauge("agent_task_duration_ms", float(j), series_labels)
+        return holder
+
+    print(f"bytes per series ({POINTS_PER_SERIES} points)  legacy {series_bytes(legacy_record):8,.0f}  "
+          f"ring {series_bytes(collector_record):8,.0f}")
+    sketch_bytes = series_bytes(lambda: [metrics.Histogram() for _ in range(SERIES)])
+    print(f"bytes per empty histogram  {sketch_bytes:,.0f}")
+
+    # Scrape: labeled counters and histograms for SCRAPE_ENDPOINTS endpoints
+    collector = metrics.MetricsCollector()
+    for i in range(SCRAPE_ENDPOINTS):
+        for status in ("200", "404", "500"):
+            series_labels = {"method": "GET", "endpoint": f"/api/{i}", "status_code": status}
+            collector.increment("http_requests_total", labels=series_labels)
+            collector.timer("http_request_duration_ms", values[i], series_labels)
+    series = sum(entry["series"] for entry in collector.get_cardinality().values())
+    started = time.perf_counter()
+    for _ in range(SCRAPES):
+        size = sum(len(chunk) for chunk in collector.iter_exposition())
+    scrape_ms = (time.perf_counter() - started) / SCRAPES * 1000
+    print(f"scrape             {series} series, {size / 1024:.0f} KiB in {scrape_ms:.1f} ms "
+          f"({scrape_ms * 1000 / series:.1f} us/series)")
+
+
+if __name__ == "__main__":
+    main()
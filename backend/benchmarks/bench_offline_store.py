@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark for FirebaseService offline mode queries
+Fills the offline store with tasks as a long outage would, then compares
+indexed agent-type and change-feed queries with scanning every record, and
+checks the records survive reopening the store
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+TASKS = 50000
+NODES = 50000
+QUERIES = 200
+AGENT_TYPES = [f"agent-{i}" for i in range(500)]
+UPDATES = 100
+
+
+def scan_by_agent_type(items, agent_type):
+    """Query the way the dict-based offline storage did"""
+    return [
+        value['data'] for key, value in items.items()
+        if key.startswith('task_') and value['data'].get('agent_type') == agent_type
+    ]
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    from services.firebase_service import FirebaseService
+    from services.offline_store import OfflineStore
+
+    async def skip_initialization(self):
+        return None
+
+    # Stay in offline mode
+    FirebaseService._initialize_with_retry = skip_initialization
+    service = FirebaseService()
+
+    path = os.path.join(tempfile.mkdtemp(), "offline.db")
+    FirebaseService._offline_storage = OfflineStore(path)
+
+    random.seed(13)
+    items = {}
+    task_ids = []
+    started = time.perf_counter()
+    for i in range(TASKS):
+        task = await service.create_task({
+            "agent_type": random.choice(AGENT_TYPES), "status": "pending", "input_prompt": f"task {i}"
+        })
+        items[f"task_{task.id}"] = {'data': {"id": task.id, "agent_type": task.agent_type}}
+        task_ids.append(task.id)
+    for i in range(NODES):
+        await service.add_node({"id": f"node-{i}", "type": "memory", "content": f"node {i}"})
+        items[f"node_node-{i}"] = {'data': {"type": "memory"}}
+    write_seconds = time.perf_counter() - started
+    print(f"tasks={TASKS} nodes={NODES} offline writes: {(TASKS + NODES) / write_seconds:8.0f} /s")
+
+    agent_types = [random.choice(AGENT_TYPES) for _ in range(QUERIES)]
+
+    started = time.perf_counter()
+    expected = [scan_by_agent_type(items, agent_type) for agent_type in agent_types]
+    scan_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = [await service.get_tasks_by_agent_type(agent_type) for agent_type in agent_types]
+    indexed_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        sorted(task.id for task in tasks) != sorted(data["id"] for data in rows)
+        for tasks, rows in zip(results, expected, strict=True)
+    )
+    print(
+        f"get_tasks_by_agent_type  scan: {scan_seconds / QUERIES * 1000:7.2f} ms  "
+        f"indexed: {indexed_seconds / QUERIES * 1000:7.2f} ms  mismatches: {mismatches}/{QUERIES}"
+    )
+
+    since = datetime.now()
+    for task_id in random.sample(task_ids, UPDATES):
+        await service.update_task_status(task_id, "completed")
+    started = time.perf_counter()
+    changes = await service.get_tasks_changes_since(since)
+    print(f"get_tasks_changes_since  indexed: {(time.perf_counter() - started) * 1000:7.2f} ms  ({len(changes)}/{UPDATES} changes)")
+    assert len(changes) == UPDATES
+
+    FirebaseService._offline_storage.close()
+    reopened = FirebaseService._offline_storage = OfflineStore(path)
+    print(f"after reopen: {len(reopened)} records, last seq {reopened.get_metrics()['last_seq']}")
+    assert len(reopened) == TASKS + NODES
+
+    service.executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark for SSEEventManager broadcast fan-out
+Broadcasts 10k events to 5k subscriptions and compares indexed routing
+with a linear scan over every subscription
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'fastapi'))
+
+SUBSCRIPTIONS = 5000
+EVENTS = 10000
+AGENTS = 500
+TASKS = 2000
+USERS = 1000
+
+
+async def main():
+    from app.responses.sse import SSEEvent, SSEEventType, SSEPriority
+    from app.services.sse_event_manager import SSEEventManager
+
+    logging.disable(logging.INFO)
+    random.seed(7)
+    manager = SSEEventManager()
+
+    # Mix of agent, task and per-user system dashboards
+    for i in range(SUBSCRIPTIONS):
+        kind = i % 3
+        if kind == 0:
+            await manager.create_agent_subscription(f"client-{i}", f"agent-{random.randrange(AGENTS)}")
+        elif kind == 1:
+            await manager.create_task_subscription(f"client-{i}", f"task-{random.randrange(TASKS)}")
+        else:
+            await manager.create_system_subscription(
+                f"client-{i}", user_id=f"user-{random.randrange(USERS)}",
+                priority_threshold=SSEPriority.LOW
+            )
+
+    event_types = [
+        SSEEventType.AGENT_STATUS_UPDATE, SSEEventType.TASK_PROGRESS,
+        SSEEventType.SYSTEM_NOTIFICATION, SSEEventType.METRICS_UPDATE,
+    ]
+    events = [
+        SSEEvent(
+            event_type=random.choice(event_types),
+            agent_id=f"agent-{random.randrange(AGENTS)}",
+            task_id=f"task-{random.randrange(TASKS)}",
+            user_id=f"user-{random.randrange(USERS)}",
+        )
+        for _ in range(EVENTS)
+    ]
+
+    start = time.perf_counter()
+    indexed_recipients = 0
+    for event in events:
+        indexed_recipients += await manager._broadcast_event(event)
+    indexed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan_recipients = 0
+    for event in events:
+        for subscription in manager._subscriptions.values():
+            if subscription.should_receive_event(event):
+                scan_recipients += 1
+    scan_seconds = time.perf_counter() - start
+
+    print(f"subscriptions={SUBSCRIPTIONS} events={EVENTS}")
+    print(f"indexed broadcast: {indexed_seconds:8.3f} s  ({EVENTS / indexed_seconds:10.0f} events/s, {indexed_recipients} deliveries)")
+    print(f"linear scan:       {scan_seconds:8.3f} s  ({EVENTS / scan_seconds:10.0f} events/s, {scan_recipients} matches)")
+
+    await manager.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
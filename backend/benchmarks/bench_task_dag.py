@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark for HTTPAgentOrchestrator dependency scheduling
+Submits a 50k task workflow (a deep layered DAG) through create_tasks and
+drives it to completion with simulated agents, then measures what the
+previous scan of every task on each completion costs at the same size
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'fastapi'))
+
+LAYERS = 500
+WIDTH = 100
+DEPENDENCIES = 2
+AGENTS = 20
+AGENT_CAPACITY = 50
+LEGACY_SAMPLES = 200
+
+
+class FakePollingService:
+    """Records task assignments; every other call is a no-op"""
+
+    def __init__(self):
+        self.assigned = []
+
+    def add_event(self, event_type, data, agent_id=None, **kwargs):
+        if event_type == "task_assigned":
+            self.assigned.append((data["task_id"], agent_id))
+
+    def create_session(self, *args, **kwargs):
+        return None
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeStreamingService:
+    """Streaming stand-in whose coroutines do nothing"""
+
+    def __getattr__(self, name):
+        async def noop(*args, **kwargs):
+            return None
+        return noop
+
+
+def workflow_specs():
+    """LAYERS x WIDTH tasks, each depending on random tasks of the previous layer"""
+    random.seed(3)
+    specs = []
+    for layer in range(LAYERS):
+        for i in range(WIDTH):
+            dependencies = []
+            if layer:
+                dependencies = [f"{layer - 1}:{j}" for j in random.sample(range(WIDTH), DEPENDENCIES)]
+            specs.append({
+                "key": f"{layer}:{i}",
+                "task_type": "step",
+                "priority": random.choice(["low", "medium", "high"]),
+                "dependencies": dependencies
+            })
+    return specs
+
+
+def legacy_check_dependent_tasks(tasks, completed_task_id):
+    """The previous release step: scan every task for the completed dependency"""
+    released = []
+    for task in tasks.values():
+        if completed_task_id in task.dependencies and task.status == "pending":
+            if all(dep not in tasks or tasks[dep].status == "completed" for dep in task.dependencies):
+                released.append(task.task_id)
+    return released
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    from backend.services.agent_orchestrator_http import (
+        HTTPAgentOrchestrator, AgentStatus, TaskPriority, ConnectionStatus
+    )
+
+    orchestrator = HTTPAgentOrchestrator()
+    for task in orchestrator._background_tasks:
+        task.cancel()
+    polling = orchestrator._polling_service = FakePollingService()
+    orchestrator._streaming_service = FakeStreamingService()
+
+    for i in range(AGENTS):
+        agent_id = f"agent-{i}"
+        await orchestrator.register_agent(
+            agent_id, "worker", agent_id, ["step"], max_capacity=AGENT_CAPACITY, http_polling_enabled=False
+        )
+        await orchestrator.update_agent_status(agent_id, AgentStatus.IDLE, connection_status=ConnectionStatus.CONNECTED)
+
+    specs = workflow_specs()
+    for spec in specs:
+        spec["priority"] = TaskPriority(spec["priority"])
+
+    started = time.perf_counter()
+    task_ids = await orchestrator.create_tasks(specs)
+    submit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    completed = 0
+    max_running = 0
+    finished_at = {}
+    while polling.assigned:
+        batch, polling.assigned = polling.assigned, []
+        max_running = max(max_running, len(batch))
+        for task_id, agent_id in batch:
+            task = orchestrator._tasks[task_id]
+            assert all(dep in finished_at for dep in task.dependencies), f"{task_id} ran before its dependencies"
+            await orchestrator.complete_task(task_id, {"ok": True}, agent_id=agent_id)
+            finished_at[task_id] = completed
+            completed += 1
+        # Agents report back in once their batch is done
+        for agent_id in {agent_id for _, agent_id in batch}:
+            await orchestrator.update_agent_status(agent_id, AgentStatus.IDLE)
+    run_seconds = time.perf_counter() - started
+
+    print(f"tasks={len(task_ids)} layers={LAYERS} width={WIDTH} agents={AGENTS}x{AGENT_CAPACITY}")
+    print(f"create_tasks: {submit_seconds * 1000:8.1f} ms")
+    print(
+        f"run to completion: {run_seconds:6.2f} s  completed={completed}  "
+        f"({completed / run_seconds:8.0f} tasks/s, max assigned per round {max_running})"
+    )
+    assert completed == len(task_ids)
+
+    try:
+        await orchestrator.create_tasks([
+            {"key": "a", "task_type": "step", "dependencies": ["c"]},
+            {"key": "b", "task_type": "step", "dependencies": ["a"]},
+            {"key": "c", "task_type": "step", "dependencies": ["b"]}
+        ])
+    except ValueError as e:
+        print(f"cycle rejected: {e}")
+    else:
+        raise AssertionError("cyclic workflow was accepted")
+
+    try:
+        await orchestrator.create_task("step", {}, dependencies=["no-such-task"])
+    except ValueError as e:
+        print(f"unknown dependency rejected: {e}")
+    else:
+        raise AssertionError("task with an unknown dependency was accepted")
+
+    # Cost of the old per-completion scan over the same task table
+    for task in orchestrator._tasks.values():
+        task.status = "pending"
+    sample = random.sample(task_ids, LEGACY_SAMPLES)
+    started = time.perf_counter()
+    for task_id in sample:
+        legacy_check_dependent_tasks(orchestrator._tasks, task_id)
+    per_completion = (time.perf_counter() - started) / LEGACY_SAMPLES
+    print(
+        f"legacy release scan: {per_completion * 1000:6.2f} ms per completion, "
+        f"~{per_completion * len(task_ids):6.0f} s for the whole workflow"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark for push-based task dispatch
+Runs AsyncAgentBase agents against the offline FirebaseService, creates
+tasks at a steady rate and measures how long each task waits between
+creation and pickup. The previous 5 second polling loop averaged half its
+interval (about 2.5 s) regardless of load.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+AGENTS_PER_TYPE = 4
+TASKS = 2000
+TASK_RATE = 400  # tasks per second
+PROCESSING_TIME = 0.02
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    from services.firebase_service import FirebaseService
+    from services.offline_store import OfflineStore
+    from services.task_dispatch import get_dispatch_queue
+    from agents.async_agent_base import AsyncAgentBase, AgentType, TaskResult, TaskType
+
+    async def skip_initialization(self):
+        return None
+
+    # Stay in offline mode with a throwaway store
+    FirebaseService._initialize_with_retry = skip_initialization
+    service = FirebaseService()
+    FirebaseService._offline_storage = OfflineStore(':memory:')
+
+    created_at = {}
+    pickup = []
+
+    class BenchAgent(AsyncAgentBase):
+        def get_agent_capabilities(self):
+            return ["benchmark"]
+
+        def get_supported_task_types(self):
+            return [TaskType.DATA_PROCESSING]
+
+        def get_agent_specialties(self):
+            return []
+
+        async def process_task_core(self, task):
+            pickup.append(time.perf_counter() - created_at[task.description])
+            await asyncio.sleep(PROCESSING_TIME)
+            return TaskResult(taskId=task.id, success=True)
+
+    agent_types = [AgentType.STRATEGY, AgentType.FINANCE, AgentType.DEVOPS]
+    agents = [
+        BenchAgent(f"{agent_type.value}-{i}", agent_type, openai_api_key="unused")
+        for agent_type in agent_types for i in range(AGENTS_PER_TYPE)
+    ]
+    for agent in agents:
+        await agent.initialize()
+        await agent.start()
+
+    random.seed(5)
+    started = time.perf_counter()
+    for i in range(TASKS):
+        # Agents can pick a task up before create_task returns
+        created_at[f"task {i}"] = time.perf_counter()
+        await service.create_task({
+            "status": "pending",
+            "input_prompt": f"task {i}",
+            "agent_type": random.choice(agent_types).value
+        })
+        await asyncio.sleep(max(0.0, started + (i + 1) / TASK_RATE - time.perf_counter()))
+
+    while len(pickup) < TASKS and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    print(f"agents={len(agents)} tasks={TASKS} rate={TASK_RATE}/s processing={PROCESSING_TIME * 1000:.0f} ms")
+    print(
+        f"picked up {len(pickup)}/{TASKS} in {elapsed:.2f} s  "
+        f"pickup latency p50={statistics.median(pickup) * 1000:.2f} ms  "
+        f"p99={percentile(pickup, 99) * 1000:.2f} ms  max={max(pickup) * 1000:.2f} ms"
+    )
+    metrics = get_dispatch_queue().get_metrics()
+    print(f"dispatch: claimed={metrics['claimed']} acked={metrics['acked']} queued={metrics['queued']} leased={metrics['leased']}")
+
+    for agent in agents:
+        await agent.stop()
+    service.executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
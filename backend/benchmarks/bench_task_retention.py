@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark for orchestrator task retention
+Pushes 200k tasks through HTTPAgentOrchestrator.create_task/complete_task
+and compares the memory held by task state when every task stays in memory
+(the previous behaviour until the 24 hour cleanup) against the tiered store
+with a 5k task hot window, plus lookup latency for hot and archived tasks
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'fastapi'))
+
+TASKS = 200000
+TIMED_TASKS = 50000
+MAX_HOT_TASKS = 5000
+LOOKUPS = 2000
+
+
+class FakePollingService:
+    """Polling stand-in whose calls are no-ops"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeStreamingService:
+    """Streaming stand-in whose coroutines do nothing"""
+
+    def __getattr__(self, name):
+        async def noop(*args, **kwargs):
+            return None
+        return noop
+
+
+class UnboundedTasks(dict):
+    """Plain dict of tasks, as before the tiered store"""
+
+    def finish(self, key):
+        pass
+
+
+async def run_tasks(orchestrator, TaskPriority, count=TASKS):
+    """Create and complete count tasks; returns (task ids, seconds)"""
+    task_ids = []
+    started = time.perf_counter()
+    for i in range(count):
+        task_id = await orchestrator.create_task(
+            "report", {"account": f"acct-{i}", "rows": list(range(10))}, priority=TaskPriority.MEDIUM
+        )
+        await orchestrator.complete_task(task_id, {"status": "ok", "rows": 10})
+        task_ids.append(task_id)
+    return task_ids, time.perf_counter() - started
+
+
+def lookup_latency(orchestrator, task_ids):
+    """Mean get_task_info latency in microseconds"""
+    sample = random.sample(task_ids, min(LOOKUPS, len(task_ids)))
+    started = time.perf_counter()
+    for task_id in sample:
+        assert orchestrator.get_task_info(task_id) is not None
+    return (time.perf_counter() - started) / len(sample) * 1e6
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    archive_dir = tempfile.mkdtemp(prefix="task_archive_")
+    os.environ['ORCHESTRATOR_TASK_ARCHIVE_DIR'] = archive_dir
+    os.environ['ORCHESTRATOR_MAX_HOT_TASKS'] = str(MAX_HOT_TASKS)
+
+    from backend.services.agent_orchestrator_http import HTTPAgentOrchestrator, TaskPriority, AgentTask
+    from backend.services.task_archive import SegmentLogArchive, TieredTaskStore
+    from backend.services.task_dag import TaskDAG
+
+    orchestrator = HTTPAgentOrchestrator()
+    for task in orchestrator._background_tasks:
+        task.cancel()
+    orchestrator._polling_service = FakePollingService()
+    orchestrator._streaming_service = FakeStreamingService()
+    random.seed(5)
+
+    # Throughput, untraced
+    timed_store = TieredTaskStore(AgentTask.to_dict, AgentTask.from_dict, SegmentLogArchive('timed'))
+    class_store = orchestrator._tasks
+    for name, store in (("unbounded", UnboundedTasks()), ("tiered", timed_store)):
+        orchestrator._tasks = store
+        orchestrator._task_dag = TaskDAG()
+        store.on_spill = orchestrator._task_dag.remove
+        _, seconds = await run_tasks(orchestrator, TaskPriority, TIMED_TASKS)
+        print(f"{name:9s} throughput: {TIMED_TASKS / seconds:6.0f} tasks/s (create + complete)")
+    del timed_store, orchestrator._tasks
+
+    tracemalloc.start()
+
+    # Everything in memory
+    orchestrator._tasks = UnboundedTasks()
+    orchestrator._task_dag = TaskDAG()
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    task_ids, _ = await run_tasks(orchestrator, TaskPriority)
+    gc.collect()
+    unbounded_bytes = tracemalloc.get_traced_memory()[0] - before
+    unbounded_lookup = lookup_latency(orchestrator, task_ids)
+    print(
+        f"unbounded: {unbounded_bytes / 2**20:7.1f} MiB for {len(orchestrator._tasks)} tasks  "
+        f"(lookup {unbounded_lookup:5.1f} us)"
+    )
+    del task_ids
+    del orchestrator._tasks, orchestrator._task_dag
+
+    # Tiered store, as configured by the class
+    orchestrator._task_dag = TaskDAG()
+    orchestrator._tasks.on_spill = orchestrator._task_dag.remove
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    task_ids, _ = await run_tasks(orchestrator, TaskPriority)
+    gc.collect()
+    tiered_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    store = orchestrator._tasks
+    assert store is class_store
+    hot_ids = list(store)
+    archived_ids = task_ids[:TASKS - MAX_HOT_TASKS]
+    metrics = store.get_metrics()
+    print(
+        f"tiered:    {tiered_bytes / 2**20:7.1f} MiB, {metrics['hot_tasks']} hot / "
+        f"{metrics['archive']['records']} archived"
+    )
+    print(
+        f"lookup: hot {lookup_latency(orchestrator, hot_ids):5.1f} us, "
+        f"archived {lookup_latency(orchestrator, archived_ids):6.1f} us"
+    )
+
+    task = orchestrator.get_task_info(archived_ids[0])
+    assert task.status == "completed" and task.result == {"status": "ok", "rows": 10}
+    archive_bytes = sum(
+        os.path.getsize(os.path.join(store.archive.directory, name))
+        for name in os.listdir(store.archive.directory)
+    )
+    print(f"archive on disk: {archive_bytes / 2**20:.1f} MiB in {metrics['archive']['segments']} segments")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
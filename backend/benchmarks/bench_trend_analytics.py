@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batched trend analytics
+Times trend fit, Holt smoothing, seasonality detection and ensemble
+forecasts for 10k series x 730 daily points in batched calls, against the
+previous per-series Python helpers (run on a sample and extrapolated).
+Correctness is covered by tests/test_trend_analytics.py.
+"""
+
+import importlib
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# Import services.business_intelligence.trend_analytics without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules["business_intelligence"] = importlib.util.module_from_spec(_spec)
+trend_analytics = importlib.import_module("business_intelligence.trend_analytics")
+
+SERIES = 10000
+POINTS = 730
+LEGACY_SAMPLE = 200
+PERIODS = (7, 30, 91)
+
+
+def make_series(rng):
+    """Trend + noise, a third also with a weekly/monthly/quarterly cycle"""
+    t = np.arange(POINTS)
+    slopes = rng.normal(0.05, 0.1, SERIES)[:, np.newaxis]
+    levels = rng.uniform(50, 500, SERIES)[:, np.newaxis]
+    matrix = levels + slopes * t + rng.normal(0, 2, (SERIES, POINTS))
+    periods = np.zeros(SERIES, dtype=int)
+    for i, period in enumerate(PERIODS):
+        rows = slice(i, SERIES, 3 * len(PERIODS))
+        periods[rows] = period
+        matrix[rows] += 15 * np.sin(2 * np.pi * t / period)
+    return matrix, periods
+
+
+# Previous per-series helpers, from KPIEngine and RevenueIntelligenceEngine
+
+def legacy_slope(x, y):
+    n = len(x)
+    sum_x, sum_y = sum(x), sum(y)
+    sum_xy = sum(x[i] * y[i] for i in range(n))
+    sum_x2 = sum(x[i] ** 2 for i in range(n))
+    return (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
+
+
+def legacy_r_squared(x, y, slope):
+    y_mean = statistics.mean(y)
+    y_pred = [slope * xi for xi in x]
+    ss_tot = sum((yi - y_mean) ** 2 for yi in y)
+    ss_res = sum((yi - y_pred[i]) ** 2 for i, yi in enumerate(y))
+    return max(0, min(1, 1 - ss_res / ss_tot))
+
+
+def legacy_seasonality(values):
+    mid_point = len(values) // 2
+    difference = abs(statistics.mean(values[:mid_point]) - statistics.mean(values[mid_point:]))
+    return difference / statistics.mean(values) > 0.2
+
+
+def legacy_forecast(values, periods=1):
+    changes = [values[i] - values[i - 1] for i in range(1, len(values))]
+    return values[-1] + statistics.mean(changes) * periods
+
+
+def main():
+    rng = np.random.default_rng(3)
+    matrix, _ = make_series(rng)
+
+    # Legacy: one series at a time over Python lists
+    sample = matrix[:LEGACY_SAMPLE].tolist()
+    x = list(range(POINTS))
+    started = time.perf_counter()
+    for values in sample:
+        slope = legacy_slope(x, values)
+        legacy_r_squared(x, values, slope)
+        legacy_forecast(values)
+        legacy_seasonality(values)
+    legacy = (time.perf_counter() - started) / LEGACY_SAMPLE * SERIES
+
+    timings = {}
+    for name, func in (
+        ("linear_trend", trend_analytics.linear_trend),
+        ("exponential_smoothing", trend_analytics.exponential_smoothing),
+        ("detect_seasonality", trend_analytics.detect_seasonality),
+        ("ensemble_forecast", trend_analytics.ensemble_forecast),
+    ):
+        started = time.perf_counter()
+        func(matrix)
+        timings[name] = time.perf_counter() - started
+
+    print(f"{SERIES} series x {POINTS} points")
+    print(f"legacy slope + R² + forecast + seasonality  {legacy * 1e3:9.0f} ms (extrapolated from {LEGACY_SAMPLE})")
+    for name, seconds in timings.items():
+        print(f"{name:42s} {seconds * 1e3:9.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
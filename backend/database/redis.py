@@ -5,6 +5,8 @@ Handles caching, session storage, and real-time data
 
 import json
 import logging
+import time
+import uuid
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
@@ -12,15 +14,94 @@ import redis.asyncio as redis
 
 logger = logging.getLogger(__name__)
 
+# Lua scripts of the task lease protocol; each runs atomically on the server.
+# Queued items are JSON objects with "task_id" and the "token" of the dispatch
+# that queued them; the queue's dispatch marker hash maps a task id to that
+# token while the task is queued or leased, and a queued copy whose token no
+# longer matches it was discarded. Every key a script touches is passed in
+# KEYS and hash-tagged to its queue (see RedisManager._lease_keys), so the
+# scripts run on Redis Cluster and under key-pattern ACLs.
+_TASK_LEASE_SCRIPTS = {
+    # KEYS: queue, dispatch markers; ARGV: task id, token, item
+    "enqueue_once": """
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('LPUSH', KEYS[1], ARGV[3])
+return 1
+""",
+    # KEYS: processing list, lease data, leases, claims, attempts, dispatch markers
+    # ARGV: lease id, expiry, claim id
+    "lease_claimed": """
+redis.call('ZREM', KEYS[4], ARGV[3])
+local item = redis.call('RPOP', KEYS[1])
+if not item then
+    return false
+end
+local task = cjson.decode(item)
+local token = task['token']
+local attempts_field = token or task['task_id']
+if token and redis.call('HGET', KEYS[6], task['task_id']) ~= token then
+    redis.call('HDEL', KEYS[5], attempts_field)
+    return {'discarded', item, 0}
+end
+local attempts = redis.call('HINCRBY', KEYS[5], attempts_field, 1)
+redis.call('HSET', KEYS[2], ARGV[1], item)
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+return {'leased', item, attempts}
+""",
+    # KEYS: leases, lease data, attempts, dispatch markers; ARGV: lease id
+    "ack": """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+local item = redis.call('HGET', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if item then
+    local task = cjson.decode(item)
+    local token = task['token']
+    redis.call('HDEL', KEYS[3], token or task['task_id'])
+    if token and redis.call('HGET', KEYS[4], task['task_id']) == token then
+        redis.call('HDEL', KEYS[4], task['task_id'])
+    end
+end
+return 1
+""",
+    # KEYS: leases, lease data, queue; ARGV: lease id
+    "release": """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+local item = redis.call('HGET', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if item then
+    redis.call('RPUSH', KEYS[3], item)
+end
+return 1
+""",
+    # KEYS: claims, processing list, queue; ARGV: claim id
+    "recover_claim": """
+local recovered = 0
+while redis.call('LMOVE', KEYS[2], KEYS[3], 'LEFT', 'RIGHT') do
+    recovered = recovered + 1
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+return recovered
+"""
+}
+
 
 class RedisManager:
     """Redis manager for AutoAdmin"""
 
+    CLAIM_GRACE_SECONDS = 30  # Past the claim timeout, a claim's processing list is requeued
+
     def __init__(self, host: str = "localhost", port: int = 6379, password: Optional[str] = None):
         self.host = host
         self.port = port
         self.password = password
         self.redis_client = None
+        self._scripts = {}
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
 
     async def initialize(self):
@@ -35,6 +116,7 @@ class RedisManager:
                 socket_timeout=5,
                 retry_on_timeout=True
             )
+            self._scripts = {}
 
             # Test connection
             await self.redis_client.ping()
@@ -202,6 +284,160 @@ class RedisManager:
             self.logger.error(f"Failed to get queue length {queue_name}: {e}")
             return 0
 
+    @staticmethod
+    def _lease_keys(queue_name: str) -> Dict[str, str]:
+        """
+        Keys of a queue's lease protocol
+
+        All are hash-tagged with the queue key ("queue:<name>" hashes the
+        same as "{queue:<name>}"), so they share its cluster slot.
+        """
+        queue = f"queue:{queue_name}"
+        tag = f"{{{queue}}}"
+        return {
+            "queue": queue,
+            "dispatch": f"{tag}:dispatch",
+            "leases": f"{tag}:leases",
+            "lease_data": f"{tag}:lease_data",
+            "attempts": f"{tag}:lease_attempts",
+            "claims": f"{tag}:claims",
+            "processing": f"{tag}:processing:"
+        }
+
+    async def enqueue_task_once(self, queue_name: str, task_id: str, task_data: Dict[str, Any]) -> Optional[bool]:
+        """
+        Add a task to a queue unless it is already queued or leased
+
+        A dispatch marker holding a fresh token is set together with the
+        push; it is cleared when the task is acked or discarded.
+
+        Returns:
+            False if the task was already dispatched, None on error
+        """
+        try:
+            keys = self._lease_keys(queue_name)
+            token = uuid.uuid4().hex
+            task_json = json.dumps({**task_data, "task_id": task_id, "token": token})
+            pushed = await self._script("enqueue_once")(
+                keys=[keys["queue"], keys["dispatch"]],
+                args=[task_id, token, task_json]
+            )
+            return bool(pushed)
+
+        except Exception as e:
+            self.logger.error(f"Failed to enqueue task {task_id} to {queue_name}: {e}")
+            return None
+
+    async def claim_task_lease(
+        self, queue_name: str, lease_id: str, timeout: float, lease_seconds: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to timeout seconds (fractions allowed, must be > 0) for a task and lease it
+
+        The task is moved atomically from the queue into a processing list of
+        this claim, then from there into the leases, so a claimer that dies in
+        between leaves it where requeue_expired_task_leases finds it.
+
+        Returns:
+            None if nothing arrived, else {"status": "leased" or "discarded",
+            "task": queued task data, "attempts", "expires_at"}
+        """
+        keys = self._lease_keys(queue_name)
+        claim_id = uuid.uuid4().hex
+        processing = keys["processing"] + claim_id
+        try:
+            await self.redis_client.zadd(
+                keys["claims"], {claim_id: time.time() + timeout + self.CLAIM_GRACE_SECONDS}
+            )
+            moved = await self.redis_client.blmove(keys["queue"], processing, timeout, "RIGHT", "LEFT")
+            if moved is None:
+                await self.redis_client.zrem(keys["claims"], claim_id)
+                return None
+
+            expires_at = time.time() + lease_seconds
+            result = await self._script("lease_claimed")(
+                keys=[processing, keys["lease_data"], keys["leases"], keys["claims"],
+                      keys["attempts"], keys["dispatch"]],
+                args=[lease_id, expires_at, claim_id]
+            )
+            if not result:
+                return None  # Recovered by another worker after the claim ran out
+            status, task_json, attempts = result
+            return {
+                "status": status,
+                "task": json.loads(task_json),
+                "attempts": int(attempts),
+                "expires_at": expires_at
+            }
+
+        except Exception as e:
+            self.logger.error(f"Failed to claim task from {queue_name}: {e}")
+            return None
+
+    async def ack_task_lease(self, queue_name: str, lease_id: str) -> bool:
+        """Remove a lease and the task's dispatch marker; False if the lease was already gone"""
+        try:
+            keys = self._lease_keys(queue_name)
+            return bool(await self._script("ack")(
+                keys=[keys["leases"], keys["lease_data"], keys["attempts"], keys["dispatch"]],
+                args=[lease_id]
+            ))
+
+        except Exception as e:
+            self.logger.error(f"Failed to ack task lease on {queue_name}: {e}")
+            return False
+
+    async def release_task_lease(self, queue_name: str, lease_id: str) -> bool:
+        """Put a leased task back at the head of its queue; False if the lease was already gone"""
+        try:
+            keys = self._lease_keys(queue_name)
+            return bool(await self._script("release")(
+                keys=[keys["leases"], keys["lease_data"], keys["queue"]],
+                args=[lease_id]
+            ))
+
+        except Exception as e:
+            self.logger.error(f"Failed to release task lease on {queue_name}: {e}")
+            return False
+
+    async def discard_queued_task(self, queue_name: str, task_id: str) -> bool:
+        """Clear a task's dispatch marker; queued copies are dropped when claimed"""
+        try:
+            return bool(await self.redis_client.hdel(self._lease_keys(queue_name)["dispatch"], task_id))
+
+        except Exception as e:
+            self.logger.error(f"Failed to discard task {task_id} from {queue_name}: {e}")
+            return False
+
+    async def requeue_expired_task_leases(self, queue_name: str, now: float) -> int:
+        """Push tasks whose lease expired, or whose claimer died mid-claim, back onto their queue"""
+        try:
+            keys = self._lease_keys(queue_name)
+            requeued = 0
+            expired = await self.redis_client.zrangebyscore(keys["leases"], "-inf", now)
+            for lease_id in expired:
+                requeued += await self.release_task_lease(queue_name, lease_id)
+            stale_claims = await self.redis_client.zrangebyscore(keys["claims"], "-inf", now)
+            for claim_id in stale_claims:
+                requeued += await self._script("recover_claim")(
+                    keys=[keys["claims"], keys["processing"] + claim_id, keys["queue"]],
+                    args=[claim_id]
+                )
+            if requeued:
+                self.logger.warning(f"Requeued {requeued} tasks with expired leases on {queue_name}")
+            return requeued
+
+        except Exception as e:
+            self.logger.error(f"Failed to requeue expired leases on {queue_name}: {e}")
+            return 0
+
+    def _script(self, name: str):
+        """Registered Lua script of the task lease protocol"""
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = self.redis_client.register_script(_TASK_LEASE_SCRIPTS[name])
+        return script
+
     # ===== CACHING =====
 
     async def set_cache(self, key: str, value: Any, ttl_seconds: int = 3600) -> bool:
@@ -9,7 +9,7 @@ import asyncio
 import uuid
 import time
 from typing import Any, Dict, AsyncGenerator, Optional, List, Callable, Union
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 from fastapi.responses import StreamingResponse
@@ -21,9 +21,63 @@ try:
 except ImportError:
     EventSourceResponse = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+def _json_default(value: Any) -> Any:
+    """Encode values JSON cannot represent the same way on the orjson and json paths"""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def dumps_json(payload: Any) -> bytes:
+    """Serialize a payload to JSON bytes, using orjson when it is installed
+
+    Both paths produce the same bytes: compact separators, raw UTF-8,
+    stringified non-string dict keys, and datetimes, enums and dataclasses
+    encoded by _json_default rather than orjson's native encoders.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=_json_default,
+            option=(
+                orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS
+            ),
+        )
+    return json.dumps(
+        payload, default=_json_default, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def format_sse_frame(
+    event: str,
+    data: bytes,
+    event_id: Optional[str] = None,
+    retry: Optional[int] = None
+) -> bytes:
+    """Assemble a complete SSE frame from pre-serialized data"""
+    parts = []
+    if event_id is not None:
+        parts.append(b"id: " + event_id.encode("utf-8") + b"\n")
+    parts.append(b"event: " + event.encode("utf-8") + b"\n")
+    parts.append(b"data: " + data + b"\n")
+    if retry is not None:
+        parts.append(b"retry: " + str(retry).encode("ascii") + b"\n")
+    parts.append(b"\n")
+    return b"".join(parts)
+
+
 class SSEPriority(Enum):
     """Event priority levels for SSE"""
     LOW = "low"
@@ -71,6 +125,23 @@ class SSEEvent:
     connection_id: Optional[str] = None
     retry: Optional[int] = None
     expires_at: Optional[datetime] = None
+    # Encoded frames by retry value; events are treated as immutable once encoded
+    _frames: Dict[Optional[int], bytes] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def encode(self, retry: Optional[int] = None) -> bytes:
+        """Serialize the event once into an SSE frame shared by every recipient"""
+        frame = self._frames.get(retry)
+        if frame is None:
+            frame = format_sse_frame(
+                self.event_type.value,
+                dumps_json(self.to_dict()),
+                self.event_id,
+                retry
+            )
+            self._frames[retry] = frame
+        return frame
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert event to dictionary for serialization"""
@@ -192,17 +263,8 @@ class SSEResponse:
                         }
                         last_metrics = current_time
 
-                    # Format and send the event
-                    event_data = sse_event.to_dict()
-                    event_id = sse_event.event_id
-                    retry = sse_event.retry or default_retry
-
-                    yield {
-                        "event": sse_event.event_type.value,
-                        "data": json.dumps(event_data),
-                        "id": event_id,
-                        "retry": retry
-                    }
+                    # Send the event's cached frame, encoded once for all streams
+                    yield sse_event.encode(sse_event.retry or default_retry)
 
                     event_count += 1
 
@@ -242,6 +304,11 @@ class SSEResponse:
             async def format_sse_events():
                 """Format events as standard SSE text"""
                 async for event_dict in event_generator():
+                    # Pre-encoded event frames pass through untouched
+                    if isinstance(event_dict, bytes):
+                        yield event_dict
+                        continue
+
                     # Format according to SSE specification
                     lines = []
                     if 'id' in event_dict:
@@ -1053,5 +1120,9 @@ __all__ = [
     # SSE data structures
     "SSEEvent",
     "SSEPriority",
-    "SSEEventType"
+    "SSEEventType",
+
+    # Frame encoding helpers
+    "dumps_json",
+    "format_sse_frame"
 ]
\ No newline at end of file
@@ -208,27 +208,24 @@ async def sync_hubspot_data_background():
         if hubspot_service.is_online:
             try:
                 contacts = await hubspot_service.get_contacts(limit=100)
-                for contact in contacts:
-                    await firebase_service.store_hubspot_contact(contact)
-                logger.info(f"Synced {len(contacts)} contacts")
+                result = await firebase_service.store_hubspot_records(contacts)
+                logger.info(f"Synced {result['stored']} contacts ({result['failed']} failed)")
             except Exception as e:
                 logger.error(f"Error syncing contacts: {str(e)}")
 
             # Sync deals
             try:
                 deals = await hubspot_service.get_deals(limit=100)
-                for deal in deals:
-                    await firebase_service.store_hubspot_deal(deal)
-                logger.info(f"Synced {len(deals)} deals")
+                result = await firebase_service.store_hubspot_records(deals)
+                logger.info(f"Synced {result['stored']} deals ({result['failed']} failed)")
             except Exception as e:
                 logger.error(f"Error syncing deals: {str(e)}")
 
             # Sync companies
             try:
                 companies = await hubspot_service.get_companies(limit=100)
-                for company in companies:
-                    await firebase_service.store_hubspot_company(company)
-                logger.info(f"Synced {len(companies)} companies")
+                result = await firebase_service.store_hubspot_records(companies)
+                logger.info(f"Synced {result['stored']} companies ({result['failed']} failed)")
             except Exception as e:
                 logger.error(f"Error syncing companies: {str(e)}")
 
@@ -5,12 +5,11 @@ Provides real-time communication using standard HTTP protocols
 """
 
 import asyncio
-import json
 import time
 import uuid
 from typing import Dict, List, Optional, Any, AsyncGenerator, Callable
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict
 from enum import Enum
 import logging
 
@@ -22,6 +21,8 @@ except ImportError:
     # Fallback if sse-starlette is not available
     EventSourceResponse = None
 
+from app.responses.sse import dumps_json, format_sse_frame
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,6 +49,8 @@ class StreamingEvent:
     session_id: Optional[str] = None
     agent_id: Optional[str] = None
     task_id: Optional[str] = None
+    # Encoded SSE frame, built once and shared by every recipient
+    frame: Optional[bytes] = field(default=None, repr=False, compare=False)
 
 
 @dataclass
@@ -61,6 +64,8 @@ class ClientConnection:
     event_types: List[EventType]
     filters: Dict[str, Any]
     is_active: bool = True
+    # Outgoing SSE frames; broadcasts enqueue references to the shared bytes
+    frames: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=1000))
 
 
 class HTTPStreamingService:
@@ -165,10 +170,8 @@ class HTTPStreamingService:
         self._connections[client_id] = connection
 
         logger.info(
-            f"Created streaming connection",
-            client_id=client_id,
-            user_id=user_id,
-            total_connections=len(self._connections)
+            f"Created streaming connection {client_id} "
+            f"(user_id={user_id}, total_connections={len(self._connections)})"
         )
 
         return client_id
@@ -181,9 +184,8 @@ class HTTPStreamingService:
             del self._connections[client_id]
 
             logger.info(
-                f"Removed streaming connection",
-                client_id=client_id,
-                total_connections=len(self._connections)
+                f"Removed streaming connection {client_id} "
+                f"(total_connections={len(self._connections)})"
             )
 
     async def send_event(self, event: StreamingEvent):
@@ -202,6 +204,7 @@ class HTTPStreamingService:
     async def _broadcast_event(self, event: StreamingEvent):
         """Broadcast event to all matching connections"""
         disconnected_clients = []
+        frame = None
 
         for client_id, connection in self._connections.items():
             if not connection.is_active:
@@ -212,9 +215,14 @@ class HTTPStreamingService:
                 if not self._should_receive_event(connection, event):
                     continue
 
-                # Send event to this connection's queue
-                # This would be implemented by the specific streaming endpoint
-                # that manages per-client event queues
+                # Serialize lazily, once per event, on the first matching connection
+                if frame is None:
+                    frame = self._format_sse_event(event)
+
+                try:
+                    connection.frames.put_nowait(frame)
+                except asyncio.QueueFull:
+                    logger.warning(f"Dropping event {event.event_id} for slow client {client_id}")
 
             except Exception as e:
                 logger.error(f"Error sending event to client {client_id}: {e}")
@@ -297,9 +305,14 @@ class HTTPStreamingService:
 
                 while connection.is_active:
                     try:
-                        # Get events for this specific connection
-                        # In a real implementation, you'd have per-client queues
-                        # For now, we'll use a simplified approach
+                        # Wait for broadcast frames until the next ping is due
+                        wait_time = max(0.0, self._ping_interval - (time.time() - last_ping))
+                        try:
+                            frame = await asyncio.wait_for(connection.frames.get(), timeout=wait_time)
+                            yield frame
+                            continue
+                        except asyncio.TimeoutError:
+                            pass
 
                         # Send ping periodically
                         current_time = time.time()
@@ -315,10 +328,6 @@ class HTTPStreamingService:
                             last_ping = current_time
                             connection.last_ping = datetime.utcnow()
 
-                        # Check for new events (simplified approach)
-                        # In production, you'd maintain per-client event queues
-                        await asyncio.sleep(1)  # Prevent tight loop
-
                         # Check if connection timed out
                         if (datetime.utcnow() - connection.last_ping).seconds > self._connection_timeout:
                             logger.info(f"Connection {client_id} timed out")
@@ -344,8 +353,11 @@ class HTTPStreamingService:
             }
         )
 
-    def _format_sse_event(self, event: StreamingEvent) -> str:
-        """Format event as SSE string"""
+    def _format_sse_event(self, event: StreamingEvent) -> bytes:
+        """Format event as an SSE frame, serializing each event only once"""
+        if event.frame is not None:
+            return event.frame
+
         event_data = {
             "id": event.event_id,
             "type": event.event_type.value,
@@ -357,16 +369,12 @@ class HTTPStreamingService:
             "task_id": event.task_id
         }
 
-        # Format as SSE
-        lines = [
-            f"id: {event.event_id}",
-            f"event: {event.event_type.value}",
-            f"data: {json.dumps(event_data)}",
-            "",  # Empty line to end the event
-            "\n"  # Extra newline
-        ]
-
-        return "\n".join(lines)
+        event.frame = format_sse_frame(
+            event.event_type.value,
+            dumps_json(event_data),
+            event.event_id
+        )
+        return event.frame
 
     # Convenience methods for creating specific event types
     async def send_agent_status_update(
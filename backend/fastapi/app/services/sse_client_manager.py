@@ -7,7 +7,6 @@ Provides comprehensive client tracking with health monitoring and graceful disco
 import asyncio
 import time
 import uuid
-import json
 import weakref
 from typing import Dict, List, Optional, Any, Set, Callable
 from datetime import datetime, timedelta
@@ -480,7 +479,7 @@ class SSEClientManager:
                     self.update_client_metrics(
                         client.client_id,
                         events_sent=1,
-                        bytes_sent=len(json.dumps(event.to_dict()))
+                        bytes_sent=len(event.encode())
                     )
 
                     yield event
@@ -44,8 +44,8 @@ class EventFilter:
 @dataclass
 class EventSubscription:
     """Event subscription configuration"""
-    subscription_id: str = field(default_factory=lambda: str(uuid.uuid4()))
     client_id: str
+    subscription_id: str = field(default_factory=lambda: str(uuid.uuid4()))
     filters: List[EventFilter] = field(default_factory=list)
     event_types: Set[SSEEventType] = field(default_factory=set)
     priority_threshold: SSEPriority = SSEPriority.LOW
@@ -54,8 +54,20 @@ class EventSubscription:
     last_activity: datetime = field(default_factory=datetime.utcnow)
     is_active: bool = True
 
-    def should_receive_event(self, event: SSEEvent) -> bool:
-        """Check if subscription should receive the event"""
+    def should_receive_event(
+        self,
+        event: SSEEvent,
+        filters: Optional[List[EventFilter]] = None,
+        check_event_types: bool = True
+    ) -> bool:
+        """
+        Check if subscription should receive the event
+
+        Args:
+            event: Event to check
+            filters: Filters to evaluate instead of all subscription filters
+            check_event_types: Whether to check the event type whitelist
+        """
         if not self.is_active:
             return False
 
@@ -64,11 +76,11 @@ class EventSubscription:
             return False
 
         # Check event types
-        if self.event_types and event.event_type not in self.event_types:
+        if check_event_types and self.event_types and event.event_type not in self.event_types:
             return False
 
         # Check all filters
-        for filter_config in self.filters:
+        for filter_config in (self.filters if filters is None else filters):
             if not self._passes_filter(filter_config, event):
                 return False
 
@@ -154,6 +166,118 @@ class EventBuffer:
             self.events.popleft()
 
 
+class SubscriptionIndex:
+    """
+    Inverted index from event attributes to candidate subscriptions
+    Each subscription is routed on its most selective whitelist filter (task, agent,
+    user) or else its event types; only the remaining filters are evaluated per event
+    """
+
+    # Routing dimensions, most selective first
+    _FILTER_DIMENSIONS = (
+        (EventFilterType.TASK_ID, "task_id"),
+        (EventFilterType.AGENT_ID, "agent_id"),
+        (EventFilterType.USER_ID, "user_id"),
+    )
+
+    def __init__(self):
+        self._buckets: Dict[tuple, Dict[str, EventSubscription]] = defaultdict(dict)
+        self._wildcard: Dict[str, EventSubscription] = {}
+        self._routes: Dict[str, List[tuple]] = {}
+        # subscription_id -> (residual filters, check event types)
+        self._residual: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._residual)
+
+    def add(self, subscription: EventSubscription):
+        """Index a subscription"""
+        self.remove(subscription.subscription_id)
+
+        keys, residual_filters, check_event_types = self._plan_route(subscription)
+        subscription_id = subscription.subscription_id
+
+        if keys is None:
+            keys = []  # Indexed nowhere: no event can pass its filters
+        elif keys:
+            for key in keys:
+                self._buckets[key][subscription_id] = subscription
+        else:
+            self._wildcard[subscription_id] = subscription
+
+        self._routes[subscription_id] = keys
+        self._residual[subscription_id] = (residual_filters, check_event_types)
+
+    def remove(self, subscription_id: str):
+        """Drop a subscription from the index"""
+        keys = self._routes.pop(subscription_id, None)
+        if keys is None:
+            return
+
+        self._residual.pop(subscription_id, None)
+        self._wildcard.pop(subscription_id, None)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.pop(subscription_id, None)
+                if not bucket:
+                    del self._buckets[key]
+
+    def match(self, event: SSEEvent) -> List[EventSubscription]:
+        """Return subscriptions that should receive the event"""
+        candidate_buckets = [self._wildcard]
+
+        for key in (
+            ("task_id", event.task_id),
+            ("agent_id", event.agent_id),
+            ("user_id", event.user_id),
+            ("event_type", event.event_type),
+        ):
+            if key[1] is not None:
+                bucket = self._buckets.get(key)
+                if bucket:
+                    candidate_buckets.append(bucket)
+
+        # A subscription is routed on a single dimension and an event carries one
+        # value per dimension, so buckets never overlap
+        matches = []
+        for bucket in candidate_buckets:
+            for subscription_id, subscription in bucket.items():
+                residual_filters, check_event_types = self._residual[subscription_id]
+                if subscription.should_receive_event(event, residual_filters, check_event_types):
+                    matches.append(subscription)
+
+        return matches
+
+    def _plan_route(self, subscription: EventSubscription) -> tuple:
+        """
+        Choose index keys for a subscription and the filters left to evaluate;
+        no keys routes it to the wildcard bucket, None keys to nowhere
+        """
+        for filter_type, dimension in self._FILTER_DIMENSIONS:
+            for filter_config in subscription.filters:
+                if filter_config.filter_type != filter_type or not filter_config.include:
+                    continue
+
+                if isinstance(filter_config.value, str):
+                    values = [filter_config.value]
+                elif isinstance(filter_config.value, list):
+                    values = filter_config.value
+                else:
+                    continue
+                if not values:
+                    return None, [], True  # An empty whitelist lets no event through
+
+                residual = [f for f in subscription.filters if f is not filter_config]
+                return [(dimension, value) for value in values], residual, True
+
+        if subscription.event_types:
+            keys = [("event_type", event_type) for event_type in subscription.event_types]
+            return keys, list(subscription.filters), False
+
+        return [], list(subscription.filters), True
+
+
 class SSEEventManager:
     """
     Comprehensive SSE Event Manager
@@ -173,6 +297,7 @@ class SSEEventManager:
             self._subscriptions: Dict[str, EventSubscription] = {}
             self._client_subscriptions: Dict[str, List[str]] = defaultdict(list)
             self._event_buffers: Dict[str, EventBuffer] = {}
+            self._subscription_index = SubscriptionIndex()
             self._event_queue: asyncio.Queue = None
             self._broadcast_task = None
             self._stats = {
@@ -246,6 +371,7 @@ class SSEEventManager:
 
         self._subscriptions[subscription.subscription_id] = subscription
         self._client_subscriptions[client_id].append(subscription.subscription_id)
+        self._subscription_index.add(subscription)
 
         # Create event buffer
         buffer = EventBuffer(
@@ -260,10 +386,8 @@ class SSEEventManager:
         self._stats['total_subscriptions'] = len(self._subscriptions)
 
         logger.info(
-            f"Created SSE subscription",
-            subscription_id=subscription.subscription_id,
-            client_id=client_id,
-            event_types=[et.value for et in event_types] if event_types else None
+            f"Created SSE subscription {subscription.subscription_id} for client {client_id} "
+            f"(event_types={[et.value for et in event_types] if event_types else None})"
         )
 
         return subscription.subscription_id
@@ -275,6 +399,7 @@ class SSEEventManager:
 
         subscription = self._subscriptions[subscription_id]
         subscription.is_active = False
+        self._subscription_index.remove(subscription_id)
 
         # Remove from client subscriptions
         if subscription.client_id in self._client_subscriptions:
@@ -293,9 +418,7 @@ class SSEEventManager:
         self._stats['active_subscriptions'] = len([s for s in self._subscriptions.values() if s.is_active])
 
         logger.info(
-            f"Removed SSE subscription",
-            subscription_id=subscription_id,
-            client_id=subscription.client_id
+            f"Removed SSE subscription {subscription_id} for client {subscription.client_id}"
         )
 
         return True
@@ -331,25 +454,21 @@ class SSEEventManager:
     async def _broadcast_event(self, event: SSEEvent) -> int:
         """Internal method to broadcast event to matching subscriptions"""
         recipients_count = 0
-        filtered_count = 0
 
-        # Find matching subscriptions
-        matching_subscriptions = []
-        for subscription in self._subscriptions.values():
-            if not subscription.is_active:
-                continue
+        # Find matching subscriptions through the index
+        candidates = self._subscription_index.match(event)
+        filtered_count = len(self._subscription_index) - len(candidates)
 
-            if subscription.should_receive_event(event):
-                # Check rate limiting
-                if subscription.max_events_per_minute:
-                    events_per_minute = self._get_events_per_minute(subscription.subscription_id)
-                    if events_per_minute >= subscription.max_events_per_minute:
-                        filtered_count += 1
-                        continue
+        matching_subscriptions = []
+        for subscription in candidates:
+            # Check rate limiting
+            if subscription.max_events_per_minute:
+                events_per_minute = self._get_events_per_minute(subscription.subscription_id)
+                if events_per_minute >= subscription.max_events_per_minute:
+                    filtered_count += 1
+                    continue
 
-                matching_subscriptions.append(subscription)
-            else:
-                filtered_count += 1
+            matching_subscriptions.append(subscription)
 
         # Send to matching subscriptions
         for subscription in matching_subscriptions:
@@ -371,11 +490,8 @@ class SSEEventManager:
 
         if recipients_count > 0:
             logger.debug(
-                f"Broadcast SSE event",
-                event_type=event.event_type.value,
-                event_id=event.event_id,
-                recipients=recipients_count,
-                filtered=filtered_count
+                f"Broadcast SSE event {event.event_id} ({event.event_type.value}) "
+                f"to {recipients_count} recipients, filtered {filtered_count}"
             )
 
         return recipients_count
@@ -607,6 +723,7 @@ class SSEEventManager:
 
         # Clear all subscriptions
         self._subscriptions.clear()
+        self._subscription_index = SubscriptionIndex()
         self._client_subscriptions.clear()
         self._event_buffers.clear()
         self._event_history.clear()
@@ -630,5 +747,6 @@ __all__ = [
     "EventSubscription",
     "EventFilter",
     "EventBuffer",
-    "EventFilterType"
+    "EventFilterType",
+    "SubscriptionIndex"
 ]
\ No newline at end of file
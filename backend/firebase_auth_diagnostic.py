@@ -113,7 +113,7 @@ async def run_diagnostic():
                 print("❌ Task creation failed")
 
             # Test offline storage
-            offline_items = len(firebase_service._offline_storage)
+            offline_items = len(firebase_service.offline_store)
             print(f"📦 Offline storage items: {offline_items}")
 
         except Exception as e:
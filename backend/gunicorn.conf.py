@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for serving the backend with several Uvicorn workers
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Workers share metrics through files in METRICS_MULTIPROC_DIR (see
+monitoring/multiprocess.py). The directory is emptied when the master starts,
+and the file of each worker is retired when it exits: its counters,
+histograms and meters are kept in the shared dead file, its gauges dropped.
+"""
+
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "autoadmin_metrics"))
+
+
+def on_starting(server):
+    """Drop metric files left by the workers of a previous run"""
+    directory = os.environ["METRICS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics_*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    """Fold an exited worker's cumulative samples into the dead file"""
+    from monitoring.multiprocess import mark_process_dead
+
+    mark_process_dead(worker.pid)
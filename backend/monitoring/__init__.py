@@ -23,6 +23,7 @@ from .metrics import (
     MetricDefinition,
     Histogram,
     Meter,
+    MetricFamily,
     metrics_collector,
     register_default_metrics
 )
@@ -95,6 +96,7 @@ __all__ = [
     "MetricDefinition",
     "Histogram",
     "Meter",
+    "MetricFamily",
     "metrics_collector",
     "register_default_metrics",
 
@@ -4,12 +4,12 @@ Monitoring and health check endpoints for FastAPI integration
 
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, HTTPException, Query, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import asyncio
 
 from .logger import get_logger, set_correlation_id, set_request_id, LogLevel, ServiceComponent
-from .metrics import metrics_collector
+from .metrics import metrics_collector, OPENMETRICS_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE
 from .health import health_checker, HealthStatus
 from .alerting import alert_manager, AlertSeverity
 
@@ -161,23 +161,17 @@ async def component_health_check(component_name: str):
 
 @router.get("/metrics", summary="System Metrics")
 async def get_metrics(
-    format: str = Query(default="json", description="Output format: json, prometheus"),
+    format: str = Query(default="json", description="Output format: json, prometheus, openmetrics"),
     component: Optional[str] = Query(default=None, description="Filter by component")
 ):
     """Get current system metrics"""
     try:
-        if format == "prometheus":
-            metrics_data = metrics_collector.get_metrics_for_export()
-
-            # Format as Prometheus text format
-            prometheus_lines = []
-            for metric_name, value in metrics_data.items():
-                prometheus_lines.append(f"{metric_name} {value}")
-
-            prometheus_text = "\n".join(prometheus_lines)
-            return Response(
-                content=prometheus_text,
-                media_type="text/plain"
+        if format in ("prometheus", "openmetrics"):
+            # Rendered one metric family at a time as the response is written
+            openmetrics = format == "openmetrics"
+            return StreamingResponse(
+                metrics_collector.iter_exposition(openmetrics=openmetrics),
+                media_type=OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
             )
         else:
             metrics_summary = metrics_collector.get_metrics_summary()
@@ -213,7 +207,7 @@ async def get_metrics_history(
         # This would typically query a time series database
         # For now, return recent values from the time_series storage
         key = f"{metric_name}:{json.dumps(label_dict, sort_keys=True)}"
-        time_series = metrics_collector.time_series.get(key, [])
+        time_series = metrics_collector.get_time_series(key)
 
         # Filter by time window
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
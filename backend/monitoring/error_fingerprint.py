@@ -0,0 +1,86 @@
+"""
+MinHash/LSH index of normalized error messages
+Finds candidate similar error reports from shared fingerprint buckets
+instead of comparing a new message against every stored report.
+"""
+
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+DEFAULT_BANDS = 8
+DEFAULT_ROWS = 3  # Bands of 3 rows surface pairs from about 0.5 shingle Jaccard similarity
+SHINGLE_SIZE = 3
+
+_HASH_MASK = (1 << 61) - 1
+
+
+class ErrorFingerprintIndex:
+    """
+    Locality-sensitive index over character shingles of messages
+
+    Each message gets a MinHash signature of bands * rows values, and each
+    band of the signature is a bucket key. Messages sharing any bucket are
+    candidates; the more buckets they share, the more similar they
+    usually are.
+    """
+
+    def __init__(self, bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS, seed: int = 17):
+        self.bands = bands
+        self.rows = rows
+        generator = random.Random(seed)
+        self._masks = [generator.getrandbits(61) for _ in range(bands * rows)]
+
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._keys: Dict[str, List[Tuple[int, int]]] = {}  # key -> its bucket keys
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str, message: str):
+        """Index a message under key, replacing any earlier entry"""
+        self.remove(key)
+        bucket_keys = self._bucket_keys(message)
+        for bucket_key in bucket_keys:
+            self._buckets.setdefault(bucket_key, set()).add(key)
+        self._keys[key] = bucket_keys
+
+    def remove(self, key: str):
+        """Drop a key from the index"""
+        for bucket_key in self._keys.pop(key, ()):
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[bucket_key]
+
+    def candidates(self, message: str, limit: int = 50) -> List[str]:
+        """Keys sharing a bucket with the message, most shared buckets first"""
+        shared: Counter = Counter()
+        for bucket_key in self._bucket_keys(message):
+            bucket = self._buckets.get(bucket_key)
+            if bucket:
+                shared.update(bucket)
+        return [key for key, _ in shared.most_common(limit)]
+
+    def _bucket_keys(self, message: str) -> List[Tuple[int, int]]:
+        signature = self._signature(self._shingles(message))
+        rows = self.rows
+        return [(band, hash(tuple(signature[band * rows:(band + 1) * rows]))) for band in range(self.bands)]
+
+    def _signature(self, shingles: Iterable[str]) -> List[int]:
+        """Minimum of each masked shingle hash"""
+        hashes = [hash(shingle) & _HASH_MASK for shingle in shingles]
+        return [min([h ^ mask for h in hashes]) for mask in self._masks]
+
+    @staticmethod
+    def _shingles(message: str) -> Set[str]:
+        if len(message) <= SHINGLE_SIZE:
+            return {message}
+        return {message[i:i + SHINGLE_SIZE] for i in range(len(message) - SHINGLE_SIZE + 1)}
+
+
+__all__ = ["ErrorFingerprintIndex"]
@@ -4,17 +4,30 @@ Comprehensive error tracking and debugging system
 
 import traceback
 import sys
+import os
+import re
 import uuid
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict, deque
+from collections import defaultdict, deque, OrderedDict
+from difflib import SequenceMatcher
 import json
 import inspect
 
 from .logger import get_logger, LogLevel, ServiceComponent, correlation_id, trace_id
+from .error_fingerprint import ErrorFingerprintIndex
+
+# Message normalization, most specific pattern first so UUIDs and
+# timestamps are not broken up by the number rule
+_NORMALIZE_PATTERNS = [
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<UUID>'),
+    (re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), '<TIMESTAMP>'),
+    (re.compile(r'\d+'), '<NUMBER>'),
+    (re.compile(r'/[^\s]+/[^\s]+/'), '<PATH>/'),
+]
 
 
 class ErrorSeverity(Enum):
@@ -235,14 +248,20 @@ class ErrorTracker:
         self.classifier = ErrorClassifier()
         self.logger = get_logger("error_tracker")
 
-        # Error storage
-        self.error_reports: Dict[str, ErrorReport] = {}
-        self.occurrences: List[ErrorOccurrence] = []
+        # Error storage; reports are kept in least recently seen order and
+        # the oldest is evicted beyond max_reports
+        self.error_reports: "OrderedDict[str, ErrorReport]" = OrderedDict()
+        self.occurrences: deque = deque(maxlen=10000)
         self.error_patterns: Dict[str, List[str]] = defaultdict(list)
+        self.max_reports = int(os.getenv("ERROR_TRACKER_MAX_REPORTS", 5000))
+        self.evicted_reports = 0
 
-        # Error grouping
+        # Error grouping: fingerprint buckets pick candidates, which are
+        # then checked against similarity_threshold
         self.similarity_threshold = 0.8
         self.max_occurrences_per_report = 100
+        self.max_similarity_candidates = 50
+        self.fingerprints = ErrorFingerprintIndex()
 
         # Context collectors
         self.context_collectors: List[Callable] = []
@@ -276,13 +295,9 @@ class ErrorTracker:
                 exception, message, context, severity, category, error_id
             )
 
-            # Store occurrence
+            # Store occurrence; the deque keeps only the most recent 10k
             self.occurrences.append(occurrence)
 
-            # Keep only recent occurrences
-            if len(self.occurrences) > 10000:
-                self.occurrences = self.occurrences[-10000:]
-
             # Update or create error report
             await self._update_error_report(occurrence)
 
@@ -499,10 +514,11 @@ class ErrorTracker:
 
         if error_id not in self.error_reports:
             # Create new error report
+            message_pattern = self._normalize_message(occurrence.message)
             self.error_reports[error_id] = ErrorReport(
                 error_id=error_id,
                 exception_type=occurrence.exception_type,
-                message_pattern=self._normalize_message(occurrence.message),
+                message_pattern=message_pattern,
                 severity=occurrence.severity,
                 category=occurrence.category,
                 first_seen=occurrence.timestamp,
@@ -512,13 +528,20 @@ class ErrorTracker:
                 unique_users=len([occ.context.user_id]) if occurrence.context and occurrence.context.user_id else 0,
                 affected_components=[occ.context.component.value] if occurrence.context and occurrence.context.component else [],
                 status=ErrorStatus.ACTIVE,
-                similar_errors=self._find_similar_errors(occurrence),
+                similar_errors=self._find_similar_errors(occurrence, message_pattern),
                 potential_causes=self._suggest_potential_causes(occurrence),
                 resolution_suggestions=self._suggest_resolution(occurrence)
             )
+            self.fingerprints.add(error_id, message_pattern)
+
+            while len(self.error_reports) > self.max_reports:
+                evicted_id, _ = self.error_reports.popitem(last=False)
+                self.fingerprints.remove(evicted_id)
+                self.evicted_reports += 1
         else:
             # Update existing report
             report = self.error_reports[error_id]
+            self.error_reports.move_to_end(error_id)
             report.last_seen = max(report.last_seen, occurrence.timestamp)
             report.occurrences.append(occurrence)
             report.total_occurrences += 1
@@ -543,40 +566,34 @@ class ErrorTracker:
 
     def _normalize_message(self, message: str) -> str:
         """Normalize error message for pattern matching"""
-        import re
-
-        # Remove specific values (numbers, UUIDs, timestamps)
-        normalized = re.sub(r'\d+', '<NUMBER>', message)
-        normalized = re.sub(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', '<UUID>', normalized)
-        normalized = re.sub(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}', '<TIMESTAMP>', normalized)
+        # Remove specific values (UUIDs, timestamps, numbers) and file paths
+        for pattern, replacement in _NORMALIZE_PATTERNS:
+            message = pattern.sub(replacement, message)
+        return message
 
-        # Remove file paths
-        normalized = re.sub(r'/[^\s]+/[^\s]+/', '<PATH>/', normalized)
-
-        return normalized
-
-    def _find_similar_errors(self, occurrence: ErrorOccurrence) -> List[str]:
-        """Find similar error patterns"""
+    def _find_similar_errors(self, occurrence: ErrorOccurrence, message_pattern: str = None) -> List[str]:
+        """Find similar error patterns among the fingerprint candidates"""
         similar = []
-        current_message = self._normalize_message(occurrence.message)
+        current_message = message_pattern or self._normalize_message(occurrence.message)
 
-        for error_id, report in self.error_reports.items():
-            if error_id == occurrence.error_id:
+        for error_id in self.fingerprints.candidates(current_message, self.max_similarity_candidates):
+            report = self.error_reports.get(error_id)
+            if error_id == occurrence.error_id or report is None:
                 continue
 
-            # Simple similarity based on message pattern
-            other_message = report.message_pattern
-            similarity = self._calculate_similarity(current_message, other_message)
-
-            if similarity > self.similarity_threshold:
+            # Simple similarity based on message pattern; the cheap upper
+            # bounds reject most non-matching candidates before ratio()
+            matcher = SequenceMatcher(None, current_message, report.message_pattern)
+            threshold = self.similarity_threshold
+            if matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold and matcher.ratio() > threshold:
                 similar.append(error_id)
+                if len(similar) == 5:
+                    break
 
-        return similar[:5]  # Return top 5 similar errors
+        return similar  # Top 5 similar errors
 
     def _calculate_similarity(self, str1: str, str2: str) -> float:
         """Calculate string similarity using simple heuristic"""
-        from difflib import SequenceMatcher
-
         return SequenceMatcher(None, str1, str2).ratio()
 
     def _severity_order(self, severity: ErrorSeverity) -> int:
@@ -4,16 +4,23 @@ Comprehensive metrics collection and monitoring system
 
 import time
 import asyncio
+import math
+import os
+import re
 import psutil
 import json
-from typing import Dict, Any, List, Optional, Callable
+from array import array
+from bisect import bisect_left
+from typing import Dict, Any, Iterator, List, Optional, Callable, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict, deque
 import threading
+import weakref
 from contextlib import asynccontextmanager
 
+from . import multiprocess as _multiprocess
+
 
 class MetricType(Enum):
     """Types of metrics"""
@@ -55,118 +62,746 @@ class MetricDefinition:
     unit: MetricUnit
     labels: List[str]
     aggregation: str = "avg"  # avg, sum, min, max, p50, p95, p99
+    max_series: Optional[int] = None  # Label sets kept before new ones share an overflow series
+
+
+# Relative error of histogram quantiles (DDSketch-style log buckets)
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+TIME_SERIES_CAPACITY = 10000
+DEFAULT_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES_PER_METRIC", 1000))
+OVERFLOW_LABELS = {"overflow": "true"}
+_OVERFLOW_KEY = tuple(OVERFLOW_LABELS.items())
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+_BIN_SLACK = 32
+_MIN_INDEXABLE = 1e-9
+
+
+class _BinStore:
+    """Dense array of bucket counts covering a contiguous range of bucket indexes"""
+
+    __slots__ = ("bins", "offset", "count", "max_bins")
+
+    def __init__(self, max_bins: int):
+        self.bins: List[int] = []  # bins[i] counts bucket offset + i
+        self.offset = 0
+        self.count = 0
+        self.max_bins = max_bins
+
+    def add(self, index: int, count: int = 1):
+        """Count a value in the given bucket"""
+        position = index - self.offset
+        if position < 0 or position >= len(self.bins):
+            position = self._grow(index)
+        self.bins[position] += count
+        self.count += count
+
+    def key_at_rank(self, rank: float) -> int:
+        """Bucket index holding the value of the given 0-based rank"""
+        seen = 0
+        for position, count in enumerate(self.bins):
+            seen += count
+            if seen > rank:
+                return self.offset + position
+        return self.offset + len(self.bins) - 1
+
+    def _grow(self, index: int) -> int:
+        """
+        Widen the range to cover index; past max_bins the lowest buckets
+        are collapsed into one, so accuracy is kept for the high quantiles
+        """
+        if not self.bins:
+            low, high = index - _BIN_SLACK, index + _BIN_SLACK
+            top = index
+        elif index < self.offset:
+            low, high = index - _BIN_SLACK, self.offset + len(self.bins) - 1
+            top = high
+        else:
+            low, high = self.offset, index + _BIN_SLACK
+            top = index
+        if high - low + 1 > self.max_bins:
+            # Drop the slack above first so the highest bucket is never collapsed
+            high = max(top, low + self.max_bins - 1)
+            low = high - self.max_bins + 1
+
+        bins = [0] * (high - low + 1)
+        for position, count in enumerate(self.bins):
+            bins[max(self.offset + position - low, 0)] += count
+        self.bins, self.offset = bins, low
+        return max(index - low, 0)
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch
+
+    Values fall in logarithmic buckets (DDSketch), so every quantile is
+    within relative_accuracy of the true value. Observing is a log and
+    an increment; quantiles are read with one pass over the buckets.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_bins: int = DEFAULT_MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1 / math.log(self._gamma)
+        self._positive = _BinStore(max_bins)
+        self._negative = _BinStore(max_bins)
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Add a value"""
+        if value > _MIN_INDEXABLE:
+            self._positive.add(math.ceil(math.log(value) * self._inv_log_gamma))
+        elif value < -_MIN_INDEXABLE:
+            self._negative.add(math.ceil(math.log(-value) * self._inv_log_gamma))
+        else:
+            self.zero_count += 1
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "QuantileSketch"):
+        """Fold another sketch with the same accuracy into this one"""
+        if other._gamma != self._gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for mine, theirs in ((self._positive, other._positive), (self._negative, other._negative)):
+            for position, count in enumerate(theirs.bins):
+                if count:
+                    mine.add(theirs.offset + position, count)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0..1), or None if empty"""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        negative_count = self._negative.count
+        if rank < negative_count:
+            index = self._negative.key_at_rank(negative_count - 1 - rank)
+            value = -self._value_of(index)
+        elif rank < negative_count + self.zero_count:
+            value = 0.0
+        else:
+            index = self._positive.key_at_rank(rank - negative_count - self.zero_count)
+            value = self._value_of(index)
+        return min(max(value, self.min), self.max)
+
+    def _value_of(self, index: int) -> float:
+        """Representative value of a bucket, within relative_accuracy of its contents"""
+        return 2 * self._gamma ** index / (self._gamma + 1)
 
 
 class Histogram:
-    """Simple histogram implementation"""
+    """Histogram with fixed buckets and streaming quantiles"""
+
+    QUANTILES = (("p50", 0.5), ("p75", 0.75), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99))
 
-    def __init__(self, buckets: List[float] = None):
-        self.buckets = buckets or [1, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf')]
-        self.counts = defaultdict(int)
+    def __init__(self, buckets: List[float] = None, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.buckets = sorted(buckets or [1, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf')])
+        self.counts = [0] * (len(self.buckets) + 1)  # Per bucket, not cumulative; last is overflow
         self.sum = 0
         self.count = 0
-        self.values = deque(maxlen=10000)  # Keep last 10k values for percentiles
+        self.sketch = QuantileSketch(relative_accuracy)
 
     def observe(self, value: float):
         """Observe a value"""
         self.sum += value
         self.count += 1
-        self.values.append(value)
-
-        # Update bucket counts
-        for bucket in self.buckets:
-            if value <= bucket:
-                self.counts[bucket] += 1
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sketch.add(value)
+
+    def merge(self, other: "Histogram"):
+        """Fold another histogram with the same buckets into this one"""
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.sum += other.sum
+        self.count += other.count
+        for position, count in enumerate(other.counts):
+            self.counts[position] += count
+        self.sketch.merge(other.sketch)
+
+    def get_cumulative_counts(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) per bucket"""
+        cumulative = []
+        seen = 0
+        for bucket, count in zip(self.buckets, self.counts, strict=False):
+            seen += count
+            cumulative.append((bucket, seen))
+        return cumulative
 
     def get_summary(self) -> Dict[str, float]:
         """Get histogram summary"""
-        if not self.values:
+        if not self.count:
             return {"count": 0, "sum": 0, "avg": 0}
 
-        sorted_values = sorted(list(self.values))
-        n = len(sorted_values)
-
         return {
             "count": self.count,
             "sum": self.sum,
             "avg": self.sum / self.count,
-            "min": sorted_values[0],
-            "max": sorted_values[-1],
-            "p50": sorted_values[int(n * 0.5)],
-            "p75": sorted_values[int(n * 0.75)],
-            "p90": sorted_values[int(n * 0.9)],
-            "p95": sorted_values[int(n * 0.95)],
-            "p99": sorted_values[int(n * 0.99)],
-            **{f"le_{bucket}": count for bucket, count in self.counts.items()}
+            "min": self.sketch.min,
+            "max": self.sketch.max,
+            **{name: self.sketch.quantile(q) for name, q in self.QUANTILES},
+            **{f"le_{bucket}": count for bucket, count in self.get_cumulative_counts()}
         }
 
 
 class Meter:
-    """Meter for measuring rates"""
+    """Meter for measuring rates, counted in one-second ring buffer slots"""
 
     def __init__(self, window_seconds: int = 60):
         self.window_seconds = window_seconds
-        self.events = deque()
+        self._slot_counts = array('q', bytes(8 * window_seconds))
+        self._slot_seconds = array('q', bytes(8 * window_seconds))  # Second each slot holds
         self.count = 0
 
     def mark(self, count: int = 1):
-        """Mark an event"""
-        timestamp = time.time()
-        for _ in range(count):
-            self.events.append(timestamp)
+        """Mark count events"""
+        second = int(time.time())
+        slot = second % self.window_seconds
+        if self._slot_seconds[slot] != second:
+            self._slot_seconds[slot] = second
+            self._slot_counts[slot] = 0
+        self._slot_counts[slot] += count
         self.count += count
 
+    def merge(self, other: "Meter"):
+        """Fold another meter with the same window into this one"""
+        if other.window_seconds != self.window_seconds:
+            raise ValueError("Cannot merge meters with different windows")
+        for slot, second in enumerate(other._slot_seconds):
+            if second > self._slot_seconds[slot]:
+                self._slot_seconds[slot] = second
+                self._slot_counts[slot] = other._slot_counts[slot]
+            elif second == self._slot_seconds[slot]:
+                self._slot_counts[slot] += other._slot_counts[slot]
+        self.count += other.count
+
     def get_rate(self) -> float:
         """Get events per second in the window"""
-        now = time.time()
-        cutoff = now - self.window_seconds
+        cutoff = int(time.time()) - self.window_seconds
+        events = 0
+        for slot, second in enumerate(self._slot_seconds):
+            if second > cutoff:
+                events += self._slot_counts[slot]
+        return events / self.window_seconds
+
+
+class TimeSeriesBuffer:
+    """
+    Ring buffer of (timestamp, value) points for one label set
+
+    Points are stored in packed float arrays that grow up to capacity, so
+    recording a point creates no objects; MetricValue views are built on
+    iteration.
+    """
+
+    def __init__(self, labels: Dict[str, str], capacity: int = TIME_SERIES_CAPACITY):
+        self.labels = labels
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * min(16, capacity)))
+        self._values = array('d', bytes(8 * min(16, capacity)))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[MetricValue]:
+        """Points oldest first"""
+        start = self._next - self._size
+        length = len(self._timestamps)
+        for i in range(start, self._next):
+            position = i % length
+            yield MetricValue(
+                timestamp=datetime.utcfromtimestamp(self._timestamps[position]),
+                value=self._values[position],
+                labels=self.labels
+            )
+
+    @property
+    def last_timestamp(self) -> float:
+        """Time of the newest point, or 0 if empty"""
+        if not self._size:
+            return 0.0
+        return self._timestamps[(self._next - 1) % len(self._timestamps)]
+
+    def extend(self, other: "TimeSeriesBuffer"):
+        """Record another buffer's points, oldest first"""
+        length = len(other._timestamps)
+        for i in range(other._next - other._size, other._next):
+            self.append(other._timestamps[i % length], other._values[i % length])
+
+    def append(self, timestamp: float, value: float):
+        """Record a point, overwriting the oldest once full"""
+        length = len(self._timestamps)
+        if self._size == length and length < self.capacity:
+            self._grow()
+            length = len(self._timestamps)
+        position = self._next % length
+        self._timestamps[position] = timestamp
+        self._values[position] = value
+        self._next = position + 1
+        if self._size < length:
+            self._size += 1
+
+    def _grow(self):
+        """Double the arrays, unrolling the ring so the oldest point comes first"""
+        length = min(2 * len(self._timestamps), self.capacity)
+        start = self._next % self._size
+        for name in ("_timestamps", "_values"):
+            old = getattr(self, name)
+            grown = old[start:] + old[:start]
+            grown.extend(array('d', bytes(8 * (length - len(grown)))))
+            setattr(self, name, grown)
+        self._next = self._size
+
+
+def _format_value(value: float) -> str:
+    """Exposition float: repr, with Prometheus spellings for infinities and NaN"""
+    if value != value:
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value))
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sanitize_name(name: str) -> str:
+    name = re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+
+class MetricSeries:
+    """One label set of a metric family: its value, history and exposition prefix"""
+
+    __slots__ = ("labels", "value", "history", "prefix", "updated")
+
+    def __init__(self, labels: Dict[str, str], value: Any, history: TimeSeriesBuffer, prefix: Any):
+        self.labels = labels
+        self.value = value  # float for counters and gauges, else a Histogram or Meter
+        self.history = history
+        self.prefix = prefix  # Sample name and labels, or per-bucket prefixes for histograms
+        self.updated = 0.0  # Set on merged series; recorded series use their history
+
+    @property
+    def last_updated(self) -> float:
+        return self.updated or self.history.last_timestamp
+
+
+class LabelSets:
+    """
+    Label sets admitted for one metric, up to max_series
+
+    Shared by the per-thread families of a metric, so the cap holds for the
+    metric as a whole rather than for each thread.
+    """
+
+    __slots__ = ("keys", "max_series", "_lock")
+
+    def __init__(self, max_series: int):
+        self.keys: set = set()
+        self.max_series = max_series
+        self._lock = threading.Lock()
 
-        # Remove old events
-        while self.events and self.events[0] < cutoff:
-            self.events.popleft()
+    def __len__(self) -> int:
+        return len(self.keys)
 
-        return len(self.events) / self.window_seconds
+    def admit(self, key: Tuple[Tuple[str, str], ...]) -> bool:
+        """True if the sorted label items have, or may now take, a series of their own"""
+        if key in self.keys:
+            return True
+        with self._lock:
+            if key in self.keys:
+                return True
+            if len(self.keys) >= self.max_series:
+                return False
+            self.keys.add(key)
+            return True
+
+    def discard(self, key: Tuple[Tuple[str, str], ...]):
+        with self._lock:
+            self.keys.discard(key)
+
+
+class MetricFamily:
+    """
+    All label sets of one metric
+
+    Series are created on first use and found again through the caller's
+    label items, so a steady-state lookup is one dict probe. Once
+    max_series label sets exist, new ones are folded into a single
+    overflow series instead of growing without bound. Exposition headers
+    and per-series line prefixes are built once.
+    """
+
+    def __init__(
+        self,
+        definition: MetricDefinition,
+        time_series: Dict[str, TimeSeriesBuffer],
+        max_series: Optional[int] = None,
+        label_sets: Optional[LabelSets] = None
+    ):
+        self.definition = definition
+        self.name = _sanitize_name(definition.name)
+        self.max_series = max_series or definition.max_series or DEFAULT_MAX_SERIES
+        self.label_sets = label_sets or LabelSets(self.max_series)
+        self.series: Dict[Tuple[Tuple[str, str], ...], MetricSeries] = {}  # Sorted label items -> series
+        self.overflowed = 0
+        self._time_series = time_series
+        self._index: Dict[Tuple[Tuple[str, str], ...], MetricSeries] = {}  # Caller's label items -> series
+
+        metric_type = definition.metric_type
+        if metric_type in (MetricType.HISTOGRAM, MetricType.TIMER):
+            self.exposition_type = "histogram"
+            self._sample_name = self.name
+        elif metric_type == MetricType.GAUGE:
+            self.exposition_type = "gauge"
+            self._sample_name = self.name
+        else:
+            self.exposition_type = "counter"
+            self._sample_name = self.name if self.name.endswith("_total") else f"{self.name}_total"
+
+        help_text = definition.description.replace("\\", "\\\\").replace("\n", "\\n")
+        om_name = self._sample_name[:-6] if self.exposition_type == "counter" else self.name
+        self.prometheus_header = (
+            f"# HELP {self._sample_name} {help_text}\n# TYPE {self._sample_name} {self.exposition_type}\n"
+        )
+        self.openmetrics_header = f"# HELP {om_name} {help_text}\n# TYPE {om_name} {self.exposition_type}\n"
+        if definition.unit in (MetricUnit.SECONDS, MetricUnit.BYTES) and om_name.endswith(f"_{definition.unit.value}"):
+            self.openmetrics_header += f"# UNIT {om_name} {definition.unit.value}\n"
+
+    def labels(self, labels: Optional[Dict[str, str]] = None) -> MetricSeries:
+        """Series for a label set, created on first use"""
+        items = tuple(labels.items()) if labels else ()
+        series = self._index.get(items)
+        if series is None:
+            series = self._lookup(items)
+        return series
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Exposition text for every series of the family"""
+        lines = [self.openmetrics_header if openmetrics else self.prometheus_header]
+        for series in list(self.series.values()):
+            value = series.value
+            if self.exposition_type == "histogram":
+                bucket_prefixes, count_prefix, sum_prefix = series.prefix
+                # One prefix more than cumulative counts when the buckets lack +Inf
+                for prefix, (_, cumulative) in zip(bucket_prefixes, value.get_cumulative_counts(), strict=False):
+                    lines.append(f"{prefix}{cumulative}\n")
+                if len(bucket_prefixes) > len(value.buckets):  # No explicit +Inf bucket
+                    lines.append(f"{bucket_prefixes[-1]}{value.count}\n")
+                lines.append(f"{count_prefix}{value.count}\n{sum_prefix}{_format_value(value.sum)}\n")
+            elif isinstance(value, Meter):
+                lines.append(f"{series.prefix}{value.count}\n")
+            else:
+                lines.append(f"{series.prefix}{_format_value(value)}\n")
+        return "".join(lines)
+
+    def series_for_key(self, key: Tuple[Tuple[str, str], ...]) -> MetricSeries:
+        """Series for sorted label items, which may be those of the overflow series"""
+        if key == _OVERFLOW_KEY:
+            return self._overflow_series()
+        series = self.series.get(key)
+        return series if series is not None else self._lookup(key)
+
+    def retain(self, keys: set):
+        """Drop series whose sorted label items are not in keys"""
+        for key in [key for key in self.series if key not in keys]:
+            del self.series[key]
+            self.label_sets.discard(key)
+        live = set(map(id, self.series.values()))
+        self._index = {items: series for items, series in self._index.items() if id(series) in live}
+
+    def _lookup(self, items: Tuple[Tuple[str, str], ...]) -> MetricSeries:
+        """Find or create the series for label items not seen in this order before"""
+        key = tuple(sorted(items))
+        series = self.series.get(key)
+        if series is None:
+            if not self.label_sets.admit(key):
+                self.overflowed += 1
+                return self._overflow_series()
+            series = self.series[key] = self._new_series(dict(key))
+        self._index[items] = series
+        return series
+
+    def _overflow_series(self) -> MetricSeries:
+        series = self.series.get(_OVERFLOW_KEY)
+        if series is None:
+            series = self.series[_OVERFLOW_KEY] = self._new_series(dict(OVERFLOW_LABELS))
+        return series
+
+    def _new_series(self, labels: Dict[str, str]) -> MetricSeries:
+        metric_type = self.definition.metric_type
+        if metric_type in (MetricType.HISTOGRAM, MetricType.TIMER):
+            value = Histogram()
+        elif metric_type == MetricType.METER:
+            value = Meter()
+        else:
+            value = 0.0
+
+        label_text = ",".join(
+            f'{_sanitize_name(name)}="{_escape_label_value(label)}"' for name, label in labels.items()
+        )
+        if self.exposition_type == "histogram":
+            separator = "," if label_text else ""
+            bounds = list(value.buckets)
+            if bounds[-1] != math.inf:
+                bounds.append(math.inf)
+            braces = f"{{{label_text}}}" if label_text else ""
+            prefix = (
+                [f'{self.name}_bucket{{{label_text}{separator}le="{_format_value(bound)}"}} ' for bound in bounds],
+                f"{self.name}_count{braces} ",
+                f"{self.name}_sum{braces} "
+            )
+        else:
+            prefix = f"{self._sample_name}{{{label_text}}} " if label_text else f"{self._sample_name} "
+
+        key = f"{self.definition.name}:{json.dumps(labels, sort_keys=True)}"
+        history = self._time_series.get(key)
+        if history is None:
+            history = self._time_series[key] = TimeSeriesBuffer(labels)
+        return MetricSeries(labels, value, history, prefix)
+
+
+def _new_rollup(metric_type: MetricType) -> Any:
+    """Empty value for a metric type"""
+    if metric_type in (MetricType.HISTOGRAM, MetricType.TIMER):
+        return Histogram()
+    if metric_type == MetricType.METER:
+        return Meter()
+    return 0.0
+
+
+def _merge_value(metric_type: MetricType, total: Any, total_time: float, value: Any, value_time: float) -> Tuple[Any, float]:
+    """
+    Fold one series value into a running total: gauges keep the most
+    recently set value, counters add, histograms and meters merge
+    """
+    if isinstance(total, (Histogram, Meter)):
+        if type(value) is type(total):
+            total.merge(value)
+        return total, max(total_time, value_time)
+    if metric_type == MetricType.GAUGE:
+        return (value, value_time) if value_time >= total_time else (total, total_time)
+    return total + value, max(total_time, value_time)
+
+
+def _series_fields(value: Any) -> Iterator[Tuple[str, float, Optional[float]]]:
+    """
+    Flatten a series value into named numbers for a multiprocess file,
+    each with its own timestamp or None for the series timestamp
+    """
+    if isinstance(value, Histogram):
+        for position, count in enumerate(value.counts):
+            if count:
+                yield f"bucket:{position}", count, None
+        yield "sum", value.sum, None
+        yield "count", value.count, None
+        sketch = value.sketch
+        yield "min", sketch.min, None
+        yield "max", sketch.max, None
+        yield "zero", sketch.zero_count, None
+        for sign, store in (("pos", sketch._positive), ("neg", sketch._negative)):
+            for position, count in enumerate(store.bins):
+                if count:
+                    yield f"{sign}:{store.offset + position}", count, None
+    elif isinstance(value, Meter):
+        yield "count", value.count, None
+        # Keyed by ring position so the file holds at most window_seconds
+        # slot keys; the timestamp carries the second the slot counts
+        for slot, second in enumerate(value._slot_seconds):
+            if second:
+                yield f"slot:{slot}", value._slot_counts[slot], second
+    else:
+        yield "value", value, None
+
+
+def _value_from_fields(metric_type: MetricType, fields: Dict[str, float], times: Dict[str, float]) -> Any:
+    """Rebuild a series value from _series_fields output and the fields' timestamps"""
+    value = _new_rollup(metric_type)
+    if isinstance(value, Histogram):
+        sketch = value.sketch
+        for field, number in fields.items():
+            kind, _, index = field.partition(":")
+            if kind == "bucket" and int(index) < len(value.counts):
+                value.counts[int(index)] = int(number)
+            elif kind == "pos":
+                sketch._positive.add(int(index), int(number))
+            elif kind == "neg":
+                sketch._negative.add(int(index), int(number))
+        value.sum = fields.get("sum", 0.0)
+        value.count = sketch.count = int(fields.get("count", 0))
+        sketch.zero_count = int(fields.get("zero", 0))
+        sketch.min = fields.get("min", math.inf)
+        sketch.max = fields.get("max", -math.inf)
+    elif isinstance(value, Meter):
+        value.count = int(fields.get("count", 0))
+        for field, number in fields.items():
+            if field.startswith("slot:"):
+                second = int(times.get(field, 0))
+                slot = second % value.window_seconds
+                if second > value._slot_seconds[slot]:
+                    value._slot_seconds[slot] = second
+                    value._slot_counts[slot] = int(number)
+    else:
+        value = fields.get("value", 0.0)
+    return value
+
+
+class _Shard:
+    """Metric families and history written by one thread"""
+
+    __slots__ = ("families", "time_series")
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+        self.time_series: Dict[str, TimeSeriesBuffer] = {}
+
+
+class _ThreadToken:
+    """Held only by a thread's local storage, so it is collected when the thread exits"""
+
+    __slots__ = ("__weakref__",)
 
 
 class MetricsCollector:
     """
     Comprehensive metrics collection system
+
+    Every thread records into its own shard of metric families, so the
+    recording path takes no lock and never races the collection thread.
+    Shards are merged when metrics are read, and the shards of exited
+    threads are folded into one retired shard. The series cap of a metric
+    is shared by all of its shards. With METRICS_MULTIPROC_DIR
+    set, each worker process also flushes its merged samples to an mmap
+    file there, and reads aggregate the files of all workers.
     """
 
-    def __init__(self, service_name: str = "autoadmin-backend"):
+    def __init__(self, service_name: str = "autoadmin-backend", multiprocess_dir: Optional[str] = None):
         self.service_name = service_name
-        self.metrics: Dict[str, Any] = {}
         self.definitions: Dict[str, MetricDefinition] = {}
         self.collector_thread = None
         self.running = False
         self.collection_interval = 15  # seconds
         self.retention_hours = 24
 
-        # Time series storage (in production, use Prometheus or similar)
-        self.time_series: Dict[str, deque] = defaultdict(lambda: deque(maxlen=10000))
+        # Per-thread shards of labeled series and their time series history
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired: Optional[_Shard] = None  # Series of exited threads
+        self._exited: List[_Shard] = []  # Shards of exited threads not folded in yet
+        self._label_sets: Dict[str, LabelSets] = {}  # Admitted label sets per metric, across shards
+        self._lock = threading.Lock()  # Guards shard and definition registration
+        self._merged: Dict[str, MetricFamily] = {}  # Reused families for merged exposition
+
+        # Multiprocess mode: samples are flushed to a per-process mmap file
+        self.multiprocess_dir = multiprocess_dir or _multiprocess.multiprocess_dir()
+        self.flush_interval = float(os.getenv("METRICS_MULTIPROC_FLUSH_SECONDS", 1.0))
+        self._pid = os.getpid()
+        self._mmap_file: Optional[_multiprocess.MmapMetricsFile] = None
+        self._flusher: Optional[threading.Thread] = None
+        if self.multiprocess_dir:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
 
         # System metrics
         self.system_metrics_enabled = True
         self.process = psutil.Process()
 
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Value of each metric across all label sets, threads and (in multiprocess mode) workers"""
+        rollups = {}
+        families = self._collect_families()
+        for name, definition in list(self.definitions.items()):
+            total, total_time = _new_rollup(definition.metric_type), 0.0
+            family = families.get(name)
+            if family is not None:
+                for series in list(family.series.values()):
+                    total, total_time = _merge_value(
+                        definition.metric_type, total, total_time, series.value, series.last_updated
+                    )
+            rollups[name] = total
+        return rollups
+
+    def get_time_series(self, key: str) -> List[MetricValue]:
+        """Recorded points of one series key from every thread, oldest first"""
+        points: List[MetricValue] = []
+        for shard in list(self._shards):
+            history = shard.time_series.get(key)
+            if history is not None:
+                points.extend(history)
+        points.sort(key=lambda point: point.timestamp)
+        return points
+
     def register_metric(self, definition: MetricDefinition):
         """Register a new metric definition"""
-        self.definitions[definition.name] = definition
-
-        if definition.metric_type == MetricType.COUNTER:
-            self.metrics[definition.name] = 0.0
-        elif definition.metric_type == MetricType.GAUGE:
-            self.metrics[definition.name] = 0.0
-        elif definition.metric_type == MetricType.HISTOGRAM:
-            self.metrics[definition.name] = Histogram()
-        elif definition.metric_type == MetricType.TIMER:
-            self.metrics[definition.name] = Histogram()
-        elif definition.metric_type == MetricType.METER:
-            self.metrics[definition.name] = Meter()
+        with self._lock:
+            self.definitions[definition.name] = definition
+            # Series recorded under a previous definition start over
+            for shard in self._shards:
+                shard.families.pop(definition.name, None)
+            self._merged.pop(definition.name, None)
+            self._label_sets.pop(definition.name, None)
+
+    def _series(self, name: str, labels: Optional[Dict[str, str]]) -> Optional[MetricSeries]:
+        """This thread's series for a label set, or None if the metric is not registered"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._attach_shard()
+        family = shard.families.get(name)
+        if family is None:
+            definition = self.definitions.get(name)
+            if definition is None:
+                return None
+            family = shard.families[name] = self._new_family(definition, shard)
+        return family.labels(labels)
+
+    def _new_family(self, definition: MetricDefinition, shard: _Shard) -> MetricFamily:
+        """A shard's family of a metric, sharing the metric's admitted label sets"""
+        with self._lock:
+            label_sets = self._label_sets.get(definition.name)
+            if label_sets is None:
+                label_sets = self._label_sets[definition.name] = LabelSets(
+                    definition.max_series or DEFAULT_MAX_SERIES
+                )
+        return MetricFamily(definition, shard.time_series, label_sets=label_sets)
+
+    def _attach_shard(self) -> _Shard:
+        shard = self._local.shard = _Shard()
+        # Runs when the thread exits and its local storage is released
+        token = self._local.token = _ThreadToken()
+        weakref.finalize(token, self._exited.append, shard)
+        with self._lock:
+            self._shards.append(shard)
+            if self.multiprocess_dir and self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+                self._flusher.start()
+        return shard
 
     def increment(self, name: str, value: float = 1.0, labels: Dict[str, str] = None):
         """Increment a counter metric"""
-        if name not in self.metrics:
+        series = self._series(name, labels)
+        if series is None:
             # Auto-register as counter if not exists
             self.register_metric(MetricDefinition(
                 name=name,
@@ -175,19 +810,20 @@ class MetricsCollector:
                 unit=MetricUnit.COUNT,
                 labels=list(labels.keys()) if labels else []
             ))
+            series = self._series(name, labels)
 
-        metric = self.metrics[name]
-        if isinstance(metric, (float, int)):
-            self.metrics[name] += value
-        elif hasattr(metric, 'mark'):  # Meter
-            metric.mark(int(value))
+        if isinstance(series.value, float):
+            series.value += value
+        elif isinstance(series.value, Meter):
+            series.value.mark(int(value))
 
         # Record time series
-        self._record_time_series(name, value, labels)
+        series.history.append(time.time(), value)
 
     def gauge(self, name: str, value: float, labels: Dict[str, str] = None):
         """Set a gauge metric value"""
-        if name not in self.metrics:
+        series = self._series(name, labels)
+        if series is None:
             self.register_metric(MetricDefinition(
                 name=name,
                 description=f"Auto-registered gauge: {name}",
@@ -195,13 +831,16 @@ class MetricsCollector:
                 unit=MetricUnit.COUNT,
                 labels=list(labels.keys()) if labels else []
             ))
+            series = self._series(name, labels)
 
-        self.metrics[name] = value
-        self._record_time_series(name, value, labels)
+        if self.definitions[name].metric_type == MetricType.GAUGE:
+            series.value = float(value)
+        series.history.append(time.time(), value)
 
     def histogram(self, name: str, value: float, labels: Dict[str, str] = None):
         """Record a histogram value"""
-        if name not in self.metrics:
+        series = self._series(name, labels)
+        if series is None:
             self.register_metric(MetricDefinition(
                 name=name,
                 description=f"Auto-registered histogram: {name}",
@@ -209,12 +848,12 @@ class MetricsCollector:
                 unit=MetricUnit.MILLISECONDS,
                 labels=list(labels.keys()) if labels else []
             ))
+            series = self._series(name, labels)
 
-        metric = self.metrics[name]
-        if hasattr(metric, 'observe'):  # Histogram or Timer
-            metric.observe(value)
+        if isinstance(series.value, Histogram):  # Histogram or Timer
+            series.value.observe(value)
 
-        self._record_time_series(name, value, labels)
+        series.history.append(time.time(), value)
 
     def timer(self, name: str, duration_ms: float, labels: Dict[str, str] = None):
         """Record a timer value"""
@@ -222,7 +861,8 @@ class MetricsCollector:
 
     def meter(self, name: str, count: int = 1, labels: Dict[str, str] = None):
         """Mark a meter event"""
-        if name not in self.metrics:
+        series = self._series(name, labels)
+        if series is None:
             self.register_metric(MetricDefinition(
                 name=name,
                 description=f"Auto-registered meter: {name}",
@@ -230,25 +870,12 @@ class MetricsCollector:
                 unit=MetricUnit.REQUESTS_PER_SECOND,
                 labels=list(labels.keys()) if labels else []
             ))
+            series = self._series(name, labels)
 
-        metric = self.metrics[name]
-        if hasattr(metric, 'mark'):  # Meter
-            metric.mark(count)
-
-        self._record_time_series(name, count, labels)
-
-    def _record_time_series(self, name: str, value: float, labels: Dict[str, str] = None):
-        """Record a time series data point"""
-        timestamp = datetime.utcnow()
-        metric_value = MetricValue(
-            timestamp=timestamp,
-            value=value,
-            labels=labels or {}
-        )
+        if isinstance(series.value, Meter):
+            series.value.mark(count)
 
-        # Store in time series
-        key = f"{name}:{json.dumps(labels or {}, sort_keys=True)}"
-        self.time_series[key].append(metric_value)
+        series.history.append(time.time(), count)
 
     @asynccontextmanager
     async def timer_context(self, name: str, labels: Dict[str, str] = None):
@@ -300,18 +927,20 @@ class MetricsCollector:
     def collect_application_metrics(self):
         """Collect application-specific metrics"""
         try:
+            metrics = self.metrics
+
             # Agent metrics
-            active_agents = len([a for a in self.metrics.get('agents', {}).values() if a.get('status') == 'active'])
-            total_agents = len(self.metrics.get('agents', {}))
+            active_agents = len([a for a in metrics.get('agents', {}).values() if a.get('status') == 'active'])
+            total_agents = len(metrics.get('agents', {}))
 
             self.gauge("agents_active_count", active_agents)
             self.gauge("agents_total_count", total_agents)
 
             # Task metrics
-            tasks_pending = self.metrics.get('tasks_pending', 0)
-            tasks_running = self.metrics.get('tasks_running', 0)
-            tasks_completed = self.metrics.get('tasks_completed_total', 0)
-            tasks_failed = self.metrics.get('tasks_failed_total', 0)
+            tasks_pending = metrics.get('tasks_pending', 0)
+            tasks_running = metrics.get('tasks_running', 0)
+            tasks_completed = metrics.get('tasks_completed_total', 0)
+            tasks_failed = metrics.get('tasks_failed_total', 0)
 
             self.gauge("tasks_pending_count", tasks_pending)
             self.gauge("tasks_running_count", tasks_running)
@@ -319,9 +948,9 @@ class MetricsCollector:
             self.gauge("tasks_failed_total", tasks_failed)
 
             # Request metrics
-            requests_total = self.metrics.get('http_requests_total', 0)
-            requests_success = self.metrics.get('http_requests_success_total', 0)
-            requests_error = self.metrics.get('http_requests_error_total', 0)
+            requests_total = metrics.get('http_requests_total', 0)
+            requests_success = metrics.get('http_requests_success_total', 0)
+            requests_error = metrics.get('http_requests_error_total', 0)
 
             self.gauge("http_requests_total", requests_total)
             self.gauge("http_requests_success_total", requests_success)
@@ -394,6 +1023,227 @@ class MetricsCollector:
 
         return metrics_for_export
 
+    def iter_exposition(self, openmetrics: bool = False) -> Iterator[str]:
+        """
+        Render every labeled series in Prometheus text format (0.0.4), or
+        OpenMetrics 1.0 when openmetrics is set, one metric at a time
+        """
+        for family in self._collect_families().values():
+            if family.series:
+                yield family.render(openmetrics)
+        if openmetrics:
+            yield "# EOF\n"
+
+    def get_cardinality(self) -> Dict[str, Dict[str, int]]:
+        """Admitted label sets, cap and overflowed label set lookups per metric"""
+        cardinality = {}
+        for shard in list(self._shards):
+            for name, family in list(shard.families.items()):
+                entry = cardinality.setdefault(name, {
+                    "series": len(family.label_sets), "max_series": family.label_sets.max_series, "overflowed": 0
+                })
+                entry["overflowed"] += family.overflowed
+        return cardinality
+
+    def mark_process_dead(self, pid: int):
+        """Retire an exited worker's samples into the dead file (multiprocess mode)"""
+        _multiprocess.mark_process_dead(pid, self.multiprocess_dir)
+
+    def _collect_families(self) -> Dict[str, MetricFamily]:
+        """
+        One family per metric with every thread's series merged in, plus
+        other workers' in multiprocess mode; a metric written by a single
+        thread of a single process is returned as is
+        """
+        self._fold_exited_shards()
+        shard_families: Dict[str, List[MetricFamily]] = {}
+        for shard in list(self._shards):
+            for name, family in list(shard.families.items()):
+                shard_families.setdefault(name, []).append(family)
+
+        worker_series: Dict[str, Dict[Tuple, List[Tuple[Any, float]]]] = {}
+        if self.multiprocess_dir:
+            worker_series = self._read_worker_files()
+
+        families = {}
+        for name, definition in list(self.definitions.items()):
+            local = shard_families.get(name, [])
+            remote = worker_series.get(name)
+            if len(local) == 1 and not remote:
+                families[name] = local[0]
+            elif local or remote:
+                families[name] = self._merge_families(definition, local, remote or {})
+        return families
+
+    def _merge_families(
+        self,
+        definition: MetricDefinition,
+        local: List[MetricFamily],
+        remote: Dict[Tuple, List[Tuple[Any, float]]]
+    ) -> MetricFamily:
+        """
+        Sum series with the same labels into a family reused across reads;
+        label sets past the metric's cap, e.g. from other workers, are
+        added to the overflow series
+        """
+        totals = self._merge_series(definition, local, remote)
+        with self._lock:
+            merged = self._merged.get(definition.name)
+            if merged is None or merged.definition is not definition:
+                merged = self._merged[definition.name] = MetricFamily(definition, {})
+        merged.retain(set(totals))
+
+        assigned: Dict[int, Tuple[Any, float]] = {}
+        for key, (value, timestamp) in totals.items():
+            series = merged.series_for_key(key)
+            if id(series) in assigned:
+                total, total_time = assigned[id(series)]
+                value, timestamp = _merge_value(definition.metric_type, total, total_time, value, timestamp)
+            assigned[id(series)] = (value, timestamp)
+            series.value = value
+            series.updated = timestamp
+        merged.retain({key for key, series in merged.series.items() if id(series) in assigned})
+        return merged
+
+    @staticmethod
+    def _merge_series(
+        definition: MetricDefinition,
+        local: List[MetricFamily],
+        remote: Dict[Tuple, List[Tuple[Any, float]]]
+    ) -> Dict[Tuple, Tuple[Any, float]]:
+        """(value, last update) per sorted label items, across families and worker files"""
+        metric_type = definition.metric_type
+        totals: Dict[Tuple, Tuple[Any, float]] = {}
+        sources = [
+            (key, series.value, series.last_updated)
+            for family in local for key, series in list(family.series.items())
+        ]
+        sources.extend((key, value, timestamp) for key, values in remote.items() for value, timestamp in values)
+        for key, value, timestamp in sources:
+            total, total_time = totals.get(key) or (_new_rollup(metric_type), 0.0)
+            totals[key] = _merge_value(metric_type, total, total_time, value, timestamp)
+        return totals
+
+    def _read_worker_files(self) -> Dict[str, Dict[Tuple, List[Tuple[Any, float]]]]:
+        """Series values of the other workers, by metric name and sorted label items"""
+        result: Dict[str, Dict[Tuple, List[Tuple[Any, float]]]] = {}
+        for path in _multiprocess.iter_worker_files(self.multiprocess_dir, exclude_pid=os.getpid()):
+            fields: Dict[Tuple[str, str, Tuple], Dict[str, float]] = {}
+            times: Dict[Tuple[str, str, Tuple], Dict[str, float]] = {}
+            updated: Dict[Tuple[str, str, Tuple], float] = {}
+            for key, number, timestamp in _multiprocess.read_metrics_file(path):
+                prefix, _, field = key.rpartition("|")
+                try:
+                    name, metric_type, labels = json.loads(prefix)
+                except ValueError:
+                    continue
+                series_key = (name, metric_type, tuple(tuple(item) for item in labels))
+                fields.setdefault(series_key, {})[field] = number
+                times.setdefault(series_key, {})[field] = timestamp
+                updated[series_key] = max(updated.get(series_key, 0.0), timestamp)
+
+            for (name, metric_type, labels), series_fields in fields.items():
+                definition = self.definitions.get(name)
+                if definition is None:
+                    # Registered only in another worker
+                    definition = MetricDefinition(
+                        name=name,
+                        description=f"Auto-registered {metric_type}: {name}",
+                        metric_type=MetricType(metric_type),
+                        unit=MetricUnit.COUNT,
+                        labels=[label for label, _ in labels]
+                    )
+                    self.register_metric(definition)
+                value = _value_from_fields(definition.metric_type, series_fields, times[(name, metric_type, labels)])
+                result.setdefault(name, {}).setdefault(labels, []).append((value, updated[(name, metric_type, labels)]))
+        return result
+
+    def flush_to_file(self):
+        """Write this process's merged series to its multiprocess file"""
+        if not self.multiprocess_dir:
+            return
+        if self._mmap_file is None:
+            self._mmap_file = _multiprocess.MmapMetricsFile(
+                _multiprocess.process_file_path(self.multiprocess_dir, os.getpid())
+            )
+
+        now = time.time()
+        self._fold_exited_shards()
+        shard_families: Dict[str, List[MetricFamily]] = {}
+        for shard in list(self._shards):
+            for name, family in list(shard.families.items()):
+                shard_families.setdefault(name, []).append(family)
+
+        for name, local in shard_families.items():
+            definition = self.definitions.get(name)
+            if definition is None:
+                continue
+            for key, (value, updated) in self._merge_series(definition, local, {}).items():
+                prefix = json.dumps([name, definition.metric_type.value, key])
+                timestamp = updated if definition.metric_type == MetricType.GAUGE else now
+                for field, number, field_time in _series_fields(value):
+                    self._mmap_file.write(f"{prefix}|{field}", number, timestamp if field_time is None else field_time)
+
+    def _fold_exited_shards(self):
+        """
+        Fold the shards of exited threads into the retired shard, swapping
+        in a new shard list so concurrent readers see each series once
+        """
+        if not self._exited:
+            return
+        with self._lock:
+            exited = []
+            while self._exited:
+                exited.append(self._exited.pop())
+            sources = [self._retired] if self._retired is not None else []
+            sources.extend(exited)
+            retired = _Shard()
+            for shard in sources:
+                for name, family in list(shard.families.items()):
+                    definition = self.definitions.get(name)
+                    if definition is None or family.definition is not definition:
+                        continue
+                    target = retired.families.get(name)
+                    if target is None:
+                        label_sets = self._label_sets.setdefault(
+                            name, LabelSets(definition.max_series or DEFAULT_MAX_SERIES)
+                        )
+                        target = retired.families[name] = MetricFamily(
+                            definition, retired.time_series, label_sets=label_sets
+                        )
+                    target.overflowed += family.overflowed
+                    for key, series in list(family.series.items()):
+                        folded = target.series_for_key(key)
+                        folded.value, folded.updated = _merge_value(
+                            definition.metric_type, folded.value, folded.updated, series.value, series.last_updated
+                        )
+                        folded.history.extend(series.history)
+            removed = set(map(id, sources))
+            self._shards = [shard for shard in self._shards if id(shard) not in removed] + [retired]
+            self._retired = retired
+
+    def _flush_loop(self):
+        """Flush to the multiprocess file every flush_interval seconds"""
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush_to_file()
+            except Exception as e:
+                print(f"Error flushing multiprocess metrics: {e}")
+
+    def _after_fork(self):
+        """A forked worker starts with empty shards and its own file"""
+        self._local = threading.local()
+        self._shards = []
+        self._retired = None
+        self._exited = []
+        self._label_sets = {}
+        self._lock = threading.Lock()
+        self._merged = {}
+        self._mmap_file = None
+        self._flusher = None
+        self._pid = os.getpid()
+
     def start_collection(self):
         """Start background metrics collection"""
         if self.running:
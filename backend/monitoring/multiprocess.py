@@ -0,0 +1,230 @@
+"""
+Shared-memory metric files for multi-worker deployments
+Each worker process writes its current metric samples to its own mmap
+file in METRICS_MULTIPROC_DIR; whichever worker serves a scrape reads
+every file and aggregates them, so gunicorn/uvicorn workers report one
+combined view instead of each worker's partial one.
+
+Under gunicorn, gunicorn.conf.py retires the file of each exited worker.
+Other servers (uvicorn --workers) have no such hook, so readers also
+retire the files of processes that no longer exist. Retiring folds the
+worker's counter, histogram and meter samples into a shared "dead" file,
+so totals never go backwards when a worker restarts; gauges are dropped.
+"""
+
+import glob
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_HEADER = struct.Struct("<I4x")  # Bytes used, including the header
+_KEY_LENGTH = struct.Struct("<I")
+_SAMPLE = struct.Struct("<dd")  # value, timestamp
+
+DEFAULT_FILE_SIZE = 1024 * 1024
+
+
+def multiprocess_dir() -> Optional[str]:
+    """Directory shared by the workers, when multiprocess mode is on"""
+    return os.getenv("METRICS_MULTIPROC_DIR") or None
+
+
+def process_file_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics_{pid}.db")
+
+
+def dead_file_path(directory: str) -> str:
+    """File holding the accumulated samples of exited workers"""
+    return os.path.join(directory, "metrics_dead.db")
+
+
+class MmapMetricsFile:
+    """
+    Append-only key table of (value, timestamp) samples in an mmap file
+
+    Entries are a length-prefixed UTF-8 key padded to 8 bytes followed by
+    two doubles. A key is appended once; later writes overwrite its
+    doubles in place. The file doubles in size when full.
+    """
+
+    def __init__(self, path: str, initial_size: int = DEFAULT_FILE_SIZE):
+        self.path = path
+        self._positions: Dict[str, int] = {}  # key -> offset of its doubles
+
+        self._file = open(path, "a+b")
+        size = max(os.fstat(self._file.fileno()).st_size, initial_size)
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        for key, _, _, position in _iter_entries(self._mmap, self._used):
+            self._positions[key] = position
+        _HEADER.pack_into(self._mmap, 0, self._used)
+
+    def write(self, key: str, value: float, timestamp: float):
+        """Set the sample for a key"""
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        _SAMPLE.pack_into(self._mmap, position, value, timestamp)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        padded = (_KEY_LENGTH.size + len(encoded) + 7) // 8 * 8
+        entry_size = padded + _SAMPLE.size
+        while self._used + entry_size > len(self._mmap):
+            self._mmap.resize(2 * len(self._mmap))
+
+        _KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        self._mmap[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(encoded)] = encoded
+        position = self._used + padded
+        _SAMPLE.pack_into(self._mmap, position, 0.0, 0.0)
+        # Publish the entry only once it is complete
+        self._used += entry_size
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = position
+        return position
+
+
+def _iter_entries(data, used: int) -> Iterator[Tuple[str, float, float, int]]:
+    """(key, value, timestamp, value offset) for each complete entry"""
+    offset = _HEADER.size
+    while offset + _KEY_LENGTH.size <= used:
+        length = _KEY_LENGTH.unpack_from(data, offset)[0]
+        padded = (_KEY_LENGTH.size + length + 7) // 8 * 8
+        if offset + padded + _SAMPLE.size > used:
+            break
+        key = bytes(data[offset + _KEY_LENGTH.size:offset + _KEY_LENGTH.size + length]).decode("utf-8")
+        value, timestamp = _SAMPLE.unpack_from(data, offset + padded)
+        yield key, value, timestamp, offset + padded
+        offset += padded + _SAMPLE.size
+
+
+def read_metrics_file(path: str) -> Iterator[Tuple[str, float, float]]:
+    """(key, value, timestamp) samples of a worker's file"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return
+    if len(data) < _HEADER.size:
+        return
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    for key, value, timestamp, _ in _iter_entries(data, used):
+        yield key, value, timestamp
+
+
+def iter_worker_files(directory: str, exclude_pid: Optional[int] = None) -> Iterator[str]:
+    """
+    Metric files of every live worker plus the dead file, optionally
+    skipping one process
+
+    Files of exited workers are retired before the directory is listed,
+    so their samples are read from the dead file even when this call is
+    the one that creates it.
+    """
+    pattern = os.path.join(directory, "metrics_*.db")
+    for path in glob.glob(pattern):
+        pid = os.path.basename(path)[len("metrics_"):-len(".db")]
+        if pid.isdigit() and int(pid) != exclude_pid and not _process_alive(int(pid)):
+            mark_process_dead(int(pid), directory)
+
+    excluded = process_file_path(directory, exclude_pid) if exclude_pid is not None else None
+    for path in sorted(glob.glob(pattern)):
+        if path != excluded:
+            yield path
+
+
+def _process_alive(pid: int) -> bool:
+    """Whether a process exists; always True where it cannot be checked safely"""
+    if os.name != "posix":
+        return True  # os.kill(pid, 0) terminates the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = None):
+    """
+    Retire the file of a worker that has exited, as gunicorn.conf.py does
+    from gunicorn's child_exit hook: its cumulative samples are added to
+    the dead file and its gauges are dropped
+    """
+    directory = directory or multiprocess_dir()
+    if not directory:
+        return
+    path = process_file_path(directory, pid)
+
+    with open(os.path.join(directory, "metrics_dead.lock"), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            return  # Already retired by another process
+
+        samples = list(read_metrics_file(path))
+        if samples:
+            dead = MmapMetricsFile(dead_file_path(directory))
+            try:
+                current = {key: (value, timestamp) for key, value, timestamp in read_metrics_file(dead.path)}
+                for key, value, timestamp in samples:
+                    if _is_gauge(key):
+                        continue
+                    total, total_time = current.get(key, (None, 0.0))
+                    dead.write(key, *_fold_field(key, total, total_time, value, timestamp))
+            finally:
+                dead.close()
+        os.remove(path)
+
+
+def _is_gauge(key: str) -> bool:
+    """Whether a sample key belongs to a gauge series"""
+    try:
+        return json.loads(key.rpartition("|")[0])[1] == "gauge"
+    except (ValueError, IndexError, TypeError):
+        return False
+
+
+def _fold_field(
+    key: str, total: Optional[float], total_time: float, value: float, timestamp: float
+) -> Tuple[float, float]:
+    """
+    Combine a retired sample with the dead file's: extremes keep the
+    extreme, meter slots keep the newer second (adding up within the same
+    second), the rest add up
+    """
+    if total is None:
+        return value, timestamp
+    field = key.rpartition("|")[2]
+    if field.startswith("slot:"):
+        if timestamp == total_time:
+            return total + value, timestamp
+        return (value, timestamp) if timestamp > total_time else (total, total_time)
+    if field == "min":
+        return min(total, value), max(total_time, timestamp)
+    if field == "max":
+        return max(total, value), max(total_time, timestamp)
+    return total + value, max(total_time, timestamp)
+
+
+__all__ = [
+    "MmapMetricsFile",
+    "dead_file_path",
+    "iter_worker_files",
+    "mark_process_dead",
+    "multiprocess_dir",
+    "read_metrics_file"
+]
@@ -20,6 +20,8 @@ from fastapi.applications import FastAPI
 from fastapi.app.services.http_streaming import get_streaming_service, EventType
 from fastapi.app.services.long_polling import get_long_polling_service
 
+from .task_archive import SegmentLogArchive, TieredTaskStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,7 +54,7 @@ class MessageType(Enum):
     COLLABORATION = "collaboration"
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentTask:
     """Task definition for agents"""
     task_id: str
@@ -95,6 +97,16 @@ class AgentTask:
             "retry_count": self.retry_count
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentTask":
+        """Rebuild a task from to_dict output"""
+        data = dict(data)
+        data["priority"] = TaskPriority(data["priority"])
+        for key in ("created_at", "started_at", "completed_at"):
+            if data.get(key):
+                data[key] = datetime.fromisoformat(data[key])
+        return cls(**data)
+
 
 @dataclass
 class AgentMessage:
@@ -168,7 +180,9 @@ class HTTPAgentOrchestrator:
 
     _instance = None
     _agents: Dict[str, AgentInfo] = {}
-    _tasks: Dict[str, AgentTask] = {}
+    _tasks: TieredTaskStore = TieredTaskStore(  # Finished tasks spill to disk
+        AgentTask.to_dict, AgentTask.from_dict, SegmentLogArchive('orchestrator')
+    )
     _message_handlers: Dict[str, Callable] = {}
     _task_handlers: Dict[str, Callable] = {}
     _heartbeat_interval = 30  # 30 seconds
@@ -540,6 +554,7 @@ class HTTPAgentOrchestrator:
 
                 # Check for dependent tasks
                 await self._check_dependent_tasks(task_id, user_id=user_id)
+                self._tasks.finish(task_id, "completed")
 
                 logger.info(f"Task {task_id} completed successfully")
                 return True
@@ -614,6 +629,9 @@ class HTTPAgentOrchestrator:
                     }
                 )
 
+                if task.status == "failed":
+                    self._tasks.finish(task_id, "failed")
+
                 logger.error(f"Task {task_id} failed: {error}")
                 return True
 
@@ -732,8 +750,9 @@ class HTTPAgentOrchestrator:
             "total_agents": len(self._agents),
             "total_tasks": len(self._tasks),
             "pending_tasks": len(self.get_pending_tasks()),
-            "completed_tasks": len([t for t in self._tasks.values() if t.status == "completed"]),
-            "failed_tasks": len([t for t in self._tasks.values() if t.status == "failed"]),
+            "completed_tasks": self._tasks.finished_count("completed"),
+            "failed_tasks": self._tasks.finished_count("failed"),
+            "task_store": self._tasks.get_metrics(),
             "total_load": total_load,
             "max_capacity": max_capacity,
             "utilization": (total_load / max_capacity * 100) if max_capacity > 0 else 0,
@@ -910,30 +929,20 @@ class HTTPAgentOrchestrator:
                 await asyncio.sleep(60)
 
     async def _cleanup_monitor(self):
-        """Clean up old completed tasks"""
+        """Move finished tasks to the archive and prune expired archive segments"""
         while True:
             try:
-                current_time = datetime.utcnow()
-                cutoff_time = current_time - timedelta(hours=24)  # Keep 24 hours
-
-                tasks_to_remove = [
-                    task_id for task_id, task in self._tasks.items()
-                    if (task.status in ["completed", "failed"] and
-                        task.completed_at and task.completed_at < cutoff_time)
-                ]
+                spilled = self._tasks.spill_expired()
+                pruned = self._tasks.prune()
 
-                for task_id in tasks_to_remove:
-                    del self._tasks[task_id]
+                if spilled or pruned:
+                    logger.info(f"Archived {spilled} finished tasks, pruned {pruned} old tasks")
 
-                if tasks_to_remove:
-                    logger.info(f"Cleaned up {len(tasks_to_remove)} old tasks")
-
-                await asyncio.sleep(3600)  # Run every hour
+                await asyncio.sleep(300)  # Run every 5 minutes
 
             except Exception as e:
                 logger.error(f"Error in cleanup monitor: {e}")
-                await asyncio.sleep(3600)
-
+                await asyncio.sleep(300)
 
 # Create singleton instance
 agent_orchestrator = HTTPAgentOrchestrator()
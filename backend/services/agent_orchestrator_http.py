@@ -5,11 +5,12 @@ Provides reliable real-time agent coordination using standard HTTP protocols
 """
 
 import asyncio
+import heapq
 import json
 import uuid
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable, Union
+from typing import Dict, List, Optional, Any, Callable, Union, Iterable, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -30,6 +31,9 @@ from ..services.http_polling import (
 # Import existing streaming for backward compatibility
 from backend.fastapi.app.services.http_streaming import get_streaming_service, EventType
 
+from .task_dag import TaskDAG
+from .task_archive import SegmentLogArchive, TieredTaskStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,6 +55,15 @@ class TaskPriority(Enum):
     URGENT = "urgent"
 
 
+# Ready queue order: lower rank is assigned first
+TASK_PRIORITY_RANK = {
+    TaskPriority.URGENT: 0,
+    TaskPriority.HIGH: 1,
+    TaskPriority.MEDIUM: 2,
+    TaskPriority.LOW: 3
+}
+
+
 class MessageType(Enum):
     """Message types for agent communication"""
     TASK_REQUEST = "task_request"
@@ -62,7 +75,7 @@ class MessageType(Enum):
     COLLABORATION = "collaboration"
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentTask:
     """Task definition for agents"""
     task_id: str
@@ -107,6 +120,16 @@ class AgentTask:
             "polling_session_id": self.polling_session_id
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentTask":
+        """Rebuild a task from to_dict output"""
+        data = dict(data)
+        data["priority"] = TaskPriority(data["priority"])
+        for key in ("created_at", "started_at", "completed_at"):
+            if data.get(key):
+                data[key] = datetime.fromisoformat(data[key])
+        return cls(**data)
+
 
 @dataclass
 class AgentMessage:
@@ -198,7 +221,9 @@ class HTTPAgentOrchestrator:
 
     _instance = None
     _agents: Dict[str, AgentInfo] = {}
-    _tasks: Dict[str, AgentTask] = {}
+    _tasks: TieredTaskStore = TieredTaskStore(  # Finished tasks spill to disk
+        AgentTask.to_dict, AgentTask.from_dict, SegmentLogArchive('http_orchestrator')
+    )
     _message_handlers: Dict[str, Callable] = {}
     _task_handlers: Dict[str, Callable] = {}
     _heartbeat_interval = 30  # 30 seconds
@@ -206,6 +231,11 @@ class HTTPAgentOrchestrator:
     _max_pending_tasks = 1000
     _background_tasks: List[asyncio.Task] = []
     _agent_sessions: Dict[str, str] = {}  # agent_id -> session_id mapping
+    _task_dag: TaskDAG = TaskDAG()  # Dependencies and ready queues
+    _task_context: Dict[str, Tuple[Optional[str], EventPriority]] = {}  # task_id -> (user_id, event priority)
+    _agent_heap: List[Tuple[int, int, str]] = []  # (current_load, seq, agent_id) of available agents
+    _agent_heap_entries: Dict[str, Tuple[int, int]] = {}  # agent_id -> live (current_load, seq) entry
+    _agent_heap_seq = 0
 
     def __new__(cls):
         if cls._instance is None:
@@ -218,6 +248,7 @@ class HTTPAgentOrchestrator:
             self._initialized = True
             self._polling_service = get_http_polling_service()
             self._streaming_service = get_streaming_service()  # For backward compatibility
+            self._tasks.on_spill = self._task_dag.remove
             self._start_background_tasks()
 
     def _start_background_tasks(self):
@@ -312,6 +343,7 @@ class HTTPAgentOrchestrator:
             )
 
             self._agents[agent_id] = agent_info
+            self._touch_agent(agent_id)
 
             # Notify about agent registration via both services
             await self._send_agent_registered_event(agent_info)
@@ -356,6 +388,7 @@ class HTTPAgentOrchestrator:
 
                 # Remove agent
                 self._agents.pop(agent_id)
+                self._agent_heap_entries.pop(agent_id, None)
 
                 # Notify about agent unregistration
                 await self._send_agent_unregistered_event(agent_info)
@@ -411,6 +444,10 @@ class HTTPAgentOrchestrator:
                     if connection_status == ConnectionStatus.CONNECTED:
                         agent_info.last_successful_connection = datetime.utcnow()
 
+                # The agent may have become available for ready tasks
+                self._touch_agent(agent_id)
+                await self._dispatch_ready([agent_id])
+
                 # Broadcast status update via both services
                 await self._send_agent_status_update_event(agent_info)
 
@@ -450,6 +487,9 @@ class HTTPAgentOrchestrator:
 
         Returns:
             str: Task ID
+
+        Raises:
+            ValueError: If a dependency is unknown or failed
         """
         task_id = str(uuid.uuid4())
 
@@ -464,14 +504,77 @@ class HTTPAgentOrchestrator:
             timeout=timeout
         )
 
+        self._task_dag.add(
+            task_id, self._pending_dependencies(task.dependencies), TASK_PRIORITY_RANK[priority], lane=assigned_to
+        )
         self._tasks[task_id] = task
+        self._task_context[task_id] = (user_id, http_polling_priority)
 
         # Try to assign task
-        await self._assign_task(task_id, user_id=user_id, priority=http_polling_priority)
+        await self._dispatch_ready([assigned_to] if assigned_to else None)
 
         logger.info(f"Created task {task_id} of type {task_type}")
         return task_id
 
+    async def create_tasks(
+        self,
+        tasks: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        http_polling_priority: EventPriority = EventPriority.MEDIUM
+    ) -> List[str]:
+        """
+        Create a whole workflow of tasks at once
+
+        Args:
+            tasks: Task specs with the create_task arguments (task_type, data,
+                priority, assigned_to, created_by, dependencies, timeout) and
+                an optional "key"; dependencies may name existing task IDs or
+                keys of other specs in the same call
+            user_id: User ID for filtering
+            http_polling_priority: Priority for HTTP polling events
+
+        Returns:
+            List[str]: Task IDs, in the order of the specs
+
+        Raises:
+            ValueError: If the dependencies form a cycle or one is unknown or
+                failed; no task is created
+        """
+        task_ids = [str(uuid.uuid4()) for _ in tasks]
+        keys = {spec["key"]: task_id for spec, task_id in zip(tasks, task_ids, strict=True) if spec.get("key")}
+
+        new_tasks = []
+        for spec, task_id in zip(tasks, task_ids, strict=True):
+            new_tasks.append(AgentTask(
+                task_id=task_id,
+                task_type=spec["task_type"],
+                priority=spec.get("priority", TaskPriority.MEDIUM),
+                assigned_to=spec.get("assigned_to"),
+                created_by=spec.get("created_by"),
+                data=spec.get("data", {}),
+                dependencies=[keys.get(dep, dep) for dep in spec.get("dependencies") or []],
+                timeout=spec.get("timeout", 300)
+            ))
+
+        batch = set(task_ids)
+        self._task_dag.add_many([
+            (
+                task.task_id,
+                self._pending_dependencies(task.dependencies, batch),
+                TASK_PRIORITY_RANK[task.priority],
+                task.assigned_to
+            )
+            for task in new_tasks
+        ])
+        for task in new_tasks:
+            self._tasks[task.task_id] = task
+            self._task_context[task.task_id] = (user_id, http_polling_priority)
+
+        await self._dispatch_ready({task.assigned_to for task in new_tasks if task.assigned_to})
+
+        logger.info(f"Created {len(new_tasks)} workflow tasks")
+        return task_ids
+
     async def update_task_progress(
         self,
         task_id: str,
@@ -547,12 +650,15 @@ class HTTPAgentOrchestrator:
                     self._agents[agent_id].current_load -= 1
                     if task_id in self._agents[agent_id].current_tasks:
                         self._agents[agent_id].current_tasks.remove(task_id)
+                    self._touch_agent(agent_id)
+                self._task_context.pop(task_id, None)
 
                 # Broadcast task completion via both services
                 await self._send_task_completed_event(task, result, agent_id, priority)
 
                 # Check for dependent tasks
-                await self._check_dependent_tasks(task_id, user_id=user_id)
+                await self._check_dependent_tasks(task_id, user_id=user_id, agent_id=agent_id)
+                self._tasks.finish(task_id, "completed")
 
                 logger.info(f"Task {task_id} completed successfully")
                 return True
@@ -599,16 +705,25 @@ class HTTPAgentOrchestrator:
                 else:
                     task.status = "failed"
                     task.completed_at = datetime.utcnow()
+                    self._task_dag.fail(task_id)
+                    self._task_context.pop(task_id, None)
 
                 # Update agent load
                 if agent_id and agent_id in self._agents:
                     self._agents[agent_id].current_load -= 1
                     if task_id in self._agents[agent_id].current_tasks:
                         self._agents[agent_id].current_tasks.remove(task_id)
+                    self._touch_agent(agent_id)
 
                 # Broadcast task failure via both services
                 await self._send_task_failed_event(task, error, agent_id, priority)
 
+                # The freed slot can take a ready task
+                if agent_id:
+                    await self._dispatch_ready([agent_id])
+                if task.status == "failed":
+                    self._tasks.finish(task_id, "failed")
+
                 logger.error(f"Task {task_id} failed: {error}")
                 return True
 
@@ -781,8 +896,9 @@ class HTTPAgentOrchestrator:
             "total_agents": len(self._agents),
             "total_tasks": len(self._tasks),
             "pending_tasks": len(self.get_pending_tasks()),
-            "completed_tasks": len([t for t in self._tasks.values() if t.status == "completed"]),
-            "failed_tasks": len([t for t in self._tasks.values() if t.status == "failed"]),
+            "completed_tasks": self._tasks.finished_count("completed"),
+            "failed_tasks": self._tasks.finished_count("failed"),
+            "task_store": self._tasks.get_metrics(),
             "total_load": total_load,
             "max_capacity": max_capacity,
             "utilization": (total_load / max_capacity * 100) if max_capacity > 0 else 0,
@@ -791,7 +907,8 @@ class HTTPAgentOrchestrator:
             "http_polling_enabled_agents": len([a for a in self._agents.values() if a.http_polling_enabled]),
             "total_http_requests": sum(a.total_http_requests for a in self._agents.values()),
             "successful_http_requests": sum(a.successful_http_requests for a in self._agents.values()),
-            "polling_sessions": len(self._agent_sessions)
+            "polling_sessions": len(self._agent_sessions),
+            "scheduler": self._task_dag.get_metrics()
         }
 
     # Private helper methods for HTTP event broadcasting
@@ -989,6 +1106,7 @@ class HTTPAgentOrchestrator:
                         if agent.status != AgentStatus.OFFLINE:
                             agent.status = AgentStatus.OFFLINE
                             agent.connection_status = ConnectionStatus.TIMEOUT
+                            self._touch_agent(agent_id)
                             await self._reassign_agent_tasks(agent_id)
 
                 await asyncio.sleep(self._heartbeat_interval)
@@ -1022,29 +1140,20 @@ class HTTPAgentOrchestrator:
                 await asyncio.sleep(60)
 
     async def _cleanup_monitor(self):
-        """Clean up old completed tasks"""
+        """Move finished tasks to the archive and prune expired archive segments"""
         while True:
             try:
-                current_time = datetime.utcnow()
-                cutoff_time = current_time - timedelta(hours=24)  # Keep 24 hours
+                spilled = self._tasks.spill_expired()
+                pruned = self._tasks.prune()
 
-                tasks_to_remove = [
-                    task_id for task_id, task in self._tasks.items()
-                    if (task.status in ["completed", "failed"] and
-                        task.completed_at and task.completed_at < cutoff_time)
-                ]
+                if spilled or pruned:
+                    logger.info(f"Archived {spilled} finished tasks, pruned {pruned} old tasks")
 
-                for task_id in tasks_to_remove:
-                    del self._tasks[task_id]
-
-                if tasks_to_remove:
-                    logger.info(f"Cleaned up {len(tasks_to_remove)} old tasks")
-
-                await asyncio.sleep(3600)  # Run every hour
+                await asyncio.sleep(300)  # Run every 5 minutes
 
             except Exception as e:
                 logger.error(f"Error in cleanup monitor: {e}")
-                await asyncio.sleep(3600)
+                await asyncio.sleep(300)
 
     async def _connection_health_monitor(self):
         """Monitor HTTP connection health for all agents"""
@@ -1062,6 +1171,7 @@ class HTTPAgentOrchestrator:
 
                         if agent.connection_status == ConnectionStatus.CONNECTED:
                             agent.connection_status = ConnectionStatus.TIMEOUT
+                            self._touch_agent(agent_id)
                             logger.warning(f"Agent {agent_id} connection timeout")
 
                 await asyncio.sleep(60)  # Check every minute
@@ -1099,43 +1209,110 @@ class HTTPAgentOrchestrator:
     # Private helper methods (existing from original orchestrator)
 
     async def _assign_task(self, task_id: str, user_id: Optional[str] = None, priority: EventPriority = EventPriority.MEDIUM) -> bool:
-        """Assign a task to an available agent"""
+        """Queue a task whose dependencies are met and assign ready tasks to available agents"""
         try:
             task = self._tasks.get(task_id)
             if not task:
                 return False
 
-            # Check dependencies
-            if task.dependencies:
-                for dep_id in task.dependencies:
-                    if dep_id in self._tasks and self._tasks[dep_id].status != "completed":
-                        # Dependency not completed yet
-                        return False
-
-            # Find suitable agent
-            if task.assigned_to:
-                # Specific agent requested
-                agent = self._agents.get(task.assigned_to)
-                if agent and agent.current_load < agent.max_capacity:
-                    await self._execute_task(task_id, task.assigned_to, user_id=user_id, priority=priority)
-                    return True
-            else:
-                # Find best available agent
-                available_agents = self.get_available_agents()
-
-                # Sort by current load (least busy first)
-                available_agents.sort(key=lambda a: a.current_load)
-
-                for agent in available_agents:
-                    await self._execute_task(task_id, agent.agent_id, user_id=user_id, priority=priority)
-                    return True
+            self._task_context[task_id] = (user_id, priority)
 
-            return False
+            # Dependencies are tracked by the DAG; this fails while any is unmet
+            self._task_dag.set_lane(task_id, task.assigned_to)
+            if not self._task_dag.mark_ready(task_id):
+                return False
+
+            await self._dispatch_ready([task.assigned_to] if task.assigned_to else None)
+            return task.status == "running"
 
         except Exception as e:
             logger.error(f"Failed to assign task {task_id}: {e}")
             return False
 
+    async def _dispatch_ready(self, agent_ids: Optional[Iterable[str]] = None):
+        """
+        Assign ready tasks, highest priority first
+
+        Tasks pinned to an agent are only checked for the given agents;
+        unpinned tasks go to the least loaded available agent.
+        """
+        for agent_id in agent_ids or ():
+            agent = self._agents.get(agent_id)
+            while (agent and agent.current_load < agent.max_capacity
+                   and self._task_dag.has_ready(agent_id)):
+                await self._execute_ready_task(self._task_dag.pop_ready(agent_id), agent_id)
+
+        while self._task_dag.has_ready():
+            agent_id = self._pick_agent()
+            if agent_id is None:
+                break
+            await self._execute_ready_task(self._task_dag.pop_ready(), agent_id)
+
+    def _pending_dependencies(self, dependencies: List[str], batch: Iterable[str] = ()) -> List[str]:
+        """
+        Dependencies to track in the DAG: those of tasks it holds or that are
+        created in the same batch; finished tasks it no longer holds count as
+        met if they completed
+
+        Raises:
+            ValueError: If a dependency is unknown or failed
+        """
+        pending = []
+        for dep_id in dependencies:
+            if dep_id in batch:
+                pending.append(dep_id)
+            elif dep_id not in self._tasks:
+                raise ValueError(f"Unknown dependency {dep_id}")
+            elif self._tasks[dep_id].status == "failed":
+                raise ValueError(f"Dependency {dep_id} failed")
+            elif dep_id in self._task_dag:
+                pending.append(dep_id)
+        return pending
+
+    async def _execute_ready_task(self, task_id: str, agent_id: str):
+        """Execute a task taken from a ready queue"""
+        user_id, priority = self._task_context.get(task_id, (None, EventPriority.MEDIUM))
+        await self._execute_task(task_id, agent_id, user_id=user_id, priority=priority)
+
+    def _touch_agent(self, agent_id: str):
+        """Re-index an agent after its load, status or connection changed"""
+        agent = self._agents.get(agent_id)
+        if agent is None or not self._is_available(agent):
+            self._agent_heap_entries.pop(agent_id, None)
+            return
+
+        entry = self._agent_heap_entries.get(agent_id)
+        if entry is not None and entry[0] == agent.current_load:
+            return
+
+        HTTPAgentOrchestrator._agent_heap_seq += 1
+        entry = (agent.current_load, self._agent_heap_seq)
+        self._agent_heap_entries[agent_id] = entry
+        heapq.heappush(self._agent_heap, (entry[0], entry[1], agent_id))
+
+    def _pick_agent(self) -> Optional[str]:
+        """Least loaded available agent, without scanning all agents"""
+        while self._agent_heap:
+            load, seq, agent_id = self._agent_heap[0]
+            agent = self._agents.get(agent_id)
+            if (self._agent_heap_entries.get(agent_id) == (load, seq) and agent is not None
+                    and agent.current_load == load and self._is_available(agent)):
+                return agent_id
+
+            # Superseded, or the agent changed without being re-indexed
+            heapq.heappop(self._agent_heap)
+            if self._agent_heap_entries.get(agent_id) == (load, seq):
+                self._agent_heap_entries.pop(agent_id, None)
+                self._touch_agent(agent_id)
+        return None
+
+    @staticmethod
+    def _is_available(agent: AgentInfo) -> bool:
+        """Same rule as get_available_agents"""
+        return (agent.status in [AgentStatus.IDLE, AgentStatus.BUSY] and
+                agent.connection_status in [ConnectionStatus.CONNECTED, ConnectionStatus.RECONNECTING] and
+                agent.current_load < agent.max_capacity)
+
     async def _execute_task(self, task_id: str, agent_id: str, user_id: Optional[str] = None, priority: EventPriority = EventPriority.MEDIUM):
         """Execute a task on a specific agent"""
         try:
@@ -1153,6 +1330,7 @@ class HTTPAgentOrchestrator:
             agent.current_load += 1
             agent.current_tasks.append(task_id)
             agent.status = AgentStatus.BUSY if agent.current_load >= agent.max_capacity else AgentStatus.PROCESSING
+            self._touch_agent(agent_id)
 
             # Send task to agent via HTTP polling
             self._polling_service.add_event(
@@ -1189,6 +1367,14 @@ class HTTPAgentOrchestrator:
         except Exception as e:
             logger.error(f"Failed to execute task {task_id} on agent {agent_id}: {e}")
 
+            # The DAG marked the task running; fail it (and retry it) instead of leaving it stuck
+            if task_id not in self._tasks:
+                self._task_dag.remove(task_id)
+                return
+            agent = self._agents.get(agent_id)
+            took_slot = agent is not None and task_id in agent.current_tasks
+            await self.fail_task(task_id, str(e), agent_id=agent_id if took_slot else None, user_id=user_id)
+
     async def _reassign_agent_tasks(self, agent_id: str):
         """Reassign tasks from an offline agent"""
         try:
@@ -1205,12 +1391,16 @@ class HTTPAgentOrchestrator:
         except Exception as e:
             logger.error(f"Failed to reassign tasks from agent {agent_id}: {e}")
 
-    async def _check_dependent_tasks(self, completed_task_id: str, user_id: Optional[str] = None):
-        """Check and assign dependent tasks"""
+    async def _check_dependent_tasks(self, completed_task_id: str, user_id: Optional[str] = None, agent_id: Optional[str] = None):
+        """Release tasks waiting on a completed task and assign ready tasks"""
         try:
-            for task in self._tasks.values():
-                if completed_task_id in task.dependencies and task.status == "pending":
-                    await self._assign_task(task.task_id, user_id=user_id)
+            released = self._task_dag.complete(completed_task_id)
+
+            pinned = {self._tasks[task_id].assigned_to for task_id in released
+                      if task_id in self._tasks and self._tasks[task_id].assigned_to}
+            if agent_id:
+                pinned.add(agent_id)
+            await self._dispatch_ready(pinned)
 
         except Exception as e:
             logger.error(f"Failed to check dependent tasks for {completed_task_id}: {e}")
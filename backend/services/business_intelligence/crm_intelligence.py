@@ -23,6 +23,10 @@ from langchain_core.messages import SystemMessage, HumanMessage
 
 from services.firebase_service import get_firebase_service
 from services.hubspot_service import get_hubspot_service
+from .deal_scoring import (
+    HEALTH_STATUSES, LAST_ACTIVITY_DAYS, DealBatch, DealScores,
+    next_best_action, recommended_actions, risk_factors, score_deals, strengths
+)
 
 
 class DealStage(str, Enum):
@@ -205,6 +209,9 @@ class CRMIntelligenceEngine:
             }
         }
 
+        # Deals reported individually per analysis (every critical deal is reported regardless)
+        self.max_reported_deals = 50
+
         # Analysis cache
         self._analysis_cache = {}
         self._cache_timestamp = {}
@@ -230,12 +237,16 @@ class CRMIntelligenceEngine:
 
             # Get CRM data from HubSpot
             crm_data = await self._get_crm_data(user_id, start_date, end_date)
+            deals = crm_data.get("deals", [])
+
+            # Score the health of every deal in one batch
+            deal_scores = self._score_deals(deals)
 
             # Analyze deal metrics
-            deal_metrics = await self._analyze_deal_metrics(crm_data)
+            deal_metrics = await self._analyze_deal_metrics(crm_data, deal_scores)
 
             # Assess deal health
-            deal_health_scores = await self._assess_deal_health(crm_data.get("deals", []))
+            deal_health_scores = await self._assess_deal_health(deals, deal_scores)
 
             # Analyze pipeline optimization opportunities
             pipeline_optimizations = await self._analyze_pipeline_optimization(
@@ -253,9 +264,7 @@ class CRMIntelligenceEngine:
             )
 
             # Identify stalled deals and recovery strategies
-            stalled_deals = await self._identify_stalled_deals(
-                crm_data.get("deals", [])
-            )
+            stalled_deals = await self._identify_stalled_deals(deals, deal_scores)
 
             # Generate strategic recommendations
             strategic_recommendations = await self._generate_crm_recommendations(
@@ -272,7 +281,7 @@ class CRMIntelligenceEngine:
                     "end_date": end_date.isoformat()
                 },
                 "deal_metrics": asdict(deal_metrics),
-                "deal_health_summary": await self._summarize_deal_health(deal_health_scores),
+                "deal_health_summary": await self._summarize_deal_health(deal_health_scores, deal_scores),
                 "pipeline_optimizations": [asdict(opt) for opt in pipeline_optimizations],
                 "customer_segments": [asdict(seg) for seg in customer_segments],
                 "engagement_insights": await self._summarize_engagement(engagement_analysis),
@@ -342,7 +351,11 @@ class CRMIntelligenceEngine:
             # Return empty data structure
             return {"deals": [], "customers": [], "engagements": [], "activities": []}
 
-    async def _analyze_deal_metrics(self, crm_data: Dict[str, Any]) -> DealMetrics:
+    async def _analyze_deal_metrics(
+        self,
+        crm_data: Dict[str, Any],
+        deal_scores: Optional[DealScores] = None
+    ) -> DealMetrics:
         """Analyze comprehensive deal metrics"""
         try:
             deals = crm_data.get("deals", [])
@@ -394,7 +407,7 @@ class CRMIntelligenceEngine:
             )
 
             # Identify stalled deals
-            stalled_deals = await self._count_stalled_deals(deals)
+            stalled_deals = await self._count_stalled_deals(deals, deal_scores)
 
             return DealMetrics(
                 total_deals=total_deals,
@@ -492,417 +505,85 @@ class CRMIntelligenceEngine:
             self.logger.error(f"Error calculating pipeline health score: {e}")
             return 50.0
 
-    async def _count_stalled_deals(self, deals: List[Dict[str, Any]]) -> int:
+    async def _count_stalled_deals(
+        self,
+        deals: List[Dict[str, Any]],
+        deal_scores: Optional[DealScores] = None
+    ) -> int:
         """Count stalled deals"""
         try:
-            stalled_count = 0
-            stall_thresholds = self.health_scoring_config["stall_thresholds"]
-
-            for deal in deals:
-                # Skip closed deals
-                if deal.get("dealstage") in ["closed_won", "closed_lost"]:
-                    continue
-
-                # Check days in current stage
-                if "createdate" in deal:
-                    created_date = datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))
-                    days_in_stage = (datetime.now(timezone.utc) - created_date).days
-
-                    if days_in_stage > stall_thresholds["days_in_stage"]:
-                        stalled_count += 1
-
-            return stalled_count
+            if deal_scores is None:
+                deal_scores = self._score_deals(deals)
+            return int(deal_scores.stalled.sum())
 
         except Exception as e:
             self.logger.error(f"Error counting stalled deals: {e}")
             return 0
 
-    async def _assess_deal_health(self, deals: List[Dict[str, Any]]) -> List[DealHealthScore]:
-        """Assess health of individual deals"""
+    def _score_deals(self, deals: List[Dict[str, Any]]) -> DealScores:
+        """Health factor scores of every deal, computed as one batch"""
+        stall_days = self.health_scoring_config["stall_thresholds"]["days_in_stage"]
         try:
-            deal_health_scores = []
-
-            for deal in deals:
-                health_score = await self._calculate_individual_deal_health(deal)
-                deal_health_scores.append(health_score)
-
-            return deal_health_scores
-
+            batch = DealBatch.from_deals(deals)
         except Exception as e:
-            self.logger.error(f"Error assessing deal health: {e}")
-            return []
-
-    async def _calculate_individual_deal_health(self, deal: Dict[str, Any]) -> DealHealthScore:
-        """Calculate health score for individual deal"""
-        try:
-            weights = self.health_scoring_config["weights"]
-            thresholds = self.health_scoring_config["thresholds"]
-
-            # Initialize scoring factors
-            scoring_factors = {
-                "activity_level": 0.0,
-                "engagement_score": 0.0,
-                "deal_progression": 0.0,
-                "timeline_compliance": 0.0,
-                "buyer_signals": 0.0
-            }
-
-            # Calculate activity level
-            scoring_factors["activity_level"] = await self._assess_activity_level(deal)
-
-            # Calculate engagement score
-            scoring_factors["engagement_score"] = await self._assess_deal_engagement(deal)
-
-            # Calculate deal progression
-            scoring_factors["deal_progression"] = await self._assess_deal_progression(deal)
-
-            # Calculate timeline compliance
-            scoring_factors["timeline_compliance"] = await self._assess_timeline_compliance(deal)
-
-            # Calculate buyer signals
-            scoring_factors["buyer_signals"] = await self._assess_buyer_signals(deal)
-
-            # Calculate weighted health score
-            health_score = (
-                scoring_factors["activity_level"] * weights["activity_level"] +
-                scoring_factors["engagement_score"] * weights["engagement_score"] +
-                scoring_factors["deal_progression"] * weights["deal_progression"] +
-                scoring_factors["timeline_compliance"] * weights["timeline_compliance"] +
-                scoring_factors["buyer_signals"] * weights["buyer_signals"]
-            ) * 100  # Convert to 0-100 scale
-
-            # Determine health status
-            if health_score >= thresholds["healthy"]:
-                health_status = DealHealth.HEALTHY
-            elif health_score >= thresholds["warning"]:
-                health_status = DealHealth.WARNING
-            elif health_score >= thresholds["at_risk"]:
-                health_status = DealHealth.AT_RISK
-            else:
-                health_status = DealHealth.CRITICAL
-
-            # Identify risk factors and strengths
-            risk_factors = await self._identify_deal_risk_factors(deal, scoring_factors)
-            strengths = await self._identify_deal_strengths(deal, scoring_factors)
-
-            # Generate recommended actions
-            recommended_actions = await self._generate_deal_recommendations(
-                deal, health_status, scoring_factors
-            )
-
-            # Determine next best action
-            next_best_action = await self._determine_next_best_action(deal, health_status)
-
-            # Calculate additional metrics
-            days_in_current_stage = await self._calculate_days_in_stage(deal)
-            last_activity_days = await self._calculate_last_activity_days(deal)
-            estimated_close_probability = health_score / 100
-
-            return DealHealthScore(
-                deal_id=deal.get("dealId", ""),
-                deal_name=deal.get("dealname", "Unknown Deal"),
-                health_score=round(health_score, 1),
-                health_status=health_status,
-                risk_factors=risk_factors,
-                strengths=strengths,
-                recommended_actions=recommended_actions,
-                next_best_action=next_best_action,
-                estimated_close_probability=estimated_close_probability,
-                days_in_current_stage=days_in_current_stage,
-                last_activity_days=last_activity_days,
-                engagement_score=scoring_factors["engagement_score"] * 100,
-                scoring_factors=scoring_factors,
-                last_assessed=datetime.now(timezone.utc)
-            )
-
-        except Exception as e:
-            self.logger.error(f"Error calculating individual deal health: {e}")
-            # Return default health score
-            return DealHealthScore(
-                deal_id=deal.get("dealId", ""),
-                deal_name=deal.get("dealname", "Unknown Deal"),
-                health_score=50.0,
-                health_status=DealHealth.WARNING,
-                risk_factors=["Unable to assess health"],
-                strengths=["Deal exists in system"],
-                recommended_actions=["Review deal manually"],
-                next_best_action="Contact sales rep",
-                estimated_close_probability=0.5,
-                days_in_current_stage=0,
-                last_activity_days=0,
-                engagement_score=50.0,
-                scoring_factors={},
-                last_assessed=datetime.now(timezone.utc)
-            )
-
-    async def _assess_activity_level(self, deal: Dict[str, Any]) -> float:
-        """Assess activity level for deal"""
-        try:
-            # This would analyze recent activities related to the deal
-            # For now, return a moderate score
-            return 0.7
-
-        except Exception as e:
-            self.logger.error(f"Error assessing activity level: {e}")
-            return 0.5
-
-    async def _assess_deal_engagement(self, deal: Dict[str, Any]) -> float:
-        """Assess engagement level for deal"""
-        try:
-            # This would analyze customer engagement metrics
-            # For now, return based on deal stage
-            stage = deal.get("dealstage", "")
-
-            if stage in ["closed_won"]:
-                return 1.0
-            elif stage in ["decision_maker_bought_in", "contract_sent"]:
-                return 0.9
-            elif stage in ["presentation_scheduled", "qualified_to_buy"]:
-                return 0.7
-            elif stage in ["appointment_scheduled"]:
-                return 0.6
-            else:
-                return 0.4
-
-        except Exception as e:
-            self.logger.error(f"Error assessing deal engagement: {e}")
-            return 0.5
-
-    async def _assess_deal_progression(self, deal: Dict[str, Any]) -> float:
-        """Assess deal progression through pipeline"""
-        try:
-            # Map deal stages to progression scores
-            stage_scores = {
-                "appointment_scheduled": 0.2,
-                "qualified_to_buy": 0.4,
-                "presentation_scheduled": 0.6,
-                "decision_maker_bought_in": 0.8,
-                "contract_sent": 0.9,
-                "closed_won": 1.0,
-                "closed_lost": 0.0
-            }
-
-            stage = deal.get("dealstage", "")
-            return stage_scores.get(stage, 0.3)
-
-        except Exception as e:
-            self.logger.error(f"Error assessing deal progression: {e}")
-            return 0.5
-
-    async def _assess_timeline_compliance(self, deal: Dict[str, Any]) -> float:
-        """Assess timeline compliance"""
-        try:
-            # This would check if the deal is progressing according to expected timeline
-            # For now, return a moderate score
-            return 0.6
-
-        except Exception as e:
-            self.logger.error(f"Error assessing timeline compliance: {e}")
-            return 0.5
-
-    async def _assess_buyer_signals(self, deal: Dict[str, Any]) -> float:
-        """Assess buyer signals and intent"""
-        try:
-            # This would analyze buyer behavior and signals
-            # For now, return based on deal amount and stage
-            amount = deal.get("amount", 0)
-            stage = deal.get("dealstage", "")
-
-            # Higher value deals and later stages indicate stronger buyer signals
-            amount_score = min(1.0, amount / 50000)  # Normalize by $50k
-            stage_score = await self._assess_deal_progression(deal)
-
-            return (amount_score + stage_score) / 2
-
-        except Exception as e:
-            self.logger.error(f"Error assessing buyer signals: {e}")
-            return 0.5
-
-    async def _identify_deal_risk_factors(
-        self,
-        deal: Dict[str, Any],
-        scoring_factors: Dict[str, float]
-    ) -> List[str]:
-        """Identify risk factors for deal"""
-        try:
-            risk_factors = []
-
-            # Low activity level
-            if scoring_factors.get("activity_level", 0) < 0.4:
-                risk_factors.append("Low recent activity")
-
-            # Low engagement
-            if scoring_factors.get("engagement_score", 0) < 0.4:
-                risk_factors.append("Poor customer engagement")
-
-            # Slow progression
-            if scoring_factors.get("deal_progression", 0) < 0.5:
-                risk_factors.append("Slow pipeline progression")
-
-            # Timeline issues
-            if scoring_factors.get("timeline_compliance", 0) < 0.5:
-                risk_factors.append("Behind schedule")
-
-            # Weak buyer signals
-            if scoring_factors.get("buyer_signals", 0) < 0.3:
-                risk_factors.append("Weak buying signals")
-
-            # Long time in current stage
-            days_in_stage = await self._calculate_days_in_stage(deal)
-            if days_in_stage > 21:  # 3 weeks
-                risk_factors.append(f"Stalled for {days_in_stage} days")
-
-            return risk_factors
-
-        except Exception as e:
-            self.logger.error(f"Error identifying deal risk factors: {e}")
-            return ["Unable to assess risk factors"]
-
-    async def _identify_deal_strengths(
-        self,
-        deal: Dict[str, Any],
-        scoring_factors: Dict[str, float]
-    ) -> List[str]:
-        """Identify deal strengths"""
-        try:
-            strengths = []
-
-            # High activity level
-            if scoring_factors.get("activity_level", 0) > 0.8:
-                strengths.append("High engagement activity")
-
-            # Strong buyer signals
-            if scoring_factors.get("buyer_signals", 0) > 0.8:
-                strengths.append("Strong buying signals")
-
-            # Good progression
-            if scoring_factors.get("deal_progression", 0) > 0.7:
-                strengths.append("Good pipeline progression")
-
-            # High deal value
-            amount = deal.get("amount", 0)
-            if amount > 50000:
-                strengths.append("High value opportunity")
-
-            # Timeline compliance
-            if scoring_factors.get("timeline_compliance", 0) > 0.8:
-                strengths.append("On track timeline")
-
-            return strengths
-
-        except Exception as e:
-            self.logger.error(f"Error identifying deal strengths: {e}")
-            return ["Unable to assess strengths"]
-
-    async def _generate_deal_recommendations(
-        self,
-        deal: Dict[str, Any],
-        health_status: DealHealth,
-        scoring_factors: Dict[str, float]
-    ) -> List[str]:
-        """Generate deal-specific recommendations"""
-        try:
-            recommendations = []
-
-            if health_status == DealHealth.CRITICAL:
-                recommendations.extend([
-                    "Immediate intervention required",
-                    "Re-qualify deal opportunity",
-                    "Consider closing if no response"
-                ])
-            elif health_status == DealHealth.AT_RISK:
-                recommendations.extend([
-                    "Schedule immediate check-in",
-                    "Identify and address objections",
-                    "Provide additional value proposition"
-                ])
-            elif health_status == DealHealth.WARNING:
-                recommendations.extend([
-                    "Increase touch frequency",
-                    "Identify decision makers",
-                    "Address timeline concerns"
-                ])
-            else:  # HEALTHY
-                recommendations.extend([
-                    "Maintain current momentum",
-                    "Prepare for next stage",
-                    "Identify upsell opportunities"
-                ])
-
-            # Add specific recommendations based on scoring factors
-            if scoring_factors.get("activity_level", 0) < 0.5:
-                recommendations.append("Increase engagement activity")
-
-            if scoring_factors.get("engagement_score", 0) < 0.5:
-                recommendations.append("Improve customer communication")
-
-            if scoring_factors.get("buyer_signals", 0) < 0.5:
-                recommendations.append("Strengthen value proposition")
-
-            return recommendations[:4]  # Top 4 recommendations
-
-        except Exception as e:
-            self.logger.error(f"Error generating deal recommendations: {e}")
-            return ["Review deal and take appropriate action"]
+            self.logger.error(f"Error loading deals for scoring: {e}")
+            batch = DealBatch.from_deals([])
+        return score_deals(
+            batch,
+            self.health_scoring_config["weights"],
+            self.health_scoring_config["thresholds"],
+            stall_days
+        )
 
-    async def _determine_next_best_action(
+    async def _assess_deal_health(
         self,
-        deal: Dict[str, Any],
-        health_status: DealHealth
-    ) -> str:
-        """Determine next best action for deal"""
-        try:
-            stage = deal.get("dealstage", "")
-
-            if health_status == DealHealth.CRITICAL:
-                return "Schedule executive review call"
-            elif health_status == DealHealth.AT_RISK:
-                return "Conduct discovery call to identify issues"
-            elif health_status == DealHealth.WARNING:
-                return "Send follow-up with value proposition"
-            else:  # HEALTHY
-                # Based on stage
-                if stage == "appointment_scheduled":
-                    return "Prepare for discovery call"
-                elif stage == "qualified_to_buy":
-                    return "Schedule product demonstration"
-                elif stage == "presentation_scheduled":
-                    return "Prepare customized proposal"
-                elif stage == "decision_maker_bought_in":
-                    return "Send contract for review"
-                elif stage == "contract_sent":
-                    return "Follow up on contract review"
-                else:
-                    return "Maintain regular contact"
-
-        except Exception as e:
-            self.logger.error(f"Error determining next best action: {e}")
-            return "Contact sales representative"
-
-    async def _calculate_days_in_stage(self, deal: Dict[str, Any]) -> int:
-        """Calculate days deal has been in current stage"""
+        deals: List[Dict[str, Any]],
+        deal_scores: Optional[DealScores] = None,
+        limit: Optional[int] = None
+    ) -> List[DealHealthScore]:
+        """
+        Health of the riskiest deals: the limit lowest-scoring ones (default
+        max_reported_deals) and every critical deal, riskiest first
+        """
         try:
-            # This would track stage changes
-            # For now, calculate from creation date
-            if "createdate" in deal:
-                created_date = datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))
-                return (datetime.now(timezone.utc) - created_date).days
-            return 0
+            if deal_scores is None:
+                deal_scores = self._score_deals(deals)
+            limit = self.max_reported_deals if limit is None else limit
+            critical = int((deal_scores.status == HEALTH_STATUSES.index(DealHealth.CRITICAL.value)).sum())
+
+            return [
+                self._build_deal_health_score(deal_scores, index)
+                for index in deal_scores.riskiest(max(limit, critical)).tolist()
+            ]
 
         except Exception as e:
-            self.logger.error(f"Error calculating days in stage: {e}")
-            return 0
-
-    async def _calculate_last_activity_days(self, deal: Dict[str, Any]) -> int:
-        """Calculate days since last activity"""
-        try:
-            # This would track actual activities
-            # For now, return a mock value
-            return 3
+            self.logger.error(f"Error assessing deal health: {e}")
+            return []
 
-        except Exception as e:
-            self.logger.error(f"Error calculating last activity days: {e}")
-            return 0
+    def _build_deal_health_score(self, deal_scores: DealScores, index: int) -> DealHealthScore:
+        """DealHealthScore of one deal of a scored batch"""
+        batch = deal_scores.batch
+        health_score = float(deal_scores.health[index])
+        health_status = DealHealth(HEALTH_STATUSES[deal_scores.status[index]])
+        scoring_factors = deal_scores.scoring_factors(index)
+        days_in_current_stage = int(deal_scores.days_in_stage[index])
+
+        return DealHealthScore(
+            deal_id=batch.deal_ids[index],
+            deal_name=batch.deal_names[index],
+            health_score=round(health_score, 1),
+            health_status=health_status,
+            risk_factors=risk_factors(scoring_factors, days_in_current_stage),
+            strengths=strengths(scoring_factors, float(batch.amounts[index])),
+            recommended_actions=recommended_actions(health_status, scoring_factors),
+            next_best_action=next_best_action(batch.stage(index), health_status),
+            estimated_close_probability=health_score / 100,
+            days_in_current_stage=days_in_current_stage,
+            last_activity_days=LAST_ACTIVITY_DAYS,
+            engagement_score=scoring_factors["engagement_score"] * 100,
+            scoring_factors=scoring_factors,
+            last_assessed=deal_scores.assessed_at
+        )
 
     async def _analyze_pipeline_optimization(
         self,
@@ -1354,17 +1035,23 @@ class CRMIntelligenceEngine:
             self.logger.error(f"Error generating engagement recommendations: {e}")
             return ["Review engagement strategy and adjust accordingly"]
 
-    async def _identify_stalled_deals(self, deals: List[Dict[str, Any]]) -> List[StalledDealRecovery]:
+    async def _identify_stalled_deals(
+        self,
+        deals: List[Dict[str, Any]],
+        deal_scores: Optional[DealScores] = None
+    ) -> List[StalledDealRecovery]:
         """Identify stalled deals and create recovery strategies"""
         try:
+            if deal_scores is None:
+                deal_scores = self._score_deals(deals)
             stalled_deals = []
 
-            for deal in deals:
-                # Check if deal is stalled
-                if await self._is_deal_stalled(deal):
-                    recovery = await self._create_recovery_strategy(deal)
-                    if recovery:
-                        stalled_deals.append(recovery)
+            for index in np.flatnonzero(deal_scores.stalled).tolist():
+                recovery = await self._create_recovery_strategy(
+                    deals[index], int(deal_scores.days_in_stage[index])
+                )
+                if recovery:
+                    stalled_deals.append(recovery)
 
             return stalled_deals
 
@@ -1372,37 +1059,13 @@ class CRMIntelligenceEngine:
             self.logger.error(f"Error identifying stalled deals: {e}")
             return []
 
-    async def _is_deal_stalled(self, deal: Dict[str, Any]) -> bool:
-        """Check if deal is stalled"""
-        try:
-            # Skip closed deals
-            if deal.get("dealstage") in ["closed_won", "closed_lost"]:
-                return False
-
-            # Check days in current stage
-            if "createdate" in deal:
-                created_date = datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))
-                days_in_stage = (datetime.now(timezone.utc) - created_date).days
-
-                stall_thresholds = self.health_scoring_config["stall_thresholds"]
-                return days_in_stage > stall_thresholds["days_in_stage"]
-
-            return False
-
-        except Exception as e:
-            self.logger.error(f"Error checking if deal is stalled: {e}")
-            return False
-
-    async def _create_recovery_strategy(self, deal: Dict[str, Any]) -> Optional[StalledDealRecovery]:
+    async def _create_recovery_strategy(
+        self,
+        deal: Dict[str, Any],
+        stall_duration: int
+    ) -> Optional[StalledDealRecovery]:
         """Create recovery strategy for stalled deal"""
         try:
-            # Calculate stall duration
-            if "createdate" in deal:
-                created_date = datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))
-                stall_duration = (datetime.now(timezone.utc) - created_date).days
-            else:
-                stall_duration = 0
-
             # Identify stall reasons
             stall_reasons = [
                 "No recent activity",
@@ -1445,10 +1108,17 @@ class CRMIntelligenceEngine:
             self.logger.error(f"Error creating recovery strategy: {e}")
             return None
 
-    async def _summarize_deal_health(self, deal_health_scores: List[DealHealthScore]) -> Dict[str, Any]:
-        """Summarize deal health across all deals"""
+    async def _summarize_deal_health(
+        self,
+        deal_health_scores: List[DealHealthScore],
+        deal_scores: Optional[DealScores] = None
+    ) -> Dict[str, Any]:
+        """
+        Summarize deal health across all deals; totals come from deal_scores
+        when given, since deal_health_scores then only holds the riskiest deals
+        """
         try:
-            if not deal_health_scores:
+            if not deal_health_scores and not (deal_scores is not None and len(deal_scores)):
                 return {
                     "total_deals": 0,
                     "average_health_score": 0,
@@ -1456,14 +1126,19 @@ class CRMIntelligenceEngine:
                     "critical_deals": []
                 }
 
-            total_deals = len(deal_health_scores)
-            avg_health_score = statistics.mean([d.health_score for d in deal_health_scores])
+            if deal_scores is not None:
+                total_deals = len(deal_scores)
+                avg_health_score = float(np.round(deal_scores.health, 1).mean())
+                health_counts = deal_scores.status_counts()
+            else:
+                total_deals = len(deal_health_scores)
+                avg_health_score = statistics.mean([d.health_score for d in deal_health_scores])
 
-            # Health distribution
-            health_counts = {}
-            for score in deal_health_scores:
-                status = score.health_status.value
-                health_counts[status] = health_counts.get(status, 0) + 1
+                # Health distribution
+                health_counts = {}
+                for score in deal_health_scores:
+                    status = score.health_status.value
+                    health_counts[status] = health_counts.get(status, 0) + 1
 
             # Critical deals requiring immediate attention
             critical_deals = [
@@ -1482,7 +1157,7 @@ class CRMIntelligenceEngine:
                 "average_health_score": round(avg_health_score, 1),
                 "health_distribution": health_counts,
                 "critical_deals": critical_deals,
-                "at_risk_count": len([d for d in deal_health_scores if d.health_status == DealHealth.AT_RISK])
+                "at_risk_count": health_counts.get(DealHealth.AT_RISK.value, 0)
             }
 
         except Exception as e:
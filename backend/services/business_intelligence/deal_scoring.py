@@ -0,0 +1,283 @@
+"""
+Batched deal health scoring
+Loads a pipeline of HubSpot deal dicts into columns once (stage codes,
+numeric amounts, creation timestamps parsed in a single pass), scores every
+health factor for all deals as NumPy operations, and leaves building
+per-deal objects to the caller for just the deals it reports on, such as
+the riskiest or the stalled ones.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FACTORS = ("activity_level", "engagement_score", "deal_progression", "timeline_compliance", "buyer_signals")
+HEALTH_STATUSES = ("healthy", "warning", "at_risk", "critical")  # Status codes index this tuple
+CLOSED_STAGES = ("closed_won", "closed_lost")
+
+STAGE_ENGAGEMENT = {
+    "closed_won": 1.0,
+    "decision_maker_bought_in": 0.9,
+    "contract_sent": 0.9,
+    "presentation_scheduled": 0.7,
+    "qualified_to_buy": 0.7,
+    "appointment_scheduled": 0.6
+}
+DEFAULT_ENGAGEMENT = 0.4
+
+STAGE_PROGRESSION = {
+    "appointment_scheduled": 0.2,
+    "qualified_to_buy": 0.4,
+    "presentation_scheduled": 0.6,
+    "decision_maker_bought_in": 0.8,
+    "contract_sent": 0.9,
+    "closed_won": 1.0,
+    "closed_lost": 0.0
+}
+DEFAULT_PROGRESSION = 0.3
+
+# Activities and stage timelines are not tracked per deal yet
+ACTIVITY_LEVEL = 0.7
+TIMELINE_COMPLIANCE = 0.6
+LAST_ACTIVITY_DAYS = 3
+
+BUYER_SIGNAL_AMOUNT = 50000  # Amount at which the amount half of the buyer signal saturates
+UNKNOWN_AMOUNT_SIGNAL = 0.5  # Buyer signal of deals without a numeric amount
+STALLED_RISK_DAYS = 21
+
+_DAY_MICROSECONDS = 86400 * 10 ** 6
+_NOT_A_TIME = np.iinfo(np.int64).min
+
+
+@dataclass
+class DealBatch:
+    """Deals as columns, one row per deal in input order"""
+    deal_ids: List[str]
+    deal_names: List[str]
+    stage_names: List[Any]  # distinct stages, indexed by stage_codes
+    stage_codes: np.ndarray
+    amounts: np.ndarray  # NaN where the amount is missing or not a number
+    created: np.ndarray  # datetime64[us] UTC, NaT where missing or unparseable
+
+    @classmethod
+    def from_deals(cls, deals: List[Dict[str, Any]]) -> "DealBatch":
+        """
+        Columns of a list of deal dicts; naive creation timestamps are taken
+        as UTC
+        """
+        stage_index: Dict[Any, int] = {}
+        stage_codes = np.fromiter(
+            (stage_index.setdefault(deal.get("dealstage", ""), len(stage_index)) for deal in deals),
+            dtype=np.int64,
+            count=len(deals)
+        )
+        amounts = pd.to_numeric(
+            pd.Series([deal.get("amount", 0) for deal in deals], dtype=object), errors="coerce"
+        ).to_numpy(dtype=np.float64)
+        created = pd.to_datetime(
+            pd.Series([deal.get("createdate") for deal in deals], dtype=object),
+            utc=True, errors="coerce", format="ISO8601"
+        )
+        return cls(
+            deal_ids=[deal.get("dealId", "") for deal in deals],
+            deal_names=[deal.get("dealname", "Unknown Deal") for deal in deals],
+            stage_names=list(stage_index),
+            stage_codes=stage_codes,
+            amounts=amounts,
+            created=created.dt.tz_convert(None).to_numpy(dtype="datetime64[us]")
+        )
+
+    def __len__(self) -> int:
+        return len(self.stage_codes)
+
+    def stage(self, index: int) -> Any:
+        return self.stage_names[self.stage_codes[index]]
+
+    def stage_lookup(self, table: Dict[str, float], default: float) -> np.ndarray:
+        """Per-deal value of each deal's stage in table"""
+        values = np.array([table.get(stage, default) for stage in self.stage_names], dtype=np.float64)
+        return values[self.stage_codes] if len(values) else np.empty(0)
+
+    def days_since_created(self, now: datetime) -> np.ndarray:
+        """Whole days from creation to now, 0 where the creation time is unknown"""
+        created = self.created.view(np.int64)
+        now_us = np.datetime64(now.astimezone(timezone.utc).replace(tzinfo=None), "us").view(np.int64)
+        known = created != _NOT_A_TIME
+        return np.where(known, (now_us - created) // _DAY_MICROSECONDS, 0)
+
+
+@dataclass
+class DealScores:
+    """Health factor scores and status of every deal in a batch"""
+    batch: DealBatch
+    factors: np.ndarray  # (deals, len(FACTORS)), each 0-1
+    health: np.ndarray  # weighted factor score, 0-100, unrounded
+    status: np.ndarray  # index into HEALTH_STATUSES
+    days_in_stage: np.ndarray
+    stalled: np.ndarray  # bool
+    assessed_at: datetime
+
+    def __len__(self) -> int:
+        return len(self.health)
+
+    def scoring_factors(self, index: int) -> Dict[str, float]:
+        return dict(zip(FACTORS, self.factors[index].tolist(), strict=True))
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of deals per health status, for the statuses that occur"""
+        counts = np.bincount(self.status, minlength=len(HEALTH_STATUSES))
+        return {status: int(count) for status, count in zip(HEALTH_STATUSES, counts, strict=True) if count}
+
+    def riskiest(self, limit: int) -> np.ndarray:
+        """Indices of the limit lowest-scoring deals, lowest first, ties in input order"""
+        limit = min(limit, len(self))
+        if limit <= 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.argpartition(self.health, limit - 1)[:limit] if limit < len(self) else np.arange(len(self))
+        # Ties at the partition boundary may leave out an earlier deal with the same score
+        cutoff = self.health[candidates].max()
+        candidates = np.union1d(candidates, np.flatnonzero(self.health == cutoff))
+        ordered = candidates[np.lexsort((candidates, self.health[candidates]))]
+        return ordered[:limit]
+
+
+def score_deals(
+    batch: DealBatch,
+    weights: Dict[str, float],
+    thresholds: Dict[str, float],
+    stall_days: int,
+    now: Optional[datetime] = None
+) -> DealScores:
+    """
+    Factor scores, weighted health and status of every deal; open deals
+    created more than stall_days ago are stalled
+    """
+    now = now or datetime.now(timezone.utc)
+    deals = len(batch)
+    progression = batch.stage_lookup(STAGE_PROGRESSION, DEFAULT_PROGRESSION)
+    with np.errstate(invalid="ignore"):
+        amount_signal = np.minimum(1.0, batch.amounts / BUYER_SIGNAL_AMOUNT)
+    buyer_signals = np.where(np.isnan(batch.amounts), UNKNOWN_AMOUNT_SIGNAL, (amount_signal + progression) / 2)
+
+    columns = {
+        "activity_level": np.full(deals, ACTIVITY_LEVEL),
+        "engagement_score": batch.stage_lookup(STAGE_ENGAGEMENT, DEFAULT_ENGAGEMENT),
+        "deal_progression": progression,
+        "timeline_compliance": np.full(deals, TIMELINE_COMPLIANCE),
+        "buyer_signals": buyer_signals
+    }
+    health = np.zeros(deals)
+    for factor in FACTORS:
+        health = health + columns[factor] * weights[factor]
+    health = health * 100
+
+    status = np.select(
+        [health >= thresholds["healthy"], health >= thresholds["warning"], health >= thresholds["at_risk"]],
+        [0, 1, 2],
+        default=3
+    )
+
+    days_in_stage = batch.days_since_created(now)
+    closed = np.isin(batch.stage_codes, [
+        code for code, stage in enumerate(batch.stage_names) if stage in CLOSED_STAGES
+    ])
+    known = batch.created.view(np.int64) != _NOT_A_TIME
+    return DealScores(
+        batch=batch,
+        factors=np.column_stack([columns[factor] for factor in FACTORS]) if deals else np.empty((0, len(FACTORS))),
+        health=health,
+        status=status,
+        days_in_stage=days_in_stage,
+        stalled=~closed & known & (days_in_stage > stall_days),
+        assessed_at=now
+    )
+
+
+def risk_factors(scoring_factors: Dict[str, float], days_in_stage: int) -> List[str]:
+    """Risk factors of one deal"""
+    risks = []
+    if scoring_factors.get("activity_level", 0) < 0.4:
+        risks.append("Low recent activity")
+    if scoring_factors.get("engagement_score", 0) < 0.4:
+        risks.append("Poor customer engagement")
+    if scoring_factors.get("deal_progression", 0) < 0.5:
+        risks.append("Slow pipeline progression")
+    if scoring_factors.get("timeline_compliance", 0) < 0.5:
+        risks.append("Behind schedule")
+    if scoring_factors.get("buyer_signals", 0) < 0.3:
+        risks.append("Weak buying signals")
+    if days_in_stage > STALLED_RISK_DAYS:
+        risks.append(f"Stalled for {days_in_stage} days")
+    return risks
+
+
+def strengths(scoring_factors: Dict[str, float], amount: float) -> List[str]:
+    """Strengths of one deal"""
+    found = []
+    if scoring_factors.get("activity_level", 0) > 0.8:
+        found.append("High engagement activity")
+    if scoring_factors.get("buyer_signals", 0) > 0.8:
+        found.append("Strong buying signals")
+    if scoring_factors.get("deal_progression", 0) > 0.7:
+        found.append("Good pipeline progression")
+    if amount > BUYER_SIGNAL_AMOUNT:
+        found.append("High value opportunity")
+    if scoring_factors.get("timeline_compliance", 0) > 0.8:
+        found.append("On track timeline")
+    return found
+
+
+def recommended_actions(health_status: str, scoring_factors: Dict[str, float]) -> List[str]:
+    """Top 4 recommendations for one deal"""
+    if health_status == "critical":
+        actions = ["Immediate intervention required", "Re-qualify deal opportunity", "Consider closing if no response"]
+    elif health_status == "at_risk":
+        actions = ["Schedule immediate check-in", "Identify and address objections", "Provide additional value proposition"]
+    elif health_status == "warning":
+        actions = ["Increase touch frequency", "Identify decision makers", "Address timeline concerns"]
+    else:
+        actions = ["Maintain current momentum", "Prepare for next stage", "Identify upsell opportunities"]
+
+    if scoring_factors.get("activity_level", 0) < 0.5:
+        actions.append("Increase engagement activity")
+    if scoring_factors.get("engagement_score", 0) < 0.5:
+        actions.append("Improve customer communication")
+    if scoring_factors.get("buyer_signals", 0) < 0.5:
+        actions.append("Strengthen value proposition")
+    return actions[:4]
+
+
+_HEALTHY_STAGE_ACTIONS = {
+    "appointment_scheduled": "Prepare for discovery call",
+    "qualified_to_buy": "Schedule product demonstration",
+    "presentation_scheduled": "Prepare customized proposal",
+    "decision_maker_bought_in": "Send contract for review",
+    "contract_sent": "Follow up on contract review"
+}
+
+
+def next_best_action(stage: Any, health_status: str) -> str:
+    """Next best action for one deal"""
+    if health_status == "critical":
+        return "Schedule executive review call"
+    if health_status == "at_risk":
+        return "Conduct discovery call to identify issues"
+    if health_status == "warning":
+        return "Send follow-up with value proposition"
+    return _HEALTHY_STAGE_ACTIONS.get(stage, "Maintain regular contact")
+
+
+__all__ = [
+    "DealBatch",
+    "DealScores",
+    "FACTORS",
+    "HEALTH_STATUSES",
+    "next_best_action",
+    "recommended_actions",
+    "risk_factors",
+    "score_deals",
+    "strengths"
+]
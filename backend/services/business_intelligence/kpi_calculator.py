@@ -6,6 +6,7 @@ with real-time monitoring, trend analysis, and predictive capabilities.
 
 import asyncio
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
@@ -24,6 +25,9 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from services.firebase_service import get_firebase_service
 from .revenue_intelligence import RevenueIntelligenceEngine
 from .crm_intelligence import CRMIntelligenceEngine
+from .kpi_graph import KPIDependencyGraph
+from .kpi_history import KPIHistoryStore
+from . import trend_analytics
 
 
 class KPICategory(str, Enum):
@@ -243,6 +247,16 @@ class KPIEngine:
         self._cache_timestamp = {}
         self._cache_ttl = 300  # 5 minutes
 
+        # Incremental evaluation: per-user dataset dependencies and memoized KPI
+        # values, for the max_kpi_graphs most recently active users
+        self._kpi_graphs: "OrderedDict[str, KPIDependencyGraph]" = OrderedDict()
+        self.max_kpi_graphs = 1000
+        self.max_concurrent_kpis = 8
+        self.firebase_service.add_data_listener(self._on_data_changed)
+
+        # Columnar history of calculated values, for trend analysis
+        self.kpi_history = KPIHistoryStore()
+
     async def initialize_kpi_system(self, user_id: str) -> Dict[str, Any]:
         """Initialize KPI system with standard KPIs"""
         try:
@@ -288,10 +302,17 @@ class KPIEngine:
         timeframe: KPITimeframe = KPITimeframe.MONTHLY,
         end_date: datetime = None
     ) -> Dict[str, Any]:
-        """Calculate specified KPIs"""
+        """
+        Calculate specified KPIs
+
+        Values whose source datasets have not changed since they were
+        computed for the same period are reused; only recomputed values are
+        stored and checked against alerts. Without end_date, the period ends
+        at the current time rounded down to the cache TTL.
+        """
         try:
             if end_date is None:
-                end_date = datetime.now(timezone.utc)
+                end_date = self._current_period_end()
 
             # Get KPI definitions to calculate
             if kpi_ids is None:
@@ -299,26 +320,19 @@ class KPIEngine:
 
             kpi_definitions = await self._get_kpi_definitions(user_id, kpi_ids)
 
-            # Calculate KPI values
-            kpi_values = []
-            for kpi_def in kpi_definitions:
-                try:
-                    kpi_value = await self._calculate_single_kpi(kpi_def, timeframe, end_date)
-                    kpi_values.append(kpi_value)
-                except Exception as e:
-                    self.logger.error(f"Error calculating KPI {kpi_def.name}: {e}")
-                    continue
+            # Calculate KPI values whose inputs changed
+            kpi_values, computed_values = await self._evaluate_kpis(user_id, kpi_definitions, timeframe, end_date)
 
-            # Store KPI values
-            for kpi_value in kpi_values:
-                await self._store_kpi_value(kpi_value, user_id)
+            # Store recomputed KPI values
+            await self._store_kpi_values(computed_values, user_id)
 
             # Check for alerts
-            await self._check_kpi_alerts(kpi_values, user_id)
+            await self._check_kpi_alerts(computed_values, user_id)
 
             return {
                 "success": True,
                 "kpi_values_calculated": len(kpi_values),
+                "kpi_values_recomputed": len(computed_values),
                 "timeframe": timeframe.value,
                 "period_end": end_date.isoformat(),
                 "kpi_values": [asdict(kpi) for kpi in kpi_values],
@@ -329,6 +343,25 @@ class KPIEngine:
             self.logger.error(f"Error calculating KPIs: {e}")
             raise
 
+    def mark_data_changed(self, user_id: str, *datasets: str) -> List[str]:
+        """
+        Record that source datasets (e.g. "hubspot" or a KPI category such
+        as "sales") changed, so the next calculation recomputes the KPIs
+        that read them
+
+        Returns:
+            IDs of the KPIs that will be recomputed
+        """
+        graph = self._kpi_graphs.get(user_id)
+        if graph is None:
+            return []  # Nothing memoized for the user
+        return sorted(graph.mark_changed(*datasets))
+
+    def _on_data_changed(self, *datasets: str):
+        """Firestore writes of shared source data, such as HubSpot records or tasks, affect every user's KPIs"""
+        for graph in list(self._kpi_graphs.values()):
+            graph.mark_changed(*datasets)
+
     async def get_kpi_dashboard(
         self,
         user_id: str,
@@ -421,7 +454,7 @@ class KPIEngine:
                     KPITimeframe(kpi_def.timeframe),
                     datetime.now(timezone.utc)
                 )
-                await self._store_kpi_value(initial_value, user_id)
+                await self._store_kpi_values([initial_value], user_id)
             except Exception as e:
                 self.logger.warning(f"Could not calculate initial value for custom KPI: {e}")
 
@@ -444,10 +477,10 @@ class KPIEngine:
     ) -> KPITrendAnalysis:
         """Analyze KPI trends over specified period"""
         try:
-            # Get historical KPI values
-            historical_values = await self._get_historical_kpi_values(user_id, kpi_id, days)
+            # Get historical KPI values, one per day
+            _, daily_values = await self._get_historical_kpi_values(user_id, kpi_id, days)
 
-            if len(historical_values) < 2:
+            if len(daily_values) < 2:
                 # Not enough data for trend analysis
                 return KPITrendAnalysis(
                     kpi_id=kpi_id,
@@ -465,14 +498,13 @@ class KPIEngine:
                 )
 
             # Calculate trend metrics
-            values = [kpi.value for kpi in historical_values]
-            timestamps = [kpi.calculation_timestamp for kpi in historical_values]
+            values = daily_values.tolist()
 
             # Trend direction
             if len(values) >= 3:
                 # Linear regression to determine trend
-                x = list(range(len(values)))
-                slope = self._calculate_slope(x, values)
+                trend = trend_analytics.linear_trend(daily_values)
+                slope = float(trend.slope[0])
 
                 if slope > 0.01:
                     trend_direction = KPITrend.IMPROVING
@@ -482,7 +514,7 @@ class KPIEngine:
                     trend_direction = KPITrend.STABLE
 
                 # Trend strength (R-squared)
-                trend_strength = self._calculate_r_squared(x, values, slope)
+                trend_strength = float(trend.r_squared[0])
             else:
                 trend_direction = KPITrend.STABLE
                 trend_strength = 0.0
@@ -494,17 +526,18 @@ class KPIEngine:
                 growth_rate = 0.0
 
             # Volatility (coefficient of variation)
-            if statistics.mean(values) != 0:
-                volatility = (statistics.stdev(values) / statistics.mean(values)) * 100
+            mean_value = float(daily_values.mean())
+            if mean_value != 0:
+                volatility = (float(daily_values.std(ddof=1)) / mean_value) * 100
             else:
                 volatility = 0.0
 
             # Forecast next period
-            forecast_value = self._forecast_next_value(values)
+            forecast_value = max(0.0, float(trend_analytics.ensemble_forecast(daily_values).ensemble[0]))
             forecast_confidence = max(0.0, min(1.0, trend_strength))
 
-            # Detect seasonality (simplified)
-            seasonality_detected = len(values) >= 12 and self._detect_seasonality(values)
+            # Detect seasonality
+            seasonality_detected = len(values) >= 12 and bool(trend_analytics.detect_seasonality(daily_values).detected[0])
 
             # Generate insights using LLM
             insights = await self._generate_trend_insights(
@@ -690,24 +723,94 @@ class KPIEngine:
             # Get all KPI definitions
             kpi_definitions = await self._get_all_kpi_definitions(user_id)
 
-            kpi_values = []
-            for kpi_def in kpi_definitions:
-                try:
-                    kpi_value = await self._calculate_single_kpi(
-                        kpi_def,
-                        KPITimeframe(kpi_def.timeframe),
-                        datetime.now(timezone.utc)
-                    )
-                    kpi_values.append(kpi_value)
-                except Exception as e:
-                    self.logger.error(f"Error calculating KPI {kpi_def.name}: {e}")
-
+            kpi_values, _ = await self._evaluate_kpis(user_id, kpi_definitions, None, self._current_period_end())
             return kpi_values
 
         except Exception as e:
             self.logger.error(f"Error calculating all KPIs: {e}")
             return []
 
+    async def _evaluate_kpis(
+        self,
+        user_id: str,
+        kpi_definitions: List[KPIDefinition],
+        timeframe: Optional[KPITimeframe],
+        end_date: datetime
+    ) -> Tuple[List[KPIValue], List[KPIValue]]:
+        """
+        Values of the KPIs for the period ending at end_date, in definition
+        order, reusing memoized values whose datasets are unchanged; KPIs to
+        recompute are calculated concurrently. Without a timeframe, each KPI
+        uses its own.
+
+        Returns:
+            (all values, recomputed values)
+        """
+        graph = self._get_kpi_graph(user_id)
+        kpi_values: List[Optional[KPIValue]] = [None] * len(kpi_definitions)
+        pending = []
+        for index, kpi_def in enumerate(kpi_definitions):
+            kpi_timeframe = timeframe or KPITimeframe(kpi_def.timeframe)
+            graph.register(kpi_def.kpi_id, self._kpi_data_sources(kpi_def), self._kpi_fingerprint(kpi_def))
+            kpi_values[index] = graph.lookup(kpi_def.kpi_id, kpi_timeframe.value, end_date)
+            if kpi_values[index] is None:
+                pending.append((index, kpi_def, kpi_timeframe))
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_kpis)
+
+        async def evaluate(index: int, kpi_def: KPIDefinition, kpi_timeframe: KPITimeframe) -> KPIValue:
+            # Versions taken first, so a dataset change during the calculation leaves the value stale
+            versions = graph.versions(kpi_def.kpi_id)
+            async with semaphore:
+                kpi_value = await self._calculate_single_kpi(kpi_def, kpi_timeframe, end_date)
+            if "error" not in kpi_value.metadata:
+                graph.store(kpi_def.kpi_id, kpi_timeframe.value, end_date, kpi_value, versions)
+            kpi_values[index] = kpi_value
+            return kpi_value
+
+        results = await asyncio.gather(*(evaluate(*entry) for entry in pending), return_exceptions=True)
+
+        computed_values = []
+        for (_, kpi_def, _), result in zip(pending, results, strict=True):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error calculating KPI {kpi_def.name}: {result}")
+            else:
+                computed_values.append(result)
+
+        return [kpi_value for kpi_value in kpi_values if kpi_value is not None], computed_values
+
+    def _get_kpi_graph(self, user_id: str) -> KPIDependencyGraph:
+        """A user's graph, evicting the least recently used one beyond max_kpi_graphs"""
+        graph = self._kpi_graphs.get(user_id)
+        if graph is None:
+            graph = self._kpi_graphs[user_id] = KPIDependencyGraph()
+            while len(self._kpi_graphs) > self.max_kpi_graphs:
+                self._kpi_graphs.popitem(last=False)
+        else:
+            self._kpi_graphs.move_to_end(user_id)
+        return graph
+
+    def _kpi_data_sources(self, kpi_def: KPIDefinition) -> List[str]:
+        """Datasets a KPI is computed from: its declared sources and its category"""
+        return [*kpi_def.data_sources, KPICategory(kpi_def.category).value]
+
+    def _kpi_fingerprint(self, kpi_def: KPIDefinition) -> Tuple:
+        """Definition fields a KPI's value depends on, so an edited KPI is recomputed"""
+        return (
+            kpi_def.calculation_method,
+            kpi_def.target_value,
+            kpi_def.minimum_acceptable,
+            kpi_def.stretch_target,
+            kpi_def.benchmark_value,
+            kpi_def.industry_average,
+            kpi_def.unit
+        )
+
+    def _current_period_end(self) -> datetime:
+        """Now, rounded down to the cache TTL so refreshes within it share a period"""
+        timestamp = datetime.now(timezone.utc).timestamp()
+        return datetime.fromtimestamp(timestamp - timestamp % self._cache_ttl, timezone.utc)
+
     async def _calculate_single_kpi(
         self,
         kpi_def: KPIDefinition,
@@ -1029,6 +1132,13 @@ class KPIEngine:
         except Exception as e:
             self.logger.error(f"Error storing KPI value: {e}")
 
+    async def _store_kpi_values(self, kpi_values: List[KPIValue], user_id: str):
+        """Store KPI values together (concurrent writes are batched by the Firebase service)"""
+        for kpi_value in kpi_values:
+            if "error" not in kpi_value.metadata:
+                self.kpi_history.append(user_id, kpi_value.kpi_id, kpi_value.period_end.timestamp(), kpi_value.value)
+        await asyncio.gather(*(self._store_kpi_value(kpi_value, user_id) for kpi_value in kpi_values))
+
     async def _store_dashboard(self, dashboard: KPIDashboard, user_id: str):
         """Store dashboard configuration"""
         try:
@@ -1165,6 +1275,10 @@ class KPIEngine:
     async def _get_latest_kpi_value(self, user_id: str, kpi_id: str) -> Optional[KPIValue]:
         """Get latest KPI value"""
         try:
+            graph = self._kpi_graphs.get(user_id)
+            if graph is not None and graph.latest(kpi_id) is not None:
+                return graph.latest(kpi_id)
+
             # This would retrieve latest value from Firebase
             # For now, return mock value
             return KPIValue(
@@ -1221,92 +1335,6 @@ class KPIEngine:
             self.logger.error(f"Error calculating dashboard summary: {e}")
             return {}
 
-    def _calculate_slope(self, x: List[float], y: List[float]) -> float:
-        """Calculate slope for linear regression"""
-        try:
-            if len(x) != len(y) or len(x) < 2:
-                return 0
-
-            n = len(x)
-            sum_x = sum(x)
-            sum_y = sum(y)
-            sum_xy = sum(x[i] * y[i] for i in range(n))
-            sum_x2 = sum(x[i] ** 2 for i in range(n))
-
-            denominator = n * sum_x2 - sum_x ** 2
-            if denominator == 0:
-                return 0
-
-            slope = (n * sum_xy - sum_x * sum_y) / denominator
-            return slope
-
-        except Exception as e:
-            self.logger.error(f"Error calculating slope: {e}")
-            return 0
-
-    def _calculate_r_squared(self, x: List[float], y: List[float], slope: float) -> float:
-        """Calculate R-squared for trend strength"""
-        try:
-            if len(x) != len(y) or len(x) < 2:
-                return 0
-
-            n = len(x)
-            y_mean = statistics.mean(y)
-
-            # Calculate predicted values
-            y_pred = [slope * xi for xi in x]
-
-            # Calculate R-squared
-            ss_tot = sum((yi - y_mean) ** 2 for yi in y)
-            ss_res = sum((yi - y_pred[i]) ** 2 for i, yi in enumerate(y))
-
-            if ss_tot == 0:
-                return 1.0
-
-            r_squared = 1 - (ss_res / ss_tot)
-            return max(0, min(1, r_squared))
-
-        except Exception as e:
-            self.logger.error(f"Error calculating R-squared: {e}")
-            return 0
-
-    def _forecast_next_value(self, values: List[float]) -> float:
-        """Simple forecast for next period"""
-        try:
-            if len(values) < 2:
-                return values[-1] if values else 0
-
-            # Simple linear forecast
-            recent_trend = values[-1] - values[-2] if len(values) >= 2 else 0
-            forecast = values[-1] + recent_trend
-
-            return max(0, forecast)  # Ensure non-negative for most KPIs
-
-        except Exception as e:
-            self.logger.error(f"Error forecasting next value: {e}")
-            return 0
-
-    def _detect_seasonality(self, values: List[float]) -> bool:
-        """Simple seasonality detection"""
-        try:
-            if len(values) < 12:
-                return False
-
-            # Simple check: compare first half with second half
-            mid_point = len(values) // 2
-            first_half_avg = statistics.mean(values[:mid_point])
-            second_half_avg = statistics.mean(values[mid_point:])
-
-            # If there's a significant pattern difference, assume seasonality
-            difference = abs(first_half_avg - second_half_avg)
-            avg_value = statistics.mean(values)
-
-            return (difference / avg_value) > 0.2 if avg_value != 0 else False
-
-        except Exception as e:
-            self.logger.error(f"Error detecting seasonality: {e}")
-            return False
-
     async def _generate_trend_insights(
         self,
         kpi_id: str,
@@ -1372,37 +1400,18 @@ class KPIEngine:
         user_id: str,
         kpi_id: str,
         days: int
-    ) -> List[KPIValue]:
-        """Get historical KPI values"""
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get historical KPI values: the last value of each UTC day over the
+        past days, as (day start timestamps, values) arrays
+        """
         try:
-            # This would retrieve historical values from Firebase
-            # For now, return mock data
-            mock_values = []
-            for i in range(days):
-                value = KPIValue(
-                    kpi_id=kpi_id,
-                    value=100 + (i * 2) + (i % 3 * 5),  # Some variation
-                    previous_value=None,
-                    target_value=100,
-                    achievement_rate=100,
-                    trend=KPITrend.STABLE,
-                    status=KPIStatus.GOOD,
-                    variance=0,
-                    variance_percentage=0,
-                    confidence_level=0.9,
-                    data_quality_score=90,
-                    calculation_timestamp=datetime.now(timezone.utc) - timedelta(days=i),
-                    period_start=datetime.now(timezone.utc) - timedelta(days=i+1),
-                    period_end=datetime.now(timezone.utc) - timedelta(days=i),
-                    metadata={}
-                )
-                mock_values.append(value)
-
-            return mock_values
+            end = datetime.now(timezone.utc).timestamp()
+            return self.kpi_history.rollup(user_id, kpi_id, "daily", start=end - days * 86400, end=end)
 
         except Exception as e:
             self.logger.error(f"Error getting historical KPI values: {e}")
-            return []
+            return np.empty(0), np.empty(0)
 
     async def _validate_kpi_definition(self, kpi_def: Dict[str, Any]) -> Dict[str, Any]:
         """Validate KPI definition"""
@@ -0,0 +1,124 @@
+"""
+Incremental KPI evaluation state
+Tracks the source datasets each KPI reads, a version per dataset, a
+fingerprint of each KPI's definition, and the KPI values computed per
+(kpi_id, timeframe, period_end), so a refresh only recomputes the KPIs whose
+datasets or definition changed since their value was computed.
+"""
+
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+DEFAULT_MAX_MEMOIZED = 4096
+
+MemoKey = Tuple[str, str, datetime]  # (kpi_id, timeframe, period_end)
+SourceVersions = Tuple[Hashable, Tuple[Tuple[str, int], ...]]  # (definition fingerprint, dataset versions)
+
+
+class KPIDependencyGraph:
+    """
+    Bipartite graph from KPIs to the datasets they are computed from
+
+    A memoized value records the versions of its KPI's datasets at the
+    time its computation started; it is served until any of those datasets
+    is marked changed or the KPI is registered with other sources or a
+    different definition fingerprint. Memoized values
+    are evicted least recently used beyond max_memoized.
+    """
+
+    def __init__(self, max_memoized: int = DEFAULT_MAX_MEMOIZED):
+        self.max_memoized = max_memoized
+
+        self._kpi_sources: Dict[str, FrozenSet[str]] = {}
+        self._kpi_fingerprints: Dict[str, Hashable] = {}
+        self._dataset_kpis: Dict[str, Set[str]] = defaultdict(set)
+        self._dataset_versions: Dict[str, int] = defaultdict(int)
+        self._memo: "OrderedDict[MemoKey, Tuple[Any, SourceVersions]]" = OrderedDict()
+        self._latest: Dict[str, Any] = {}  # kpi_id -> most recently computed value
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._memo)
+
+    def register(self, kpi_id: str, datasets: Iterable[str], fingerprint: Hashable = None):
+        """
+        Set the datasets a KPI reads and a fingerprint of the rest of its
+        definition (formula, targets) that its values depend on
+        """
+        self._kpi_fingerprints[kpi_id] = fingerprint
+        sources = frozenset(datasets)
+        previous = self._kpi_sources.get(kpi_id)
+        if previous == sources:
+            return
+        for dataset in previous or ():
+            self._dataset_kpis[dataset].discard(kpi_id)
+        for dataset in sources:
+            self._dataset_kpis[dataset].add(kpi_id)
+        self._kpi_sources[kpi_id] = sources
+
+    def sources(self, kpi_id: str) -> FrozenSet[str]:
+        return self._kpi_sources.get(kpi_id, frozenset())
+
+    def dependents(self, dataset: str) -> Set[str]:
+        """KPIs computed from a dataset"""
+        return set(self._dataset_kpis.get(dataset, ()))
+
+    def mark_changed(self, *datasets: str) -> Set[str]:
+        """Invalidate the values computed from datasets; returns the KPIs affected"""
+        affected = set()
+        for dataset in datasets:
+            self._dataset_versions[dataset] += 1
+            affected |= self._dataset_kpis.get(dataset, set())
+        return affected
+
+    def versions(self, kpi_id: str) -> SourceVersions:
+        """
+        Current definition fingerprint and dataset versions of a KPI; take
+        them before computing its value
+        """
+        return (
+            self._kpi_fingerprints.get(kpi_id),
+            tuple(sorted((dataset, self._dataset_versions[dataset]) for dataset in self.sources(kpi_id)))
+        )
+
+    def lookup(self, kpi_id: str, timeframe: str, period_end: datetime) -> Optional[Any]:
+        """Memoized value, if neither its datasets nor its definition changed since it was computed"""
+        key = (kpi_id, timeframe, period_end)
+        entry = self._memo.get(key)
+        if entry is not None:
+            value, versions = entry
+            if versions == self.versions(kpi_id):
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._memo[key]
+        self.misses += 1
+        return None
+
+    def store(self, kpi_id: str, timeframe: str, period_end: datetime, value: Any, versions: SourceVersions):
+        """Memoize a value computed from the given definition and dataset versions"""
+        key = (kpi_id, timeframe, period_end)
+        self._memo[key] = (value, versions)
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_memoized:
+            self._memo.popitem(last=False)
+        self._latest[kpi_id] = value
+
+    def latest(self, kpi_id: str) -> Optional[Any]:
+        """Most recently computed value of a KPI, for any period"""
+        return self._latest.get(kpi_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "kpis": len(self._kpi_sources),
+            "datasets": len(self._dataset_kpis),
+            "memoized": len(self._memo),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+__all__ = ["KPIDependencyGraph"]
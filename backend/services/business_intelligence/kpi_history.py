@@ -0,0 +1,399 @@
+"""
+Columnar history of KPI observations
+Stores (timestamp, value) observations per (user, KPI) as float64 columns in
+fixed-size memory-mapped segment files, appended in time order, so range
+queries and daily/weekly/monthly rollups over years of values are NumPy
+slices and reductions instead of lists of KPIValue objects. Resident memory
+stays flat: segments are paged in by the OS on access, and only the most
+recently used series keep their segment files mapped.
+
+Several processes may share a directory: appends to a series hold an
+exclusive lock on its lock file and pick up what other processes appended
+before writing.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only safe from one process
+    fcntl = None
+
+DEFAULT_SEGMENT_POINTS = 4096
+DEFAULT_MAX_OPEN_SERIES = 128
+LOCK_FILE_NAME = ".lock"
+
+ROLLUP_FREQUENCIES = ("daily", "weekly", "monthly")
+ROLLUP_AGGREGATES = ("last", "first", "mean", "sum", "min", "max", "count")
+
+_DAY_SECONDS = 86400.0
+_WEEK_SECONDS = 7 * _DAY_SECONDS
+_FIRST_MONDAY = 4 * _DAY_SECONDS  # 1970-01-05
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+class _Segment:
+    """
+    One (2, capacity) float64 block: row 0 timestamps, row 1 values
+
+    Unused slots hold NaN timestamps, so the number of points is recovered
+    from the file itself when it is reopened.
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self.size = 0
+        self.resize()
+
+    def resize(self):
+        """Recover the size after points were written through another mapping"""
+        unused = np.isnan(self.data[0, self.size:])
+        self.size += int(unused.argmax()) if unused.any() else len(unused)
+
+    @property
+    def capacity(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def first(self) -> float:
+        return float(self.data[0, 0])
+
+    @property
+    def last(self) -> float:
+        return float(self.data[0, self.size - 1])
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.data[0, :self.size], self.data[1, :self.size]
+
+
+class _Series:
+    """
+    Segments of one (user, KPI) series, oldest first
+
+    Segment files are numbered in creation order. A file left empty by a
+    crashed writer stays in the list with size 0.
+    """
+
+    def __init__(self, directory: Optional[str], segment_points: int):
+        self.directory = directory
+        self.segment_points = segment_points
+        self.segments: List[_Segment] = []
+        self._next_number = 0
+        self._lock_file = None
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._lock_file = open(os.path.join(directory, LOCK_FILE_NAME), "a+b")
+            self.refresh()
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        for segment in reversed(self.segments):
+            if segment.size:
+                return segment.last
+        return None
+
+    def __len__(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Exclusive lock against appends from other processes"""
+        if self._lock_file is None or fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Pick up points and segment files appended by other processes"""
+        if self.directory is None:
+            return
+        # The newest known segment first: another process fills it before creating the next
+        if self.segments:
+            self.segments[-1].resize()
+        numbers = sorted(
+            int(name[:-4]) for name in os.listdir(self.directory)
+            if name.endswith(".npy") and name[:-4].isdigit()
+        )
+        for number in numbers:
+            if number >= self._next_number:
+                self.segments.append(_Segment(np.load(self._segment_path(number), mmap_mode="r+")))
+                self._next_number = number + 1
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray):
+        position = 0
+        while position < len(timestamps):
+            segment = self.segments[-1] if self.segments else None
+            if segment is None or segment.size == segment.capacity:
+                segment = self._new_segment()
+            count = min(segment.capacity - segment.size, len(timestamps) - position)
+            # Values first: a reader recovers the size from the timestamps
+            segment.data[1, segment.size:segment.size + count] = values[position:position + count]
+            segment.data[0, segment.size:segment.size + count] = timestamps[position:position + count]
+            segment.size += count
+            position += count
+
+    def range(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        timestamp_parts, value_parts = [], []
+        for segment in self.segments:
+            if not segment.size or segment.last < start or segment.first > end:
+                continue
+            timestamps, values = segment.columns()
+            low = np.searchsorted(timestamps, start, side="left")
+            high = np.searchsorted(timestamps, end, side="right")
+            if high > low:
+                timestamp_parts.append(timestamps[low:high])
+                value_parts.append(values[low:high])
+        if not timestamp_parts:
+            return _EMPTY, _EMPTY
+        if len(timestamp_parts) == 1:
+            return np.array(timestamp_parts[0]), np.array(value_parts[0])
+        return np.concatenate(timestamp_parts), np.concatenate(value_parts)
+
+    def flush(self):
+        for segment in self.segments:
+            if isinstance(segment.data, np.memmap):
+                segment.data.flush()
+
+    def close(self):
+        """Flush and unmap the segments and release the lock file"""
+        self.flush()
+        self.segments = []
+        self._next_number = 0
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _new_segment(self) -> _Segment:
+        if self.directory is None:
+            data = np.full((2, self.segment_points), np.nan)
+        else:
+            # Written in full before it is renamed into place, so readers never see unset timestamps
+            path = self._segment_path(self._next_number)
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, np.full((2, self.segment_points), np.nan))
+            os.replace(f"{path}.tmp", path)
+            data = np.load(path, mmap_mode="r+")
+            self._next_number += 1
+        segment = _Segment(data)
+        self.segments.append(segment)
+        return segment
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{number:08d}.npy")
+
+
+class KPIHistoryStore:
+    """
+    Append-only columnar store of KPI observations
+
+    Timestamps are seconds since the epoch (UTC). Observations of a series
+    must be appended in non-decreasing timestamp order; equal timestamps
+    are kept, and the last of them wins in "last" rollups. Without a
+    directory the store lives in memory only.
+
+    On disk, series are opened on first use and the least recently used one
+    is closed once more than max_open_series are open, so the number of
+    mapped files stays bounded however many KPIs are tracked.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        segment_points: int = DEFAULT_SEGMENT_POINTS,
+        persistent: bool = True,
+        max_open_series: Optional[int] = None
+    ):
+        """
+        Args:
+            directory: Root of the segment files; defaults to KPI_HISTORY_DIR or
+                ~/.autoadmin/kpi_history. Series are opened on first use.
+            segment_points: Observations per segment file
+            persistent: False keeps every segment in memory instead of on disk
+            max_open_series: Series kept open on disk; defaults to
+                KPI_HISTORY_MAX_OPEN_SERIES or 128
+        """
+        self.directory = (directory or os.getenv(
+            "KPI_HISTORY_DIR", os.path.join(os.path.expanduser("~"), ".autoadmin", "kpi_history")
+        )) if persistent else None
+        self.segment_points = segment_points
+        self.max_open_series = max_open_series or int(
+            os.getenv("KPI_HISTORY_MAX_OPEN_SERIES", DEFAULT_MAX_OPEN_SERIES)
+        )
+
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.appended = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def append(self, user_id: str, kpi_id: str, timestamp: float, value: float) -> bool:
+        """Record one observation; returns False if it is older than the series' newest"""
+        return self.append_many(user_id, kpi_id, np.array([timestamp], dtype=np.float64), np.array([value])) == 1
+
+    def append_many(self, user_id: str, kpi_id: str, timestamps, values) -> int:
+        """
+        Record observations in time order; ones older than the series'
+        newest observation are dropped. Returns the number recorded.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if timestamps.shape != values.shape or timestamps.ndim != 1:
+            raise ValueError("timestamps and values must be 1-D arrays of the same length")
+
+        with self._lock:
+            series = self._get_series(user_id, kpi_id)
+            with series.locked():
+                series.refresh()
+                newest = series.last_timestamp
+                keep = ~np.isnan(timestamps)
+                if newest is not None:
+                    keep &= timestamps >= newest
+                # Anything behind a running maximum would break the time order
+                keep &= timestamps >= np.fmax.accumulate(np.where(keep, timestamps, -np.inf))
+                accepted = int(keep.sum())
+                self.rejected += len(timestamps) - accepted
+                if accepted:
+                    series.append(timestamps[keep], values[keep])
+                    self.appended += accepted
+            return accepted
+
+    def range(
+        self,
+        user_id: str,
+        kpi_id: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps, values) of the observations with start <= timestamp <= end"""
+        with self._lock:
+            series = self._get_series(user_id, kpi_id)
+            series.refresh()
+            return series.range(-np.inf if start is None else start, np.inf if end is None else end)
+
+    def rollup(
+        self,
+        user_id: str,
+        kpi_id: str,
+        frequency: str = "daily",
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        aggregate: str = "last"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Observations in range aggregated per UTC day, Monday-based week or
+        calendar month
+
+        Returns:
+            (bucket start timestamps, aggregated values), one entry per
+            bucket that has observations
+        """
+        timestamps, values = self.range(user_id, kpi_id, start, end)
+        return downsample(timestamps, values, frequency, aggregate)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(series) for series in self._series.values())
+
+    def flush(self):
+        """Write dirty segment pages to disk"""
+        with self._lock:
+            for series in self._series.values():
+                series.flush()
+
+    def close(self):
+        """Flush and close every open series"""
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "series": len(self._series),
+            "segments": sum(len(series.segments) for series in self._series.values()),
+            "appended": self.appended,
+            "rejected": self.rejected,
+            "evicted": self.evicted
+        }
+
+    def _get_series(self, user_id: str, kpi_id: str) -> _Series:
+        key = (user_id, kpi_id)
+        series = self._series.get(key)
+        if series is not None:
+            self._series.move_to_end(key)
+            return series
+
+        directory = None
+        if self.directory is not None:
+            directory = os.path.join(self.directory, quote(user_id, safe=""), quote(kpi_id, safe=""))
+        series = self._series[key] = _Series(directory, self.segment_points)
+        # In-memory series hold the only copy of their points and are never evicted
+        if self.directory is not None and len(self._series) > self.max_open_series:
+            _, idle = self._series.popitem(last=False)
+            idle.close()
+            self.evicted += 1
+        return series
+
+
+def bucket_starts(timestamps: np.ndarray, frequency: str) -> np.ndarray:
+    """Start of the UTC day/week/month of each timestamp, as epoch seconds"""
+    if frequency == "daily":
+        return timestamps - timestamps % _DAY_SECONDS
+    if frequency == "weekly":
+        return timestamps - (timestamps - _FIRST_MONDAY) % _WEEK_SECONDS
+    if frequency == "monthly":
+        months = timestamps.astype("datetime64[s]").astype("datetime64[M]")
+        return months.astype("datetime64[s]").astype(np.float64)
+    raise ValueError(f"Unknown rollup frequency {frequency!r}; expected one of {ROLLUP_FREQUENCIES}")
+
+
+def downsample(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    frequency: str = "daily",
+    aggregate: str = "last"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Aggregate time-ordered observations per bucket of the given frequency"""
+    if aggregate not in ROLLUP_AGGREGATES:
+        raise ValueError(f"Unknown rollup aggregate {aggregate!r}; expected one of {ROLLUP_AGGREGATES}")
+    if len(timestamps) == 0:
+        return _EMPTY, _EMPTY
+
+    buckets = bucket_starts(timestamps, frequency)
+    # Observations are time ordered, so each bucket is one contiguous run
+    boundaries = np.flatnonzero(np.diff(buckets)) + 1
+    firsts = np.concatenate(([0], boundaries))
+    lasts = np.concatenate((boundaries, [len(buckets)])) - 1
+
+    if aggregate == "last":
+        aggregated = values[lasts]
+    elif aggregate == "first":
+        aggregated = values[firsts]
+    elif aggregate == "sum":
+        aggregated = np.add.reduceat(values, firsts)
+    elif aggregate == "mean":
+        aggregated = np.add.reduceat(values, firsts) / (lasts - firsts + 1)
+    elif aggregate == "min":
+        aggregated = np.minimum.reduceat(values, firsts)
+    elif aggregate == "max":
+        aggregated = np.maximum.reduceat(values, firsts)
+    else:  # count
+        aggregated = (lasts - firsts + 1).astype(np.float64)
+    return buckets[firsts], aggregated
+
+
+__all__ = ["KPIHistoryStore", "bucket_starts", "downsample"]
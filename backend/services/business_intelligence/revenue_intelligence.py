@@ -24,6 +24,7 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from services.firebase_service import get_firebase_service
 from services.hubspot_service import get_hubspot_service
 from agents.base_agent import BaseAgent
+from . import trend_analytics
 
 
 class RevenueType(str, Enum):
@@ -452,62 +453,27 @@ class RevenueIntelligenceEngine:
             raise
 
     def _linear_forecast(self, values: List[float], periods: int) -> float:
-        """Simple linear forecast"""
+        """Least squares trend line projected forward"""
         if len(values) < 2:
             return values[-1] if values else 0
 
-        # Calculate trend
-        changes = [values[i] - values[i-1] for i in range(1, len(values))]
-        avg_change = statistics.mean(changes)
-
-        # Project forward
-        return values[-1] + (avg_change * periods)
+        return float(trend_analytics.linear_forecast(values, periods)[0])
 
     def _exponential_forecast(self, values: List[float], periods: int) -> float:
         """Exponential growth forecast"""
         if len(values) < 2:
             return values[-1] if values else 0
 
-        # Calculate growth rate
-        growth_rates = []
-        for i in range(1, len(values)):
-            if values[i-1] > 0:
-                growth_rates.append((values[i] - values[i-1]) / values[i-1])
-
-        if not growth_rates:
-            return values[-1]
-
-        avg_growth_rate = statistics.mean(growth_rates)
-
-        # Project forward with compound growth
-        last_value = values[-1]
-        for _ in range(periods):
-            last_value *= (1 + avg_growth_rate)
-
-        return last_value
+        # Project forward with the average growth rate compounded
+        return float(trend_analytics.growth_forecast(values, periods)[0])
 
     def _seasonal_forecast(self, values: List[float], periods: int) -> float:
         """Seasonal adjusted forecast"""
-        if len(values) < 12:
+        if len(values) < 24:
             return self._linear_forecast(values, periods)
 
-        # Calculate seasonal factors (simplified)
-        seasonal_factors = []
-        for month in range(12):
-            if month < len(values):
-                # Compare to annual average
-                annual_avg = statistics.mean(values)
-                seasonal_factor = values[month] / annual_avg if annual_avg > 0 else 1
-                seasonal_factors.append(seasonal_factor)
-
-        # Use linear forecast as base and apply seasonal adjustment
-        base_forecast = self._linear_forecast(values, periods)
-
-        # Apply seasonal factor for the target month
-        target_month = (datetime.now().month + periods - 1) % 12
-        seasonal_adjustment = seasonal_factors[target_month] if target_month < len(seasonal_factors) else 1
-
-        return base_forecast * seasonal_adjustment
+        # Trend line plus the average deviation at the same month of the year
+        return float(trend_analytics.seasonal_forecast(values, periods, period=12)[0])
 
     async def _generate_ensemble_forecast(self, forecasts: List[RevenueForecast]) -> RevenueForecast:
         """Generate ensemble forecast from multiple models"""
@@ -0,0 +1,197 @@
+"""
+Shared producers for business intelligence streams
+One producer per (user, stream kind, params) computes a stream payload once
+per refresh interval and fans it out to every subscribed connection, so
+several tabs on the same dashboard share one briefing/KPI pipeline instead
+of each running its own.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Payload fields that change on every computation without carrying news
+VOLATILE_FIELDS = frozenset({"last_updated"})
+
+_MISSING = object()
+
+Compute = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+Update = Tuple[str, Dict[str, Any], int]  # (kind, payload, version); "full", "delta", "heartbeat" or "error"
+
+
+def payload_diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level fields of current that differ from previous, and fields removed"""
+    changed = {key: value for key, value in current.items() if previous.get(key, _MISSING) != value}
+    removed = [key for key in previous if key not in current]
+    return {
+        "changed": changed,
+        "removed": removed,
+        "substantive": bool(removed) or any(key not in VOLATILE_FIELDS for key in changed)
+    }
+
+
+class SharedStreamProducer:
+    """
+    Single-flight producer of one stream's payloads
+
+    A background task computes the payload every refresh interval (the
+    shortest one any subscriber asked for) while at least one subscriber is
+    attached. Subscribers get the full payload first and then, if they opted
+    into deltas, only the fields that changed; a subscriber that fell behind
+    by more than one update gets the full payload again. A computation in
+    which only VOLATILE_FIELDS changed is sent as a heartbeat.
+    """
+
+    def __init__(self, key: Hashable, compute: Compute, on_idle: Optional[Callable[[Hashable], None]] = None):
+        self.key = key
+        self._compute = compute
+        self._on_idle = on_idle
+
+        self._intervals: Dict[int, float] = {}  # subscriber -> requested refresh interval
+        self._next_subscriber = 0
+        self._task: Optional[asyncio.Task] = None
+        self._published = asyncio.Event()
+
+        self.version = 0
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_version = 0
+        self._base_version = 0  # snapshot version a delta update applies to
+        self._update: Optional[Tuple[str, Dict[str, Any]]] = None
+        self.computations = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._intervals)
+
+    @property
+    def refresh_interval(self) -> float:
+        return min(self._intervals.values())
+
+    async def subscribe(self, refresh_interval: float, deltas: bool = False) -> AsyncGenerator[Update, None]:
+        """
+        Updates for one subscriber, until the generator is closed; without
+        deltas every change is sent as the full payload
+        """
+        subscriber = self._next_subscriber
+        self._next_subscriber += 1
+        self._intervals[subscriber] = refresh_interval
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+        try:
+            seen = synced = 0
+            if self.snapshot is not None:
+                seen, synced = self.version, self._snapshot_version
+                yield "full", self.snapshot, synced
+
+            while True:
+                while self.version <= seen:
+                    await self._published.wait()
+                seen = self.version
+                kind, payload = self._update
+
+                if kind == "error" or (kind == "heartbeat" and synced == self._snapshot_version):
+                    yield kind, payload, seen
+                    continue
+                if kind == "delta" and deltas and synced == self._base_version:
+                    yield kind, payload, seen
+                else:
+                    yield "full", self.snapshot, seen
+                synced = self._snapshot_version
+        finally:
+            del self._intervals[subscriber]
+            if not self._intervals:
+                self._stop()
+
+    async def _run(self):
+        while self._intervals:
+            try:
+                data = await self._compute()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error computing stream {self.key}: {e}")
+                self._publish("error", {"error": str(e)})
+            else:
+                if data is not None:
+                    self._publish_data(data)
+            await asyncio.sleep(self.refresh_interval)
+
+    def _publish_data(self, data: Dict[str, Any]):
+        self.computations += 1
+        if self.snapshot is None:
+            update = ("full", data)
+        else:
+            diff = payload_diff(self.snapshot, data)
+            if not diff["substantive"]:
+                # Full payloads sent later carry the new volatile fields
+                self.snapshot = data
+                self._publish("heartbeat", {})
+                return
+            update = ("delta", diff)
+        self._base_version = self._snapshot_version
+        self.snapshot = data
+        self._publish(*update)
+        self._snapshot_version = self.version
+
+    def _publish(self, kind: str, payload: Dict[str, Any]):
+        self.version += 1
+        self._update = (kind, payload)
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def _stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._on_idle:
+            self._on_idle(self.key)
+
+
+class StreamProducerRegistry:
+    """Shared producers by key; a producer is dropped once its last subscriber leaves"""
+
+    def __init__(self):
+        self._producers: Dict[Hashable, SharedStreamProducer] = {}
+
+    def __len__(self) -> int:
+        return len(self._producers)
+
+    async def subscribe(
+        self,
+        key: Hashable,
+        compute: Compute,
+        refresh_interval: float,
+        deltas: bool = False
+    ) -> AsyncGenerator[Update, None]:
+        """
+        Updates of the producer for key, creating it with compute if no
+        connection is subscribed to it yet
+        """
+        producer = self._producers.get(key)
+        if producer is None:
+            producer = SharedStreamProducer(key, compute, on_idle=self._remove)
+            self._producers[key] = producer
+
+        # No await between the lookup and the subscription, so the producer cannot go idle in between
+        updates = producer.subscribe(refresh_interval, deltas)
+        try:
+            async for update in updates:
+                yield update
+        finally:
+            await updates.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "producers": len(self._producers),
+            "subscribers": sum(producer.subscribers for producer in self._producers.values()),
+            "computations": sum(producer.computations for producer in self._producers.values())
+        }
+
+    def _remove(self, key: Hashable):
+        self._producers.pop(key, None)
+
+
+__all__ = ["SharedStreamProducer", "StreamProducerRegistry", "payload_diff"]
@@ -9,13 +9,15 @@ import json
 import logging
 import uuid
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional, AsyncGenerator, Callable
+from typing import Dict, Any, List, Optional, AsyncGenerator, Awaitable, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
 
+from .stream_producers import StreamProducerRegistry
+
 
 class StreamingEventType(str, Enum):
     """Types of streaming events"""
@@ -32,6 +34,10 @@ class StreamingEventType(str, Enum):
     HEARTBEAT = "heartbeat"
 
 
+# Appended to the event type of delta events, e.g. "kpi_update_delta"
+DELTA_EVENT_SUFFIX = "_delta"
+
+
 @dataclass
 class StreamingEvent:
     """Represents a streaming event"""
@@ -41,6 +47,12 @@ class StreamingEvent:
     session_id: Optional[str] = None
     timestamp: Optional[datetime] = None
     metadata: Optional[Dict[str, Any]] = None
+    delta: bool = False  # data holds {changed, removed, substantive} rather than the full payload
+
+    @property
+    def type_name(self) -> str:
+        """Event type as sent to clients"""
+        return self.event_type.value + DELTA_EVENT_SUFFIX if self.delta else self.event_type.value
 
     def to_sse_format(self) -> str:
         """Convert event to Server-Sent Events format"""
@@ -48,7 +60,7 @@ class StreamingEvent:
             self.timestamp = datetime.now(timezone.utc)
 
         event_data = {
-            "type": self.event_type.value,
+            "type": self.type_name,
             "user_id": self.user_id,
             "session_id": self.session_id,
             "timestamp": self.timestamp.isoformat(),
@@ -57,7 +69,7 @@ class StreamingEvent:
         }
 
         sse_lines = [
-            f"event: {self.event_type.value}",
+            f"event: {self.type_name}",
             f"data: {json.dumps(event_data)}",
             "",  # Empty line to mark end of event
         ]
@@ -222,6 +234,9 @@ class BIDataStreamManager:
         # Background tasks
         self.heartbeat_tasks: Dict[str, asyncio.Task] = {}
 
+        # One producer per (user, stream, params), shared by every connection to it
+        self.stream_producers = StreamProducerRegistry()
+
     def set_engines(self, **engines) -> None:
         """Set BI engines for streaming operations"""
         for name, engine in engines.items():
@@ -230,336 +245,237 @@ class BIDataStreamManager:
     async def create_morning_briefing_stream(
         self,
         user_id: str,
-        refresh_interval: int = 30
+        refresh_interval: int = 30,
+        deltas: bool = False
     ) -> AsyncGenerator[str, None]:
         """Create a morning briefing streaming response"""
-        connection_id = f"briefing_{user_id}_{uuid.uuid4().hex[:8]}"
-        self.connection_manager.register_connection(
-            connection_id, user_id, "morning_briefing"
-        )
-
-        try:
-            # Start heartbeat task
-            heartbeat_task = asyncio.create_task(
-                self._send_heartbeat(connection_id, refresh_interval)
+        async def compute() -> Optional[Dict[str, Any]]:
+            if not self.morning_briefing_engine:
+                return None
+
+            # Generate fresh briefing
+            briefing = await self.morning_briefing_engine.generate_morning_briefing(
+                user_id=user_id,
+                date_range=None,
+                include_forecasts=True
             )
-            self.heartbeat_tasks[connection_id] = heartbeat_task
-
-            while True:
-                try:
-                    # Update connection activity
-                    self.connection_manager.update_connection_activity(connection_id)
-
-                    # Generate fresh briefing
-                    if self.morning_briefing_engine:
-                        briefing = await self.morning_briefing_engine.generate_morning_briefing(
-                            user_id=user_id,
-                            date_range=None,
-                            include_forecasts=True
-                        )
-
-                        # Create streaming event
-                        event = StreamingEvent(
-                            event_type=StreamingEventType.MORNING_BRIEFING_UPDATE,
-                            data={
-                                "briefing_id": briefing.id,
-                                "date": briefing.date.isoformat() if hasattr(briefing.date, 'isoformat') else str(briefing.date),
-                                "executive_summary": getattr(briefing, 'executive_summary', {}),
-                                "key_metrics_count": len(getattr(briefing, 'key_metrics', [])),
-                                "alerts_count": len(getattr(briefing, 'alerts', [])),
-                                "opportunities_count": len(getattr(briefing, 'growth_opportunities', [])),
-                                "strategic_priorities": getattr(briefing, 'strategic_priorities', [])
-                            },
-                            user_id=user_id,
-                            session_id=connection_id
-                        )
-
-                        yield event.to_sse_format()
-
-                        # Publish to internal subscribers
-                        await self.connection_manager.publish_event(event)
-
-                    # Wait before next update
-                    await asyncio.sleep(refresh_interval)
-
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    self.logger.error(f"Error in morning briefing stream: {e}")
-
-                    # Send error event
-                    error_event = StreamingEvent(
-                        event_type=StreamingEventType.ERROR,
-                        data={"error": str(e), "context": "morning_briefing_stream"},
-                        user_id=user_id,
-                        session_id=connection_id
-                    )
-                    yield error_event.to_sse_format()
-
-        finally:
-            # Cleanup
-            if connection_id in self.heartbeat_tasks:
-                self.heartbeat_tasks[connection_id].cancel()
-                del self.heartbeat_tasks[connection_id]
+            return {
+                "briefing_id": briefing.id,
+                "date": briefing.date.isoformat() if hasattr(briefing.date, 'isoformat') else str(briefing.date),
+                "executive_summary": getattr(briefing, 'executive_summary', {}),
+                "key_metrics_count": len(getattr(briefing, 'key_metrics', [])),
+                "alerts_count": len(getattr(briefing, 'alerts', [])),
+                "opportunities_count": len(getattr(briefing, 'growth_opportunities', [])),
+                "strategic_priorities": getattr(briefing, 'strategic_priorities', [])
+            }
 
-            self.connection_manager.unregister_connection(connection_id)
+        async for message in self._shared_stream(
+            "morning_briefing", user_id, {}, StreamingEventType.MORNING_BRIEFING_UPDATE, compute, refresh_interval,
+            deltas
+        ):
+            yield message
 
     async def create_kpi_dashboard_stream(
         self,
         dashboard_id: str,
         user_id: str,
-        refresh_interval: int = 60
+        refresh_interval: int = 60,
+        deltas: bool = False
     ) -> AsyncGenerator[str, None]:
         """Create a KPI dashboard streaming response"""
-        connection_id = f"kpi_{user_id}_{dashboard_id}_{uuid.uuid4().hex[:8]}"
-        self.connection_manager.register_connection(
-            connection_id, user_id, "kpi_dashboard",
-            {"dashboard_id": dashboard_id}
-        )
-
-        try:
-            # Start heartbeat task
-            heartbeat_task = asyncio.create_task(
-                self._send_heartbeat(connection_id, refresh_interval)
+        async def compute() -> Optional[Dict[str, Any]]:
+            if not self.kpi_engine:
+                return None
+
+            # Get dashboard data
+            dashboard = await self.kpi_engine.get_kpi_dashboard(
+                user_id=user_id,
+                dashboard_id=dashboard_id,
+                real_time=True
             )
-            self.heartbeat_tasks[connection_id] = heartbeat_task
-
-            while True:
-                try:
-                    # Update connection activity
-                    self.connection_manager.update_connection_activity(connection_id)
-
-                    # Get dashboard data
-                    if self.kpi_engine:
-                        dashboard = await self.kpi_engine.get_kpi_dashboard(
-                            user_id=user_id,
-                            dashboard_id=dashboard_id,
-                            real_time=True
-                        )
-
-                        # Create streaming event
-                        event = StreamingEvent(
-                            event_type=StreamingEventType.KPI_UPDATE,
-                            data={
-                                "dashboard_id": dashboard_id,
-                                "summary": dashboard.get("summary", {}),
-                                "kpi_values": dashboard.get("kpi_values", []),
-                                "last_updated": dashboard.get("last_updated"),
-                                "trend_data": dashboard.get("trend_data", {}),
-                                "alert_count": len(dashboard.get("active_alerts", []))
-                            },
-                            user_id=user_id,
-                            session_id=connection_id,
-                            metadata={"dashboard_id": dashboard_id}
-                        )
-
-                        yield event.to_sse_format()
-
-                        # Publish to internal subscribers
-                        await self.connection_manager.publish_event(event)
-
-                    # Wait before next update
-                    await asyncio.sleep(refresh_interval)
-
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    self.logger.error(f"Error in KPI dashboard stream: {e}")
-
-                    # Send error event
-                    error_event = StreamingEvent(
-                        event_type=StreamingEventType.ERROR,
-                        data={"error": str(e), "context": "kpi_dashboard_stream"},
-                        user_id=user_id,
-                        session_id=connection_id
-                    )
-                    yield error_event.to_sse_format()
-
-        finally:
-            # Cleanup
-            if connection_id in self.heartbeat_tasks:
-                self.heartbeat_tasks[connection_id].cancel()
-                del self.heartbeat_tasks[connection_id]
+            return {
+                "dashboard_id": dashboard_id,
+                "summary": dashboard.get("summary", {}),
+                "kpi_values": dashboard.get("kpi_values", []),
+                "last_updated": dashboard.get("last_updated"),
+                "trend_data": dashboard.get("trend_data", {}),
+                "alert_count": len(dashboard.get("active_alerts", []))
+            }
 
-            self.connection_manager.unregister_connection(connection_id)
+        async for message in self._shared_stream(
+            "kpi_dashboard", user_id, {"dashboard_id": dashboard_id}, StreamingEventType.KPI_UPDATE,
+            compute, refresh_interval, deltas
+        ):
+            yield message
 
     async def create_alerts_stream(
         self,
         user_id: str,
-        refresh_interval: int = 15
+        refresh_interval: int = 15,
+        deltas: bool = False
     ) -> AsyncGenerator[str, None]:
         """Create an alerts streaming response"""
-        connection_id = f"alerts_{user_id}_{uuid.uuid4().hex[:8]}"
-        self.connection_manager.register_connection(
-            connection_id, user_id, "alerts"
-        )
+        async def compute() -> Optional[Dict[str, Any]]:
+            if not self.alert_system:
+                return None
 
-        try:
-            # Start heartbeat task
-            heartbeat_task = asyncio.create_task(
-                self._send_heartbeat(connection_id, refresh_interval)
+            # Get alerts data
+            alerts_data = await self.alert_system.get_active_alerts(
+                user_id=user_id
             )
-            self.heartbeat_tasks[connection_id] = heartbeat_task
-
-            while True:
-                try:
-                    # Update connection activity
-                    self.connection_manager.update_connection_activity(connection_id)
-
-                    # Get alerts data
-                    if self.alert_system:
-                        alerts_data = await self.alert_system.get_active_alerts(
-                            user_id=user_id
-                        )
-
-                        # Create streaming event
-                        event = StreamingEvent(
-                            event_type=StreamingEventType.ALERT_UPDATE,
-                            data={
-                                "active_alerts": alerts_data.get("active_alerts", []),
-                                "alert_count": len(alerts_data.get("active_alerts", [])),
-                                "severity_distribution": alerts_data.get("severity_distribution", {}),
-                                "recent_escalations": alerts_data.get("recent_escalations", [])
-                            },
-                            user_id=user_id,
-                            session_id=connection_id
-                        )
-
-                        yield event.to_sse_format()
-
-                        # Publish to internal subscribers
-                        await self.connection_manager.publish_event(event)
-
-                    # Wait before next update
-                    await asyncio.sleep(refresh_interval)
-
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    self.logger.error(f"Error in alerts stream: {e}")
-
-                    # Send error event
-                    error_event = StreamingEvent(
-                        event_type=StreamingEventType.ERROR,
-                        data={"error": str(e), "context": "alerts_stream"},
-                        user_id=user_id,
-                        session_id=connection_id
-                    )
-                    yield error_event.to_sse_format()
-
-        finally:
-            # Cleanup
-            if connection_id in self.heartbeat_tasks:
-                self.heartbeat_tasks[connection_id].cancel()
-                del self.heartbeat_tasks[connection_id]
+            return {
+                "active_alerts": alerts_data.get("active_alerts", []),
+                "alert_count": len(alerts_data.get("active_alerts", [])),
+                "severity_distribution": alerts_data.get("severity_distribution", {}),
+                "recent_escalations": alerts_data.get("recent_escalations", [])
+            }
 
-            self.connection_manager.unregister_connection(connection_id)
+        async for message in self._shared_stream(
+            "alerts", user_id, {}, StreamingEventType.ALERT_UPDATE, compute, refresh_interval, deltas
+        ):
+            yield message
 
     async def create_executive_dashboard_stream(
         self,
         user_id: str,
-        refresh_interval: int = 30
+        refresh_interval: int = 30,
+        deltas: bool = False
     ) -> AsyncGenerator[str, None]:
         """Create a comprehensive executive dashboard streaming response"""
-        connection_id = f"executive_{user_id}_{uuid.uuid4().hex[:8]}"
-        self.connection_manager.register_connection(
-            connection_id, user_id, "executive_dashboard"
-        )
+        async def compute() -> Dict[str, Any]:
+            # Collect data from all BI modules
+            dashboard_data = {}
 
-        try:
-            # Start heartbeat task
-            heartbeat_task = asyncio.create_task(
-                self._send_heartbeat(connection_id, refresh_interval)
-            )
-            self.heartbeat_tasks[connection_id] = heartbeat_task
+            if self.morning_briefing_engine:
+                try:
+                    briefing = await self.morning_briefing_engine.get_latest_briefing(user_id)
+                    dashboard_data["morning_briefing"] = {
+                        "id": briefing.id,
+                        "date": briefing.date.isoformat() if hasattr(briefing.date, 'isoformat') else str(briefing.date),
+                        "health_score": getattr(briefing, 'health_score', 0)
+                    }
+                except Exception as e:
+                    self.logger.warning(f"Error getting morning briefing: {e}")
 
-            while True:
+            if self.revenue_intelligence_engine:
                 try:
-                    # Update connection activity
-                    self.connection_manager.update_connection_activity(connection_id)
-
-                    # Collect data from all BI modules
-                    dashboard_data = {}
-
-                    if self.morning_briefing_engine:
-                        try:
-                            briefing = await self.morning_briefing_engine.get_latest_briefing(user_id)
-                            dashboard_data["morning_briefing"] = {
-                                "id": briefing.id,
-                                "date": briefing.date.isoformat() if hasattr(briefing.date, 'isoformat') else str(briefing.date),
-                                "health_score": getattr(briefing, 'health_score', 0)
-                            }
-                        except Exception as e:
-                            self.logger.warning(f"Error getting morning briefing: {e}")
-
-                    if self.revenue_intelligence_engine:
-                        try:
-                            revenue_data = await self.revenue_intelligence_engine.get_current_metrics(user_id)
-                            dashboard_data["revenue_metrics"] = {
-                                "current_mrr": getattr(revenue_data, 'current_mrr', 0),
-                                "growth_rate": getattr(revenue_data, 'growth_rate', 0),
-                                "health_status": getattr(revenue_data, 'health_status', 'unknown')
-                            }
-                        except Exception as e:
-                            self.logger.warning(f"Error getting revenue metrics: {e}")
-
-                    if self.kpi_engine:
-                        try:
-                            kpi_summary = await self.kpi_engine.get_kpi_summary(user_id)
-                            dashboard_data["kpi_summary"] = {
-                                "overall_health": getattr(kpi_summary, 'overall_health', 0),
-                                "critical_count": getattr(kpi_summary, 'critical_count', 0),
-                                "healthy_count": getattr(kpi_summary, 'healthy_count', 0)
-                            }
-                        except Exception as e:
-                            self.logger.warning(f"Error getting KPI summary: {e}")
-
-                    if self.alert_system:
-                        try:
-                            alerts = await self.alert_system.get_alert_summary(user_id)
-                            dashboard_data["alerts"] = {
-                                "active_count": getattr(alerts, 'active_count', 0),
-                                "critical_count": getattr(alerts, 'critical_count', 0),
-                                "resolution_rate": getattr(alerts, 'resolution_rate', 0)
-                            }
-                        except Exception as e:
-                            self.logger.warning(f"Error getting alerts summary: {e}")
-
-                    # Create comprehensive streaming event
-                    event = StreamingEvent(
-                        event_type=StreamingEventType.SYSTEM_STATUS,
-                        data={
-                            "dashboard_data": dashboard_data,
-                            "last_updated": datetime.now(timezone.utc).isoformat(),
-                            "data_sources": list(dashboard_data.keys())
-                        },
-                        user_id=user_id,
-                        session_id=connection_id
-                    )
+                    revenue_data = await self.revenue_intelligence_engine.get_current_metrics(user_id)
+                    dashboard_data["revenue_metrics"] = {
+                        "current_mrr": getattr(revenue_data, 'current_mrr', 0),
+                        "growth_rate": getattr(revenue_data, 'growth_rate', 0),
+                        "health_status": getattr(revenue_data, 'health_status', 'unknown')
+                    }
+                except Exception as e:
+                    self.logger.warning(f"Error getting revenue metrics: {e}")
 
-                    yield event.to_sse_format()
+            if self.kpi_engine:
+                try:
+                    kpi_summary = await self.kpi_engine.get_kpi_summary(user_id)
+                    dashboard_data["kpi_summary"] = {
+                        "overall_health": getattr(kpi_summary, 'overall_health', 0),
+                        "critical_count": getattr(kpi_summary, 'critical_count', 0),
+                        "healthy_count": getattr(kpi_summary, 'healthy_count', 0)
+                    }
+                except Exception as e:
+                    self.logger.warning(f"Error getting KPI summary: {e}")
 
-                    # Publish to internal subscribers
-                    await self.connection_manager.publish_event(event)
+            if self.alert_system:
+                try:
+                    alerts = await self.alert_system.get_alert_summary(user_id)
+                    dashboard_data["alerts"] = {
+                        "active_count": getattr(alerts, 'active_count', 0),
+                        "critical_count": getattr(alerts, 'critical_count', 0),
+                        "resolution_rate": getattr(alerts, 'resolution_rate', 0)
+                    }
+                except Exception as e:
+                    self.logger.warning(f"Error getting alerts summary: {e}")
 
-                    # Wait before next update
-                    await asyncio.sleep(refresh_interval)
+            return {
+                "dashboard_data": dashboard_data,
+                "last_updated": datetime.now(timezone.utc).isoformat(),
+                "data_sources": list(dashboard_data.keys())
+            }
 
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    self.logger.error(f"Error in executive dashboard stream: {e}")
+        async for message in self._shared_stream(
+            "executive_dashboard", user_id, {}, StreamingEventType.SYSTEM_STATUS, compute, refresh_interval, deltas
+        ):
+            yield message
 
-                    # Send error event
-                    error_event = StreamingEvent(
+    async def _shared_stream(
+        self,
+        session_type: str,
+        user_id: str,
+        params: Dict[str, Any],
+        event_type: StreamingEventType,
+        compute: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+        refresh_interval: int,
+        deltas: bool = False
+    ) -> AsyncGenerator[str, None]:
+        """
+        Serve one connection from the shared producer of (user, stream, params)
+
+        Every change is sent as the full payload under event_type, unless the
+        connection opted into deltas: then changes after the first payload
+        are sent as {changed, removed, substantive} under event_type plus
+        DELTA_EVENT_SUFFIX. Refreshes that changed nothing but volatile
+        fields are sent as heartbeats.
+        """
+        connection_id = "_".join([session_type, user_id, *map(str, params.values()), uuid.uuid4().hex[:8]])
+        self.connection_manager.register_connection(connection_id, user_id, session_type, params or None)
+        producer_key = (user_id, session_type, tuple(sorted(params.items())))
+
+        async def produce() -> Optional[Dict[str, Any]]:
+            data = await compute()
+            if data is not None:
+                # Publish to internal subscribers once per computation
+                await self.connection_manager.publish_event(StreamingEvent(
+                    event_type=event_type,
+                    data=data,
+                    user_id=user_id,
+                    metadata=dict(params)
+                ))
+            return data
+
+        # Start heartbeat task
+        self.heartbeat_tasks[connection_id] = asyncio.create_task(
+            self._send_heartbeat(connection_id, refresh_interval)
+        )
+        updates = self.stream_producers.subscribe(producer_key, produce, refresh_interval, deltas)
+        try:
+            async for kind, payload, version in updates:
+                self.connection_manager.update_connection_activity(connection_id)
+
+                if kind == "error":
+                    event = StreamingEvent(
                         event_type=StreamingEventType.ERROR,
-                        data={"error": str(e), "context": "executive_dashboard_stream"},
+                        data={**payload, "context": f"{session_type}_stream"},
                         user_id=user_id,
                         session_id=connection_id
                     )
-                    yield error_event.to_sse_format()
+                elif kind == "heartbeat":
+                    event = StreamingEvent(
+                        event_type=StreamingEventType.HEARTBEAT,
+                        data={"connection_id": connection_id},
+                        user_id=user_id,
+                        session_id=connection_id,
+                        metadata={**params, "version": version}
+                    )
+                else:
+                    event = StreamingEvent(
+                        event_type=event_type,
+                        data=payload,
+                        user_id=user_id,
+                        session_id=connection_id,
+                        metadata={**params, "version": version},
+                        delta=kind == "delta"
+                    )
+                yield event.to_sse_format()
 
+        except asyncio.CancelledError:
+            pass
         finally:
+            await updates.aclose()
+
             # Cleanup
             if connection_id in self.heartbeat_tasks:
                 self.heartbeat_tasks[connection_id].cancel()
@@ -616,6 +532,7 @@ class BIDataStreamManager:
         return {
             "connections": self.connection_manager.get_connection_stats(),
             "heartbeat_tasks": len(self.heartbeat_tasks),
+            "producers": self.stream_producers.get_stats(),
             "engines_status": {
                 "morning_briefing": self.morning_briefing_engine is not None,
                 "revenue_intelligence": self.revenue_intelligence_engine is not None,
@@ -663,6 +580,7 @@ async def start_streaming_cleanup_task():
 
 # Export main components
 __all__ = [
+    "DELTA_EVENT_SUFFIX",
     "StreamingEventType",
     "StreamingEvent",
     "StreamingConnectionManager",
@@ -50,7 +50,8 @@ streaming_manager.set_engines(
 @streaming_router.get("/dashboard/{user_id}", summary="Executive Dashboard Stream")
 async def executive_dashboard_stream(
     user_id: str,
-    refresh_interval: int = Query(30, description="Refresh interval in seconds", ge=5, le=300)
+    refresh_interval: int = Query(30, description="Refresh interval in seconds", ge=5, le=300),
+    deltas: bool = Query(False, description="Send changes as <type>_delta events with only the changed fields")
 ) -> StreamingResponse:
     """
     Real-time executive dashboard stream using Server-Sent Events.
@@ -65,6 +66,7 @@ async def executive_dashboard_stream(
     Args:
         user_id: User identifier for personalized data
         refresh_interval: How often to refresh data (5-300 seconds)
+        deltas: Send changes after the first payload as <type>_delta events
 
     Returns:
         StreamingResponse with Server-Sent Events format
@@ -72,7 +74,8 @@ async def executive_dashboard_stream(
     try:
         stream_generator = streaming_manager.create_executive_dashboard_stream(
             user_id=user_id,
-            refresh_interval=refresh_interval
+            refresh_interval=refresh_interval,
+            deltas=deltas
         )
 
         return create_streaming_response(
@@ -91,7 +94,8 @@ async def executive_dashboard_stream(
 @streaming_router.get("/morning-briefing/{user_id}", summary="Morning Briefing Stream")
 async def morning_briefing_stream(
     user_id: str,
-    refresh_interval: int = Query(30, description="Refresh interval in seconds", ge=5, le=300)
+    refresh_interval: int = Query(30, description="Refresh interval in seconds", ge=5, le=300),
+    deltas: bool = Query(False, description="Send changes as <type>_delta events with only the changed fields")
 ) -> StreamingResponse:
     """
     Real-time morning briefing stream using Server-Sent Events.
@@ -106,6 +110,7 @@ async def morning_briefing_stream(
     Args:
         user_id: User identifier for personalized briefings
         refresh_interval: How often to refresh data (5-300 seconds)
+        deltas: Send changes after the first payload as <type>_delta events
 
     Returns:
         StreamingResponse with Server-Sent Events format
@@ -113,7 +118,8 @@ async def morning_briefing_stream(
     try:
         stream_generator = streaming_manager.create_morning_briefing_stream(
             user_id=user_id,
-            refresh_interval=refresh_interval
+            refresh_interval=refresh_interval,
+            deltas=deltas
         )
 
         return create_streaming_response(
@@ -133,7 +139,8 @@ async def morning_briefing_stream(
 async def kpi_dashboard_stream(
     dashboard_id: str,
     user_id: str,
-    refresh_interval: int = Query(60, description="Refresh interval in seconds", ge=5, le=300)
+    refresh_interval: int = Query(60, description="Refresh interval in seconds", ge=5, le=300),
+    deltas: bool = Query(False, description="Send changes as <type>_delta events with only the changed fields")
 ) -> StreamingResponse:
     """
     Real-time KPI dashboard stream using Server-Sent Events.
@@ -149,6 +156,7 @@ async def kpi_dashboard_stream(
         dashboard_id: Unique identifier for the KPI dashboard
         user_id: User identifier for authorization
         refresh_interval: How often to refresh data (5-300 seconds)
+        deltas: Send changes after the first payload as <type>_delta events
 
     Returns:
         StreamingResponse with Server-Sent Events format
@@ -157,7 +165,8 @@ async def kpi_dashboard_stream(
         stream_generator = streaming_manager.create_kpi_dashboard_stream(
             dashboard_id=dashboard_id,
             user_id=user_id,
-            refresh_interval=refresh_interval
+            refresh_interval=refresh_interval,
+            deltas=deltas
         )
 
         return create_streaming_response(
@@ -177,7 +186,8 @@ async def kpi_dashboard_stream(
 async def alerts_stream(
     user_id: str,
     severity_filter: Optional[str] = Query(None, description="Filter by severity level"),
-    refresh_interval: int = Query(15, description="Refresh interval in seconds", ge=5, le=300)
+    refresh_interval: int = Query(15, description="Refresh interval in seconds", ge=5, le=300),
+    deltas: bool = Query(False, description="Send changes as <type>_delta events with only the changed fields")
 ) -> StreamingResponse:
     """
     Real-time alerts stream using Server-Sent Events.
@@ -193,6 +203,7 @@ async def alerts_stream(
         user_id: User identifier for personalized alerts
         severity_filter: Optional filter by severity (critical, error, warning, info)
         refresh_interval: How often to check for new alerts (5-300 seconds)
+        deltas: Send changes after the first payload as <type>_delta events
 
     Returns:
         StreamingResponse with Server-Sent Events format
@@ -200,7 +211,8 @@ async def alerts_stream(
     try:
         stream_generator = streaming_manager.create_alerts_stream(
             user_id=user_id,
-            refresh_interval=refresh_interval
+            refresh_interval=refresh_interval,
+            deltas=deltas
         )
 
         return create_streaming_response(
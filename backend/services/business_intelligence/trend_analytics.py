@@ -0,0 +1,290 @@
+"""
+Batched trend analytics
+Trend fits, smoothing, seasonality detection and forecasts for many series
+at once: every function takes a 2-D matrix with one series per row (a 1-D
+array is treated as a single series) and evaluated at points 0..n-1, and
+returns one result per row, so analysing hundreds of KPIs or revenue series
+is a handful of NumPy operations instead of a Python loop per series.
+Series must be complete (no NaN) and share a length; group them by length
+otherwise.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_SMOOTHING_LEVEL = 0.3
+DEFAULT_SMOOTHING_TREND = 0.1
+DEFAULT_SEASONALITY_THRESHOLD = 0.3  # Minimum autocorrelation of the detrended series at the period
+MIN_SEASONAL_CYCLES = 2
+
+_EPSILON = 1e-12
+
+
+@dataclass
+class LinearTrend:
+    """Ordinary least squares fit value = intercept + slope * t, per series"""
+    slope: np.ndarray
+    intercept: np.ndarray
+    r_squared: np.ndarray
+    mse: np.ndarray  # mean squared residual
+
+    def predict(self, t) -> np.ndarray:
+        return self.intercept + self.slope * t
+
+
+@dataclass
+class Smoothing:
+    """Holt linear exponential smoothing state after the last point, per series"""
+    level: np.ndarray
+    trend: np.ndarray
+    mse: np.ndarray  # mean squared one-step-ahead error
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        return self.level + horizon * self.trend
+
+
+@dataclass
+class Seasonality:
+    """Strongest autocorrelation period of the detrended series, per series"""
+    detected: np.ndarray  # bool
+    period: np.ndarray  # 0 where nothing was detected
+    strength: np.ndarray  # autocorrelation at the period
+
+
+@dataclass
+class EnsembleForecast:
+    """Forecasts of each model and their inverse-error weighted mean, per series"""
+    linear: np.ndarray
+    smoothing: np.ndarray
+    seasonal: np.ndarray
+    ensemble: np.ndarray
+    weights: np.ndarray  # (series, 3): linear, smoothing, seasonal
+
+
+def as_matrix(values) -> np.ndarray:
+    """Series as a float64 (series, points) matrix"""
+    matrix = np.asarray(values, dtype=np.float64)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    if matrix.ndim != 2:
+        raise ValueError("Expected one series or a 2-D matrix of series")
+    return matrix
+
+
+def linear_trend(values) -> LinearTrend:
+    """OLS slope, intercept and R² of each series against t = 0..n-1"""
+    matrix = as_matrix(values)
+    series, points = matrix.shape
+    means = matrix.mean(axis=1) if points else np.zeros(series)
+    if points < 2:
+        zeros = np.zeros(series)
+        return LinearTrend(slope=zeros, intercept=means, r_squared=zeros.copy(), mse=zeros.copy())
+
+    t = np.arange(points, dtype=np.float64)
+    centered_t = t - t.mean()
+    sxx = centered_t @ centered_t
+    slope = (matrix @ centered_t) / sxx  # centered_t sums to 0, so the series mean drops out
+    intercept = means - slope * t.mean()
+
+    total = points * matrix.var(axis=1)
+    explained = slope ** 2 * sxx
+    residual = np.maximum(total - explained, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_squared = np.where(total > _EPSILON, explained / total, 1.0)
+    return LinearTrend(slope=slope, intercept=intercept, r_squared=np.clip(r_squared, 0.0, 1.0), mse=residual / points)
+
+
+def linear_forecast(values, horizon: int = 1) -> np.ndarray:
+    """Value of each series' OLS line horizon points after the last one"""
+    matrix = as_matrix(values)
+    return linear_trend(matrix).predict(matrix.shape[1] - 1 + horizon)
+
+
+def growth_forecast(values, horizon: int = 1) -> np.ndarray:
+    """
+    Last value compounded horizon times by the mean period-over-period
+    growth rate (periods starting at zero or below are skipped)
+    """
+    matrix = as_matrix(values)
+    if matrix.shape[1] < 2:
+        return matrix[:, -1].copy() if matrix.shape[1] else np.zeros(matrix.shape[0])
+
+    previous = matrix[:, :-1]
+    valid = previous > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(valid, (matrix[:, 1:] - previous) / previous, 0.0)
+    counts = valid.sum(axis=1)
+    mean_rate = np.where(counts > 0, rates.sum(axis=1) / np.maximum(counts, 1), 0.0)
+    return matrix[:, -1] * (1 + mean_rate) ** horizon
+
+
+def exponential_smoothing(
+    values,
+    level_weight: float = DEFAULT_SMOOTHING_LEVEL,
+    trend_weight: float = DEFAULT_SMOOTHING_TREND
+) -> Smoothing:
+    """Holt linear exponential smoothing of every series, one vector step per point"""
+    matrix = as_matrix(values)
+    series, points = matrix.shape
+    if points < 2:
+        last = matrix[:, -1].copy() if points else np.zeros(series)
+        return Smoothing(level=last, trend=np.zeros(series), mse=np.zeros(series))
+
+    level = matrix[:, 0].copy()
+    trend = matrix[:, 1] - matrix[:, 0]
+    squared_errors = np.zeros(series)
+    for t in range(1, points):
+        observed = matrix[:, t]
+        predicted = level + trend
+        squared_errors += (observed - predicted) ** 2
+        new_level = level_weight * observed + (1 - level_weight) * predicted
+        trend = trend_weight * (new_level - level) + (1 - trend_weight) * trend
+        level = new_level
+    return Smoothing(level=level, trend=trend, mse=squared_errors / (points - 1))
+
+
+def autocorrelation(values, max_lag: Optional[int] = None) -> np.ndarray:
+    """
+    Autocorrelation of each series at lags 0..max_lag (default n // 2),
+    via FFT; constant series have zero autocorrelation beyond lag 0
+    """
+    matrix = as_matrix(values)
+    points = matrix.shape[1]
+    max_lag = min(points - 1, points // 2 if max_lag is None else max_lag)
+    centered = matrix - matrix.mean(axis=1, keepdims=True)
+
+    size = 1 << max(1, (2 * points - 1).bit_length())  # Zero padding avoids circular overlap
+    spectrum = np.fft.rfft(centered, n=size, axis=1)
+    autocovariance = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :max_lag + 1]
+
+    variance = autocovariance[:, :1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.where(variance > _EPSILON, autocovariance / variance, 0.0)
+    result[:, 0] = 1.0
+    return result
+
+
+def detect_seasonality(
+    values,
+    min_period: int = 2,
+    max_period: Optional[int] = None,
+    threshold: float = DEFAULT_SEASONALITY_THRESHOLD
+) -> Seasonality:
+    """
+    Period of each series: the lag with the highest autocorrelation peak
+    of the linearly detrended series, between min_period and max_period
+    (default: at least MIN_SEASONAL_CYCLES cycles), if it exceeds threshold
+    """
+    matrix = as_matrix(values)
+    series, points = matrix.shape
+    max_period = min(max_period or points // MIN_SEASONAL_CYCLES, points // MIN_SEASONAL_CYCLES)
+    nothing = Seasonality(
+        detected=np.zeros(series, dtype=bool), period=np.zeros(series, dtype=np.int64), strength=np.zeros(series)
+    )
+    if max_period < max(min_period, 2):
+        return nothing
+
+    acf = autocorrelation(_detrend(matrix, linear_trend(matrix)), max_period + 1)
+
+    # Local maxima at lags min_period..max_period
+    center = acf[:, min_period:max_period + 1]
+    peaks = (center > acf[:, min_period - 1:max_period]) & (center >= acf[:, min_period + 1:max_period + 2])
+    candidates = np.where(peaks, center, -np.inf)
+    best = candidates.argmax(axis=1)
+    strength = candidates[np.arange(series), best]
+
+    detected = strength > threshold
+    return Seasonality(
+        detected=detected,
+        period=np.where(detected, best + min_period, 0),
+        strength=np.where(np.isfinite(strength), strength, 0.0)
+    )
+
+
+def seasonal_forecast(
+    values,
+    horizon: int = 1,
+    period: Optional[int] = None,
+    trend: Optional[LinearTrend] = None
+) -> np.ndarray:
+    """
+    OLS line plus the mean detrended value at the same phase of the
+    period; the period is detected per series unless given, and series
+    without one get the plain linear forecast
+    """
+    forecast, _ = _seasonal_fit(as_matrix(values), horizon, period, trend)
+    return forecast
+
+
+def ensemble_forecast(values, horizon: int = 1) -> EnsembleForecast:
+    """
+    Linear, Holt smoothing and seasonal forecasts of every series, and
+    their mean weighted by each model's inverse in-sample squared error
+    """
+    matrix = as_matrix(values)
+    trend = linear_trend(matrix)
+    smoothing = exponential_smoothing(matrix)
+    linear = trend.predict(matrix.shape[1] - 1 + horizon)
+    smoothed = smoothing.forecast(horizon)
+    seasonal, seasonal_mse = _seasonal_fit(matrix, horizon, None, trend)
+
+    errors = np.stack([trend.mse, smoothing.mse, seasonal_mse], axis=1)
+    weights = 1.0 / (errors + _EPSILON)
+    weights /= weights.sum(axis=1, keepdims=True)
+    forecasts = np.stack([linear, smoothed, seasonal], axis=1)
+    return EnsembleForecast(
+        linear=linear,
+        smoothing=smoothed,
+        seasonal=seasonal,
+        ensemble=(forecasts * weights).sum(axis=1),
+        weights=weights
+    )
+
+
+def _detrend(matrix: np.ndarray, trend: LinearTrend) -> np.ndarray:
+    t = np.arange(matrix.shape[1], dtype=np.float64)
+    return matrix - (trend.intercept[:, np.newaxis] + trend.slope[:, np.newaxis] * t)
+
+
+def _seasonal_fit(matrix: np.ndarray, horizon: int, period: Optional[int], trend: Optional[LinearTrend]):
+    """(seasonal forecast, in-sample mean squared error) per series"""
+    series, points = matrix.shape
+    trend = trend or linear_trend(matrix)
+    residuals = _detrend(matrix, trend)
+
+    forecast = trend.predict(points - 1 + horizon)
+    mse = trend.mse.copy()
+    if period is not None:
+        periods = np.full(series, period if points >= MIN_SEASONAL_CYCLES * period else 0)
+    else:
+        periods = detect_seasonality(matrix).period
+
+    for value in np.unique(periods):
+        if value < 2:
+            continue
+        rows = np.flatnonzero(periods == value)
+        phases = np.arange(points) % value
+        indicator = (phases[:, np.newaxis] == np.arange(value)).astype(np.float64)  # (points, period)
+        profile = (residuals[rows] @ indicator) / indicator.sum(axis=0)
+        forecast[rows] += profile[:, (points - 1 + horizon) % value]
+        mse[rows] = ((residuals[rows] - profile[:, phases]) ** 2).mean(axis=1)
+    return forecast, mse
+
+
+__all__ = [
+    "EnsembleForecast",
+    "LinearTrend",
+    "Seasonality",
+    "Smoothing",
+    "as_matrix",
+    "autocorrelation",
+    "detect_seasonality",
+    "ensemble_forecast",
+    "exponential_smoothing",
+    "growth_forecast",
+    "linear_forecast",
+    "linear_trend",
+    "seasonal_forecast"
+]
@@ -9,10 +9,12 @@ import json
 import logging
 import time
 import asyncio
+import weakref
 from typing import Dict, List, Optional, Any, Union
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, asdict
 from pathlib import Path
+import numpy as np
 from google.cloud import firestore
 from firebase_admin import credentials, initialize_app, get_app, auth
 from firebase_admin import firestore as admin_firestore
@@ -20,6 +22,11 @@ from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from google.cloud.firestore import Query
 
+from .firestore_executor import FirestoreExecutor, timed_operation
+from .firestore_batcher import FirestoreWriteBatcher
+from .offline_store import OfflineStore
+from .task_dispatch import get_dispatch_queue, task_message
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -32,6 +39,22 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+# Source datasets fed by each collection: the system the records come
+# from and the KPI categories computed from them
+SOURCE_DATASETS = {
+    'hubspot_contacts': ('hubspot', 'marketing', 'customer_success'),
+    'hubspot_deals': ('hubspot', 'sales', 'financial'),
+    'hubspot_companies': ('hubspot', 'sales', 'customer_success'),
+    'tasks': ('internal_systems', 'operational', 'team'),
+}
+
+
+def shared_file_invalidation_enabled() -> bool:
+    """Whether virtual filesystem writes are published to other workers (VFS_SHARED_INVALIDATION)"""
+    return os.getenv('VFS_SHARED_INVALIDATION', 'false').lower() == 'true'
+
+
 class FirebaseMode(Enum):
     """Firebase service operating mode"""
     ONLINE = "online"
@@ -153,6 +176,7 @@ class AgentFile:
     path: str
     content: str
     last_modified: Optional[datetime] = None
+    size: int = 0
 
 @dataclass
 class HubSpotContact:
@@ -215,7 +239,10 @@ class FirebaseService:
     _retry_count = 0
     _max_retries = 5
     _retry_delays = [1, 2, 5, 10, 30]  # seconds
-    _offline_storage = {}  # In-memory offline storage
+    _offline_storage = None  # Persistent offline store, opened on first use
+    _executor = None  # Thread pool for blocking Firestore calls
+    _writer = None  # Coalesces document writes into WriteBatches
+    _data_listeners: List[weakref.WeakMethod] = []  # Notified of source dataset writes
     _health_status = {"last_check": None, "consecutive_failures": 0}
 
     def __new__(cls):
@@ -333,8 +360,11 @@ class FirebaseService:
             'test': True
         }
 
-        test_doc.set(test_data)
-        test_doc.delete()
+        def probe():
+            test_doc.set(test_data)
+            test_doc.delete()
+
+        await self.executor.run("test_connection", probe)
 
     async def _fallback_to_offline_mode(self, reason: str):
         """Fallback to offline mode with proper setup"""
@@ -385,6 +415,33 @@ class FirebaseService:
         """Check if service is offline"""
         return self._mode in [FirebaseMode.OFFLINE, FirebaseMode.DEGRADED]
 
+    @property
+    def executor(self) -> FirestoreExecutor:
+        """Get the bounded executor that runs blocking Firestore calls"""
+        if FirebaseService._executor is None:
+            FirebaseService._executor = FirestoreExecutor()
+        return FirebaseService._executor
+
+    @property
+    def offline_store(self) -> OfflineStore:
+        """Get the persistent store used while Firebase is offline"""
+        if FirebaseService._offline_storage is None:
+            FirebaseService._offline_storage = OfflineStore()
+        return FirebaseService._offline_storage
+
+    @property
+    def writer(self) -> FirestoreWriteBatcher:
+        """Get the write batcher used for coalesced document writes"""
+        if FirebaseService._writer is None:
+            FirebaseService._writer = FirestoreWriteBatcher(self)
+        return FirebaseService._writer
+
+    def get_operation_metrics(self) -> Dict[str, Any]:
+        """Get executor usage, per-operation latency histograms and write batching"""
+        metrics = self.executor.get_metrics()
+        metrics["write_batching"] = self.writer.get_metrics()
+        return metrics
+
     @property
     def db(self) -> admin_firestore.client:
         """Get Firestore client with fallback handling"""
@@ -397,13 +454,19 @@ class FirebaseService:
         return self._db
 
     async def safe_firestore_operation(self, operation_name: str, operation_func):
-        """Execute a Firestore operation with error handling and recovery"""
+        """
+        Execute a Firestore operation with error handling and recovery
+        Plain functions run on the Firestore executor so their blocking
+        client calls stay off the event loop
+        """
         if not self.is_online:
             logger.info(f"Skipping {operation_name} - Firebase is offline")
             return None
 
         try:
-            return await operation_func()
+            if asyncio.iscoroutinefunction(operation_func):
+                return await operation_func()
+            return await self.executor.run(operation_name, operation_func)
         except Exception as e:
             logger.error(f"Firestore operation '{operation_name}' failed: {str(e)}")
             self._health_status["consecutive_failures"] += 1
@@ -415,7 +478,15 @@ class FirebaseService:
 
             raise
 
+    async def offline_operation(self, operation_name: str, operation_func, *args):
+        """
+        Run offline store calls on the Firestore executor, so SQLite disk
+        I/O stays off the event loop in offline mode too
+        """
+        return await self.executor.run(operation_name, operation_func, *args)
+
     # Task Management Methods with Enhanced Offline Support
+    @timed_operation("create_task")
     async def create_task(self, task_data: Dict[str, Any]) -> Task:
         """Create a new task with offline support"""
         try:
@@ -430,17 +501,18 @@ class FirebaseService:
                 offline_task_data['updated_at'] = None
 
                 # Store in offline storage
-                self._offline_storage[f"task_{task_id}"] = {
-                    'data': offline_task_data,
-                    'created_at': datetime.now(),
-                    'operation': 'create_task'
-                }
+                await self.offline_operation(
+                    "create_task", self.offline_store.put, f"task_{task_id}", 'create_task', offline_task_data
+                )
 
                 logger.info(f"Created task {task_id} in offline mode")
-                return Task(**offline_task_data)
+                task = Task(**offline_task_data)
+                await self._dispatch_task(task)
+                self._notify_data_changed(*SOURCE_DATASETS['tasks'])
+                return task
 
             # Online mode - use Firestore with safe operation
-            async def create_operation():
+            def create_operation():
                 task_data['created_at'] = admin_firestore.SERVER_TIMESTAMP
                 task_data['updated_at'] = None
 
@@ -450,7 +522,10 @@ class FirebaseService:
                 task_data['id'] = task_id
                 return Task(**task_data)
 
-            return await self.safe_firestore_operation("create_task", create_operation)
+            task = await self.safe_firestore_operation("create_task", create_operation)
+            await self._dispatch_task(task)
+            self._notify_data_changed(*SOURCE_DATASETS['tasks'])
+            return task
 
         except Exception as e:
             logger.error(f"Error creating task: {str(e)}")
@@ -462,21 +537,31 @@ class FirebaseService:
             logger.warning(f"Task created in fallback offline mode: {fallback_task_data['id']}")
             return Task(**fallback_task_data)
 
+    async def _dispatch_task(self, task: Task):
+        """Push a new pending task to agents of its type"""
+        if task.status != 'pending':
+            return
+        try:
+            await get_dispatch_queue().publish(task.agent_type, task_message(task))
+        except Exception as e:
+            # Agents still pick the task up from the pending backlog on start
+            logger.warning(f"Failed to dispatch task {task.id}: {str(e)}")
+
+    @timed_operation("get_task")
     async def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID with offline support"""
         try:
             # Check offline storage first if offline
             if self.is_offline:
-                offline_key = f"task_{task_id}"
-                if offline_key in self._offline_storage:
-                    offline_data = self._offline_storage[offline_key]['data']
+                item = await self.offline_operation("get_task", self.offline_store.get, f"task_{task_id}")
+                if item is not None:
                     logger.info(f"Retrieved task {task_id} from offline storage")
-                    return Task(**offline_data)
+                    return Task(**item['data'])
                 logger.info(f"Task {task_id} not found in offline storage")
                 return None
 
             # Online mode - use Firestore
-            async def get_operation():
+            def get_operation():
                 doc_ref = self.db.collection('tasks').document(task_id)
                 doc = doc_ref.get()
 
@@ -492,23 +577,28 @@ class FirebaseService:
             logger.error(f"Error getting task {task_id}: {str(e)}")
             return None
 
+    @timed_operation("update_task_status")
     async def update_task_status(self, task_id: str, status: str) -> Optional[Task]:
         """Update task status with offline support"""
         try:
             if self.is_offline:
                 # Update in offline storage
-                offline_key = f"task_{task_id}"
-                if offline_key in self._offline_storage:
-                    self._offline_storage[offline_key]['data']['status'] = status
-                    self._offline_storage[offline_key]['data']['updated_at'] = datetime.now()
+                item = await self.offline_operation(
+                    "update_task_status", self.offline_store.update,
+                    f"task_{task_id}", {'status': status, 'updated_at': datetime.now()}
+                )
+                if item is not None:
                     logger.info(f"Updated task {task_id} status in offline mode")
-                    return Task(**self._offline_storage[offline_key]['data'])
+                    task = Task(**item['data'])
                 else:
                     logger.warning(f"Task {task_id} not found in offline storage for update")
                     return None
+                await self._discard_dispatched_task(task)
+                self._notify_data_changed(*SOURCE_DATASETS['tasks'])
+                return task
 
             # Online mode - use Firestore
-            async def update_operation():
+            def update_operation():
                 doc_ref = self.db.collection('tasks').document(task_id)
 
                 update_data = {
@@ -524,29 +614,53 @@ class FirebaseService:
 
                 return Task(**task_data)
 
-            return await self.safe_firestore_operation("update_task_status", update_operation)
+            task = await self.safe_firestore_operation("update_task_status", update_operation)
+            await self._discard_dispatched_task(task)
+            if task is not None:
+                self._notify_data_changed(*SOURCE_DATASETS['tasks'])
+            return task
 
         except Exception as e:
             logger.error(f"Error updating task status: {str(e)}")
             return None
 
-    async def get_tasks_by_agent_type(self, agent_type: str) -> List[Task]:
-        """Get tasks by agent type with offline support"""
+    async def _discard_dispatched_task(self, task: Optional[Task]):
+        """Drop a task that is no longer pending from its agent type's dispatch queue"""
+        if task is None or task.status == 'pending':
+            return
+        try:
+            await get_dispatch_queue().discard(task.agent_type, task.id)
+        except Exception as e:
+            # The status write already succeeded; a queue failure must not report it as failed
+            logger.warning(f"Failed to discard dispatched task {task.id}: {str(e)}")
+
+    @timed_operation("get_tasks_by_agent_type")
+    async def get_tasks_by_agent_type(
+        self,
+        agent_type: str,
+        status: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Task]:
+        """Get tasks by agent type, optionally only those with a status, with offline support"""
         try:
             if self.is_offline:
-                # Return tasks from offline storage
-                offline_tasks = []
-                for key, value in self._offline_storage.items():
-                    if key.startswith('task_') and value['data'].get('agent_type') == agent_type:
-                        offline_tasks.append(Task(**value['data']))
+                # Return tasks from offline storage (indexed by agent type and status)
+                rows = await self.offline_operation(
+                    "get_tasks_by_agent_type",
+                    lambda: self.offline_store.query_tasks(agent_type=agent_type, status=status, limit=limit)
+                )
+                offline_tasks = [Task(**data) for data in rows]
                 logger.info(f"Retrieved {len(offline_tasks)} tasks for agent {agent_type} from offline storage")
                 return offline_tasks
 
-            # Online mode - use Firestore
-            async def query_operation():
-                query = (self.db.collection('tasks')
-                        .where('agent_type', '==', agent_type)
-                        .order_by('created_at', direction=Query.DESCENDING))
+            # Online mode - use Firestore (agent_type, status, created_at index)
+            def query_operation():
+                query = self.db.collection('tasks').where('agent_type', '==', agent_type)
+                if status is not None:
+                    query = query.where('status', '==', status)
+                query = query.order_by('created_at', direction=Query.DESCENDING)
+                if limit is not None:
+                    query = query.limit(limit)
 
                 docs = query.stream()
                 tasks = []
@@ -565,14 +679,29 @@ class FirebaseService:
             return []
 
     # Graph Memory Methods
+    @timed_operation("add_node")
     async def add_node(self, node_data: Dict[str, Any]) -> GraphNode:
         """Add a node to the graph memory"""
         try:
+            if self.is_offline:
+                import uuid
+                offline_node_data = node_data.copy()
+                offline_node_data['id'] = offline_node_data.get('id') or str(uuid.uuid4())
+                offline_node_data['created_at'] = datetime.now()
+                offline_node_data['updated_at'] = None
+
+                await self.offline_operation(
+                    "add_node", self.offline_store.put, f"node_{offline_node_data['id']}", 'add_node', offline_node_data
+                )
+
+                logger.info(f"Added node {offline_node_data['id']} in offline mode")
+                return GraphNode(**offline_node_data)
+
             node_data['created_at'] = admin_firestore.SERVER_TIMESTAMP
             node_data['updated_at'] = None
 
             doc_ref = self.db.collection('nodes').document()
-            doc_ref.set(node_data)
+            await self.executor.run("add_node", doc_ref.set, node_data)
 
             node_data['id'] = doc_ref.id
             return GraphNode(**node_data)
@@ -581,60 +710,179 @@ class FirebaseService:
             logger.error(f"Error adding node: {str(e)}")
             raise
 
+    @timed_operation("add_edge")
     async def add_edge(self, edge_data: Dict[str, Any]) -> GraphEdge:
         """Add an edge to the graph"""
+        edges = await self.batch_create_edges([edge_data])
+        return edges[0]
+
+    @timed_operation("batch_create_edges")
+    async def batch_create_edges(self, edges_data: List[Dict[str, Any]]) -> List[GraphEdge]:
+        """Create multiple edges, in Firestore batches of up to 500 writes"""
+        try:
+            if self.is_offline:
+                import uuid
+                edges = []
+                queued = []
+                for edge_data in edges_data:
+                    offline_edge_data = {
+                        'source_id': edge_data['source_id'],
+                        'target_id': edge_data['target_id'],
+                        'relation': edge_data['relation'],
+                        'created_at': datetime.now()
+                    }
+                    edge_key = f"edge_{edge_data['source_id']}_{edge_data['target_id']}_{edge_data['relation']}"
+                    # Document id fixed when queued, so every sync attempt writes the same edge
+                    queued.append((edge_key, {**offline_edge_data, 'id': str(uuid.uuid4())}))
+                    edges.append(GraphEdge(**offline_edge_data))
+
+                def store_operation():
+                    for edge_key, data in queued:
+                        self.offline_store.put(edge_key, 'add_edge', data)
+
+                await self.offline_operation("batch_create_edges", store_operation)
+
+                logger.info(f"Added {len(edges)} edges in offline mode")
+                return edges
+
+            edges = []
+            for start in range(0, len(edges_data), 500):
+                batch = self.db.batch()
+
+                for edge_data in edges_data[start:start + 500]:
+                    edge_doc = {
+                        'source_id': edge_data['source_id'],
+                        'target_id': edge_data['target_id'],
+                        'relation': edge_data['relation'],
+                        'created_at': admin_firestore.SERVER_TIMESTAMP
+                    }
+                    batch.set(self.db.collection('edges').document(), edge_doc)
+                    edges.append(GraphEdge(**edge_doc))
+
+                await self.executor.run("batch_create_edges", batch.commit)
+
+            return edges
+
+        except Exception as e:
+            logger.error(f"Error adding edges: {str(e)}")
+            raise
+
+    @timed_operation("get_graph_edges")
+    async def get_graph_edges(self) -> List[Dict[str, Any]]:
+        """Get all graph edges"""
+        try:
+            if self.is_offline:
+                return await self.offline_operation("get_graph_edges", self.offline_store.list_kind, 'edge')
+
+            def query_operation():
+                edges = []
+                for doc in self.db.collection('edges').stream():
+                    edge_data = doc.to_dict()
+                    edge_data['id'] = doc.id
+                    edges.append(edge_data)
+                return edges
+
+            return await self.executor.run("get_graph_edges", query_operation)
+
+        except Exception as e:
+            logger.error(f"Error getting graph edges: {str(e)}")
+            raise
+
+    @timed_operation("get_graph_nodes")
+    async def get_graph_nodes(self, node_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get all graph nodes, optionally filtered by type"""
         try:
-            edge_data['created_at'] = admin_firestore.SERVER_TIMESTAMP
+            if self.is_offline:
+                return await self.offline_operation(
+                    "get_graph_nodes", lambda: self.offline_store.list_kind('node', node_type=node_type)
+                )
+
+            query = self.db.collection('nodes')
+            if node_type:
+                query = query.where('type', '==', node_type)
+
+            def query_operation():
+                nodes = []
+                for doc in query.stream():
+                    node_data = doc.to_dict()
+                    node_data['id'] = doc.id
+                    nodes.append(node_data)
+                return nodes
+
+            return await self.executor.run("get_graph_nodes", query_operation)
+
+        except Exception as e:
+            logger.error(f"Error getting graph nodes: {str(e)}")
+            raise
+
+    @timed_operation("count_graph_nodes")
+    async def count_graph_nodes(self) -> int:
+        """Get the number of graph nodes, as a count aggregation when online"""
+        try:
+            if self.is_offline:
+                return await self.offline_operation("count_graph_nodes", self.offline_store.count_kind, 'node')
 
-            doc_ref = self.db.collection('edges').document()
-            doc_ref.set(edge_data)
+            def count_operation():
+                return int(self.db.collection('nodes').count().get()[0][0].value)
 
-            edge_data['id'] = doc_ref.id
-            return GraphEdge(**edge_data)
+            return await self.executor.run("count_graph_nodes", count_operation)
 
         except Exception as e:
-            logger.error(f"Error adding edge: {str(e)}")
+            logger.error(f"Error counting graph nodes: {str(e)}")
             raise
 
-    async def query_graph(self, query_embedding: List[float], match_threshold: float = 0.7) -> List[Dict[str, Any]]:
+    @timed_operation("query_graph")
+    async def query_graph(
+        self,
+        query_embedding: List[float],
+        match_threshold: float = 0.7,
+        max_results: int = 10
+    ) -> List[Dict[str, Any]]:
         """
         Query graph using vector similarity
-        This would typically call a Firebase Cloud Function for vector search
+        Scans stored node embeddings; agents should prefer the local VectorIndex
+        kept by GraphMemory and use this as the remote fallback
         """
         try:
-            # For now, implement a simple search
-            # In production, this should call a vector search function
-
-            query = (self.db.collection('nodes')
-                    .where('embedding', '!=', None)
-                    .limit(10))
-
-            docs = query.stream()
-            results = []
-
-            for doc in docs:
-                node_data = doc.to_dict()
-                node_data['id'] = doc.id
-
-                # Simple similarity calculation (replace with proper implementation)
-                if 'embedding' in node_data and node_data['embedding']:
-                    # Placeholder similarity calculation
-                    similarity = 0.8  # This should be calculated properly
-                    if similarity >= match_threshold:
-                        results.append({
-                            'id': doc.id,
-                            'content': node_data.get('content', ''),
-                            'type': node_data.get('type', ''),
-                            'similarity': similarity
-                        })
-
-            return results
+            nodes = [node for node in await self.get_graph_nodes() if node.get('embedding')]
+            if not nodes or not query_embedding:
+                return []
+
+            def rank_operation():
+                query_vector = np.asarray(query_embedding, dtype=np.float32)
+                candidates = [node for node in nodes if len(node['embedding']) == query_vector.shape[0]]
+                if not candidates:
+                    return []
+
+                matrix = np.asarray([node['embedding'] for node in candidates], dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+                norms[norms == 0] = 1.0
+                similarities = (matrix @ query_vector) / norms
+
+                k = min(max_results, len(candidates))
+                top = np.argpartition(-similarities, k - 1)[:k]
+                top = top[np.argsort(-similarities[top])]
+
+                return [
+                    {
+                        'id': candidates[i]['id'],
+                        'content': candidates[i].get('content', ''),
+                        'type': candidates[i].get('type', ''),
+                        'similarity': float(similarities[i])
+                    }
+                    for i in top
+                    if similarities[i] >= match_threshold
+                ]
+
+            # The similarity scan is CPU-bound, so it runs off the event loop too
+            return await self.executor.run("query_graph", rank_operation)
 
         except Exception as e:
             logger.error(f"Error querying graph: {str(e)}")
             raise
 
     # Virtual Filesystem Methods with Offline Support
+    @timed_operation("store_agent_file")
     async def store_agent_file(self, path: str, content: str) -> AgentFile:
         """Store a file in the virtual filesystem with offline support"""
         try:
@@ -643,14 +891,15 @@ class FirebaseService:
                 offline_file_data = {
                     'path': path,
                     'content': content,
-                    'last_modified': datetime.now()
+                    'last_modified': datetime.now(),
+                    'size': len(content.encode('utf-8'))
                 }
 
-                self._offline_storage[f"file_{path}"] = {
-                    'data': offline_file_data,
-                    'created_at': datetime.now(),
-                    'operation': 'store_agent_file'
-                }
+                def store_operation():
+                    self.offline_store.delete(f"delete_file_{path}")
+                    self.offline_store.put(f"file_{path}", 'store_agent_file', offline_file_data)
+
+                await self.offline_operation("store_agent_file", store_operation)
 
                 logger.info(f"Stored agent file {path} in offline mode")
                 return AgentFile(**offline_file_data)
@@ -660,11 +909,21 @@ class FirebaseService:
                 file_data = {
                     'path': path,
                     'content': content,
-                    'last_modified': admin_firestore.SERVER_TIMESTAMP
+                    'last_modified': admin_firestore.SERVER_TIMESTAMP,
+                    'size': len(content.encode('utf-8'))
                 }
 
-                doc_ref = self.db.collection('agent_files').document(path)
-                doc_ref.set(file_data)
+                # Concurrent file writes are committed together; last_modified becomes the commit time
+                writes = [self.writer.enqueue('agent_files', path, file_data)]
+                if shared_file_invalidation_enabled():
+                    writes.append(self.writer.enqueue('agent_file_versions', path, {
+                        'path': path,
+                        'size': file_data['size'],
+                        'last_modified': admin_firestore.SERVER_TIMESTAMP
+                    }))
+                update_time = (await asyncio.gather(*writes))[0]
+                if update_time is not None:
+                    file_data['last_modified'] = update_time
 
                 return AgentFile(**file_data)
 
@@ -676,26 +935,27 @@ class FirebaseService:
             fallback_file_data = {
                 'path': path,
                 'content': content,
-                'last_modified': datetime.now()
+                'last_modified': datetime.now(),
+                'size': len(content.encode('utf-8'))
             }
             logger.warning(f"Agent file stored in fallback offline mode: {path}")
             return AgentFile(**fallback_file_data)
 
+    @timed_operation("get_agent_file")
     async def get_agent_file(self, path: str) -> Optional[AgentFile]:
         """Get a file from the virtual filesystem with offline support"""
         try:
             # Check offline storage first if offline
             if self.is_offline:
-                offline_key = f"file_{path}"
-                if offline_key in self._offline_storage:
-                    file_data = self._offline_storage[offline_key]['data']
+                item = await self.offline_operation("get_agent_file", self.offline_store.get, f"file_{path}")
+                if item is not None:
                     logger.info(f"Retrieved agent file {path} from offline storage")
-                    return AgentFile(**file_data)
+                    return AgentFile(**item['data'])
                 logger.info(f"Agent file {path} not found in offline storage")
                 return None
 
             # Online mode
-            async def get_operation():
+            def get_operation():
                 doc_ref = self.db.collection('agent_files').document(path)
                 doc = doc_ref.get()
 
@@ -710,44 +970,253 @@ class FirebaseService:
             logger.error(f"Error getting agent file: {str(e)}")
             return None
 
+    @timed_operation("get_agent_file_version")
+    async def get_agent_file_version(self, path: str) -> Optional[datetime]:
+        """
+        Get a file's last_modified timestamp without loading its content,
+        for cheap cache revalidation
+        """
+        try:
+            if self.is_offline:
+                item = await self.offline_operation("get_agent_file_version", self.offline_store.get, f"file_{path}")
+                return item['data'].get('last_modified') if item else None
+
+            def version_operation():
+                doc = self.db.collection('agent_files').document(path).get(field_paths=['last_modified'])
+                return doc.to_dict().get('last_modified') if doc.exists else None
+
+            return await self.safe_firestore_operation("get_agent_file_version", version_operation)
+
+        except Exception as e:
+            logger.error(f"Error getting agent file version: {str(e)}")
+            return None
+
+    def watch_agent_files(self, callback):
+        """
+        Listen for virtual filesystem changes made by any process
+
+        Follows the small per-path documents in agent_file_versions, which
+        writers publish while VFS_SHARED_INVALIDATION is on, from now on;
+        file contents are never downloaded.
+
+        Args:
+            callback: Called as callback(path, file_data) from the Firestore
+                listener thread; file_data is None when the file was removed
+
+        Returns:
+            The Firestore watch (call unsubscribe() to stop), or None if offline
+        """
+        if not self.is_online:
+            logger.info("Skipping agent file watch - Firebase is offline")
+            return None
+
+        def on_snapshot(_docs, changes, _read_time):
+            for change in changes:
+                if change.type.name == 'REMOVED':
+                    continue
+                version = change.document.to_dict() or {}
+                path = version.get('path', change.document.id)
+                if version.get('deleted'):
+                    callback(path, None)
+                else:
+                    callback(path, {
+                        'path': path,
+                        'size': version.get('size', 0),
+                        'last_modified': version.get('last_modified')
+                    })
+
+        query = self.db.collection('agent_file_versions').where(
+            'last_modified', '>=', datetime.now(timezone.utc)
+        )
+        return query.on_snapshot(on_snapshot)
+
+    @timed_operation("list_agent_files")
+    async def list_agent_files(self, prefix: str = "") -> List[Dict[str, Any]]:
+        """
+        List virtual filesystem file metadata (path, size, last_modified)
+        without loading contents, optionally restricted to a path prefix
+        """
+        try:
+            if self.is_offline:
+                return [
+                    {
+                        'path': data['path'],
+                        'size': data.get('size', len(data.get('content') or '')),
+                        'last_modified': data.get('last_modified')
+                    }
+                    for data in await self.offline_operation("list_agent_files", self.offline_store.list_files, prefix)
+                ]
+
+            def list_operation():
+                query = self.db.collection('agent_files').select(['path', 'size', 'last_modified'])
+                if prefix:
+                    query = query.where('path', '>=', prefix).where('path', '<', prefix + '\uf8ff')
+
+                files = []
+                for doc in query.stream():
+                    file_data = doc.to_dict()
+                    files.append({
+                        'path': file_data.get('path', doc.id),
+                        'size': file_data.get('size', 0),
+                        'last_modified': file_data.get('last_modified')
+                    })
+                return files
+
+            return await self.safe_firestore_operation("list_agent_files", list_operation) or []
+
+        except Exception as e:
+            logger.error(f"Error listing agent files: {str(e)}")
+            raise
+
+    @timed_operation("count_agent_files")
+    async def count_agent_files(self) -> int:
+        """Get the number of virtual filesystem files, as a count aggregation when online"""
+        try:
+            if self.is_offline:
+                return await self.offline_operation("count_agent_files", self.offline_store.count_kind, 'file')
+
+            def count_operation():
+                return int(self.db.collection('agent_files').count().get()[0][0].value)
+
+            return await self.executor.run("count_agent_files", count_operation)
+
+        except Exception as e:
+            logger.error(f"Error counting agent files: {str(e)}")
+            raise
+
+    @timed_operation("get_latest_agent_file")
+    async def get_latest_agent_file(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata (path, size, last_modified) of the most recently
+        written virtual filesystem file, or None if there are no files
+        """
+        try:
+            if self.is_offline:
+                data = await self.offline_operation("get_latest_agent_file", self.offline_store.latest, 'file')
+                if data is None:
+                    return None
+                return {
+                    'path': data['path'],
+                    'size': data.get('size', len(data.get('content') or '')),
+                    'last_modified': data.get('last_modified')
+                }
+
+            def latest_operation():
+                query = (self.db.collection('agent_files')
+                         .select(['path', 'size', 'last_modified'])
+                         .order_by('last_modified', direction=Query.DESCENDING)
+                         .limit(1))
+                for doc in query.stream():
+                    file_data = doc.to_dict()
+                    return {
+                        'path': file_data.get('path', doc.id),
+                        'size': file_data.get('size', 0),
+                        'last_modified': file_data.get('last_modified')
+                    }
+                return None
+
+            return await self.executor.run("get_latest_agent_file", latest_operation)
+
+        except Exception as e:
+            logger.error(f"Error getting latest agent file: {str(e)}")
+            raise
+
+    @timed_operation("delete_agent_file")
+    async def delete_agent_file(self, path: str) -> bool:
+        """Delete a file from the virtual filesystem with offline support"""
+        try:
+            if self.is_offline:
+                def delete_operation():
+                    existed = self.offline_store.delete(f"file_{path}")
+                    # Record the delete so it reaches Firestore on sync
+                    self.offline_store.put(f"delete_file_{path}", 'delete_agent_file', {'path': path})
+                    return existed
+
+                existed = await self.offline_operation("delete_agent_file", delete_operation)
+                logger.info(f"Deleted agent file {path} in offline mode")
+                return existed
+
+            def delete_operation():
+                doc_ref = self.db.collection('agent_files').document(path)
+                if not doc_ref.get().exists:
+                    return False
+                doc_ref.delete()
+                return True
+
+            deleted = bool(await self.safe_firestore_operation("delete_agent_file", delete_operation))
+            if deleted and shared_file_invalidation_enabled():
+                # Tombstone, so watchers only ever see version documents change
+                await self.writer.write('agent_file_versions', path, {
+                    'path': path,
+                    'deleted': True,
+                    'last_modified': admin_firestore.SERVER_TIMESTAMP
+                })
+            return deleted
+
+        except Exception as e:
+            logger.error(f"Error deleting agent file: {str(e)}")
+            return False
+
+    def _offline_item_write(self, operation: str, data: Dict[str, Any]) -> Optional[tuple]:
+        """Map a queued offline operation to a (collection, doc_id, data) write; data None deletes"""
+        if operation == 'create_task':
+            # Remove offline mode flag and convert timestamps
+            sync_data = {k: v for k, v in data.items() if k != 'offline_mode'}
+            sync_data['created_at'] = data.get('created_at', admin_firestore.SERVER_TIMESTAMP)
+            if 'updated_at' in sync_data and sync_data['updated_at']:
+                sync_data['updated_at'] = admin_firestore.SERVER_TIMESTAMP
+            return ('tasks', data['id'], sync_data)
+
+        elif operation == 'add_node':
+            return ('nodes', data['id'], {k: v for k, v in data.items() if k != 'id'})
+
+        elif operation == 'add_edge':
+            # Edges queued before their id was stored get one per attempt
+            edge_id = data.get('id') or self.db.collection('edges').document().id
+            return ('edges', edge_id, {k: v for k, v in data.items() if k != 'id'})
+
+        elif operation == 'store_agent_file':
+            sync_data = {k: v for k, v in data.items() if k != 'offline_mode'}
+            sync_data['last_modified'] = admin_firestore.SERVER_TIMESTAMP
+            return ('agent_files', data['path'], sync_data)
+
+        elif operation == 'delete_agent_file':
+            return ('agent_files', data['path'], None)
+
+        return None
+
+    @timed_operation("sync_offline_storage")
     async def sync_offline_storage(self) -> Dict[str, Any]:
         """Sync offline storage with Firebase when connection is restored"""
         try:
             if not self.is_online:
                 return {"success": False, "error": "Firebase is offline"}
 
-            if not self._offline_storage:
+            replay_log = await self.offline_operation("sync_offline_storage", self.offline_store.replay)
+            if not replay_log:
                 return {"success": True, "synced": 0, "error": None}
 
             synced_count = 0
             errors = []
+            queued = []
 
-            for key, item in list(self._offline_storage.items()):
+            # Queue the replay log in write order so the writer commits full batches
+            for seq, key, item in replay_log:
                 try:
-                    operation = item['operation']
-                    data = item['data']
-
-                    if operation == 'create_task':
-                        # Sync task to Firestore
-                        doc_ref = self.db.collection('tasks').document(data['id'])
-                        # Remove offline mode flag and convert timestamps
-                        sync_data = {k: v for k, v in data.items() if k != 'offline_mode'}
-                        sync_data['created_at'] = data.get('created_at', admin_firestore.SERVER_TIMESTAMP)
-                        if 'updated_at' in sync_data and sync_data['updated_at']:
-                            sync_data['updated_at'] = admin_firestore.SERVER_TIMESTAMP
-                        doc_ref.set(sync_data)
-                        synced_count += 1
+                    write = self._offline_item_write(item['operation'], item['data'])
+                    queued.append((seq, key, self.writer.enqueue(*write) if write else None))
+                except Exception as e:
+                    errors.append(f"Failed to sync {key}: {str(e)}")
 
-                    elif operation == 'store_agent_file':
-                        # Sync file to Firestore
-                        doc_ref = self.db.collection('agent_files').document(data['path'])
-                        sync_data = {k: v for k, v in data.items() if k != 'offline_mode'}
-                        sync_data['last_modified'] = admin_firestore.SERVER_TIMESTAMP
-                        doc_ref.set(sync_data)
+            for seq, key, future in queued:
+                try:
+                    if future is not None:
+                        await future
                         synced_count += 1
 
-                    # Remove from offline storage after successful sync
-                    del self._offline_storage[key]
+                    # Remove from offline storage after successful sync, unless
+                    # it was written again while the sync was running
+                    await self.offline_operation("sync_offline_storage", self.offline_store.delete, key, seq)
 
                 except Exception as e:
                     errors.append(f"Failed to sync {key}: {str(e)}")
@@ -755,7 +1224,7 @@ class FirebaseService:
             return {
                 "success": True,
                 "synced": synced_count,
-                "remaining": len(self._offline_storage),
+                "remaining": await self.offline_operation("sync_offline_storage", len, self.offline_store),
                 "errors": errors
             }
 
@@ -764,6 +1233,7 @@ class FirebaseService:
             return {"success": False, "error": str(e)}
 
     # Webhook Event Methods
+    @timed_operation("create_webhook_event")
     async def create_webhook_event(self, event_data: Dict[str, Any]) -> WebhookEvent:
         """Create a webhook event"""
         try:
@@ -789,7 +1259,7 @@ class FirebaseService:
             event_data['created_at'] = admin_firestore.SERVER_TIMESTAMP
 
             doc_ref = self.db.collection('webhook_events').document()
-            doc_ref.set(event_data)
+            await self.writer.write('webhook_events', doc_ref.id, event_data)
 
             event_data['id'] = doc_ref.id
             return WebhookEvent(**event_data)
@@ -799,6 +1269,7 @@ class FirebaseService:
             raise
 
     # Batch Operations
+    @timed_operation("batch_create_nodes")
     async def batch_create_nodes(self, nodes_data: List[Dict[str, Any]]) -> List[str]:
         """Create multiple nodes in a batch"""
         try:
@@ -814,7 +1285,7 @@ class FirebaseService:
 
                 batch.set(doc_ref, node_data)
 
-            batch.commit()
+            await self.executor.run("batch_create_nodes", batch.commit)
 
             return [doc_ref.id for doc_ref in doc_refs]
 
@@ -823,6 +1294,7 @@ class FirebaseService:
             raise
 
     # Real-time Updates (HTTP-based polling alternative)
+    @timed_operation("get_tasks_changes_since")
     async def get_tasks_changes_since(self, since_timestamp: datetime) -> List[Dict[str, Any]]:
         """
         Get task changes since a specific timestamp
@@ -836,16 +1308,15 @@ class FirebaseService:
         """
         try:
             if self.is_offline:
-                # Get changes from offline storage
-                changes = []
-                for key, item in self._offline_storage.items():
-                    if key.startswith('task_') and item.get('created_at') and item['created_at'] > since_timestamp:
-                        changes.append(item['data'])
+                # Get changes from offline storage (indexed by write time)
+                changes = await self.offline_operation(
+                    "get_tasks_changes_since", self.offline_store.changed_since, 'task', since_timestamp
+                )
                 logger.info(f"Retrieved {len(changes)} task changes from offline storage since {since_timestamp}")
                 return changes
 
             # Online mode - use Firestore query
-            async def query_operation():
+            def query_operation():
                 query = (self.db.collection('tasks')
                         .where('updated_at', '>', since_timestamp)
                         .order_by('updated_at', direction=firestore.ASCENDING))
@@ -866,6 +1337,7 @@ class FirebaseService:
             logger.error(f"Error getting task changes since {since_timestamp}: {str(e)}")
             return []
 
+    @timed_operation("get_agent_status_changes")
     async def get_agent_status_changes(self, last_check: datetime) -> List[Dict[str, Any]]:
         """
         Get agent status changes since last check
@@ -883,7 +1355,7 @@ class FirebaseService:
                 return []
 
             # Online mode - query agent status collection if exists
-            async def query_operation():
+            def query_operation():
                 query = (self.db.collection('agent_status')
                         .where('last_updated', '>', last_check)
                         .order_by('last_updated', direction=firestore.ASCENDING))
@@ -918,15 +1390,35 @@ class FirebaseService:
         logger.warning("- GET /api/v1/notifications/stream for real-time updates")
         pass
 
+    def add_data_listener(self, callback):
+        """
+        Call a bound method as callback(*datasets) after writes to source
+        datasets, as listed in SOURCE_DATASETS; the listener is dropped once
+        its object is garbage collected
+        """
+        self._data_listeners.append(weakref.WeakMethod(callback))
+
+    def _notify_data_changed(self, *datasets: str):
+        for reference in list(self._data_listeners):
+            callback = reference()
+            if callback is None:
+                self._data_listeners.remove(reference)
+                continue
+            try:
+                callback(*datasets)
+            except Exception as e:
+                logger.error(f"Error notifying data change of {', '.join(datasets)}: {str(e)}")
+
     # HubSpot Data Methods
+    @timed_operation("store_hubspot_contact")
     async def store_hubspot_contact(self, contact: HubSpotContact) -> HubSpotContact:
         """Store HubSpot contact in Firebase"""
         try:
             contact_data = asdict(contact)
             contact_data['firebase_updated_at'] = admin_firestore.SERVER_TIMESTAMP
 
-            doc_ref = self.db.collection('hubspot_contacts').document(contact.id)
-            doc_ref.set(contact_data)
+            await self.writer.write('hubspot_contacts', contact.id, contact_data)
+            self._notify_data_changed(*SOURCE_DATASETS['hubspot_contacts'])
 
             return contact
 
@@ -934,14 +1426,15 @@ class FirebaseService:
             logger.error(f"Error storing HubSpot contact: {str(e)}")
             raise
 
+    @timed_operation("store_hubspot_deal")
     async def store_hubspot_deal(self, deal: HubSpotDeal) -> HubSpotDeal:
         """Store HubSpot deal in Firebase"""
         try:
             deal_data = asdict(deal)
             deal_data['firebase_updated_at'] = admin_firestore.SERVER_TIMESTAMP
 
-            doc_ref = self.db.collection('hubspot_deals').document(deal.id)
-            doc_ref.set(deal_data)
+            await self.writer.write('hubspot_deals', deal.id, deal_data)
+            self._notify_data_changed(*SOURCE_DATASETS['hubspot_deals'])
 
             return deal
 
@@ -949,14 +1442,15 @@ class FirebaseService:
             logger.error(f"Error storing HubSpot deal: {str(e)}")
             raise
 
+    @timed_operation("store_hubspot_company")
     async def store_hubspot_company(self, company: HubSpotCompany) -> HubSpotCompany:
         """Store HubSpot company in Firebase"""
         try:
             company_data = asdict(company)
             company_data['firebase_updated_at'] = admin_firestore.SERVER_TIMESTAMP
 
-            doc_ref = self.db.collection('hubspot_companies').document(company.id)
-            doc_ref.set(company_data)
+            await self.writer.write('hubspot_companies', company.id, company_data)
+            self._notify_data_changed(*SOURCE_DATASETS['hubspot_companies'])
 
             return company
 
@@ -964,6 +1458,48 @@ class FirebaseService:
             logger.error(f"Error storing HubSpot company: {str(e)}")
             raise
 
+    @timed_operation("store_hubspot_records")
+    async def store_hubspot_records(self, records: List[Any]) -> Dict[str, Any]:
+        """
+        Store many HubSpot contacts, deals and/or companies in batched writes
+
+        Args:
+            records: HubSpotContact, HubSpotDeal or HubSpotCompany instances
+
+        Returns:
+            Counts of stored and failed records, with error messages
+        """
+        collections = {
+            HubSpotContact: 'hubspot_contacts',
+            HubSpotDeal: 'hubspot_deals',
+            HubSpotCompany: 'hubspot_companies'
+        }
+
+        futures = []
+        for record in records:
+            record_data = asdict(record)
+            record_data['firebase_updated_at'] = admin_firestore.SERVER_TIMESTAMP
+            futures.append(self.writer.enqueue(collections[type(record)], record.id, record_data))
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        errors = [str(result) for result in results if isinstance(result, Exception)]
+        stored_collections = {
+            collections[type(record)]
+            for record, result in zip(records, results, strict=True)
+            if not isinstance(result, Exception)
+        }
+        if stored_collections:
+            self._notify_data_changed(
+                *sorted({dataset for collection in stored_collections for dataset in SOURCE_DATASETS[collection]})
+            )
+
+        return {
+            "stored": len(records) - len(errors),
+            "failed": len(errors),
+            "errors": errors[:10]
+        }
+
+    @timed_operation("get_hubspot_contacts")
     async def get_hubspot_contacts(self, limit: int = 100) -> List[HubSpotContact]:
         """Get HubSpot contacts from Firebase"""
         try:
@@ -971,19 +1507,16 @@ class FirebaseService:
                     .order_by('firebase_updated_at', direction=Query.DESCENDING)
                     .limit(limit))
 
-            docs = query.stream()
-            contacts = []
-
-            for doc in docs:
-                contact_data = doc.to_dict()
-                contacts.append(HubSpotContact(**contact_data))
+            def query_operation():
+                return [HubSpotContact(**doc.to_dict()) for doc in query.stream()]
 
-            return contacts
+            return await self.executor.run("get_hubspot_contacts", query_operation)
 
         except Exception as e:
             logger.error(f"Error getting HubSpot contacts: {str(e)}")
             return []
 
+    @timed_operation("get_hubspot_deals")
     async def get_hubspot_deals(self, limit: int = 100) -> List[HubSpotDeal]:
         """Get HubSpot deals from Firebase"""
         try:
@@ -991,19 +1524,16 @@ class FirebaseService:
                     .order_by('firebase_updated_at', direction=Query.DESCENDING)
                     .limit(limit))
 
-            docs = query.stream()
-            deals = []
+            def query_operation():
+                return [HubSpotDeal(**doc.to_dict()) for doc in query.stream()]
 
-            for doc in docs:
-                deal_data = doc.to_dict()
-                deals.append(HubSpotDeal(**deal_data))
-
-            return deals
+            return await self.executor.run("get_hubspot_deals", query_operation)
 
         except Exception as e:
             logger.error(f"Error getting HubSpot deals: {str(e)}")
             return []
 
+    @timed_operation("get_recent_hubspot_changes")
     async def get_recent_hubspot_changes(self, since: datetime) -> Dict[str, List]:
         """Get recent HubSpot data changes"""
         try:
@@ -1015,8 +1545,16 @@ class FirebaseService:
                           .where('firebase_updated_at', '>', since)
                           .order_by('firebase_updated_at', direction=Query.DESCENDING))
 
-            contacts = [HubSpotContact(**doc.to_dict()) for doc in contacts_query.stream()]
-            deals = [HubSpotDeal(**doc.to_dict()) for doc in deals_query.stream()]
+            contacts, deals = await asyncio.gather(
+                self.executor.run(
+                    "get_recent_hubspot_changes",
+                    lambda: [HubSpotContact(**doc.to_dict()) for doc in contacts_query.stream()]
+                ),
+                self.executor.run(
+                    "get_recent_hubspot_changes",
+                    lambda: [HubSpotDeal(**doc.to_dict()) for doc in deals_query.stream()]
+                )
+            )
 
             return {
                 'contacts': contacts,
@@ -1029,11 +1567,12 @@ class FirebaseService:
             return {'contacts': [], 'deals': [], 'total_changes': 0}
 
     # Utility Methods
+    @timed_operation("get_collection_stats")
     async def get_collection_stats(self, collection_name: str) -> Dict[str, int]:
         """Get statistics for a collection"""
         try:
             query = self.db.collection(collection_name).limit(1)
-            docs = list(query.stream())
+            docs = await self.executor.run("get_collection_stats", lambda: list(query.stream()))
 
             # For accurate count, you might need a Cloud Function or
             # use a separate collection to track counts
@@ -1056,7 +1595,7 @@ class FirebaseService:
             "metrics": {
                 "consecutive_failures": self._health_status["consecutive_failures"],
                 "retry_count": self._retry_count,
-                "offline_storage_items": len(self._offline_storage)
+                "offline_storage_items": len(self.offline_store)
             },
             "configuration": {
                 "project_id": self._config.project_id if self._config else None,
@@ -1070,7 +1609,7 @@ class FirebaseService:
         try:
             if self.is_online and self._db:
                 # Test Firestore connection
-                async def firestore_test():
+                def firestore_test():
                     doc_ref = self.db.collection('health').document('check')
                     test_data = {
                         'timestamp': admin_firestore.SERVER_TIMESTAMP,
@@ -1113,6 +1652,10 @@ class FirebaseService:
         """Get detailed diagnostic information"""
         try:
             config_errors = self._config.validate_format() if self._config else []
+            offline_metrics, offline_keys = await self.offline_operation(
+                "get_diagnostics",
+                lambda: (self.offline_store.get_metrics(), self.offline_store.keys(limit=10))
+            )
 
             diagnostics = {
                 "service_mode": self._mode.value,
@@ -1135,10 +1678,11 @@ class FirebaseService:
                     "retry_delays": self._retry_delays
                 },
                 "offline_storage": {
-                    "items": len(self._offline_storage),
-                    "keys": list(self._offline_storage.keys())[:10]  # First 10 keys
+                    **offline_metrics,
+                    "keys": offline_keys  # First 10 keys
                 },
                 "health_metrics": self._health_status,
+                "operations": self.get_operation_metrics(),
                 "environment": {
                     "firebase_project_id": bool(os.getenv('FIREBASE_PROJECT_ID')),
                     "firebase_client_email": bool(os.getenv('FIREBASE_CLIENT_EMAIL')),
@@ -1167,6 +1711,8 @@ def get_firebase_service():
 __all__ = [
     'FirebaseService',
     'firebase_service',
+    'shared_file_invalidation_enabled',
+    'SOURCE_DATASETS',
     'get_firebase_service',
     'Task',
     'GraphNode',
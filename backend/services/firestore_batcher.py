@@ -0,0 +1,283 @@
+"""
+Write coalescing for Firestore
+Groups pending document writes into WriteBatches of up to 500 operations,
+flushing on size or after a short delay, so bulk imports and bursts of
+small writes cost one round trip per batch instead of one per document
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from .firestore_executor import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+# Rejections caused by a write in the batch rather than by the service; a
+# batch is only split to isolate the offending document on these
+DOCUMENT_ERRORS = (
+    google_exceptions.InvalidArgument,
+    google_exceptions.NotFound,
+    google_exceptions.AlreadyExists
+)
+
+
+@dataclass
+class PendingWrite:
+    """A document write waiting for the next batch"""
+    collection: str
+    doc_id: str
+    data: Optional[Dict[str, Any]]  # None means delete
+    futures: List[asyncio.Future] = field(default_factory=list)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.collection, self.doc_id)
+
+
+class FirestoreWriteBatcher:
+    """
+    Coalescing writer on top of FirebaseService
+
+    Every write targets an explicit document id, so a batch can be retried
+    without duplicating documents. Writes to a document already waiting in
+    the queue replace it (last write wins), and a document is never part of
+    two in-flight batches, so writes land in the order they were made.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        flush_interval: float = 0.02,
+        max_retries: int = 3,
+        max_concurrent_flushes: int = 4
+    ):
+        self.service = service
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_concurrent_flushes = max_concurrent_flushes
+
+        self._pending: Dict[Tuple[str, str], PendingWrite] = {}
+        self._in_flight_keys: Set[Tuple[str, str]] = set()
+        self._active_flushes = 0
+        self._flush_tasks: Set[asyncio.Task] = set()  # Referenced until done, so they are not collected
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._idle: Optional[asyncio.Event] = None
+
+        self.writes = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.committed = 0
+        self.retries = 0
+        self.splits = 0
+        self.failed = 0
+        self.max_observed_batch = 0
+        self._flush_histogram = LatencyHistogram()
+
+    def enqueue(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]) -> asyncio.Future:
+        """
+        Queue a document write without waiting for it
+
+        Args:
+            collection: Collection name
+            doc_id: Document ID
+            data: Document data to set, or None to delete the document
+
+        Returns:
+            Future resolved with the commit's update time once the write is
+            committed
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (collection, doc_id)
+
+        self.writes += 1
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.data = data
+            pending.futures.append(future)
+            self.coalesced += 1
+        else:
+            self._pending[key] = PendingWrite(collection, doc_id, data, [future])
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._schedule_flush)
+
+        return future
+
+    async def write(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]) -> Optional[datetime]:
+        """
+        Queue a document write and wait until it is committed
+
+        Returns:
+            The commit's update time, which SERVER_TIMESTAMP fields are set to
+        """
+        return await self.enqueue(collection, doc_id, data)
+
+    async def write_many(
+        self, collection: str, documents: List[Tuple[str, Optional[Dict[str, Any]]]]
+    ) -> List[Optional[Exception]]:
+        """
+        Queue many document writes and wait for all of them
+
+        Returns:
+            One entry per document: None if committed, else the error
+        """
+        futures = [self.enqueue(collection, doc_id, data) for doc_id, data in documents]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    async def flush(self):
+        """Commit everything queued so far"""
+        while self._pending or self._active_flushes:
+            if self._idle is None or self._idle.is_set():
+                self._idle = asyncio.Event()
+            self._schedule_flush()
+            await self._idle.wait()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get batching and flush latency metrics"""
+        return {
+            "pending": len(self._pending),
+            "active_flushes": self._active_flushes,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "committed": self.committed,
+            "avg_batch_size": self.committed / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "retries": self.retries,
+            "splits": self.splits,
+            "failed": self.failed,
+            "flush_latency": self._flush_histogram.to_dict()
+        }
+
+    def _schedule_flush(self):
+        """Start as many batch commits as allowed"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending and self._active_flushes < self.max_concurrent_flushes:
+            batch = self._take_batch()
+            if not batch:
+                break
+            self._active_flushes += 1
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+        if self._pending and self._timer is None and self._active_flushes < self.max_concurrent_flushes:
+            # Only documents still in flight are left; try again shortly
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._schedule_flush)
+
+    def _take_batch(self) -> List[PendingWrite]:
+        """Pop up to max_batch_size writes whose documents are not in flight"""
+        batch = []
+        for key in list(self._pending):
+            if key in self._in_flight_keys:
+                continue
+            batch.append(self._pending.pop(key))
+            self._in_flight_keys.add(key)
+            if len(batch) >= self.max_batch_size:
+                break
+        return batch
+
+    async def _run_batch(self, batch: List[PendingWrite]):
+        """Commit one batch and resolve its writers"""
+        try:
+            await self._commit_with_retry(batch)
+        finally:
+            for write in batch:
+                self._in_flight_keys.discard(write.key)
+            self._active_flushes -= 1
+
+            if self._pending:
+                self._schedule_flush()
+            elif self._active_flushes == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def _commit_with_retry(self, batch: List[PendingWrite]):
+        """
+        Commit a batch, retrying with backoff
+
+        A batch rejected because of one of its documents (DOCUMENT_ERRORS)
+        is split in half, so one bad document only fails its own writers.
+        Any other error, such as Unavailable or DeadlineExceeded, is retried
+        and then fails the whole batch rather than multiplying requests
+        during an outage.
+        """
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries):
+            started_at = time.perf_counter()
+            try:
+                results = await self.service.executor.run("write_batch", self._commit, batch)
+            except Exception as e:
+                self._flush_histogram.record(time.perf_counter() - started_at, error=True)
+                last_error = e
+                if isinstance(e, DOCUMENT_ERRORS):
+                    break
+                if attempt + 1 < self.max_retries:
+                    self.retries += 1
+                    await asyncio.sleep(0.1 * (2 ** attempt))
+                continue
+
+            self._flush_histogram.record(time.perf_counter() - started_at)
+            self.batches += 1
+            self.committed += len(batch)
+            self.max_observed_batch = max(self.max_observed_batch, len(batch))
+            for write, result in zip(batch, results or [None] * len(batch), strict=True):
+                update_time = getattr(result, 'update_time', None)
+                for future in write.futures:
+                    if not future.done():
+                        future.set_result(update_time)
+            return
+
+        if len(batch) > 1 and isinstance(last_error, DOCUMENT_ERRORS):
+            self.splits += 1
+            middle = len(batch) // 2
+            await self._commit_with_retry(batch[:middle])
+            await self._commit_with_retry(batch[middle:])
+            return
+
+        if len(batch) == 1:
+            logger.error(f"Failed to write {batch[0].collection}/{batch[0].doc_id}: {last_error}")
+        else:
+            logger.error(f"Failed to write a batch of {len(batch)} documents: {last_error}")
+        self.failed += len(batch)
+        for write in batch:
+            for future in write.futures:
+                if not future.done():
+                    future.set_exception(last_error)
+
+    def _commit(self, batch: List[PendingWrite]) -> List[Any]:
+        """Build and commit a WriteBatch (blocking); returns one WriteResult per write"""
+        db = self.service.db
+        write_batch = db.batch()
+        for write in batch:
+            doc_ref = db.collection(write.collection).document(write.doc_id)
+            if write.data is None:
+                write_batch.delete(doc_ref)
+            else:
+                write_batch.set(doc_ref, write.data)
+        return write_batch.commit()
+
+
+__all__ = [
+    'DOCUMENT_ERRORS',
+    'MAX_BATCH_SIZE',
+    'PendingWrite',
+    'FirestoreWriteBatcher'
+]
@@ -0,0 +1,179 @@
+"""
+Non-blocking execution layer for Firestore calls
+Runs the synchronous firebase_admin client on a bounded, dedicated thread
+pool so Firestore round trips never stall the event loop, and keeps
+per-operation latency histograms for both online and offline modes
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (last bucket is unbounded)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = buckets_ms or LATENCY_BUCKETS_MS
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float, error: bool = False):
+        """Record one observation"""
+        milliseconds = seconds * 1000.0
+        index = 0
+        while index < len(self.buckets_ms) and milliseconds > self.buckets_ms[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += milliseconds
+        self.max_ms = max(self.max_ms, milliseconds)
+        if error:
+            self.errors += 1
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket containing the given percentile"""
+        if self.count == 0:
+            return 0.0
+
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary and raw buckets"""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "buckets": {
+                (f"le_{bound}ms" if index < len(self.buckets_ms) else "inf"): self.counts[index]
+                for index, bound in enumerate(self.buckets_ms + [None])
+            }
+        }
+
+
+class FirestoreExecutor:
+    """
+    Bounded thread pool for blocking Firestore calls
+
+    At most max_workers calls run at once; a further max_concurrency - max_workers
+    may wait in the pool queue, and callers beyond that wait on a semaphore
+    without holding a pool slot.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_concurrency: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('FIRESTORE_MAX_WORKERS', 8))
+        self.max_concurrency = max_concurrency or int(os.getenv('FIRESTORE_MAX_CONCURRENCY', 32))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="firestore")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._wait_histogram = LatencyHistogram()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    async def run(self, operation_name: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the pool and await its result"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        started_at = [queued_at]
+
+        def call():
+            started_at[0] = time.perf_counter()
+            return func(*args, **kwargs)
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self._pool, call)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            # Time spent waiting for a semaphore permit and a pool thread
+            self._wait_histogram.record(started_at[0] - queued_at)
+
+    def record(self, operation_name: str, mode: str, seconds: float, error: bool = False):
+        """Record the latency of one service operation"""
+        key = (operation_name, mode)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.record(seconds, error)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Pool usage and per-operation latency histograms"""
+        operations: Dict[str, Dict[str, Any]] = {}
+        for (operation_name, mode), histogram in sorted(self._histograms.items()):
+            operations.setdefault(operation_name, {})[mode] = histogram.to_dict()
+
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "executor": self._wait_histogram.to_dict(),
+            "operations": operations
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads"""
+        self._pool.shutdown(wait=wait)
+
+
+def timed_operation(operation_name: str):
+    """
+    Decorator for FirebaseService coroutines that records their latency,
+    labelled with the service mode at call time
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            mode = self.mode.value
+            started_at = time.perf_counter()
+            error = False
+            try:
+                return await method(self, *args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.executor.record(operation_name, mode, time.perf_counter() - started_at, error)
+        return wrapper
+    return decorator
+
+
+__all__ = [
+    'LatencyHistogram',
+    'FirestoreExecutor',
+    'timed_operation'
+]
@@ -5,12 +5,14 @@ Provides reliable real-time functionality using regular HTTP polling
 """
 
 import asyncio
+import bisect
+import heapq
 import json
 import time
 import uuid
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union, Callable, Set
+from typing import Dict, List, Optional, Any, Union, Callable
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from collections import defaultdict, deque
@@ -175,7 +177,9 @@ class PollingSession:
     status: ConnectionStatus
     filters: Dict[str, Any] = field(default_factory=dict)
     is_active: bool = True
-    delivered_events: Set[str] = field(default_factory=set)
+    # Last sequence number read from each priority log
+    cursors: Dict[EventPriority, int] = field(default_factory=dict)
+    delivered_count: int = 0
     event_buffer: deque = field(default_factory=lambda: deque(maxlen=1000))
     metrics: PollingMetrics = field(default_factory=PollingMetrics)
     backoff_factor: float = 1.0
@@ -222,89 +226,240 @@ class PollingSession:
         self.update_activity()
 
 
+@dataclass
+class EventLog:
+    """Append-only, sequence-numbered log of events for a single priority"""
+    seqs: List[int] = field(default_factory=list)
+    entries: List[Optional[PollingEvent]] = field(default_factory=list)
+    head: int = 0
+    # Removed slots (None entries) at or after head
+    dead: int = 0
+
+    # Compact the backing lists once this many slots are dead
+    compact_threshold: int = 1024
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head - self.dead
+
+    def append(self, seq: int, event: PollingEvent):
+        """Append an event with a monotonically increasing sequence number"""
+        self.seqs.append(seq)
+        self.entries.append(event)
+
+    def read_after(self, cursor: int):
+        """Yield (seq, event) pairs newer than the cursor; removed slots yield None"""
+        start = bisect.bisect_right(self.seqs, cursor, lo=self.head)
+        for index in range(start, len(self.seqs)):
+            yield self.seqs[index], self.entries[index]
+
+    def peek(self) -> Optional[PollingEvent]:
+        """Return the oldest live event in the log"""
+        while self.head < len(self.seqs) and self.entries[self.head] is None:
+            self.head += 1
+            self.dead -= 1
+        return self.entries[self.head] if self.head < len(self.seqs) else None
+
+    def pop_head(self):
+        """Drop the oldest live event"""
+        if self.peek() is not None:
+            self.entries[self.head] = None
+            self.head += 1
+            self._maybe_compact()
+
+    def remove(self, seq: int) -> bool:
+        """Drop the event with this sequence number, wherever it is in the log"""
+        index = bisect.bisect_left(self.seqs, seq, lo=self.head)
+        if index == len(self.seqs) or self.seqs[index] != seq or self.entries[index] is None:
+            return False
+        self.entries[index] = None
+        self.dead += 1
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self):
+        """Rebuild the backing lists without dead slots once they dominate, amortized"""
+        waste = self.head + self.dead
+        if waste < self.compact_threshold or waste * 2 < len(self.seqs):
+            return
+        live = [
+            (seq, event) for seq, event in zip(self.seqs[self.head:], self.entries[self.head:], strict=True)
+            if event is not None
+        ]
+        self.seqs = [seq for seq, _ in live]
+        self.entries = [event for _, event in live]
+        self.head = 0
+        self.dead = 0
+
+
 @dataclass
 class EventBuffer:
     """Buffer for managing events during connection loss"""
     max_size: int = 10000
     max_age: timedelta = field(default_factory=lambda: timedelta(hours=24))
     events: Dict[str, PollingEvent] = field(default_factory=dict)
-    priority_queues: Dict[EventPriority, deque] = field(default_factory=lambda: {
-        priority: deque(maxlen=2000) for priority in EventPriority
+    priority_queues: Dict[EventPriority, EventLog] = field(default_factory=lambda: {
+        priority: EventLog() for priority in EventPriority
     })
+    sequence: int = 0
+    # Sequence number of each buffered event, to find its log slot
+    event_seqs: Dict[str, int] = field(default_factory=dict)
+    expiry_heap: List[tuple] = field(default_factory=list)
+    # Long-poll waiters bucketed by the session's user_id filter (None = unfiltered)
+    waiters: Dict[Optional[str], Dict[str, tuple]] = field(default_factory=dict)
+    waiter_keys: Dict[str, Optional[str]] = field(default_factory=dict)
 
     def add_event(self, event: PollingEvent) -> bool:
         """Add event to buffer"""
         if len(self.events) >= self.max_size:
-            # Remove oldest events by priority (low priority first)
             self._cleanup_old_events()
+            if len(self.events) >= self.max_size:
+                # Still full: drop oldest events by priority (low priority first)
+                self._evict_oldest()
+
+        if event.event_id in self.events:
+            self.remove_event(event.event_id)
 
+        self.sequence += 1
         self.events[event.event_id] = event
-        self.priority_queues[event.priority].append(event.event_id)
+        self.event_seqs[event.event_id] = self.sequence
+        self.priority_queues[event.priority].append(self.sequence, event)
+        if event.expires_at:
+            heapq.heappush(self.expiry_heap, (event.expires_at, self.sequence, event.event_id))
+
+        self._notify_waiters(event)
         return True
 
     def get_events(self, session: PollingSession, limit: int = 100) -> List[PollingEvent]:
-        """Get events for a session"""
+        """Get events newer than the session's cursors"""
         available_events = []
+        now = datetime.utcnow()
 
         # Get events by priority (highest first)
         for priority in sorted(EventPriority, key=lambda p: p.value, reverse=True):
-            queue = self.priority_queues[priority]
+            cursor = session.cursors.get(priority, 0)
 
-            for event_id in list(queue):
-                if event_id in session.delivered_events:
-                    continue
+            for seq, event in self.priority_queues[priority].read_after(cursor):
+                cursor = seq
 
-                event = self.events.get(event_id)
-                if not event or event.is_expired():
-                    queue.remove(event_id)
+                # Removed events leave an empty slot until the log is compacted
+                if event is None:
+                    continue
+                if event.expires_at and now > event.expires_at:
                     continue
-
                 if not event.matches_filters(session.filters):
                     continue
 
                 available_events.append(event)
-                session.delivered_events.add(event_id)
-
                 if len(available_events) >= limit:
                     break
 
+            session.cursors[priority] = cursor
+
             if len(available_events) >= limit:
                 break
 
+        session.delivered_count += len(available_events)
         return available_events
 
     def _cleanup_old_events(self):
         """Remove old expired events"""
         current_time = datetime.utcnow()
-        expired_events = []
 
-        for event_id, event in self.events.items():
-            if event.is_expired() or (current_time - event.timestamp) > self.max_age:
-                expired_events.append(event_id)
-
-        for event_id in expired_events:
+        while self.expiry_heap and self.expiry_heap[0][0] < current_time:
+            _, _, event_id = heapq.heappop(self.expiry_heap)
             self.remove_event(event_id)
 
+        cutoff = current_time - self.max_age
+        for log in self.priority_queues.values():
+            self._truncate_log(log, cutoff)
+
+    def _truncate_log(self, log: EventLog, cutoff: datetime):
+        """Drop events older than cutoff from the log head"""
+        while len(log):
+            event = log.peek()
+            if event.timestamp >= cutoff:
+                break
+            self._forget(event.event_id)
+            log.pop_head()
+
+    def _evict_oldest(self):
+        """Evict the oldest event from the lowest non-empty priority"""
+        for priority in sorted(EventPriority, key=lambda p: p.value):
+            log = self.priority_queues[priority]
+            if len(log):
+                self._forget(log.peek().event_id)
+                log.pop_head()
+                return
+
     def remove_event(self, event_id: str):
         """Remove event from buffer"""
-        if event_id in self.events:
-            event = self.events[event_id]
-            # Remove from priority queue
-            if event_id in self.priority_queues[event.priority]:
-                self.priority_queues[event.priority].remove(event_id)
-            del self.events[event_id]
+        event = self.events.get(event_id)
+        if event:
+            self.priority_queues[event.priority].remove(self.event_seqs[event_id])
+            self._forget(event_id)
+
+    def _forget(self, event_id: str):
+        """Drop an event's bookkeeping once its log slot is gone"""
+        self.events.pop(event_id, None)
+        self.event_seqs.pop(event_id, None)
 
     def get_stats(self) -> Dict[str, Any]:
         """Get buffer statistics"""
         return {
             "total_events": len(self.events),
             "max_size": self.max_size,
+            "sequence": self.sequence,
             "priority_distribution": {
-                priority.name: len(queue)
-                for priority, queue in self.priority_queues.items()
+                priority.name: len(log)
+                for priority, log in self.priority_queues.items()
             }
         }
 
+    def register_waiter(self, session: PollingSession) -> asyncio.Future:
+        """Register a long-poll waiter that resolves when a matching event arrives"""
+        self.unregister_waiter(session.session_id)
+
+        future = asyncio.get_running_loop().create_future()
+        key = session.filters.get("user_id")
+        self.waiters.setdefault(key, {})[session.session_id] = (session, future)
+        self.waiter_keys[session.session_id] = key
+        return future
+
+    def unregister_waiter(self, session_id: str, wake: bool = False):
+        """Remove a session's waiter, optionally waking it first"""
+        if session_id not in self.waiter_keys:
+            return
+
+        key = self.waiter_keys.pop(session_id)
+        bucket = self.waiters.get(key, {})
+        _, future = bucket.pop(session_id, (None, None))
+        if not bucket:
+            self.waiters.pop(key, None)
+
+        if wake and future and not future.done():
+            future.set_result(None)
+
+    def _notify_waiters(self, event: PollingEvent):
+        """Wake waiting sessions whose filters match the new event"""
+        if not self.waiters:
+            return
+
+        # Events scoped to a user can only match that user's bucket or unfiltered
+        # sessions; unscoped events pass every user_id filter
+        if event.user_id is None:
+            buckets = list(self.waiters.values())
+        else:
+            buckets = [
+                bucket for bucket in (self.waiters.get(event.user_id), self.waiters.get(None))
+                if bucket
+            ]
+
+        for bucket in buckets:
+            for session, future in list(bucket.values()):
+                if future.done() or not event.matches_filters(session.filters):
+                    continue
+                future.set_result(event.event_id)
+
 
 class HTTPPollingService:
     """
@@ -443,11 +598,8 @@ class HTTPPollingService:
         self._sessions[session_id] = session
 
         logger.info(
-            f"Created polling session",
-            session_id=session_id,
-            user_id=user_id,
-            interval=interval.name,
-            total_sessions=len(self._sessions)
+            f"Created polling session {session_id} "
+            f"(user_id={user_id}, interval={interval.name}, total_sessions={len(self._sessions)})"
         )
 
         # Send welcome event
@@ -472,13 +624,14 @@ class HTTPPollingService:
             session.status = ConnectionStatus.DISCONNECTED
             session.is_active = False
 
+            # Release any long poll still waiting on this session
+            self._event_buffer.unregister_waiter(session_id, wake=True)
+
             del self._sessions[session_id]
 
             logger.info(
-                f"Removed polling session",
-                session_id=session_id,
-                user_id=session.user_id,
-                total_sessions=len(self._sessions)
+                f"Removed polling session {session_id} "
+                f"(user_id={session.user_id}, total_sessions={len(self._sessions)})"
             )
 
     def add_event(
@@ -535,11 +688,8 @@ class HTTPPollingService:
         self._event_buffer.add_event(event)
 
         logger.debug(
-            f"Added polling event",
-            event_id=event_id,
-            event_type=event_type,
-            priority=priority.name,
-            user_id=user_id
+            f"Added polling event {event_id} "
+            f"(type={event_type}, priority={priority.name}, user_id={user_id})"
         )
 
         return event_id
@@ -598,17 +748,28 @@ class HTTPPollingService:
 
                 return response
 
-            # No events immediately available, enter long polling
-            start_time = datetime.utcnow()
-            timeout_delta = timedelta(seconds=timeout)
+            # No events immediately available, wait until add_event wakes us
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            deadline = start_time + timeout
 
-            while (datetime.utcnow() - start_time) < timeout_delta:
-                await asyncio.sleep(1)  # Check every second
+            while session.is_active:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+
+                waiter = self._event_buffer.register_waiter(session)
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    break
+                finally:
+                    self._event_buffer.unregister_waiter(session_id)
 
                 # Look for new events
                 new_events = self._event_buffer.get_events(session, max_events)
                 if new_events:
-                    waited_seconds = (datetime.utcnow() - start_time).total_seconds()
+                    waited_seconds = loop.time() - start_time
                     session.handle_success()
 
                     response = {
@@ -685,14 +846,14 @@ class HTTPPollingService:
 
         if filters:
             session.filters.update(filters)
+            # A pending long poll re-registers under the new filters
+            self._event_buffer.unregister_waiter(session_id, wake=True)
 
         session.update_activity()
 
         logger.info(
-            f"Updated polling session",
-            session_id=session_id,
-            new_interval=interval.name if interval else None,
-            updated_filters=bool(filters)
+            f"Updated polling session {session_id} "
+            f"(new_interval={interval.name if interval else None}, updated_filters={bool(filters)})"
         )
 
         return True
@@ -893,7 +1054,8 @@ class HTTPPollingService:
             "effective_interval": session.get_effective_interval(),
             "status": session.status.value,
             "is_active": session.is_active,
-            "delivered_events_count": len(session.delivered_events),
+            "delivered_events_count": session.delivered_count,
+            "cursors": {priority.name: seq for priority, seq in session.cursors.items()},
             "buffer_size": len(session.event_buffer),
             "backoff_factor": session.backoff_factor,
             "consecutive_errors": session.consecutive_errors,
@@ -1079,5 +1241,6 @@ __all__ = [
     'PollingEvent',
     'PollingSession',
     'EventBuffer',
+    'EventLog',
     'PollingMetrics'
 ]
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Persistent offline store for FirebaseService
+Keeps writes made while Firebase is unreachable in a SQLite database (WAL
+mode) with secondary indexes for the offline query paths, so queries stay
+index lookups during long outages and nothing is lost on restart. Every
+write is stamped with a sequence number, which gives sync an ordered
+replay log.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Offline operation -> record kind used by the indexes
+OPERATION_KINDS = {
+    'create_task': 'task',
+    'add_node': 'node',
+    'add_edge': 'edge',
+    'store_agent_file': 'file',
+    'delete_agent_file': 'delete_file'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offline_items (
+    key TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    data TEXT NOT NULL,
+    agent_type TEXT,
+    status TEXT,
+    node_type TEXT,
+    path TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_offline_seq ON offline_items (seq);
+CREATE INDEX IF NOT EXISTS idx_offline_agent_type ON offline_items (kind, agent_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_offline_status ON offline_items (kind, status, created_at);
+CREATE INDEX IF NOT EXISTS idx_offline_created ON offline_items (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_offline_updated ON offline_items (kind, updated_at);
+CREATE INDEX IF NOT EXISTS idx_offline_node_type ON offline_items (kind, node_type);
+CREATE INDEX IF NOT EXISTS idx_offline_path ON offline_items (kind, path);
+CREATE TABLE IF NOT EXISTS offline_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO offline_counters (name, value)
+    SELECT 'seq', COALESCE(MAX(seq), 0) FROM offline_items;
+"""
+
+
+def _encode(value: Any) -> Any:
+    """JSON fallback for datetimes"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    """JSON object hook restoring datetimes"""
+    if len(value) == 1 and "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+class OfflineStore:
+    """
+    SQLite-backed offline record store
+
+    Records are addressed by the same keys FirebaseService has always used
+    ("task_<id>", "file_<path>", ...) and returned in the same shape:
+    {'data': ..., 'created_at': ..., 'operation': ...}.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite file; defaults to FIREBASE_OFFLINE_STORE_PATH or
+                ~/.autoadmin/firebase_offline.db. ":memory:" disables persistence.
+        """
+        self.path = path or os.getenv(
+            'FIREBASE_OFFLINE_STORE_PATH',
+            os.path.join(os.path.expanduser('~'), '.autoadmin', 'firebase_offline.db')
+        )
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self.writes = 0
+        self.queries = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM offline_items").fetchone()[0]
+
+    def __bool__(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM offline_items LIMIT 1").fetchone() is not None
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM offline_items WHERE key = ?", (key,)
+            ).fetchone() is not None
+
+    def put(self, key: str, operation: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert or replace a record, moving it to the end of the replay log.
+
+        The record keeps its original created_at when it already exists.
+
+        Returns:
+            The stored record
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                item = self._write(key, operation, data)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return item
+
+    def update(self, key: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge changes into a record's data; returns the record or None if missing"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT operation, data, created_at FROM offline_items WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                item = self._to_item(row)
+                item['data'].update(changes)
+                self._write(key, item['operation'], item['data'])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return item
+
+    def _write(self, key: str, operation: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Upsert a record inside an open write transaction.
+
+        The sequence number comes from a persisted counter bumped while the
+        write lock is held, so processes sharing one file never hand out the
+        same seq, and seqs are not reused after the log is drained.
+        """
+        now = datetime.now()
+        kind = OPERATION_KINDS.get(operation, operation)
+        payload = json.dumps(data, default=_encode)
+        seq = self._conn.execute(
+            "UPDATE offline_counters SET value = value + 1 WHERE name = 'seq' RETURNING value"
+        ).fetchone()[0]
+
+        self._conn.execute(
+            """
+            INSERT INTO offline_items
+                (key, seq, kind, operation, data, agent_type, status, node_type, path, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                seq = excluded.seq, kind = excluded.kind, operation = excluded.operation,
+                data = excluded.data, agent_type = excluded.agent_type, status = excluded.status,
+                node_type = excluded.node_type, path = excluded.path, updated_at = excluded.updated_at
+            """,
+            (
+                key, seq, kind, operation, payload,
+                data.get('agent_type'), data.get('status'),
+                data.get('type') if kind == 'node' else None,
+                data.get('path'),
+                now.timestamp(), now.timestamp()
+            )
+        )
+        self.writes += 1
+        return {'data': data, 'created_at': now, 'operation': operation}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a record by key"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT operation, data, created_at FROM offline_items WHERE key = ?", (key,)
+            ).fetchone()
+        return self._to_item(row) if row else None
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        """Remove a record and return it, or default if missing"""
+        item = self.get(key)
+        if item is None:
+            return default
+        self.delete(key)
+        return item
+
+    def delete(self, key: str, seq: Optional[int] = None) -> bool:
+        """
+        Remove a record.
+
+        Args:
+            key: Record key
+            seq: If given, only remove the record if it was not rewritten
+                since this point in the replay log
+        """
+        with self._lock:
+            if seq is None:
+                cursor = self._conn.execute("DELETE FROM offline_items WHERE key = ?", (key,))
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM offline_items WHERE key = ? AND seq <= ?", (key, seq)
+                )
+            self.writes += 1
+            return cursor.rowcount > 0
+
+    def query_tasks(
+        self,
+        agent_type: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get task data filtered by agent type and/or status, newest first"""
+        clauses = ["kind = 'task'"]
+        params: List[Any] = []
+        if agent_type is not None:
+            clauses.append("agent_type = ?")
+            params.append(agent_type)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+
+        sql = f"SELECT data FROM offline_items WHERE {' AND '.join(clauses)} ORDER BY created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return self._select_data(sql, params)
+
+    def changed_since(self, kind: str, since: datetime) -> List[Dict[str, Any]]:
+        """Get data of records of a kind written after a timestamp, oldest first"""
+        return self._select_data(
+            "SELECT data FROM offline_items WHERE kind = ? AND updated_at > ? ORDER BY updated_at",
+            [kind, since.timestamp()]
+        )
+
+    def list_kind(self, kind: str, node_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get data of all records of a kind, optionally filtered by node type"""
+        if node_type:
+            return self._select_data(
+                "SELECT data FROM offline_items WHERE kind = ? AND node_type = ? ORDER BY seq",
+                [kind, node_type]
+            )
+        return self._select_data(
+            "SELECT data FROM offline_items WHERE kind = ? ORDER BY seq", [kind]
+        )
+
+    def count_kind(self, kind: str) -> int:
+        """Number of records of a kind"""
+        with self._lock:
+            self.queries += 1
+            return self._conn.execute("SELECT COUNT(*) FROM offline_items WHERE kind = ?", [kind]).fetchone()[0]
+
+    def latest(self, kind: str) -> Optional[Dict[str, Any]]:
+        """Get data of the most recently written record of a kind"""
+        rows = self._select_data(
+            "SELECT data FROM offline_items WHERE kind = ? ORDER BY seq DESC LIMIT 1", [kind]
+        )
+        return rows[0] if rows else None
+
+    def list_files(self, prefix: str = "") -> List[Dict[str, Any]]:
+        """Get data of stored files whose path starts with prefix, by path"""
+        if prefix:
+            return self._select_data(
+                "SELECT data FROM offline_items WHERE kind = 'file' AND path >= ? AND path < ? ORDER BY path",
+                [prefix, prefix + '\uf8ff']
+            )
+        return self._select_data(
+            "SELECT data FROM offline_items WHERE kind = 'file' ORDER BY path", []
+        )
+
+    def replay(self, after_seq: int = 0, limit: Optional[int] = None) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Read the replay log in write order.
+
+        Returns:
+            (seq, key, record) tuples with seq greater than after_seq
+        """
+        sql = "SELECT seq, key, operation, data, created_at FROM offline_items WHERE seq > ? ORDER BY seq"
+        params: List[Any] = [after_seq]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self.queries += 1
+        return [(row[0], row[1], self._to_item(row[2:])) for row in rows]
+
+    def keys(self, limit: Optional[int] = None) -> List[str]:
+        """Get record keys in replay order"""
+        sql = "SELECT key FROM offline_items ORDER BY seq"
+        params: List[Any] = []
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def clear(self):
+        """Remove all records"""
+        with self._lock:
+            self._conn.execute("DELETE FROM offline_items")
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get record counts by kind and usage counters"""
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT kind, COUNT(*) FROM offline_items GROUP BY kind"
+            ).fetchall())
+            last_seq = self._conn.execute(
+                "SELECT value FROM offline_counters WHERE name = 'seq'"
+            ).fetchone()[0]
+        return {
+            "path": self.path,
+            "items": sum(counts.values()),
+            "by_kind": counts,
+            "last_seq": last_seq,
+            "writes": self.writes,
+            "queries": self.queries
+        }
+
+    def _select_data(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        """Run a query returning one data column"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self.queries += 1
+        return [json.loads(row[0], object_hook=_decode) for row in rows]
+
+    @staticmethod
+    def _to_item(row) -> Dict[str, Any]:
+        """Build a record from (operation, data, created_at)"""
+        operation, data, created_at = row
+        return {
+            'data': json.loads(data, object_hook=_decode),
+            'created_at': datetime.fromtimestamp(created_at),
+            'operation': operation
+        }
+
+
+__all__ = [
+    'OPERATION_KINDS',
+    'OfflineStore'
+]
@@ -0,0 +1,468 @@
+"""
+Tiered task state for the agent orchestrators
+Keeps a bounded hot window of tasks in memory and spills finished tasks to
+an append-only on-disk segment log, so orchestrator memory is capped by
+configuration instead of growing with a day of traffic. Lookups by task ID
+fall through to the archive transparently.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_HOT_TASKS = 10000
+DEFAULT_HOT_TASK_TTL = 3600  # seconds a finished task stays in memory
+DEFAULT_RETENTION_HOURS = 24
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+
+# Index entries pack (segment, offset, length) into one int
+_OFFSET_BITS = 40
+_LENGTH_BITS = 32
+
+
+def _pack(segment: int, offset: int, length: int) -> int:
+    return (((segment << _OFFSET_BITS) | offset) << _LENGTH_BITS) | length
+
+
+def _unpack(location: int) -> Tuple[int, int, int]:
+    length = location & ((1 << _LENGTH_BITS) - 1)
+    location >>= _LENGTH_BITS
+    return location >> _OFFSET_BITS, location & ((1 << _OFFSET_BITS) - 1), length
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class SegmentLogArchive:
+    """
+    Append-only JSON-lines segment log with an in-memory offset index
+
+    Records are appended to the newest segment until it reaches
+    segment_bytes, then a new segment is started. Whole segments are
+    deleted once their newest record is older than the retention period.
+    Reopening the same directory rebuilds the index from the segments.
+
+    Offsets are only valid for the process that wrote them, so the default
+    directory is per process (<root>/<name>/<pid>); directories left by
+    exited processes are removed once they age past the retention period.
+    """
+
+    def __init__(
+        self,
+        name: str = 'tasks',
+        directory: Optional[str] = None,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        retention_hours: Optional[float] = None
+    ):
+        """
+        Args:
+            name: Subdirectory of the archive root, one per task owner
+            directory: Segment directory; defaults to <root>/<name>/<pid>, where
+                root is ORCHESTRATOR_TASK_ARCHIVE_DIR or ~/.autoadmin/task_archive.
+                Opened on first use. An explicit directory must not be shared
+                between processes.
+            segment_bytes: Size at which a new segment is started
+            retention_hours: Age after which segments are pruned; defaults to
+                ORCHESTRATOR_TASK_RETENTION_HOURS or 24
+        """
+        self._owner_directory = None if directory else os.path.join(
+            os.getenv(
+                'ORCHESTRATOR_TASK_ARCHIVE_DIR',
+                os.path.join(os.path.expanduser('~'), '.autoadmin', 'task_archive')
+            ),
+            name
+        )
+        self.directory = directory or os.path.join(self._owner_directory, str(os.getpid()))
+        self.segment_bytes = segment_bytes
+        self.retention_seconds = 3600 * (
+            retention_hours if retention_hours is not None
+            else float(os.getenv('ORCHESTRATOR_TASK_RETENTION_HOURS', DEFAULT_RETENTION_HOURS))
+        )
+
+        self._index: Dict[str, int] = {}  # key -> packed (segment, offset, length)
+        self._segment_keys: Dict[int, List[str]] = {}
+        self._segment_newest: Dict[int, float] = {}
+        self._segment = 0
+        self._file = None
+        self._opened = False
+        self._pid = os.getpid()
+
+        self.appended = 0
+        self.reads = 0
+        self.pruned_segments = 0
+
+    def __contains__(self, key: str) -> bool:
+        self._open()
+        return key in self._index
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._index)
+
+    def append(self, key: str, record: Dict[str, Any], timestamp: Optional[float] = None):
+        """Append a record, superseding any earlier record with the same key"""
+        self.append_many([(key, record)], timestamp)
+
+    def append_many(self, records: List[Tuple[str, Dict[str, Any]]], timestamp: Optional[float] = None):
+        """Append (key, record) pairs with one write"""
+        if not records:
+            return
+        self._open()
+        timestamp = timestamp or time.time()
+
+        if self._file.tell() >= self.segment_bytes:
+            self._roll()
+
+        offset = self._file.tell()
+        lines = []
+        for key, record in records:
+            line = json.dumps({"k": key, "t": timestamp, "r": record}, separators=(',', ':'), default=str)
+            line = line.encode('utf-8') + b'\n'
+            lines.append(line)
+            self._index[key] = _pack(self._segment, offset, len(line))
+            self._segment_keys[self._segment].append(key)
+            offset += len(line)
+
+        self._file.write(b''.join(lines))
+        self._file.flush()
+        self._segment_newest[self._segment] = timestamp
+        self.appended += len(records)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read the latest record for a key"""
+        self._open()
+        location = self._index.get(key)
+        if location is None:
+            return None
+
+        segment, offset, length = _unpack(location)
+        try:
+            with open(self._segment_path(segment), 'rb') as f:
+                f.seek(offset)
+                line = f.read(length)
+        except FileNotFoundError:
+            self._index.pop(key, None)
+            return None
+
+        try:
+            record = json.loads(line)["r"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Unreadable task archive record for {key} in segment {segment}")
+            self._index.pop(key, None)
+            return None
+
+        self.reads += 1
+        return record
+
+    def discard(self, key: str) -> bool:
+        """Forget a key; its bytes are reclaimed when the segment is pruned"""
+        self._open()
+        return self._index.pop(key, None) is not None
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Delete closed segments older than the retention period
+
+        Returns:
+            Number of records dropped
+        """
+        self._open()
+        cutoff = (now or time.time()) - self.retention_seconds
+        dropped = 0
+        for segment in sorted(self._segment_keys):
+            if segment == self._segment or self._segment_newest.get(segment, 0) >= cutoff:
+                continue
+
+            for key in self._segment_keys.pop(segment):
+                location = self._index.get(key)
+                if location is not None and _unpack(location)[0] == segment:
+                    del self._index[key]
+                    dropped += 1
+            self._segment_newest.pop(segment, None)
+            try:
+                os.remove(self._segment_path(segment))
+            except FileNotFoundError:
+                pass
+            self.pruned_segments += 1
+
+        # The active segment ages out too once nothing new arrives
+        if self._segment_newest.get(self._segment, cutoff) < cutoff:
+            self._roll()
+            dropped += self.prune(now)
+
+        self._prune_orphans(cutoff)
+        return dropped
+
+    def close(self):
+        """Close the active segment"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._opened = False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get archive size and usage counters"""
+        self._open()
+        return {
+            "directory": self.directory,
+            "records": len(self._index),
+            "segments": len(self._segment_keys),
+            "active_segment_bytes": self._file.tell() if self._file else 0,
+            "appended": self.appended,
+            "reads": self.reads,
+            "pruned_segments": self.pruned_segments
+        }
+
+    def _prune_orphans(self, cutoff: float):
+        """Delete expired segments left by exited processes"""
+        if self._owner_directory is None:
+            return
+        try:
+            owners = os.listdir(self._owner_directory)
+        except FileNotFoundError:
+            return
+
+        for owner in owners:
+            if not owner.isdigit() or int(owner) == os.getpid() or _pid_alive(int(owner)):
+                continue
+            directory = os.path.join(self._owner_directory, owner)
+            try:
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                os.rmdir(directory)
+            except OSError:
+                # Not empty yet, or another process is cleaning it up
+                pass
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:08d}.jsonl")
+
+    def _open(self):
+        """Load the index from existing segments and open the newest for appends"""
+        if self._opened and self._pid == os.getpid():
+            return
+        if self._pid != os.getpid():
+            # Forked: the inherited index and file belong to the parent
+            self._pid = os.getpid()
+            if self._owner_directory is not None:
+                self.directory = os.path.join(self._owner_directory, str(self._pid))
+            self._index.clear()
+            self._segment_keys.clear()
+            self._segment_newest.clear()
+            self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+
+        segments = sorted(
+            int(name[8:-6]) for name in os.listdir(self.directory)
+            if name.startswith('segment-') and name.endswith('.jsonl')
+        )
+        for segment in segments:
+            self._segment_keys[segment] = []
+            offset = 0
+            with open(self._segment_path(segment), 'r+b') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write at the tail; drop it so appends stay readable
+                        logger.warning(f"Truncating torn record in task archive segment {segment}")
+                        f.truncate(offset)
+                        break
+                    self._index[entry["k"]] = _pack(segment, offset, len(line))
+                    self._segment_keys[segment].append(entry["k"])
+                    self._segment_newest[segment] = entry["t"]
+                    offset += len(line)
+
+        self._segment = segments[-1] if segments else 0
+        self._segment_keys.setdefault(self._segment, [])
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._opened = True
+
+    def _roll(self):
+        """Start a new segment"""
+        self._file.close()
+        self._segment += 1
+        self._segment_keys[self._segment] = []
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+
+class TieredTaskStore(MutableMapping[str, Any]):
+    """
+    Dict of tasks with a bounded hot window and an archive tier
+
+    Tasks are kept in memory until they are marked finished. Finished tasks
+    are spilled to the archive, oldest first, once the hot window exceeds
+    max_hot_tasks or they have been finished for longer than hot_ttl.
+    Lookups by key (get, [], in) see archived tasks, returned as read-only
+    snapshots; iteration and len() cover the hot window only, so counts of
+    finished tasks come from finished_count(), which survives spilling.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[Any], Dict[str, Any]],
+        decode: Callable[[Dict[str, Any]], Any],
+        archive: Optional[SegmentLogArchive] = None,
+        max_hot_tasks: Optional[int] = None,
+        hot_ttl: Optional[float] = None,
+        on_spill: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Args:
+            encode: Converts a task to a JSON-serializable dict
+            decode: Rebuilds a task from an encoded dict
+            archive: Archive tier; defaults to a SegmentLogArchive
+            max_hot_tasks: Hot window size; defaults to ORCHESTRATOR_MAX_HOT_TASKS or 10000
+            hot_ttl: Seconds finished tasks stay hot; defaults to ORCHESTRATOR_HOT_TASK_TTL or 3600
+            on_spill: Called with the key of every task moved to the archive
+        """
+        self.encode = encode
+        self.decode = decode
+        self.archive = archive if archive is not None else SegmentLogArchive()
+        self.max_hot_tasks = max_hot_tasks or int(os.getenv('ORCHESTRATOR_MAX_HOT_TASKS', DEFAULT_MAX_HOT_TASKS))
+        self.hot_ttl = hot_ttl if hot_ttl is not None else float(
+            os.getenv('ORCHESTRATOR_HOT_TASK_TTL', DEFAULT_HOT_TASK_TTL)
+        )
+        self.on_spill = on_spill
+
+        self._hot: Dict[str, Any] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # key -> finished at (monotonic)
+
+        self.spilled = 0
+        self.archive_hits = 0
+        self.finished_counts: Dict[str, int] = {}  # outcome -> tasks finished with it
+
+    def __getitem__(self, key: str) -> Any:
+        task = self._hot.get(key)
+        if task is not None:
+            return task
+        record = self.archive.get(key)
+        if record is None:
+            raise KeyError(key)
+        self.archive_hits += 1
+        return self.decode(record)
+
+    def __setitem__(self, key: str, task: Any):
+        self._hot[key] = task
+        self._finished.pop(key, None)
+
+    def __delitem__(self, key: str):
+        found = self._hot.pop(key, None) is not None
+        self._finished.pop(key, None)
+        if not self.archive.discard(key) and not found:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._hot or key in self.archive
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._hot)
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def finish(self, key: str, outcome: Optional[str] = None):
+        """
+        Mark a task finished, making it eligible for the archive
+
+        Args:
+            key: Task key
+            outcome: Counted in finished_count() (e.g. "completed" or "failed")
+                unless the task is already marked finished
+        """
+        if key not in self._hot:
+            return
+        if outcome is not None and key not in self._finished:
+            self.finished_counts[outcome] = self.finished_counts.get(outcome, 0) + 1
+        self._finished.pop(key, None)
+        self._finished[key] = time.monotonic()
+
+        if len(self._hot) > self.max_hot_tasks:
+            # Spill a tenth of the window at once so appends are batched
+            self._spill(len(self._hot) - self.max_hot_tasks + self.max_hot_tasks // 10)
+
+    def spill_expired(self) -> int:
+        """
+        Move tasks finished longer than hot_ttl ago to the archive
+
+        Returns:
+            Number of tasks spilled
+        """
+        cutoff = time.monotonic() - self.hot_ttl
+        count = 0
+        for finished_at in self._finished.values():
+            if finished_at > cutoff:
+                break
+            count += 1
+        return self._spill(count)
+
+    def finished_count(self, outcome: str) -> int:
+        """Number of tasks finished with an outcome since the store was created"""
+        return self.finished_counts.get(outcome, 0)
+
+    def prune(self) -> int:
+        """Drop archived tasks past the archive's retention period"""
+        return self.archive.prune()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get tier sizes and spill counters"""
+        return {
+            "hot_tasks": len(self._hot),
+            "hot_finished": len(self._finished),
+            "max_hot_tasks": self.max_hot_tasks,
+            "spilled": self.spilled,
+            "archive_hits": self.archive_hits,
+            "finished": dict(self.finished_counts),
+            "archive": self.archive.get_metrics()
+        }
+
+    def _spill(self, count: int) -> int:
+        """Archive the count oldest finished tasks"""
+        keys = []
+        while count > 0 and self._finished:
+            key, _ = self._finished.popitem(last=False)
+            if key in self._hot:
+                keys.append(key)
+                count -= 1
+
+        if not keys:
+            return 0
+
+        try:
+            self.archive.append_many([(key, self.encode(self._hot[key])) for key in keys])
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to archive {len(keys)} tasks, keeping them in memory: {e}")
+            now = time.monotonic()
+            for key in reversed(keys):
+                self._finished[key] = now
+                self._finished.move_to_end(key, last=False)
+            return 0
+
+        for key in keys:
+            del self._hot[key]
+        self.spilled += len(keys)
+        if self.on_spill:
+            for key in keys:
+                self.on_spill(key)
+        return len(keys)
+
+
+__all__ = [
+    'SegmentLogArchive',
+    'TieredTaskStore'
+]
@@ -0,0 +1,301 @@
+"""
+Task dependency graph for the HTTP agent orchestrator
+Keeps reverse-dependency edges and a count of unmet dependencies per task,
+so completing a task releases its dependents in O(out-degree), and holds
+tasks whose dependencies are met in priority-ordered ready queues.
+"""
+
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WAITING = "waiting"
+READY = "ready"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@dataclass
+class _TaskNode:
+    """Scheduling state of one task"""
+    task_id: str
+    rank: int  # lower runs first
+    lane: Optional[str] = None  # agent the task is pinned to, None for any agent
+    state: str = WAITING
+    unmet: int = 0
+    ready_seq: int = 0
+    dependents: List[str] = field(default_factory=list)
+
+
+class TaskDAG:
+    """
+    Dependency-aware ready queue
+
+    Dependencies must be tasks in the graph or in the same batch; completed
+    ones are met, and a failed dependency blocks its dependents.
+    Each lane (None, or a pinned agent id) has its own ready queue ordered
+    by rank, then by the order tasks became ready.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[str, _TaskNode] = {}
+        self._ready: Dict[Optional[str], List[Tuple[int, int, str]]] = {}
+        self._ready_count: Dict[Optional[str], int] = {}
+        self._seq = 0
+
+        self.released = 0
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add(
+        self,
+        task_id: str,
+        dependencies: Iterable[str] = (),
+        rank: int = 0,
+        lane: Optional[str] = None
+    ) -> bool:
+        """
+        Add a task
+
+        Returns:
+            True if the task is ready to run
+
+        Raises:
+            ValueError: If the task exists, depends on itself or on an
+                unknown task
+        """
+        return self.add_many([(task_id, list(dependencies), rank, lane)])[0]
+
+    def add_many(self, tasks: List[Tuple[str, List[str], int, Optional[str]]]) -> List[bool]:
+        """
+        Add a batch of tasks that may depend on each other
+
+        Args:
+            tasks: (task_id, dependencies, rank, lane) tuples
+
+        Returns:
+            Whether each task is ready to run
+
+        Raises:
+            ValueError: If a task exists already, a dependency is unknown or
+                the batch has a cycle; nothing is added in that case
+        """
+        batch = {}
+        for task_id, dependencies, *_ in tasks:
+            if task_id in self._nodes or task_id in batch:
+                raise ValueError(f"Task {task_id} already exists")
+            batch[task_id] = dependencies
+        for task_id, dependencies in batch.items():
+            for dep_id in dependencies:
+                if dep_id not in self._nodes and dep_id not in batch:
+                    raise ValueError(f"Task {task_id} depends on unknown task {dep_id}")
+
+        cycle = self._find_cycle(batch)
+        if cycle:
+            raise ValueError(f"Task dependencies form a cycle: {' -> '.join(cycle)}")
+
+        for task_id, _, rank, lane in tasks:
+            self._nodes[task_id] = _TaskNode(task_id, rank, lane)
+
+        ready = []
+        for task_id, dependencies, *_ in tasks:
+            node = self._nodes[task_id]
+            for dep_id in set(dependencies):
+                dep = self._nodes[dep_id]
+                dep.dependents.append(task_id)
+                if dep.state != COMPLETED:
+                    node.unmet += 1
+
+            ready.append(node.unmet == 0)
+
+        # Queue in submission order once every edge is in place
+        for (task_id, *_), is_ready in zip(tasks, ready, strict=True):
+            if is_ready:
+                self._push_ready(self._nodes[task_id])
+
+        return ready
+
+    def is_ready(self, task_id: str) -> bool:
+        """Whether a task is waiting in a ready queue"""
+        node = self._nodes.get(task_id)
+        return node is not None and node.state == READY
+
+    def unmet_dependencies(self, task_id: str) -> int:
+        """Number of dependencies a task still waits for"""
+        node = self._nodes.get(task_id)
+        return node.unmet if node else 0
+
+    def mark_ready(self, task_id: str) -> bool:
+        """
+        Put a task (back) in its ready queue, e.g. to retry it
+
+        Returns:
+            False if the task is unknown or still has unmet dependencies
+        """
+        node = self._nodes.get(task_id)
+        if node is None or node.unmet > 0:
+            return False
+        if node.state != READY:
+            self._push_ready(node)
+        return True
+
+    def has_ready(self, lane: Optional[str] = None) -> bool:
+        """Whether a lane has tasks ready to run"""
+        return self._ready_count.get(lane, 0) > 0
+
+    def pop_ready(self, lane: Optional[str] = None) -> Optional[str]:
+        """Take the highest priority ready task of a lane and mark it running"""
+        heap = self._ready.get(lane)
+        while heap:
+            _, seq, task_id = heapq.heappop(heap)
+            node = self._nodes.get(task_id)
+            if node is None or node.state != READY or node.ready_seq != seq:
+                continue  # Superseded entry
+
+            node.state = RUNNING
+            self._ready_count[lane] -= 1
+            return task_id
+        return None
+
+    def set_lane(self, task_id: str, lane: Optional[str]):
+        """Pin a task to an agent, or unpin it with None"""
+        node = self._nodes.get(task_id)
+        if node is None or node.lane == lane:
+            return
+        was_ready = node.state == READY
+        if was_ready:
+            self._unready(node)
+        node.lane = lane
+        if was_ready:
+            self._push_ready(node)
+
+    def complete(self, task_id: str) -> List[str]:
+        """
+        Mark a task completed
+
+        Returns:
+            Dependents that became ready, in the order they were added
+        """
+        node = self._nodes.get(task_id)
+        if node is None or node.state == COMPLETED:
+            return []
+
+        if node.state == READY:
+            self._unready(node)
+        node.state = COMPLETED
+
+        released = []
+        for dependent_id in node.dependents:
+            dependent = self._nodes.get(dependent_id)
+            if dependent is None:
+                continue
+            dependent.unmet -= 1
+            if dependent.unmet == 0 and dependent.state == WAITING:
+                self._push_ready(dependent)
+                released.append(dependent_id)
+
+        self.released += len(released)
+        return released
+
+    def fail(self, task_id: str):
+        """Mark a task permanently failed; its dependents stay blocked"""
+        node = self._nodes.get(task_id)
+        if node is None:
+            return
+        if node.state == READY:
+            self._unready(node)
+        node.state = FAILED
+
+    def remove(self, task_id: str):
+        """Forget a finished task"""
+        node = self._nodes.pop(task_id, None)
+        if node is not None and node.state == READY:
+            node.state = WAITING
+            self._unready(node)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get task counts by state"""
+        counts = {WAITING: 0, READY: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        for node in self._nodes.values():
+            counts[node.state] += 1
+        return {
+            "tasks": len(self._nodes),
+            "by_state": counts,
+            "ready_lanes": {str(lane): count for lane, count in self._ready_count.items() if count},
+            "released": self.released
+        }
+
+    def _push_ready(self, node: _TaskNode):
+        """Queue a task in its lane"""
+        self._seq += 1
+        node.state = READY
+        node.ready_seq = self._seq
+        heapq.heappush(self._ready.setdefault(node.lane, []), (node.rank, self._seq, node.task_id))
+        self._ready_count[node.lane] = self._ready_count.get(node.lane, 0) + 1
+
+    def _unready(self, node: _TaskNode):
+        """
+        Take a task out of its lane's count; its heap entry goes stale and is
+        skipped on pop, or dropped here once stale entries dominate the heap
+        """
+        lane = node.lane
+        self._ready_count[lane] -= 1
+        heap = self._ready.get(lane)
+        if heap and len(heap) > 2 * self._ready_count[lane] + 64:
+            node.ready_seq = 0  # Exclude this entry from the rebuilt heap
+            live = []
+            for entry in heap:
+                other = self._nodes.get(entry[2])
+                if other is not None and other.state == READY and other.ready_seq == entry[1] and other.lane == lane:
+                    live.append(entry)
+            heapq.heapify(live)
+            self._ready[lane] = live
+
+    @staticmethod
+    def _find_cycle(batch: Dict[str, List[str]]) -> Optional[List[str]]:
+        """Find a dependency cycle among new tasks (Kahn's algorithm), if any"""
+        indegree = dict.fromkeys(batch, 0)
+        dependents: Dict[str, List[str]] = {task_id: [] for task_id in batch}
+        for task_id, dependencies in batch.items():
+            for dep_id in set(dependencies):
+                if dep_id in batch:
+                    indegree[task_id] += 1
+                    dependents[dep_id].append(task_id)
+
+        queue = deque(task_id for task_id, degree in indegree.items() if degree == 0)
+        visited = 0
+        while queue:
+            task_id = queue.popleft()
+            visited += 1
+            for dependent_id in dependents[task_id]:
+                indegree[dependent_id] -= 1
+                if indegree[dependent_id] == 0:
+                    queue.append(dependent_id)
+
+        if visited == len(batch):
+            return None
+
+        # Walk dependencies among the leftover tasks until one repeats
+        leftover = {task_id for task_id, degree in indegree.items() if degree > 0}
+        path: List[str] = []
+        seen: Dict[str, int] = {}
+        task_id = next(iter(leftover))
+        while task_id not in seen:
+            seen[task_id] = len(path)
+            path.append(task_id)
+            task_id = next(dep_id for dep_id in batch[task_id] if dep_id in leftover)
+        return path[seen[task_id]:] + [task_id]
+
+
+__all__ = [
+    'TaskDAG'
+]
@@ -0,0 +1,413 @@
+"""
+Push-based task dispatch
+Hands newly created tasks to agents of the matching type as soon as they
+are created, so agents block on a queue instead of polling Firestore.
+Claimed tasks are leased: a lease that is neither acknowledged nor released
+before it expires puts the task back on the queue, so a crashed agent does
+not lose work.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import asdict, dataclass, is_dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .firestore_executor import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 360.0
+MIN_CLAIM_WAIT_SECONDS = 0.01
+
+
+@dataclass
+class TaskLease:
+    """A claimed task and how long the claimer may hold it"""
+    lease_id: str
+    task_id: str
+    agent_type: str
+    task: Dict[str, Any]
+    expires_at: float  # time.time()
+    attempts: int = 1
+
+
+@dataclass
+class _QueuedTask:
+    """Task waiting to be claimed"""
+    task_id: str
+    agent_type: str
+    task: Dict[str, Any]
+    published_at: float
+    attempts: int = 0
+
+
+def task_message(task: Any) -> Dict[str, Any]:
+    """
+    Convert a Task (or task dict) to a JSON-safe dispatch payload
+
+    Datetimes become ISO strings; Firestore sentinels such as
+    SERVER_TIMESTAMP become the current time.
+    """
+    data = asdict(task) if is_dataclass(task) else dict(task)
+    for key in ('created_at', 'updated_at'):
+        value = data.get(key)
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+        elif value is not None and not isinstance(value, str):
+            data[key] = datetime.now().isoformat()
+    return data
+
+
+class DispatchQueue(ABC):
+    """Per agent type queue of pending tasks with leased delivery"""
+
+    def __init__(self):
+        self.published = 0
+        self.duplicates = 0
+        self.claimed = 0
+        self.acked = 0
+        self.released = 0
+        self.expired = 0
+        self.discarded = 0
+        self._pickup_histogram = LatencyHistogram()
+
+    @abstractmethod
+    async def publish(self, agent_type: str, task: Dict[str, Any]) -> bool:
+        """
+        Queue a pending task for agents of a type
+
+        Returns:
+            False if the task is already queued or leased
+        """
+
+    @abstractmethod
+    async def claim(
+        self,
+        agent_type: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        timeout: float = 5.0
+    ) -> Optional[TaskLease]:
+        """Wait up to timeout seconds for a task and lease it"""
+
+    @abstractmethod
+    async def ack(self, lease: TaskLease) -> bool:
+        """Mark a leased task as done so it is never redelivered"""
+
+    @abstractmethod
+    async def release(self, lease: TaskLease) -> bool:
+        """Give a leased task back so another agent can claim it"""
+
+    @abstractmethod
+    async def discard(self, agent_type: str, task_id: str) -> bool:
+        """Drop a queued task whose status is no longer pending"""
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get delivery counters and pickup latency"""
+        return {
+            "published": self.published,
+            "duplicates": self.duplicates,
+            "claimed": self.claimed,
+            "acked": self.acked,
+            "released": self.released,
+            "expired": self.expired,
+            "discarded": self.discarded,
+            "pickup_latency": self._pickup_histogram.to_dict()
+        }
+
+
+class InProcessDispatchQueue(DispatchQueue):
+    """Dispatch queue for agents running in the same process"""
+
+    def __init__(self):
+        super().__init__()
+        self._queues: Dict[str, Deque[str]] = {}
+        self._queued: Dict[str, _QueuedTask] = {}
+        self._leases: Dict[str, Tuple[TaskLease, _QueuedTask]] = {}
+        self._leased_tasks: Dict[str, str] = {}  # task_id -> lease_id
+        self._expiry: List[Tuple[float, str]] = []
+        self._conditions: Dict[str, asyncio.Condition] = {}
+
+    async def publish(self, agent_type: str, task: Dict[str, Any]) -> bool:
+        task_id = task['id']
+        if task_id in self._queued or task_id in self._leased_tasks:
+            self.duplicates += 1
+            return False
+
+        self._push(_QueuedTask(task_id, agent_type, task, time.time()))
+        self.published += 1
+        await self._notify(agent_type)
+        return True
+
+    async def claim(
+        self,
+        agent_type: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        timeout: float = 5.0
+    ) -> Optional[TaskLease]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            self._requeue_expired()
+            queued = self._pop(agent_type)
+            if queued is not None:
+                return self._lease(queued, lease_seconds)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            if self._expiry:
+                # Wake up in time to pick up a lease that runs out
+                remaining = min(remaining, max(self._expiry[0][0] - time.time(), 0.0) + 0.001)
+
+            condition = self._condition(agent_type)
+            async with condition:
+                if self._queues.get(agent_type):
+                    continue  # Published while we were taking the lock
+                try:
+                    await asyncio.wait_for(condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def ack(self, lease: TaskLease) -> bool:
+        entry = self._leases.pop(lease.lease_id, None)
+        if entry is None:
+            return False
+        self._leased_tasks.pop(lease.task_id, None)
+        self.acked += 1
+        return True
+
+    async def release(self, lease: TaskLease) -> bool:
+        entry = self._leases.pop(lease.lease_id, None)
+        if entry is None:
+            return False
+        self._leased_tasks.pop(lease.task_id, None)
+        self._push(entry[1], front=True)
+        self.released += 1
+        await self._notify(lease.agent_type)
+        return True
+
+    async def discard(self, agent_type: str, task_id: str) -> bool:
+        # The task id stays in its deque and is skipped when popped
+        if self._queued.pop(task_id, None) is None:
+            return False
+        self.discarded += 1
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = super().get_metrics()
+        metrics.update({
+            "backend": "memory",
+            "queued": len(self._queued),
+            "leased": len(self._leases)
+        })
+        return metrics
+
+    def _push(self, queued: _QueuedTask, front: bool = False):
+        """Add a task to its agent type's queue"""
+        self._queued[queued.task_id] = queued
+        queue = self._queues.setdefault(queued.agent_type, deque())
+        if front:
+            queue.appendleft(queued.task_id)
+        else:
+            queue.append(queued.task_id)
+
+    def _pop(self, agent_type: str) -> Optional[_QueuedTask]:
+        """Take the oldest still-queued task for an agent type"""
+        queue = self._queues.get(agent_type)
+        while queue:
+            queued = self._queued.pop(queue.popleft(), None)
+            if queued is not None:
+                return queued
+        return None
+
+    def _lease(self, queued: _QueuedTask, lease_seconds: float) -> TaskLease:
+        """Create a lease for a popped task"""
+        now = time.time()
+        queued.attempts += 1
+        lease = TaskLease(
+            lease_id=uuid.uuid4().hex,
+            task_id=queued.task_id,
+            agent_type=queued.agent_type,
+            task=queued.task,
+            expires_at=now + lease_seconds,
+            attempts=queued.attempts
+        )
+        self._leases[lease.lease_id] = (lease, queued)
+        self._leased_tasks[lease.task_id] = lease.lease_id
+        heapq.heappush(self._expiry, (lease.expires_at, lease.lease_id))
+
+        self.claimed += 1
+        if queued.attempts == 1:
+            self._pickup_histogram.record(now - queued.published_at)
+        return lease
+
+    def _requeue_expired(self):
+        """Put tasks whose lease ran out back at the front of their queue"""
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, lease_id = heapq.heappop(self._expiry)
+            entry = self._leases.pop(lease_id, None)
+            if entry is None:
+                continue  # Acked or released already
+
+            lease, queued = entry
+            self._leased_tasks.pop(lease.task_id, None)
+            self._push(queued, front=True)
+            self.expired += 1
+            logger.warning(f"Lease on task {lease.task_id} expired, requeueing")
+
+    def _condition(self, agent_type: str) -> asyncio.Condition:
+        condition = self._conditions.get(agent_type)
+        if condition is None:
+            condition = self._conditions[agent_type] = asyncio.Condition()
+        return condition
+
+    async def _notify(self, agent_type: str):
+        """Wake one agent waiting for this type"""
+        condition = self._condition(agent_type)
+        async with condition:
+            condition.notify()
+
+
+class RedisDispatchQueue(DispatchQueue):
+    """
+    Dispatch queue shared across processes, on the RedisManager task queues
+
+    Publishing sets the task's dispatch marker together with the push, so a
+    task is queued at most once until it is acked or discarded. Claims move
+    the task atomically into a lease, and expired leases (or claims cut off
+    midway) are pushed back by any worker.
+    """
+
+    def __init__(self, redis_manager: Any = None):
+        super().__init__()
+        self._redis = redis_manager
+
+    async def _manager(self):
+        if self._redis is None:
+            from database.redis import get_redis
+            self._redis = await get_redis()
+        return self._redis
+
+    @staticmethod
+    def _queue_name(agent_type: str) -> str:
+        return f"agent_tasks:{agent_type}"
+
+    async def publish(self, agent_type: str, task: Dict[str, Any]) -> bool:
+        redis = await self._manager()
+        enqueued = await redis.enqueue_task_once(self._queue_name(agent_type), task['id'], {
+            "task": task,
+            "published_at": time.time()
+        })
+        if enqueued:
+            self.published += 1
+        elif enqueued is not None:
+            self.duplicates += 1
+        return bool(enqueued)
+
+    async def claim(
+        self,
+        agent_type: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        timeout: float = 5.0
+    ) -> Optional[TaskLease]:
+        redis = await self._manager()
+        queue_name = self._queue_name(agent_type)
+
+        self.expired += await redis.requeue_expired_task_leases(queue_name, time.time())
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            # BLMOVE takes decimal seconds (Redis 6+); 0 would block forever
+            remaining = max(deadline - loop.time(), MIN_CLAIM_WAIT_SECONDS)
+            lease_id = uuid.uuid4().hex
+            claimed = await redis.claim_task_lease(queue_name, lease_id, remaining, lease_seconds)
+            if claimed is None:
+                return None
+
+            item = claimed["task"]
+            if claimed["status"] == "discarded":
+                self.discarded += 1
+                if loop.time() < deadline:
+                    continue
+                return None
+
+            lease = TaskLease(
+                lease_id=lease_id,
+                task_id=item['task_id'],
+                agent_type=agent_type,
+                task=item['task'],
+                expires_at=claimed["expires_at"],
+                attempts=claimed["attempts"]
+            )
+
+            self.claimed += 1
+            if lease.attempts == 1:
+                now = time.time()
+                self._pickup_histogram.record(now - item.get('published_at', now))
+            return lease
+
+    async def ack(self, lease: TaskLease) -> bool:
+        redis = await self._manager()
+        acked = await redis.ack_task_lease(self._queue_name(lease.agent_type), lease.lease_id)
+        if acked:
+            self.acked += 1
+        return acked
+
+    async def release(self, lease: TaskLease) -> bool:
+        redis = await self._manager()
+        released = await redis.release_task_lease(self._queue_name(lease.agent_type), lease.lease_id)
+        if released:
+            self.released += 1
+        return released
+
+    async def discard(self, agent_type: str, task_id: str) -> bool:
+        redis = await self._manager()
+        # Queued copies no longer match the dispatch marker and are dropped when claimed
+        discarded = await redis.discard_queued_task(self._queue_name(agent_type), task_id)
+        if discarded:
+            self.discarded += 1
+        return discarded
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = super().get_metrics()
+        metrics["backend"] = "redis"
+        return metrics
+
+
+# Global dispatch queue
+_dispatch_queue: Optional[DispatchQueue] = None
+
+
+def get_dispatch_queue() -> DispatchQueue:
+    """
+    Get the global dispatch queue
+
+    TASK_DISPATCH_BACKEND selects the implementation: "memory" (default) for
+    agents in this process, "redis" for agents spread over processes.
+    """
+    global _dispatch_queue
+    if _dispatch_queue is None:
+        backend = os.getenv('TASK_DISPATCH_BACKEND', 'memory').lower()
+        _dispatch_queue = RedisDispatchQueue() if backend == 'redis' else InProcessDispatchQueue()
+    return _dispatch_queue
+
+
+__all__ = [
+    'DEFAULT_LEASE_SECONDS',
+    'TaskLease',
+    'DispatchQueue',
+    'InProcessDispatchQueue',
+    'RedisDispatchQueue',
+    'task_message',
+    'get_dispatch_queue'
+]
@@ -0,0 +1,12 @@
+"""
+Shared test setup
+Puts the backend root on sys.path so tests can import services and
+monitoring modules the way the application does.
+"""
+
+import os
+import sys
+
+_backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
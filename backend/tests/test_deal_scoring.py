@@ -0,0 +1,169 @@
+"""
+Tests for batched deal health scoring
+Checks score_deals against the per-deal scoring CRMIntelligenceEngine did
+before it was batched, on a fixture pipeline with every stage, missing and
+malformed amounts and creation dates, and on an empty pipeline.
+"""
+
+import importlib
+import importlib.util
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+# Import services.business_intelligence.deal_scoring without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("business_intelligence", importlib.util.module_from_spec(_spec))
+deal_scoring = importlib.import_module("business_intelligence.deal_scoring")
+
+# CRMIntelligenceEngine.health_scoring_config
+WEIGHTS = {
+    "activity_level": 0.25,
+    "engagement_score": 0.20,
+    "deal_progression": 0.20,
+    "timeline_compliance": 0.15,
+    "buyer_signals": 0.20
+}
+THRESHOLDS = {"healthy": 80, "warning": 60, "at_risk": 40, "critical": 20}
+STALL_DAYS = 14
+
+NOW = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+
+STAGES = [
+    "appointment_scheduled", "qualified_to_buy", "presentation_scheduled", "decision_maker_bought_in",
+    "contract_sent", "closed_won", "closed_lost", "custom_stage"
+]
+AMOUNTS = [0, 1200, 25000.5, 50000, 250000, None, float("nan"), "n/a"]
+CREATED = [
+    (NOW - timedelta(days=3)).isoformat(),
+    (NOW - timedelta(days=14, hours=1)).isoformat(),
+    (NOW - timedelta(days=15)).isoformat().replace("+00:00", "Z"),
+    (NOW - timedelta(days=90)).isoformat(),
+    "not a date",
+    None,
+]
+
+
+def pipeline():
+    """Every combination of stage, amount and creation date, some without the keys"""
+    deals = []
+    for stage_index, stage in enumerate(STAGES):
+        for amount_index, amount in enumerate(AMOUNTS):
+            for created_index, created in enumerate(CREATED):
+                deal = {"dealId": f"deal-{len(deals)}", "dealname": f"Deal {len(deals)}", "dealstage": stage}
+                if (stage_index + amount_index) % 5:
+                    deal["amount"] = amount  # Left out of some deals: counted as 0
+                if created is not None:
+                    deal["createdate"] = created
+                deals.append(deal)
+    deals.append({"dealId": "bare"})
+    return deals
+
+
+def legacy_score(deal):
+    """(factors, health, status, days in stage, stalled) as scored one deal at a time before batching"""
+    stage = deal.get("dealstage", "")
+    engagement = deal_scoring.STAGE_ENGAGEMENT.get(stage, deal_scoring.DEFAULT_ENGAGEMENT)
+    progression = deal_scoring.STAGE_PROGRESSION.get(stage, deal_scoring.DEFAULT_PROGRESSION)
+    try:
+        amount = deal.get("amount", 0)
+        if isinstance(amount, float) and math.isnan(amount):
+            raise ValueError("NaN amount")  # Scored as 1.0 before; now unknown like other non-numbers
+        buyer_signals = (min(1.0, amount / 50000) + progression) / 2
+    except (TypeError, ValueError):
+        buyer_signals = 0.5
+    factors = {
+        "activity_level": 0.7,
+        "engagement_score": engagement,
+        "deal_progression": progression,
+        "timeline_compliance": 0.6,
+        "buyer_signals": buyer_signals
+    }
+    health = (
+        factors["activity_level"] * WEIGHTS["activity_level"] +
+        factors["engagement_score"] * WEIGHTS["engagement_score"] +
+        factors["deal_progression"] * WEIGHTS["deal_progression"] +
+        factors["timeline_compliance"] * WEIGHTS["timeline_compliance"] +
+        factors["buyer_signals"] * WEIGHTS["buyer_signals"]
+    ) * 100
+    if health >= THRESHOLDS["healthy"]:
+        status = "healthy"
+    elif health >= THRESHOLDS["warning"]:
+        status = "warning"
+    elif health >= THRESHOLDS["at_risk"]:
+        status = "at_risk"
+    else:
+        status = "critical"
+
+    try:
+        days = (NOW - datetime.fromisoformat(deal["createdate"].replace('Z', '+00:00'))).days
+    except (KeyError, ValueError):
+        days = 0
+    stalled = stage not in deal_scoring.CLOSED_STAGES and "createdate" in deal and days > STALL_DAYS
+    return factors, health, status, days, stalled
+
+
+def test_batched_scores_match_per_deal_scoring():
+    deals = pipeline()
+
+    scores = deal_scoring.score_deals(deal_scoring.DealBatch.from_deals(deals), WEIGHTS, THRESHOLDS, STALL_DAYS, now=NOW)
+
+    assert len(scores) == len(deals)
+    for index, deal in enumerate(deals):
+        factors, health, status, days, stalled = legacy_score(deal)
+        assert scores.scoring_factors(index) == pytest.approx(factors), deal
+        assert scores.health[index] == pytest.approx(health), deal
+        assert deal_scoring.HEALTH_STATUSES[scores.status[index]] == status, deal
+        assert (int(scores.days_in_stage[index]), bool(scores.stalled[index])) == (days, stalled), deal
+        assert scores.batch.stage(index) == deal.get("dealstage", "")
+    assert scores.assessed_at == NOW
+
+
+def test_missing_and_malformed_amounts_score_unknown_buyer_signals():
+    deals = [
+        {"dealstage": "contract_sent", "amount": None},
+        {"dealstage": "contract_sent", "amount": float("nan")},
+        {"dealstage": "contract_sent", "amount": "n/a"},
+        {"dealstage": "contract_sent"},
+        {"dealstage": "contract_sent", "amount": 100000},
+    ]
+
+    scores = deal_scoring.score_deals(deal_scoring.DealBatch.from_deals(deals), WEIGHTS, THRESHOLDS, STALL_DAYS, now=NOW)
+
+    buyer_signals = scores.factors[:, deal_scoring.FACTORS.index("buyer_signals")]
+    assert buyer_signals.tolist() == pytest.approx([0.5, 0.5, 0.5, 0.45, 0.95])
+
+
+def test_status_counts_and_riskiest_deals():
+    deals = pipeline()
+    scores = deal_scoring.score_deals(deal_scoring.DealBatch.from_deals(deals), WEIGHTS, THRESHOLDS, STALL_DAYS, now=NOW)
+
+    expected_counts = {}
+    for deal in deals:
+        status = legacy_score(deal)[2]
+        expected_counts[status] = expected_counts.get(status, 0) + 1
+    assert scores.status_counts() == expected_counts
+
+    riskiest = scores.riskiest(10).tolist()
+    assert riskiest == sorted(range(len(deals)), key=lambda index: (scores.health[index], index))[:10]
+    assert scores.riskiest(len(deals) + 5).tolist() == sorted(
+        range(len(deals)), key=lambda index: (scores.health[index], index)
+    )
+
+
+def test_empty_pipeline_scores_nothing():
+    scores = deal_scoring.score_deals(deal_scoring.DealBatch.from_deals([]), WEIGHTS, THRESHOLDS, STALL_DAYS, now=NOW)
+
+    assert len(scores) == 0
+    assert scores.factors.shape == (0, len(deal_scoring.FACTORS))
+    assert scores.status_counts() == {}
+    assert scores.riskiest(5).size == 0
+    assert not np.any(scores.stalled)
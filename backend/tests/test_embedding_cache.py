@@ -0,0 +1,163 @@
+"""
+Tests for the graph memory embedding cache and batcher
+Runs CachedEmbedder against a fake embedder that records every
+aembed_documents call, so no OpenAI access is needed.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Import agents.memory.embedding_cache without running the package __init__,
+# which connects graph memory and the virtual filesystem to Firebase
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'agents', 'memory')
+_spec = importlib.util.spec_from_file_location(
+    "agent_memory", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("agent_memory", importlib.util.module_from_spec(_spec))
+embedding_cache = importlib.import_module("agent_memory.embedding_cache")
+
+
+class FakeEmbedder:
+    """Deterministic embedder recording the texts of each call"""
+
+    model = "fake-embedding"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [[float(len(text)), float(sum(map(ord, text)) % 997)] for text in texts]
+
+
+def test_cache_keys_by_content_hash():
+    cache = embedding_cache.EmbeddingCache(namespace="model-a")
+
+    cache.put("same text", [1.0, 2.0])
+
+    assert cache.get("same text") == [1.0, 2.0]
+    assert cache.key_for("same text") == embedding_cache.EmbeddingCache(namespace="model-a").key_for("same text")
+    assert cache.key_for("same text") != embedding_cache.EmbeddingCache(namespace="model-b").key_for("same text")
+    assert cache.get("other text") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = embedding_cache.EmbeddingCache(max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]  # b is now least recently used
+
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.get("c") == [3.0]
+    metrics = cache.get_metrics()
+    assert metrics["entries"] == 2
+    assert metrics["evictions"] == 1
+
+
+def test_cache_survives_restart_through_disk_store(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = embedding_cache.EmbeddingCache(store_path=path)
+    cache.put("persisted", [0.5, 0.25])
+    cache.close()
+
+    reopened = embedding_cache.EmbeddingCache(store_path=path)
+
+    assert reopened.get("persisted") == [0.5, 0.25]
+    assert reopened.get_metrics()["disk_hits"] == 1
+    reopened.close()
+
+
+async def test_duplicate_texts_are_embedded_once():
+    fake = FakeEmbedder()
+    embedder = embedding_cache.CachedEmbedder(fake)
+
+    vectors = await embedder.aembed_documents(["alpha", "beta", "alpha"])
+    again = await embedder.aembed_query("alpha")
+
+    assert vectors[0] == vectors[2] == again
+    assert [sorted(call) for call in fake.calls] == [["alpha", "beta"]]
+
+
+async def test_concurrent_requests_merge_into_one_batch():
+    fake = FakeEmbedder(delay=0.01)
+    embedder = embedding_cache.CachedEmbedder(fake, max_batch_size=64, max_wait_ms=20)
+    texts = [f"text {i}" for i in range(10)]
+
+    results = await asyncio.gather(*(embedder.aembed_query(text) for text in texts))
+
+    assert len(fake.calls) == 1
+    assert sorted(fake.calls[0]) == sorted(texts)
+    assert results == await fake.aembed_documents(texts)
+
+
+async def test_full_batch_flushes_without_waiting():
+    fake = FakeEmbedder()
+    embedder = embedding_cache.CachedEmbedder(fake, max_batch_size=4, max_wait_ms=10000)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(embedder.aembed_query(f"text {i}") for i in range(8))), timeout=1.0
+    )
+
+    assert [len(call) for call in fake.calls] == [4, 4]
+
+
+async def test_metrics_report_hit_rate_and_batch_size():
+    fake = FakeEmbedder()
+    embedder = embedding_cache.CachedEmbedder(fake, max_wait_ms=5)
+
+    await asyncio.gather(*(embedder.aembed_query(f"text {i}") for i in range(4)))
+    await asyncio.gather(*(embedder.aembed_query(f"text {i}") for i in range(4)))
+
+    metrics = embedder.get_metrics()
+    assert metrics["cache"]["hits"] == 4
+    assert metrics["cache"]["misses"] == 4
+    assert metrics["cache"]["hit_rate"] == pytest.approx(0.5)
+    assert metrics["batching"]["batches"] == 1
+    assert metrics["batching"]["batched_texts"] == 4
+    assert metrics["batching"]["avg_batch_size"] == pytest.approx(4.0)
+    assert metrics["batching"]["max_batch_size"] == 4
+
+
+async def test_embedder_errors_reach_every_waiter():
+    class FailingEmbedder:
+        async def aembed_documents(self, texts):
+            raise RuntimeError("embedding service down")
+
+    embedder = embedding_cache.CachedEmbedder(FailingEmbedder())
+
+    results = await asyncio.gather(
+        embedder.aembed_query("a"), embedder.aembed_query("b"), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert embedder.cache.get_metrics()["entries"] == 0
+
+
+async def test_short_embedder_response_fails_every_waiter():
+    class ShortEmbedder:
+        async def aembed_documents(self, texts):
+            return [[1.0, 2.0]] * (len(texts) - 1)
+
+    embedder = embedding_cache.CachedEmbedder(ShortEmbedder(), max_wait_ms=5)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            embedder.aembed_query("a"), embedder.aembed_query("b"), embedder.aembed_query("c"),
+            return_exceptions=True
+        ),
+        timeout=1.0
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert embedder.cache.get_metrics()["entries"] == 0
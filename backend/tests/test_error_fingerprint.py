@@ -0,0 +1,99 @@
+"""
+Tests for error grouping
+Checks message normalization, near-duplicate matching through the
+MinHash/LSH fingerprint index, and least recently seen eviction of
+error reports together with their fingerprints.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+# Import the monitoring modules without running the package __init__, which imports every backend client
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'monitoring')
+_spec = importlib.util.spec_from_file_location(
+    "autoadmin_monitoring", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("autoadmin_monitoring", importlib.util.module_from_spec(_spec))
+error_fingerprint = importlib.import_module("autoadmin_monitoring.error_fingerprint")
+error_tracking = importlib.import_module("autoadmin_monitoring.error_tracking")
+
+ErrorFingerprintIndex = error_fingerprint.ErrorFingerprintIndex
+
+TIMEOUT = "Timed out after <NUMBER>ms waiting for response from the payments service while charging the customer card"
+
+
+def test_normalization_replaces_ids_timestamps_numbers_and_paths():
+    tracker = error_tracking.ErrorTracker()
+    first = tracker._normalize_message(
+        "Task 3f2b1c4e-9a8d-4e7f-b6c5-1d2e3f4a5b6c failed at 2024-05-01T10:20:30.123Z "
+        "after 3 retries reading /srv/app/data/file.json"
+    )
+    second = tracker._normalize_message(
+        "Task 00000000-1111-2222-3333-444444444444 failed at 2025-12-31T23:59:59+01:00 "
+        "after 17 retries reading /var/lib/cache/file.json"
+    )
+
+    assert first == second
+    assert first == "Task <UUID> failed at <TIMESTAMP> after <NUMBER> retries reading <PATH>/file.json"
+
+
+async def test_messages_differing_only_in_values_are_grouped():
+    tracker = error_tracking.ErrorTracker()
+    first = await tracker.track_error(TimeoutError("Timed out after 500ms waiting for response from the payments service"))
+    second = await tracker.track_error(TimeoutError("Timed out after 750ms waiting for response from the payments service"))
+    other = await tracker.track_error(KeyError("missing configuration key"))
+
+    assert first != second
+    assert tracker.error_reports[first].message_pattern == tracker.error_reports[second].message_pattern
+    assert tracker.error_reports[second].similar_errors == [first]
+    assert tracker.error_reports[other].similar_errors == []
+
+
+def test_index_finds_near_duplicates_and_skips_unrelated_messages():
+    index = ErrorFingerprintIndex()
+    index.add("timeout", TIMEOUT)
+    index.add("auth", "Invalid credentials supplied for user account login")
+
+    near_duplicate = TIMEOUT.replace("customer", "customers")
+    assert index.candidates(near_duplicate) == ["timeout"]
+    assert index.candidates("Disk quota exceeded on volume") == []
+
+
+def test_index_ranks_candidates_by_shared_buckets():
+    index = ErrorFingerprintIndex()
+    index.add("near", TIMEOUT.replace("payments", "billing").replace("customer card", "stored client account"))
+    index.add("exact", TIMEOUT)
+
+    assert index.candidates(TIMEOUT)[0] == "exact"
+    assert index.candidates(TIMEOUT, limit=1) == ["exact"]
+
+
+def test_index_add_replaces_and_remove_drops_buckets():
+    index = ErrorFingerprintIndex()
+    index.add("key", TIMEOUT)
+    index.add("key", "Invalid credentials supplied for user account login")
+
+    assert len(index) == 1
+    assert index.candidates(TIMEOUT) == []
+
+    index.remove("key")
+    index.remove("key")  # Already removed
+    assert "key" not in index
+    assert index._buckets == {}
+
+
+async def test_least_recently_seen_report_is_evicted_with_its_fingerprint():
+    tracker = error_tracking.ErrorTracker()
+    tracker.max_reports = 2
+    first = await tracker.track_error(ValueError("first distinct failure in the importer"))
+    second = await tracker.track_error(KeyError("second unrelated lookup problem"))
+    await tracker.track_error(ValueError("first distinct failure in the importer"))  # Seen again
+    third = await tracker.track_error(RuntimeError("third kind of crash in the scheduler"))
+
+    assert list(tracker.error_reports) == [first, third]
+    assert tracker.evicted_reports == 1
+    assert second not in tracker.fingerprints
+    assert len(tracker.fingerprints) == 2
+    assert tracker.error_reports[first].total_occurrences == 2
@@ -0,0 +1,145 @@
+"""
+Tests for the virtual filesystem content cache
+Drives FileCache with a fake clock through TTL expiry, revalidation the
+way VirtualFileSystem.read_file does it, and byte-budgeted eviction.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Import agents.memory.file_cache without running the package __init__,
+# which connects graph memory and the virtual filesystem to Firebase
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'agents', 'memory')
+_spec = importlib.util.spec_from_file_location(
+    "agent_memory", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("agent_memory", importlib.util.module_from_spec(_spec))
+file_cache = importlib.import_module("agent_memory.file_cache")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return file_cache.FileCache(max_bytes=100, ttl_seconds=60, clock=clock)
+
+
+def read(cache, path, stored_version, fetch):
+    """VirtualFileSystem.read_file's cache protocol, with (version, content) entries"""
+    entry = cache.get(path)
+    if entry is not None:
+        return entry[1]
+    stale = cache.get_stale(path)
+    if stale is not None:
+        if stale[0] == stored_version:
+            cache.renew(path)
+            return stale[1]
+        cache.invalidate(path)
+    version, content = fetch()
+    cache.put(path, (version, content), len(content))
+    return content
+
+
+def test_entry_is_served_within_the_ttl(cache, clock):
+    cache.put("/a", "alpha", 5)
+    clock.now += 59.9
+
+    assert cache.get("/a") == "alpha"
+    assert "/a" in cache
+    assert cache.get("/b") is None
+    metrics = cache.get_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_expired_entry_is_kept_for_revalidation(cache, clock):
+    cache.put("/a", "alpha", 5)
+    clock.now += 60
+
+    assert cache.get("/a") is None
+    assert "/a" not in cache
+    assert cache.get_stale("/a") == "alpha"
+    assert cache.get_metrics()["expirations"] == 1
+
+
+def test_unchanged_version_renews_without_fetching(cache, clock):
+    fetches = []
+    cache.put("/a", ("v1", "alpha"), 5)
+    clock.now += 61
+
+    content = read(cache, "/a", "v1", lambda: fetches.append(1))
+
+    assert content == "alpha"
+    assert fetches == []
+    assert cache.get_metrics()["revalidations"] == 1
+    clock.now += 59  # TTL restarted at revalidation
+    assert cache.get("/a") == ("v1", "alpha")
+
+
+def test_changed_version_refetches(cache, clock):
+    cache.put("/a", ("v1", "alpha"), 5)
+    clock.now += 61
+
+    content = read(cache, "/a", "v2", lambda: ("v2", "alpha-2"))
+
+    assert content == "alpha-2"
+    assert cache.get("/a") == ("v2", "alpha-2")
+    assert cache.current_bytes == 7
+    metrics = cache.get_metrics()
+    assert (metrics["invalidations"], metrics["revalidations"]) == (1, 0)
+
+
+def test_least_recently_used_entries_are_evicted_by_bytes(cache):
+    cache.put("/a", "a", 40)
+    cache.put("/b", "b", 40)
+    cache.get("/a")  # /b is now least recently used
+    cache.put("/c", "c", 40)
+
+    assert cache.get_stale("/b") is None
+    assert cache.get("/a") == "a" and cache.get("/c") == "c"
+    assert cache.current_bytes == 80
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_rewrite_releases_old_bytes_and_oversized_values_are_not_cached(cache):
+    cache.put("/a", "a", 60)
+    cache.put("/a", "a2", 30)
+    assert cache.current_bytes == 30
+
+    cache.put("/big", "big", 101)
+    assert cache.get_stale("/big") is None
+    assert len(cache) == 1
+
+
+def test_invalidate_and_clear(cache):
+    cache.put("/a", "a", 10)
+    cache.put("/b", "b", 10)
+
+    assert cache.invalidate("/a")
+    assert not cache.invalidate("/a")
+    assert cache.current_bytes == 10
+    cache.clear()
+    assert (len(cache), cache.current_bytes) == (0, 0)
+
+
+def test_shared_invalidation_is_opt_in(monkeypatch):
+    firebase_service = pytest.importorskip("services.firebase_service")
+
+    monkeypatch.delenv("VFS_SHARED_INVALIDATION", raising=False)
+    assert not firebase_service.shared_file_invalidation_enabled()
+    monkeypatch.setenv("VFS_SHARED_INVALIDATION", "True")
+    assert firebase_service.shared_file_invalidation_enabled()
@@ -0,0 +1,77 @@
+"""
+Tests for FirebaseService in offline mode
+Runs the service against a temporary SQLite offline store and checks
+that every store call happens on the Firestore executor, not on the
+event loop thread.
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+
+from services import firebase_service as firebase_module  # noqa: E402
+from services.firestore_executor import FirestoreExecutor  # noqa: E402
+from services.offline_store import OfflineStore  # noqa: E402
+
+
+class ThreadRecordingLock:
+    """The store's lock, noting which thread each SQLite call runs on"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.threads = []
+
+    def __enter__(self):
+        self.threads.append(threading.current_thread().name)
+        return self._lock.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._lock.__exit__(*exc_info)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    store = OfflineStore(str(tmp_path / "offline.db"))
+    store._lock = ThreadRecordingLock()
+    executor = FirestoreExecutor(max_workers=2)
+    cls = firebase_module.FirebaseService
+    monkeypatch.setattr(cls, "_instance", None)
+    monkeypatch.setattr(cls, "_mode", firebase_module.FirebaseMode.OFFLINE)
+    monkeypatch.setattr(cls, "_offline_storage", store)
+    monkeypatch.setattr(cls, "_executor", executor)
+
+    service = cls.__new__(cls)
+    service._initialized = True  # Skip connecting to Firebase
+    yield service
+    executor.shutdown()
+    store.close()
+
+
+async def test_offline_calls_run_off_the_event_loop_thread(service):
+    task = await service.create_task({"agent_type": "strategy", "status": "pending", "input_prompt": "plan"})
+    assert (await service.get_task(task.id)).input_prompt == "plan"
+    assert [t.id for t in await service.get_tasks_by_agent_type("strategy", status="pending")] == [task.id]
+    assert (await service.update_task_status(task.id, "done")).status == "done"
+
+    node = await service.add_node({"type": "fact", "content": "x"})
+    await service.batch_create_edges([{"source_id": node.id, "target_id": "other", "relation": "rel"}])
+    assert len(await service.get_graph_nodes("fact")) == 1
+    assert len(await service.get_graph_edges()) == 1
+    assert await service.count_graph_nodes() == 1
+
+    await service.store_agent_file("/notes.txt", "hello")
+    assert (await service.get_agent_file("/notes.txt")).content == "hello"
+    assert await service.get_agent_file_version("/notes.txt") is not None
+    assert [f["path"] for f in await service.list_agent_files("/")] == ["/notes.txt"]
+    assert await service.count_agent_files() == 1
+    assert (await service.get_latest_agent_file())["path"] == "/notes.txt"
+    assert await service.delete_agent_file("/notes.txt")
+    assert len(await service.get_tasks_changes_since(task.created_at.replace(year=2000))) == 1
+    assert "offline_storage" in await service.get_diagnostics()
+
+    threads = service.offline_store._lock.threads
+    assert threads
+    assert threading.current_thread().name not in threads
+    assert all(name.startswith("firestore") for name in threads)
@@ -0,0 +1,148 @@
+"""
+Tests for the Firestore write batcher
+Runs FirestoreWriteBatcher against a fake Firestore client whose WriteBatch
+records every commit and can reject chosen documents or whole commits.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+google_exceptions = pytest.importorskip("google.api_core.exceptions")
+
+from services.firestore_batcher import FirestoreWriteBatcher  # noqa: E402
+
+
+class FakeExecutor:
+    """Runs blocking calls inline"""
+
+    async def run(self, operation_name, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, doc_ref, data):
+        self.ops.append(("set", doc_ref, data))
+
+    def delete(self, doc_ref):
+        self.ops.append(("delete", doc_ref, None))
+
+    def commit(self):
+        self.db.commits.append(list(self.ops))
+        if self.db.unavailable:
+            self.db.unavailable -= 1
+            raise google_exceptions.ServiceUnavailable("try again")
+        bad = [doc_ref for _, doc_ref, _ in self.ops if doc_ref[1] in self.db.bad_docs]
+        if bad:
+            raise google_exceptions.InvalidArgument(f"bad document {bad[0][1]}")
+        for op, doc_ref, data in self.ops:
+            if op == "set":
+                self.db.documents[doc_ref] = data
+            else:
+                self.db.documents.pop(doc_ref, None)
+        return [SimpleNamespace(update_time=len(self.db.commits)) for _ in self.ops]
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, doc_id):
+        return (self.name, doc_id)
+
+
+class FakeFirestore:
+    """Firestore client keeping documents in a dict keyed by (collection, id)"""
+
+    def __init__(self, bad_docs=(), unavailable=0):
+        self.bad_docs = set(bad_docs)
+        self.unavailable = unavailable
+        self.commits = []
+        self.documents = {}
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+
+def make_batcher(db, **kwargs):
+    service = SimpleNamespace(db=db, executor=FakeExecutor())
+    return FirestoreWriteBatcher(service, flush_interval=0.001, **kwargs)
+
+
+async def test_writes_to_one_document_coalesce_last_write_wins():
+    db = FakeFirestore()
+    batcher = make_batcher(db)
+
+    futures = [batcher.enqueue("nodes", "a", {"version": version}) for version in range(3)]
+    other = batcher.enqueue("nodes", "b", None)
+    await batcher.flush()
+
+    assert [future.result() for future in futures] == [1, 1, 1]
+    assert other.result() == 1
+    assert len(db.commits) == 1
+    assert [op[:2] for op in db.commits[0]] == [("set", ("nodes", "a")), ("delete", ("nodes", "b"))]
+    assert db.documents == {("nodes", "a"): {"version": 2}}
+    metrics = batcher.get_metrics()
+    assert metrics["writes"] == 4
+    assert metrics["coalesced"] == 2
+    assert metrics["committed"] == 2
+
+
+async def test_full_batches_flush_at_max_batch_size():
+    db = FakeFirestore()
+    batcher = make_batcher(db, max_batch_size=3)
+
+    errors = await batcher.write_many("nodes", [(f"doc-{i}", {"i": i}) for i in range(7)])
+
+    assert errors == [None] * 7
+    assert sorted(len(commit) for commit in db.commits) == [1, 3, 3]
+    assert batcher.get_metrics()["max_batch_size"] == 3
+
+
+async def test_document_error_splits_batch_to_isolate_bad_document():
+    db = FakeFirestore(bad_docs={"doc-2"})
+    batcher = make_batcher(db)
+
+    errors = await batcher.write_many("nodes", [(f"doc-{i}", {"i": i}) for i in range(4)])
+
+    assert [error is None for error in errors] == [True, True, False, True]
+    assert isinstance(errors[2], google_exceptions.InvalidArgument)
+    assert set(db.documents) == {("nodes", "doc-0"), ("nodes", "doc-1"), ("nodes", "doc-3")}
+    metrics = batcher.get_metrics()
+    assert metrics["splits"] == 2
+    assert metrics["committed"] == 3
+    assert metrics["failed"] == 1
+    assert metrics["retries"] == 0
+
+
+async def test_service_errors_are_retried_without_splitting():
+    db = FakeFirestore(unavailable=1)
+    batcher = make_batcher(db, max_retries=2)
+
+    errors = await batcher.write_many("nodes", [(f"doc-{i}", {"i": i}) for i in range(4)])
+
+    assert errors == [None] * 4
+    assert [len(commit) for commit in db.commits] == [4, 4]
+    metrics = batcher.get_metrics()
+    assert metrics["retries"] == 1
+    assert metrics["splits"] == 0
+
+
+async def test_persistent_service_error_fails_whole_batch():
+    db = FakeFirestore(unavailable=10)
+    batcher = make_batcher(db, max_retries=2)
+
+    errors = await batcher.write_many("nodes", [(f"doc-{i}", {"i": i}) for i in range(4)])
+
+    assert all(isinstance(error, google_exceptions.ServiceUnavailable) for error in errors)
+    assert [len(commit) for commit in db.commits] == [4, 4]
+    metrics = batcher.get_metrics()
+    assert metrics["splits"] == 0
+    assert metrics["failed"] == 4
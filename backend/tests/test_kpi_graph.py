@@ -0,0 +1,243 @@
+"""
+Tests for incremental KPI evaluation
+Checks the dependency graph's memoization and invalidation on its own,
+then KPIEngine against an offline FirebaseService: memo hits across
+refreshes, recomputation after task and HubSpot writes, definition order
+of concurrently computed values, and eviction of idle users' graphs.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+pytest.importorskip("langchain_openai")
+
+from services import firebase_service as firebase_module  # noqa: E402
+from services.firestore_executor import FirestoreExecutor  # noqa: E402
+from services.offline_store import OfflineStore  # noqa: E402
+
+# Import services.business_intelligence.kpi_calculator without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("business_intelligence", importlib.util.module_from_spec(_spec))
+kpi_calculator = importlib.import_module("business_intelligence.kpi_calculator")
+kpi_graph = importlib.import_module("business_intelligence.kpi_graph")
+
+PERIOD_END = datetime(2026, 3, 31, tzinfo=timezone.utc)
+OTHER_PERIOD_END = datetime(2026, 4, 30, tzinfo=timezone.utc)
+
+
+def test_memoized_value_is_served_until_a_source_dataset_changes():
+    graph = kpi_graph.KPIDependencyGraph()
+    graph.register("mrr", ["hubspot", "financial"], fingerprint=("automated", 100))
+    graph.register("csat", ["surveys", "customer_success"], fingerprint=("automated", 8))
+    for kpi_id, value in (("mrr", 10.0), ("csat", 7.5)):
+        graph.store(kpi_id, "monthly", PERIOD_END, value, graph.versions(kpi_id))
+
+    assert graph.lookup("mrr", "monthly", PERIOD_END) == 10.0
+    assert graph.lookup("mrr", "monthly", OTHER_PERIOD_END) is None
+    assert graph.mark_changed("hubspot") == {"mrr"}
+    assert graph.lookup("mrr", "monthly", PERIOD_END) is None
+    assert graph.lookup("csat", "monthly", PERIOD_END) == 7.5
+    assert (graph.hits, graph.misses) == (2, 2)
+    assert graph.latest("mrr") == 10.0  # Kept for dashboards after invalidation
+
+
+def test_definition_change_invalidates_and_datasets_are_rewired():
+    graph = kpi_graph.KPIDependencyGraph()
+    graph.register("mrr", ["hubspot"], fingerprint=("automated", 100))
+    graph.store("mrr", "monthly", PERIOD_END, 10.0, graph.versions("mrr"))
+
+    graph.register("mrr", ["hubspot"], fingerprint=("automated", 90))
+    assert graph.lookup("mrr", "monthly", PERIOD_END) is None
+
+    graph.register("mrr", ["billing"], fingerprint=("automated", 90))
+    assert graph.dependents("hubspot") == set()
+    assert graph.dependents("billing") == {"mrr"}
+
+
+def test_value_computed_across_a_dataset_change_is_stale():
+    graph = kpi_graph.KPIDependencyGraph()
+    graph.register("mrr", ["hubspot"])
+    versions = graph.versions("mrr")  # Taken when the calculation starts
+    graph.mark_changed("hubspot")
+    graph.store("mrr", "monthly", PERIOD_END, 10.0, versions)
+
+    assert graph.lookup("mrr", "monthly", PERIOD_END) is None
+
+
+def test_memoized_values_are_evicted_least_recently_used():
+    graph = kpi_graph.KPIDependencyGraph(max_memoized=2)
+    for kpi_id in ("a", "b"):
+        graph.register(kpi_id, ["data"])
+        graph.store(kpi_id, "monthly", PERIOD_END, 1.0, graph.versions(kpi_id))
+    graph.lookup("a", "monthly", PERIOD_END)
+    graph.register("c", ["data"])
+    graph.store("c", "monthly", PERIOD_END, 1.0, graph.versions("c"))
+
+    assert len(graph) == 2
+    assert graph.lookup("b", "monthly", PERIOD_END) is None
+    assert graph.lookup("a", "monthly", PERIOD_END) == 1.0
+
+
+def definition(kpi_id, category, data_sources):
+    return kpi_calculator.KPIDefinition(
+        kpi_id=kpi_id,
+        name=kpi_id,
+        description="",
+        category=category,
+        unit="",
+        calculation_method="automated",
+        data_sources=data_sources,
+        target_value=100,
+        minimum_acceptable=80,
+        stretch_target=120,
+        timeframe=kpi_calculator.KPITimeframe.MONTHLY,
+        owner="System",
+        reporting_frequency="monthly",
+        benchmark_value=None,
+        industry_average=None,
+        created_at=PERIOD_END
+    )
+
+
+class RecordingKPIEngine(kpi_calculator.KPIEngine):
+    """Fixed KPI definitions, and calculations that record which KPIs ran"""
+
+    def __init__(self):
+        super().__init__(openai_api_key="sk-test")
+        self.definitions = [
+            definition("kpi_revenue", kpi_calculator.KPICategory.FINANCIAL, ["hubspot"]),
+            definition("kpi_win_rate", kpi_calculator.KPICategory.SALES, ["hubspot"]),
+            definition("kpi_throughput", kpi_calculator.KPICategory.OPERATIONAL, ["internal_systems"]),
+            definition("kpi_okrs", kpi_calculator.KPICategory.STRATEGIC, []),
+        ]
+        self.latency = {}
+        self.completed = []
+
+    async def _get_all_kpi_ids(self, user_id):
+        return [kpi_def.kpi_id for kpi_def in self.definitions]
+
+    async def _get_kpi_definitions(self, user_id, kpi_ids=None):
+        return [kpi_def for kpi_def in self.definitions if kpi_def.kpi_id in kpi_ids]
+
+    async def _calculate_value(self, kpi_def, start_date, end_date):
+        await asyncio.sleep(self.latency.get(kpi_def.kpi_id, 0))
+        self.completed.append(kpi_def.kpi_id)
+        return 90.0
+
+    _calculate_financial_kpi = _calculate_sales_kpi = _calculate_customer_kpi = _calculate_generic_kpi = _calculate_value
+
+    async def _store_kpi_value(self, kpi_value, user_id):
+        pass
+
+    async def recomputed(self, user_id="user-1"):
+        """IDs of the KPIs a refresh recomputed"""
+        self.completed = []
+        await self.calculate_kpis(user_id, end_date=PERIOD_END)
+        return sorted(self.completed)
+
+
+class RecordingWriter:
+    """Write batcher standing in for Firestore"""
+
+    def __init__(self):
+        self.writes = []
+
+    async def write(self, collection, document_id, data):
+        self.writes.append((collection, document_id))
+
+    async def enqueue(self, collection, document_id, data):
+        self.writes.append((collection, document_id))
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    store = OfflineStore(str(tmp_path / "offline.db"))
+    executor = FirestoreExecutor(max_workers=2)
+    cls = firebase_module.FirebaseService
+    monkeypatch.setattr(cls, "_instance", None)
+    monkeypatch.setattr(cls, "_mode", firebase_module.FirebaseMode.OFFLINE)
+    monkeypatch.setattr(cls, "_offline_storage", store)
+    monkeypatch.setattr(cls, "_executor", executor)
+    monkeypatch.setattr(cls, "_writer", RecordingWriter())
+    monkeypatch.setattr(cls, "_data_listeners", [])
+
+    service = cls.__new__(cls)
+    service._initialized = True  # Skip connecting to Firebase
+    monkeypatch.setattr(firebase_module, "firebase_service", service)
+    yield service
+    executor.shutdown()
+    store.close()
+
+
+@pytest.fixture
+async def engine(service, tmp_path, monkeypatch):
+    # The revenue and CRM engines start their HubSpot client on the running loop
+    monkeypatch.setenv("KPI_HISTORY_DIR", str(tmp_path / "kpi_history"))
+    return RecordingKPIEngine()
+
+
+async def test_unchanged_refresh_serves_every_kpi_from_the_memo(engine):
+    all_kpis = sorted(kpi_def.kpi_id for kpi_def in engine.definitions)
+    assert await engine.recomputed() == all_kpis
+
+    result = await engine.calculate_kpis("user-1", end_date=PERIOD_END)
+
+    assert (result["kpi_values_calculated"], result["kpi_values_recomputed"]) == (4, 0)
+    assert engine._kpi_graphs["user-1"].hits == 4
+
+
+async def test_task_writes_recompute_internal_system_kpis(engine, service):
+    await engine.recomputed()
+
+    task = await service.create_task({"agent_type": "devops", "status": "pending", "input_prompt": "deploy"})
+    assert await engine.recomputed() == ["kpi_throughput"]
+
+    await service.update_task_status(task.id, "done")
+    assert await engine.recomputed() == ["kpi_throughput"]
+    assert await engine.recomputed() == []
+
+
+async def test_hubspot_writes_recompute_kpis_of_their_datasets(engine, service):
+    await engine.recomputed()
+
+    await service.store_hubspot_records([firebase_module.HubSpotDeal(id="deal-1", amount=5000.0)])
+    assert await engine.recomputed() == ["kpi_revenue", "kpi_win_rate"]
+
+    await service.store_hubspot_contact(firebase_module.HubSpotContact(id="contact-1"))
+    assert await engine.recomputed() == ["kpi_revenue", "kpi_win_rate"]
+
+    # Category datasets are versioned on their own
+    assert engine.mark_data_changed("user-1", "sales") == ["kpi_win_rate"]
+    assert await engine.recomputed() == ["kpi_win_rate"]
+
+
+async def test_values_follow_definition_order_whatever_the_completion_order(engine):
+    engine.latency = {"kpi_revenue": 0.03, "kpi_win_rate": 0.02, "kpi_throughput": 0.01}
+
+    result = await engine.calculate_kpis("user-1", end_date=PERIOD_END)
+
+    definition_order = [kpi_def.kpi_id for kpi_def in engine.definitions]
+    assert [value["kpi_id"] for value in result["kpi_values"]] == definition_order
+    assert engine.completed == list(reversed(definition_order))
+
+
+async def test_least_recently_refreshed_users_graphs_are_evicted(engine):
+    engine.max_kpi_graphs = 2
+    for user_id in ("user-a", "user-b", "user-a", "user-c"):
+        await engine.recomputed(user_id)
+
+    assert list(engine._kpi_graphs) == ["user-a", "user-c"]
+    assert engine.mark_data_changed("user-b", "hubspot") == []
+    # An evicted user's KPIs are computed afresh
+    assert len(await engine.recomputed("user-b")) == 4
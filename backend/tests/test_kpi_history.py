@@ -0,0 +1,189 @@
+"""
+Tests for the columnar KPI history store
+Checks appends and their time-order rule, inclusive range queries at
+segment and query boundaries, rollups against a per-observation
+reference, and that a reopened directory serves the same data.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+# Import services.business_intelligence.kpi_history without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("business_intelligence", importlib.util.module_from_spec(_spec))
+kpi_history = importlib.import_module("business_intelligence.kpi_history")
+
+DAY = 86400.0
+START = datetime(2026, 1, 29, 6, tzinfo=timezone.utc).timestamp()  # A Thursday
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = kpi_history.KPIHistoryStore(str(tmp_path), segment_points=4)
+    yield store
+    store.close()
+
+
+def observations(count=20, step=DAY / 2):
+    timestamps = START + step * np.arange(count)
+    return timestamps, np.arange(count, dtype=np.float64) * 1.5
+
+
+def reference_rollup(timestamps, values, frequency, aggregate):
+    """Group observations by calendar bucket one at a time"""
+    groups = defaultdict(list)
+    for timestamp, value in zip(timestamps, values, strict=True):
+        moment = datetime.fromtimestamp(timestamp, timezone.utc)
+        if frequency == "daily":
+            bucket = datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+        elif frequency == "weekly":
+            day = datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+            bucket = datetime.fromtimestamp(day.timestamp() - day.weekday() * DAY, timezone.utc)
+        else:
+            bucket = datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+        groups[bucket.timestamp()].append(value)
+    reduce = {
+        "last": lambda group: group[-1],
+        "first": lambda group: group[0],
+        "mean": lambda group: sum(group) / len(group),
+        "sum": sum,
+        "min": min,
+        "max": max,
+        "count": len,
+    }[aggregate]
+    starts = sorted(groups)
+    return starts, [float(reduce(groups[start])) for start in starts]
+
+
+def test_appends_keep_time_order_and_reject_older_observations(store):
+    assert store.append("user-1", "mrr", START, 1.0)
+    assert store.append("user-1", "mrr", START, 2.0)  # Same timestamp is still in order
+    assert not store.append("user-1", "mrr", START - 1, 3.0)
+
+    accepted = store.append_many("user-1", "mrr", [START + 3, START + 2, START + 4, np.nan], [4.0, 5.0, 6.0, 7.0])
+
+    assert accepted == 2
+    timestamps, values = store.range("user-1", "mrr")
+    assert timestamps.tolist() == [START, START, START + 3, START + 4]
+    assert values.tolist() == [1.0, 2.0, 4.0, 6.0]
+    assert store.get_stats()["appended"] == 4
+    assert store.get_stats()["rejected"] == 3
+    with pytest.raises(ValueError):
+        store.append_many("user-1", "mrr", [START + 5], [1.0, 2.0])
+
+
+def test_range_is_inclusive_at_query_and_segment_boundaries(store):
+    timestamps, values = observations(count=10)
+    store.append_many("user-1", "mrr", timestamps, values)
+    assert store.get_stats()["segments"] == 3  # Points 0-3, 4-7 and 8-9
+
+    # Bounds on segment edges: the last point of the first segment to the first of the third
+    found, found_values = store.range("user-1", "mrr", timestamps[3], timestamps[8])
+    assert found.tolist() == timestamps[3:9].tolist()
+    assert found_values.tolist() == values[3:9].tolist()
+
+    assert store.range("user-1", "mrr", timestamps[4], timestamps[4])[0].tolist() == [timestamps[4]]
+    assert store.range("user-1", "mrr", timestamps[4] + 1, timestamps[5] - 1)[0].size == 0
+    assert store.range("user-1", "mrr", end=timestamps[0])[0].tolist() == [timestamps[0]]
+    assert store.range("user-1", "mrr", start=timestamps[9] + 1)[0].size == 0
+    assert store.range("user-1", "mrr")[0].tolist() == timestamps.tolist()
+    assert store.range("user-1", "other")[0].size == 0
+
+
+@pytest.mark.parametrize("frequency", kpi_history.ROLLUP_FREQUENCIES)
+@pytest.mark.parametrize("aggregate", kpi_history.ROLLUP_AGGREGATES)
+def test_rollup_matches_per_observation_grouping(store, frequency, aggregate):
+    timestamps, values = observations(count=90, step=DAY / 3 + 1234)  # Crosses weeks and a month end
+    store.append_many("user-1", "mrr", timestamps, values)
+
+    starts, aggregated = store.rollup("user-1", "mrr", frequency, aggregate=aggregate)
+
+    expected_starts, expected = reference_rollup(timestamps, values, frequency, aggregate)
+    assert starts.tolist() == expected_starts
+    assert aggregated.tolist() == pytest.approx(expected)
+
+
+def test_rollup_covers_only_the_requested_range(store):
+    timestamps, values = observations(count=8)  # Two per day
+    store.append_many("user-1", "mrr", timestamps, values)
+
+    starts, totals = store.rollup("user-1", "mrr", "daily", start=timestamps[1], end=timestamps[4], aggregate="sum")
+
+    assert totals.tolist() == [values[1], values[2] + values[3], values[4]]
+    assert starts[0] == timestamps[0] - timestamps[0] % DAY
+    assert store.rollup("user-1", "other", "weekly")[0].size == 0
+    with pytest.raises(ValueError):
+        store.rollup("user-1", "mrr", "hourly")
+    with pytest.raises(ValueError):
+        store.rollup("user-1", "mrr", "daily", aggregate="median")
+
+
+def test_reopened_directory_serves_the_same_data(tmp_path):
+    timestamps, values = observations(count=10)
+    store = kpi_history.KPIHistoryStore(str(tmp_path), segment_points=4)
+    store.append_many("user/1", "mrr", timestamps[:6], values[:6])
+    store.close()
+
+    reopened = kpi_history.KPIHistoryStore(str(tmp_path), segment_points=4)
+    try:
+        assert len(reopened.range("user/1", "mrr")[0]) == 6
+        # Appends continue in the partly filled segment
+        reopened.append_many("user/1", "mrr", timestamps[6:], values[6:])
+        assert reopened.get_stats()["segments"] == 3
+        found, found_values = reopened.range("user/1", "mrr")
+        assert found.tolist() == timestamps.tolist()
+        assert found_values.tolist() == values.tolist()
+        assert not reopened.append("user/1", "mrr", timestamps[0], 0.0)
+    finally:
+        reopened.close()
+
+
+def test_stores_sharing_a_directory_see_each_others_appends(tmp_path):
+    timestamps, values = observations(count=6)
+    writer = kpi_history.KPIHistoryStore(str(tmp_path), segment_points=4)
+    reader = kpi_history.KPIHistoryStore(str(tmp_path), segment_points=4)
+    try:
+        writer.append_many("user-1", "mrr", timestamps[:3], values[:3])
+        assert reader.range("user-1", "mrr")[0].tolist() == timestamps[:3].tolist()
+
+        writer.append_many("user-1", "mrr", timestamps[3:], values[3:])  # Fills the segment and starts another
+        assert reader.range("user-1", "mrr")[0].tolist() == timestamps.tolist()
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_idle_series_are_closed_and_reopened_from_disk(tmp_path):
+    store = kpi_history.KPIHistoryStore(str(tmp_path), segment_points=4, max_open_series=1)
+    try:
+        store.append("user-1", "mrr", START, 1.0)
+        store.append("user-1", "churn", START, 2.0)
+
+        assert store.get_stats()["evicted"] == 1
+        assert store.range("user-1", "mrr")[1].tolist() == [1.0]
+        assert store.get_stats()["series"] == 1
+    finally:
+        store.close()
+
+
+def test_in_memory_store_writes_no_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("KPI_HISTORY_DIR", str(tmp_path))
+    store = kpi_history.KPIHistoryStore(segment_points=4, persistent=False, max_open_series=1)
+    timestamps, values = observations(count=6)
+    store.append_many("user-1", "mrr", timestamps, values)
+    store.append("user-1", "churn", START, 1.0)
+
+    assert store.range("user-1", "mrr")[1].tolist() == values.tolist()
+    assert store.get_stats()["evicted"] == 0
+    assert os.listdir(tmp_path) == []
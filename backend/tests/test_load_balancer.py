@@ -0,0 +1,246 @@
+"""
+Tests for the agent load balancer
+Checks agent selection under each strategy against the registry scan it
+replaced, exclusion and re-admission of agents as their health changes,
+and that assignments never completed are dropped after assignment_ttl or
+past max_task_assignments, releasing the load they hold.
+"""
+
+import importlib
+import importlib.util
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Import agents.swarm.load_balancer without running the agents.swarm __init__,
+# which builds every swarm agent; the backend root is a package here because
+# load_balancer imports the database layer relative to it
+_backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for _name, _path in (
+    ("autoadmin_backend", _backend_dir),
+    ("autoadmin_backend.agents", os.path.join(_backend_dir, 'agents')),
+    ("autoadmin_backend.agents.swarm", os.path.join(_backend_dir, 'agents', 'swarm')),
+):
+    _spec = importlib.util.spec_from_file_location(
+        _name, os.path.join(_path, '__init__.py'), submodule_search_locations=[_path]
+    )
+    sys.modules.setdefault(_name, importlib.util.module_from_spec(_spec))
+load_balancer = importlib.import_module("autoadmin_backend.agents.swarm.load_balancer")
+
+
+async def make_balancer(**config):
+    balancer = load_balancer.AgentLoadBalancer({"strategy": "least_connections", **config})
+    await balancer.register_agent("agent-1", "strategy", ["analysis"], max_concurrent_tasks=1000)
+    return balancer
+
+
+async def assign(balancer, task_id):
+    return await balancer.assign_task({"id": task_id, "type": "strategy", "force_agent": "agent-1"})
+
+
+async def test_assignments_past_max_are_dropped_oldest_first():
+    balancer = await make_balancer(max_task_assignments=3)
+
+    for i in range(5):
+        assert await assign(balancer, f"task-{i}") == "agent-1"
+
+    assert list(balancer.task_assignments) == ["task-2", "task-3", "task-4"]
+    assert balancer.agent_metrics["agent-1"].current_load == 3
+    assert balancer.expired_assignments == 2
+
+
+async def test_reassigned_task_moves_to_the_end():
+    balancer = await make_balancer(max_task_assignments=3)
+    for i in range(3):
+        await assign(balancer, f"task-{i}")
+
+    await assign(balancer, "task-0")
+    await assign(balancer, "task-3")
+
+    assert list(balancer.task_assignments) == ["task-2", "task-0", "task-3"]
+
+
+async def test_assignments_older_than_ttl_expire_on_health_check():
+    balancer = await make_balancer(assignment_ttl=60)
+    for i in range(3):
+        await assign(balancer, f"task-{i}")
+    for task_id in ("task-0", "task-1"):
+        balancer.task_assignments[task_id].assigned_at = datetime.now() - timedelta(seconds=120)
+
+    assert balancer._expire_task_assignments() == 2
+
+    assert list(balancer.task_assignments) == ["task-2"]
+    assert balancer.agent_metrics["agent-1"].current_load == 1
+
+
+async def test_completed_assignment_is_removed():
+    balancer = await make_balancer()
+    await assign(balancer, "task-0")
+
+    await balancer.complete_task("task-0", success=True, response_time=12.0)
+
+    assert balancer.task_assignments == {}
+    assert balancer.agent_metrics["agent-1"].current_load == 0
+    assert balancer.expired_assignments == 0
+
+
+STRATEGIES = [strategy.value for strategy in load_balancer.LoadBalancingStrategy]
+
+
+async def make_pool(strategy, agents):
+    """Balancer with agents given as (agent_id, agent_type, capabilities, metric overrides)"""
+    balancer = load_balancer.AgentLoadBalancer({"strategy": strategy})
+    for agent_id, agent_type, capabilities, overrides in agents:
+        await balancer.register_agent(
+            agent_id, agent_type, capabilities,
+            max_concurrent_tasks=overrides.pop("max_concurrent_tasks", 5),
+            weight=overrides.pop("weight", 1.0)
+        )
+        for name, value in overrides.items():
+            setattr(balancer.agent_metrics[agent_id], name, value)
+        balancer.refresh_agent(agent_id)
+    return balancer
+
+
+def select(balancer, task_type="strategy", capabilities=()):
+    return balancer._agent_index.select(task_type, list(capabilities))
+
+
+async def test_least_connections_picks_lowest_load_then_registration_order():
+    balancer = await make_pool("least_connections", [
+        ("a", "strategy", [], {"current_load": 2}),
+        ("b", "strategy", [], {"current_load": 1}),
+        ("c", "strategy", [], {"current_load": 1}),
+    ])
+
+    assert select(balancer) == "b"
+    assert await balancer.assign_task({"id": "t1", "type": "strategy"}) == "b"
+    assert await balancer.assign_task({"id": "t2", "type": "strategy"}) == "c"
+
+
+async def test_weighted_round_robin_picks_highest_weight_times_spare_capacity():
+    balancer = await make_pool("weighted_round_robin", [
+        ("a", "strategy", [], {"weight": 2.0, "current_load": 4}),  # 2.0 * 0.2
+        ("b", "strategy", [], {"weight": 1.0, "current_load": 1}),  # 1.0 * 0.8
+    ])
+
+    assert select(balancer) == "b"
+
+
+async def test_response_time_based_picks_fastest_agent():
+    balancer = await make_pool("response_time_based", [
+        ("a", "strategy", [], {"average_response_time": 250.0}),
+        ("b", "strategy", [], {"average_response_time": 90.0}),
+    ])
+
+    assert select(balancer) == "b"
+
+
+async def test_capability_based_prefers_capability_match_over_performance():
+    balancer = await make_pool("capability_based", [
+        ("a", "strategy", ["analysis"], {}),
+        ("b", "strategy", ["analysis", "forecasting"], {"success_rate": 0.8, "current_load": 2}),
+        ("c", "strategy_backup", ["planning"], {}),
+    ])
+
+    assert select(balancer, capabilities=["analysis", "forecasting"]) == "b"
+    assert select(balancer, capabilities=["planning"]) == "c"
+    assert select(balancer, capabilities=["unknown"]) is None
+    # Without required capabilities the least loaded agent is picked
+    assert select(balancer) == "a"
+
+
+async def test_round_robin_rotates_over_candidates():
+    balancer = await make_pool("round_robin", [
+        ("a", "strategy", [], {"max_concurrent_tasks": 100}),
+        ("b", "strategy", [], {"max_concurrent_tasks": 100}),
+        ("c", "devops", [], {"max_concurrent_tasks": 100}),
+    ])
+
+    picks = [await balancer.assign_task({"id": f"t{i}", "type": "strategy"}) for i in range(4)]
+
+    assert picks == ["a", "b", "a", "b"]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+async def test_index_matches_a_registry_scan(strategy):
+    rng = random.Random(strategy)
+    capabilities = ["analysis", "forecasting", "planning", "research"]
+    agents = []
+    for i in range(40):
+        agents.append((f"agent-{i}", rng.choice(["strategy", "strategy_backup", "devops"]),
+                       rng.sample(capabilities, rng.randint(1, 3)), {
+                           "current_load": rng.randint(0, 5),
+                           "average_response_time": float(rng.randint(10, 500)),
+                           "success_rate": rng.choice([0.5, 0.8, 0.9, 1.0]),
+                           "weight": rng.choice([0.5, 1.0, 2.0]),
+                           "status": rng.choice([load_balancer.AgentStatus.HEALTHY] * 4 + [
+                               load_balancer.AgentStatus.DEGRADED, load_balancer.AgentStatus.UNHEALTHY
+                           ]),
+                       }))
+    balancer = await make_pool(strategy, agents)
+
+    for task_type in ("strategy", "devops", "general"):
+        for required in ([], ["analysis"], ["forecasting", "planning"]):
+            eligible = [
+                agent_id for agent_id, metrics in balancer.agent_metrics.items()
+                if (task_type == "general" or task_type in metrics.agent_type)
+                and (not required or set(required) & set(metrics.capabilities))
+                and metrics.status in (load_balancer.AgentStatus.HEALTHY, load_balancer.AgentStatus.DEGRADED)
+                and metrics.current_load < metrics.max_concurrent_tasks
+            ]
+            assert balancer._agent_index.candidates(task_type, required) == eligible
+            if strategy != "round_robin":
+                expected = await balancer._select_agent(eligible, {"capabilities_required": required})
+                assert select(balancer, task_type, required) == expected
+
+
+async def test_unhealthy_overloaded_and_open_circuit_agents_are_excluded():
+    balancer = await make_pool("least_connections", [
+        ("a", "strategy", [], {"status": load_balancer.AgentStatus.UNHEALTHY}),
+        ("b", "strategy", [], {"current_load": 5}),
+        ("c", "strategy", [], {}),
+        ("d", "strategy", [], {"current_load": 1}),
+    ])
+    assert select(balancer) == "c"
+
+    balancer.circuit_breakers["c"].state = "OPEN"
+    assert select(balancer) == "d"
+    assert balancer._agent_index.candidates("strategy", []) == ["d"]
+
+    balancer.agent_metrics["d"].status = load_balancer.AgentStatus.MAINTENANCE
+    balancer.refresh_agent("d")
+    assert select(balancer) is None
+    assert await balancer.assign_task({"id": "t1", "type": "strategy"}) is None
+
+
+async def test_refresh_agent_readmits_an_agent_recovered_by_failover():
+    balancer = await make_pool("least_connections", [
+        ("a", "strategy", [], {"current_load": 3}),
+        ("standby", "strategy", [], {"status": load_balancer.AgentStatus.FAILED}),
+    ])
+    assert select(balancer) == "a"
+
+    # What the failover manager does when it recovers a standby
+    metrics = balancer.agent_metrics["standby"]
+    metrics.status = load_balancer.AgentStatus.HEALTHY
+    metrics.consecutive_failures = 0
+    balancer.circuit_breakers["standby"].state = "CLOSED"
+    assert select(balancer) == "a"  # Unavailable agents hold no heap entries until refreshed
+
+    balancer.refresh_agent("standby")
+    assert select(balancer) == "standby"
+
+
+async def test_metrics_changed_in_place_are_rekeyed_on_selection():
+    balancer = await make_pool("response_time_based", [
+        ("a", "strategy", [], {"average_response_time": 50.0}),
+        ("b", "strategy", [], {"average_response_time": 80.0}),
+    ])
+
+    balancer.agent_metrics["a"].average_response_time = 120.0
+
+    assert select(balancer) == "b"
@@ -0,0 +1,456 @@
+"""
+Tests for the metrics collector
+Checks the streaming quantile sketch against exact quantiles, the
+meter's ring buffer against a fake clock, the exposition text against
+golden output, and aggregation across threads and forked workers.
+"""
+
+import gc
+import importlib
+import importlib.util
+import math
+import os
+import random
+import sys
+import threading
+
+import pytest
+
+# Import monitoring.metrics without running the package __init__, which imports every backend client
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'monitoring')
+_spec = importlib.util.spec_from_file_location(
+    "autoadmin_monitoring", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("autoadmin_monitoring", importlib.util.module_from_spec(_spec))
+metrics = importlib.import_module("autoadmin_monitoring.metrics")
+multiprocess = importlib.import_module("autoadmin_monitoring.multiprocess")
+
+ACCURACY = metrics.DEFAULT_RELATIVE_ACCURACY
+
+
+def exact_quantile(values, q):
+    """Value at the rank QuantileSketch.quantile reports"""
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def assert_within_accuracy(estimate, exact, accuracy=ACCURACY):
+    assert abs(estimate - exact) <= accuracy * abs(exact) * (1 + 1e-9), (estimate, exact)
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(metrics.time, "time", clock)
+    return clock
+
+
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.5, 0.9, 0.95, 0.99, 1.0])
+def test_sketch_quantiles_are_within_relative_accuracy(q):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1.5) for _ in range(20000)]
+    sketch = metrics.QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    assert_within_accuracy(sketch.quantile(q), exact_quantile(values, q))
+
+
+def test_sketch_handles_negative_and_zero_values():
+    rng = random.Random(11)
+    values = [rng.uniform(-500, 500) for _ in range(5000)] + [0.0] * 500
+    sketch = metrics.QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert_within_accuracy(sketch.quantile(q), exact_quantile(values, q))
+    assert sketch.zero_count == 500
+    assert metrics.QuantileSketch().quantile(0.5) is None
+
+
+def test_sketch_merge_matches_a_single_sketch():
+    rng = random.Random(3)
+    values = [rng.expovariate(0.01) for _ in range(10000)]
+    whole, left, right = metrics.QuantileSketch(), metrics.QuantileSketch(), metrics.QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+
+    left.merge(right)
+
+    assert left.count == whole.count
+    assert (left.min, left.max) == (whole.min, whole.max)
+    for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+        assert left.quantile(q) == whole.quantile(q)
+        assert_within_accuracy(left.quantile(q), exact_quantile(values, q))
+
+
+def test_sketch_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        metrics.QuantileSketch(0.01).merge(metrics.QuantileSketch(0.02))
+
+
+def test_bins_collapse_lowest_buckets_past_max_bins():
+    rng = random.Random(5)
+    # Nine decades need about a thousand 1% buckets
+    values = [10 ** rng.uniform(-3, 6) for _ in range(20000)]
+    sketch = metrics.QuantileSketch(max_bins=64)
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch._positive.bins) <= 64
+    assert sketch._positive.count == sketch.count == len(values)
+    # High quantiles keep their accuracy; low ones fold into the lowest bucket
+    for q in (0.99, 0.999, 1.0):
+        assert_within_accuracy(sketch.quantile(q), exact_quantile(values, q))
+    assert sketch.quantile(0.0) >= min(values)
+    assert sketch.quantile(0.5) > exact_quantile(values, 0.5)
+
+
+def test_bin_store_keeps_counts_when_growing_both_ways():
+    store = metrics._BinStore(max_bins=16)
+    for index in (100, 90, 130, 85, 200):
+        store.add(index)
+
+    assert len(store.bins) <= 16
+    assert sum(store.bins) == store.count == 5
+    assert store.key_at_rank(4) == 200  # Highest bucket kept exactly
+    assert store.key_at_rank(0) == store.offset  # Lower ones collapsed into the first
+
+
+def test_histogram_buckets_without_inf_keep_an_overflow_slot():
+    histogram = metrics.Histogram(buckets=[1, 10])
+    for value in (0.5, 1, 5, 50, 500):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 2]
+    assert histogram.get_cumulative_counts() == [(1, 2), (10, 3)]
+    summary = histogram.get_summary()
+    assert summary["count"] == 5
+    assert summary["max"] == 500
+
+
+def test_histogram_merge_adds_buckets_and_sketch():
+    first, second = metrics.Histogram(), metrics.Histogram()
+    for value in (3, 30, 300):
+        first.observe(value)
+    second.observe(3000)
+
+    first.merge(second)
+
+    assert first.count == 4
+    assert first.sum == 3333
+    assert first.get_cumulative_counts()[-1] == (math.inf, 4)
+    assert first.sketch.max == 3000
+    with pytest.raises(ValueError):
+        first.merge(metrics.Histogram(buckets=[1, 2]))
+
+
+def test_meter_rate_covers_only_the_window(clock):
+    meter = metrics.Meter(window_seconds=10)
+    meter.mark(30)
+    clock.now += 5
+    meter.mark(20)
+
+    assert meter.get_rate() == pytest.approx(5.0)
+
+    clock.now += 6  # The first second has left the window
+    assert meter.get_rate() == pytest.approx(2.0)
+    assert meter.count == 50
+
+    clock.now += 10
+    meter.mark(1)  # Reuses the ring slot of an old second
+    assert meter.get_rate() == pytest.approx(0.1)
+
+
+def test_meter_merge_sums_same_seconds_and_keeps_newer_ones(clock):
+    first, second = metrics.Meter(window_seconds=10), metrics.Meter(window_seconds=10)
+    first.mark(4)
+    second.mark(6)
+    clock.now += 10  # Same ring slot, newer second
+    second.mark(1)
+
+    first.merge(second)
+
+    assert first.count == 11
+    assert first.get_rate() == pytest.approx(0.1)
+    with pytest.raises(ValueError):
+        first.merge(metrics.Meter(window_seconds=5))
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    return metrics.MetricsCollector("test")
+
+
+def define(collector, name, metric_type, description="", unit=metrics.MetricUnit.COUNT, max_series=None):
+    collector.register_metric(metrics.MetricDefinition(
+        name=name, description=description, metric_type=metric_type, unit=unit, labels=[], max_series=max_series
+    ))
+
+
+def test_prometheus_exposition_escapes_labels_and_help(collector):
+    define(collector, "http_requests", metrics.MetricType.COUNTER, 'Requests "served" \\ by path\nand method')
+    collector.increment("http_requests", 2, {"path": 'a\\b\n"c"', "method": "GET"})
+
+    assert "".join(collector.iter_exposition()) == (
+        '# HELP http_requests_total Requests "served" \\\\ by path\\nand method\n'
+        '# TYPE http_requests_total counter\n'
+        'http_requests_total{method="GET",path="a\\\\b\\n\\"c\\""} 2.0\n'
+    )
+
+
+def test_openmetrics_exposition_drops_total_from_family_name(collector):
+    define(collector, "jobs_total", metrics.MetricType.COUNTER, "Jobs run")
+    define(collector, "heap_bytes", metrics.MetricType.GAUGE, "Heap size", unit=metrics.MetricUnit.BYTES)
+    collector.increment("jobs_total")
+    collector.gauge("heap_bytes", 1024)
+
+    assert "".join(collector.iter_exposition(openmetrics=True)) == (
+        "# HELP jobs Jobs run\n"
+        "# TYPE jobs counter\n"
+        "jobs_total 1.0\n"
+        "# HELP heap_bytes Heap size\n"
+        "# TYPE heap_bytes gauge\n"
+        "# UNIT heap_bytes bytes\n"
+        "heap_bytes 1024.0\n"
+        "# EOF\n"
+    )
+    assert "".join(collector.iter_exposition()).startswith(
+        "# HELP jobs_total Jobs run\n# TYPE jobs_total counter\njobs_total 1.0\n"
+    )
+
+
+def test_histogram_exposition_ends_with_inf_bucket(collector):
+    define(collector, "latency", metrics.MetricType.HISTOGRAM, "Latency")
+    collector.histogram("latency", 3, {"route": "/"})
+    collector.histogram("latency", 2000, {"route": "/"})
+
+    assert "".join(collector.iter_exposition()) == (
+        "# HELP latency Latency\n"
+        "# TYPE latency histogram\n"
+        'latency_bucket{route="/",le="1.0"} 0\n'
+        'latency_bucket{route="/",le="5.0"} 1\n'
+        'latency_bucket{route="/",le="10.0"} 1\n'
+        'latency_bucket{route="/",le="25.0"} 1\n'
+        'latency_bucket{route="/",le="50.0"} 1\n'
+        'latency_bucket{route="/",le="100.0"} 1\n'
+        'latency_bucket{route="/",le="250.0"} 1\n'
+        'latency_bucket{route="/",le="500.0"} 1\n'
+        'latency_bucket{route="/",le="1000.0"} 1\n'
+        'latency_bucket{route="/",le="+Inf"} 2\n'
+        'latency_count{route="/"} 2\n'
+        'latency_sum{route="/"} 2003.0\n'
+    )
+
+
+def test_histogram_exposition_adds_inf_bucket_when_buckets_lack_it(collector, monkeypatch):
+    class TwoBucketHistogram(metrics.Histogram):
+        def __init__(self):
+            super().__init__(buckets=[1, 10])
+
+    monkeypatch.setattr(metrics, "Histogram", TwoBucketHistogram)
+    define(collector, "latency", metrics.MetricType.HISTOGRAM, "Latency")
+    for value in (0.5, 5, 50):
+        collector.histogram("latency", value)
+
+    assert "".join(collector.iter_exposition()) == (
+        "# HELP latency Latency\n"
+        "# TYPE latency histogram\n"
+        'latency_bucket{le="1.0"} 1\n'
+        'latency_bucket{le="10.0"} 2\n'
+        'latency_bucket{le="+Inf"} 3\n'
+        "latency_count 3\n"
+        "latency_sum 55.5\n"
+    )
+
+
+def test_label_sets_past_max_series_share_the_overflow_series(collector):
+    define(collector, "logins", metrics.MetricType.COUNTER, "Logins", max_series=2)
+    for user in ("ann", "bob", "cy", "dee", "ann"):
+        collector.increment("logins", labels={"user": user})
+
+    assert "".join(collector.iter_exposition()) == (
+        "# HELP logins_total Logins\n"
+        "# TYPE logins_total counter\n"
+        'logins_total{user="ann"} 2.0\n'
+        'logins_total{user="bob"} 1.0\n'
+        'logins_total{overflow="true"} 2.0\n'
+    )
+    assert collector.get_cardinality()["logins"] == {"series": 2, "max_series": 2, "overflowed": 2}
+
+
+fork_only = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+@pytest.fixture
+def worker_collector(tmp_path, monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    collector = metrics.MetricsCollector("test", multiprocess_dir=str(tmp_path))
+    define(collector, "jobs", metrics.MetricType.COUNTER)
+    define(collector, "queue_depth", metrics.MetricType.GAUGE)
+    define(collector, "latency", metrics.MetricType.HISTOGRAM)
+    return collector
+
+
+def fork_worker(collector, record, hold=False):
+    """
+    Fork a worker that records, flushes its file and exits; with hold it
+    stays alive until the returned release function is called
+    """
+    ready_read, ready_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(ready_read)
+            os.close(release_write)
+            record(collector)
+            collector.flush_to_file()
+            os.write(ready_write, b"x")
+            if hold:
+                os.read(release_read, 1)
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(ready_write)
+    os.close(release_read)
+    assert os.read(ready_read, 1) == b"x", "worker failed before flushing"
+    os.close(ready_read)
+
+    def release():
+        os.close(release_write)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+
+    if not hold:
+        release()
+    return pid, release
+
+
+def record_jobs(count, depth=None):
+    def record(collector):
+        for _ in range(count):
+            collector.increment("jobs", labels={"queue": "a"})
+        if depth is not None:
+            collector.gauge("queue_depth", depth)
+        collector.histogram("latency", 40)
+    return record
+
+
+def test_exited_thread_shard_is_folded_into_the_retired_shard(collector):
+    define(collector, "jobs", metrics.MetricType.COUNTER)
+
+    def work(count):
+        for _ in range(count):
+            collector.increment("jobs", labels={"queue": "a"})
+
+    for count in (3, 4):
+        thread = threading.Thread(target=work, args=(count,))
+        thread.start()
+        thread.join()
+        del thread
+        gc.collect()
+    collector.increment("jobs", labels={"queue": "a"})
+
+    assert collector.metrics["jobs"] == 8
+    # This thread's shard plus one retired shard holding both exited threads
+    assert len(collector._shards) == 2
+    assert collector._retired.families["jobs"].series[(("queue", "a"),)].value == 7
+    assert 'jobs_total{queue="a"} 8.0\n' in "".join(collector.iter_exposition())
+
+
+@fork_only
+def test_live_worker_file_is_read_after_fork(worker_collector):
+    worker_collector.increment("jobs", labels={"queue": "a"})
+    pid, release = fork_worker(worker_collector, record_jobs(5, depth=12), hold=True)
+    try:
+        workers = worker_collector._read_worker_files()
+        assert multiprocess.process_file_path(worker_collector.multiprocess_dir, pid) in set(
+            multiprocess.iter_worker_files(worker_collector.multiprocess_dir)
+        )
+    finally:
+        release()
+
+    [(jobs, _)] = workers["jobs"][(("queue", "a"),)]
+    [(depth, _)] = workers["queue_depth"][()]
+    [(latency, _)] = workers["latency"][()]
+    assert (jobs, depth) == (5, 12)
+    assert (latency.count, latency.sum, latency.sketch.max) == (1, 40, 40)
+    # The parent's own sample is not read back from a file
+    assert worker_collector.metrics["jobs"] == 6
+
+
+@fork_only
+def test_exited_worker_is_counted_across_the_scrape_that_retires_it(worker_collector):
+    pid, _ = fork_worker(worker_collector, record_jobs(7))
+    directory = worker_collector.multiprocess_dir
+    assert not os.path.exists(multiprocess.dead_file_path(directory))
+
+    assert worker_collector.metrics["jobs"] == 7
+    assert not os.path.exists(multiprocess.process_file_path(directory, pid))
+    assert worker_collector.metrics["jobs"] == 7
+
+
+@fork_only
+def test_dead_file_folds_retired_workers(worker_collector):
+    first, _ = fork_worker(worker_collector, record_jobs(2, depth=5))
+    second, _ = fork_worker(worker_collector, record_jobs(3, depth=9))
+    worker_collector.mark_process_dead(first)
+    worker_collector.mark_process_dead(second)
+    worker_collector.mark_process_dead(second)  # Already retired
+
+    directory = worker_collector.multiprocess_dir
+    assert list(multiprocess.iter_worker_files(directory)) == [multiprocess.dead_file_path(directory)]
+    totals = worker_collector.metrics
+    assert totals["jobs"] == 5
+    assert totals["latency"].count == 2
+    assert totals["latency"].sum == 80
+    assert "queue_depth" not in worker_collector._read_worker_files()  # Gauges are dropped
+
+
+@fork_only
+def test_meter_slots_keep_the_worker_file_bounded(worker_collector, clock):
+    define(worker_collector, "requests", metrics.MetricType.METER)
+    window = metrics.Meter().window_seconds
+    seconds = window + 10
+
+    def record(collector):
+        for _ in range(seconds):
+            collector.meter("requests")
+            collector.flush_to_file()
+            clock.now += 1
+
+    start = clock.now
+    pid, release = fork_worker(worker_collector, record, hold=True)
+    try:
+        path = multiprocess.process_file_path(worker_collector.multiprocess_dir, pid)
+        keys = [key for key, _, _ in multiprocess.read_metrics_file(path) if '"requests"' in key]
+        clock.now = start + seconds
+        [(meter, _)] = worker_collector._read_worker_files()["requests"][()]
+    finally:
+        release()
+
+    # One key per ring slot plus the running count, however long the worker runs
+    assert len(keys) == window + 1
+    reference = metrics.Meter()
+    clock.now = start
+    for _ in range(seconds):
+        reference.mark()
+        clock.now += 1
+    assert (meter.count, meter.get_rate()) == (seconds, reference.get_rate())
+
+    worker_collector.mark_process_dead(pid)
+    retired = worker_collector.metrics["requests"]
+    assert (retired.count, retired.get_rate()) == (seconds, reference.get_rate())
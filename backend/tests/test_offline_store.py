@@ -0,0 +1,111 @@
+"""
+Tests for the SQLite offline store
+Covers replay ordering by sequence number, conditional deletes during sync
+and sequence numbers surviving an emptied log and a reopen.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from services.offline_store import OfflineStore
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "offline.db")
+
+
+@pytest.fixture
+def store(store_path):
+    store = OfflineStore(store_path)
+    yield store
+    store.close()
+
+
+def test_replay_returns_records_in_write_order(store):
+    store.put("task_a", "create_task", {"id": "a", "status": "pending"})
+    store.put("node_b", "add_node", {"id": "b", "type": "fact"})
+    store.put("task_c", "create_task", {"id": "c", "status": "pending"})
+
+    log = store.replay()
+
+    assert [key for _, key, _ in log] == ["task_a", "node_b", "task_c"]
+    seqs = [seq for seq, _, _ in log]
+    assert seqs == sorted(seqs)
+    assert len(set(seqs)) == 3
+    assert log[1][2]["operation"] == "add_node"
+    assert log[1][2]["data"] == {"id": "b", "type": "fact"}
+
+
+def test_rewrite_moves_record_to_end_and_keeps_created_at(store):
+    first = store.put("task_a", "create_task", {"id": "a", "status": "pending"})
+    store.put("task_b", "create_task", {"id": "b", "status": "pending"})
+
+    store.update("task_a", {"status": "completed"})
+
+    log = store.replay()
+    assert [key for _, key, _ in log] == ["task_b", "task_a"]
+    assert log[1][2]["data"]["status"] == "completed"
+    assert store.get("task_a")["created_at"] == first["created_at"]
+
+
+def test_replay_after_seq_and_limit(store):
+    for i in range(5):
+        store.put(f"task_{i}", "create_task", {"id": str(i)})
+    seqs = [seq for seq, _, _ in store.replay()]
+
+    page = store.replay(after_seq=seqs[1], limit=2)
+
+    assert [key for _, key, _ in page] == ["task_2", "task_3"]
+
+
+def test_conditional_delete_keeps_records_rewritten_during_sync(store):
+    store.put("task_a", "create_task", {"id": "a", "status": "pending"})
+    (seq, key, _), = store.replay()
+
+    store.update("task_a", {"status": "completed"})  # written while the sync was in flight
+
+    assert store.delete(key, seq=seq) is False
+    assert store.get("task_a")["data"]["status"] == "completed"
+    (new_seq, _, _), = store.replay()
+    assert store.delete(key, seq=new_seq) is True
+    assert not store
+
+
+def test_seqs_are_not_reused_after_log_empties(store_path):
+    store = OfflineStore(store_path)
+    store.put("task_a", "create_task", {"id": "a"})
+    store.put("task_b", "create_task", {"id": "b"})
+    last_seq = store.replay()[-1][0]
+    store.clear()
+    store.close()
+
+    reopened = OfflineStore(store_path)
+    reopened.put("task_c", "create_task", {"id": "c"})
+
+    (seq, key, _), = reopened.replay()
+    assert key == "task_c"
+    assert seq > last_seq
+    assert reopened.get_metrics()["last_seq"] == seq
+    reopened.close()
+
+
+def test_datetimes_round_trip_through_replay(store):
+    created = datetime(2024, 5, 1, 12, 30)
+    store.put("edge_x", "add_edge", {"source_id": "a", "target_id": "b", "created_at": created})
+
+    (_, _, item), = store.replay()
+
+    assert item["data"]["created_at"] == created
+    assert store.list_kind("edge") == [{"source_id": "a", "target_id": "b", "created_at": created}]
+
+
+def test_latest_returns_the_last_written_record_of_a_kind(store):
+    assert store.latest("file") is None
+    store.put("file_/a", "store_agent_file", {"path": "/a", "size": 1})
+    store.put("file_/b", "store_agent_file", {"path": "/b", "size": 2})
+    store.put("task_t", "create_task", {"id": "t"})
+    store.put("file_/a", "store_agent_file", {"path": "/a", "size": 3})
+
+    assert store.latest("file") == {"path": "/a", "size": 3}
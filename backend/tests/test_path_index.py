@@ -0,0 +1,149 @@
+"""
+Tests for the virtual filesystem path index
+Builds indexes from file metadata the way VirtualFileSystem.rebuild_index
+does and checks lookups, listings, persistence and staleness checks.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Import agents.memory.path_index without running the package __init__,
+# which connects graph memory and the virtual filesystem to Firebase
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'agents', 'memory')
+_spec = importlib.util.spec_from_file_location(
+    "agent_memory", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("agent_memory", importlib.util.module_from_spec(_spec))
+path_index = importlib.import_module("agent_memory.path_index")
+
+T0 = datetime(2026, 1, 5, 12, 0, tzinfo=timezone.utc)
+
+FILES = [
+    {'path': '/reports/2026/q1.md', 'size': 120, 'last_modified': T0},
+    {'path': '/reports/2026/q2.md', 'size': 80, 'last_modified': T0 + timedelta(minutes=1)},
+    {'path': '/reports/summary.md', 'size': 40, 'last_modified': T0 + timedelta(minutes=2)},
+    {'path': '/notes.txt', 'size': 5, 'last_modified': T0 + timedelta(minutes=3)},
+]
+
+
+def build(files=FILES):
+    index = path_index.PathIndex()
+    for meta in files:
+        index.add(meta['path'], meta['size'], meta['last_modified'])
+    return index
+
+
+def names(entries):
+    return [(entry['name'], entry['type']) for entry in entries]
+
+
+def test_build_counts_files_and_sizes():
+    index = build()
+
+    assert len(index) == 4
+    assert index.total_size == 245
+    index.add('/notes.txt', 10, T0 + timedelta(minutes=4))  # Update in place
+    assert (len(index), index.total_size) == (4, 250)
+    with pytest.raises(ValueError):
+        index.add('/', 1)
+
+
+def test_lookup_normalizes_slashes():
+    index = build()
+
+    assert index.stat('reports//2026/q1.md/') == {
+        'path': '/reports/2026/q1.md', 'size': 120, 'last_modified': T0.isoformat()
+    }
+    assert '/notes.txt' in index
+    assert '/reports/2026' not in index  # Directories are not files
+    assert index.is_dir('/reports/2026') and index.exists('/reports/2026')
+    assert not index.exists('/reports/2025')
+    assert index.is_dir('/')
+
+
+def test_listing_is_sorted_and_pages_by_cursor():
+    index = build()
+
+    entries, cursor = index.list('/')
+    assert names(entries) == [('notes.txt', 'file'), ('reports', 'directory')]
+    assert cursor is None
+
+    first, cursor = index.list('/reports', limit=1)
+    assert names(first) == [('2026', 'directory')]
+    rest, cursor = index.list('/reports', limit=1, cursor=cursor)
+    assert names(rest) == [('summary.md', 'file')]
+    assert rest[0]['size'] == 40
+    assert cursor is None
+    assert index.list('/missing') == ([], None)
+
+
+def test_iter_files_covers_a_prefix():
+    index = build()
+
+    assert sorted(meta['path'] for meta in index.iter_files('/reports')) == [
+        '/reports/2026/q1.md', '/reports/2026/q2.md', '/reports/summary.md'
+    ]
+    assert list(index.iter_files('/nothing')) == []
+
+
+def test_remove_prunes_emptied_directories():
+    index = build()
+
+    assert index.remove('/reports/2026/q1.md')
+    assert index.is_dir('/reports/2026')
+    assert index.remove('/reports/2026/q2.md')
+    assert not index.is_dir('/reports/2026')
+    assert names(index.list('/reports')[0]) == [('summary.md', 'file')]
+    assert not index.remove('/reports/2026/q2.md')
+    assert (len(index), index.total_size) == (2, 45)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build()
+    target = tmp_path / 'index' / 'paths.json'
+    index.save(str(target))
+
+    loaded = path_index.PathIndex.load(str(target))
+
+    assert (len(loaded), loaded.total_size) == (4, 245)
+    assert sorted(loaded.iter_files(), key=lambda meta: meta['path']) == sorted(
+        index.iter_files(), key=lambda meta: meta['path']
+    )
+
+
+def latest(files):
+    return max(files, key=lambda meta: meta['last_modified']) if files else None
+
+
+def test_index_is_current_with_an_unchanged_store():
+    assert build().is_current(len(FILES), latest(FILES))
+    assert path_index.PathIndex().is_current(0, None)
+    assert not path_index.PathIndex().is_current(1, latest(FILES))
+
+
+def test_index_is_stale_after_a_create_and_a_delete():
+    index = build()
+    store = FILES[1:] + [{'path': '/new.txt', 'size': 3, 'last_modified': T0 + timedelta(minutes=5)}]
+
+    # Same number of files as the index holds
+    assert not index.is_current(len(store), latest(store))
+
+
+def test_index_is_stale_after_an_edit():
+    index = build()
+    edited = dict(FILES[0], size=999, last_modified=T0 + timedelta(minutes=5))
+    store = [edited] + FILES[1:]
+
+    assert not index.is_current(len(store), latest(store))
+    index.add(edited['path'], edited['size'], edited['last_modified'])  # Invalidation applied
+    assert index.is_current(len(store), latest(store))
+
+
+def test_index_is_stale_after_a_delete():
+    store = FILES[:-1]
+    assert not build().is_current(len(store), latest(store))
@@ -0,0 +1,151 @@
+"""
+Tests for shared BI stream producers
+Drives each producer's refresh cycle from the test through a gated
+compute function, and checks that subscribers share one computation per
+cycle, get full or delta payloads as requested, and that the producer
+stops once its last subscriber leaves.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+
+# Import services.business_intelligence.stream_producers without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("business_intelligence", importlib.util.module_from_spec(_spec))
+stream_producers = importlib.import_module("business_intelligence.stream_producers")
+
+
+class GatedCompute:
+    """Compute function that returns the next queued payload, one per tick"""
+
+    def __init__(self):
+        self.payloads: asyncio.Queue = asyncio.Queue()
+        self.calls = 0
+
+    async def __call__(self):
+        payload = await self.payloads.get()
+        self.calls += 1
+        if isinstance(payload, Exception):
+            raise payload
+        return payload
+
+    def tick(self, payload):
+        self.payloads.put_nowait(payload)
+
+
+async def collect(updates, received, count):
+    try:
+        async for update in updates:
+            received.append(update)
+            if len(received) == count:
+                break
+    finally:
+        await updates.aclose()
+
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.001)
+
+
+async def test_subscribers_share_one_computation_per_refresh():
+    registry = stream_producers.StreamProducerRegistry()
+    compute = GatedCompute()
+    received = [[] for _ in range(5)]
+    consumers = [
+        asyncio.create_task(collect(registry.subscribe("kpis", compute, refresh_interval=0), updates, 3))
+        for updates in received
+    ]
+    await wait_until(lambda: registry.get_stats()["subscribers"] == 5)
+
+    for value in (1, 2, 3):
+        compute.tick({"value": value})
+        await wait_until(lambda: all(len(updates) >= value for updates in received))
+    await asyncio.gather(*consumers)
+
+    assert compute.calls == 3
+    assert len({tuple(map(repr, updates)) for updates in received}) == 1
+    assert [update[2] for update in received[0]] == [1, 2, 3]
+
+
+async def test_producer_stops_when_the_last_subscriber_leaves():
+    registry = stream_producers.StreamProducerRegistry()
+    compute = GatedCompute()
+    first, second = [], []
+    first_consumer = asyncio.create_task(collect(registry.subscribe("kpis", compute, 0), first, 1))
+    second_consumer = asyncio.create_task(collect(registry.subscribe("kpis", compute, 0), second, 2))
+    await wait_until(lambda: registry.get_stats()["subscribers"] == 2)
+    (producer,) = registry._producers.values()
+    task = producer._task
+
+    compute.tick({"value": 1})
+    await first_consumer
+    assert registry.get_stats() == {"producers": 1, "subscribers": 1, "computations": 1}
+    assert not task.done()
+
+    compute.tick({"value": 2})
+    await second_consumer
+    await wait_until(task.done)
+
+    assert task.cancelled()
+    assert producer._task is None
+    assert len(registry) == 0
+    compute.tick({"value": 3})
+    await asyncio.sleep(0.01)
+    assert compute.calls == 2
+
+
+async def test_delta_and_full_subscribers_get_their_payloads():
+    registry = stream_producers.StreamProducerRegistry()
+    compute = GatedCompute()
+    deltas, fulls = [], []
+    consumers = [
+        asyncio.create_task(collect(registry.subscribe("kpis", compute, 0, deltas=True), deltas, 4)),
+        asyncio.create_task(collect(registry.subscribe("kpis", compute, 0), fulls, 4)),
+    ]
+    await wait_until(lambda: registry.get_stats()["subscribers"] == 2)
+
+    first = {"revenue": 10, "deals": 2, "last_updated": 1}
+    second = {"revenue": 12, "deals": 2, "last_updated": 2}
+    third = {"revenue": 12, "deals": 2, "last_updated": 3}  # Only a volatile field changed
+    for step, payload in enumerate([first, second, third, RuntimeError("upstream down")], start=1):
+        compute.tick(payload)
+        await wait_until(lambda: len(deltas) >= step and len(fulls) >= step)
+    await asyncio.gather(*consumers)
+
+    error = ("error", {"error": "upstream down"}, 4)
+    assert deltas == [
+        ("full", first, 1),
+        ("delta", {"changed": {"revenue": 12, "last_updated": 2}, "removed": [], "substantive": True}, 2),
+        ("heartbeat", {}, 3),
+        error,
+    ]
+    assert fulls == [("full", first, 1), ("full", second, 2), ("heartbeat", {}, 3), error]
+
+
+async def test_late_subscriber_starts_from_the_latest_snapshot():
+    producer = stream_producers.SharedStreamProducer("kpis", GatedCompute())
+    compute = producer._compute
+    early, late = [], []
+    early_consumer = asyncio.create_task(collect(producer.subscribe(0, deltas=True), early, 2))
+    await wait_until(lambda: producer.subscribers == 1)
+
+    compute.tick({"revenue": 10, "last_updated": 1})
+    await wait_until(lambda: len(early) == 1)
+    late_consumer = asyncio.create_task(collect(producer.subscribe(0, deltas=True), late, 2))
+    await wait_until(lambda: producer.subscribers == 2)
+    compute.tick({"revenue": 11, "last_updated": 2})
+    await asyncio.gather(early_consumer, late_consumer)
+
+    assert late[0] == ("full", {"revenue": 10, "last_updated": 1}, 1)
+    assert late[1] == early[1]
+    assert late[1][0] == "delta"
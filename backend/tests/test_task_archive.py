@@ -0,0 +1,152 @@
+"""
+Tests for tiered orchestrator task state
+Covers the segment log archive (append, read-back, reopen, pruning) and
+TieredTaskStore spilling finished tasks to it.
+"""
+
+import os
+import time
+
+import pytest
+
+from services.task_archive import SegmentLogArchive, TieredTaskStore
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = SegmentLogArchive(directory=str(tmp_path / "archive"), segment_bytes=256)
+    yield archive
+    archive.close()
+
+
+def make_store(archive, **kwargs):
+    return TieredTaskStore(encode=dict, decode=dict, archive=archive, **kwargs)
+
+
+def test_archive_reads_back_latest_record(archive):
+    archive.append("a", {"status": "running"})
+    archive.append_many([("b", {"status": "completed"}), ("a", {"status": "completed"})])
+
+    assert archive.get("a") == {"status": "completed"}
+    assert archive.get("b") == {"status": "completed"}
+    assert archive.get("missing") is None
+    assert len(archive) == 2
+
+
+def test_archive_rolls_segments_and_rebuilds_index_on_reopen(tmp_path, archive):
+    for i in range(20):
+        archive.append(f"task-{i}", {"i": i, "payload": "x" * 40})
+    assert archive.get_metrics()["segments"] > 1
+    archive.close()
+
+    reopened = SegmentLogArchive(directory=archive.directory)
+
+    assert len(reopened) == 20
+    assert all(reopened.get(f"task-{i}")["i"] == i for i in range(20))
+    reopened.close()
+
+
+def test_archive_drops_torn_tail_record_on_reopen(archive):
+    archive.append("a", {"status": "completed"})
+    archive.close()
+    with open(os.path.join(archive.directory, "segment-00000000.jsonl"), "ab") as f:
+        f.write(b'{"k":"b","t":1,"r":{"sta')
+
+    reopened = SegmentLogArchive(directory=archive.directory)
+    reopened.append("c", {"status": "failed"})
+
+    assert reopened.get("a") == {"status": "completed"}
+    assert "b" not in reopened
+    assert reopened.get("c") == {"status": "failed"}
+    reopened.close()
+
+
+def test_archive_prunes_segments_past_retention(tmp_path):
+    archive = SegmentLogArchive(directory=str(tmp_path / "archive"), segment_bytes=64, retention_hours=1)
+    old = time.time() - 7200
+    archive.append_many([(f"old-{i}", {"i": i}) for i in range(3)], timestamp=old)
+    archive.append("new", {"i": 3})
+
+    dropped = archive.prune()
+
+    assert dropped == 3
+    assert archive.get("old-0") is None
+    assert archive.get("new") == {"i": 3}
+    archive.close()
+
+
+def test_store_spills_oldest_finished_tasks_past_max_hot(archive):
+    spilled = []
+    store = make_store(archive, max_hot_tasks=10, hot_ttl=3600, on_spill=spilled.append)
+    for i in range(10):
+        store[f"task-{i}"] = {"id": i, "status": "running"}
+    for i in (3, 1):
+        store[f"task-{i}"]["status"] = "completed"
+        store.finish(f"task-{i}", "completed")
+    assert spilled == []
+
+    store["task-10"] = {"id": 10, "status": "running"}
+    store["task-11"] = {"id": 11, "status": "running"}
+    store["task-4"]["status"] = "failed"
+    store.finish("task-4", "failed")
+
+    assert spilled == ["task-3", "task-1", "task-4"]
+    assert len(store) == 9
+    for key in spilled:
+        assert key not in list(store)
+        assert key in store
+    assert store["task-1"] == {"id": 1, "status": "completed"}
+    assert store["task-4"] == {"id": 4, "status": "failed"}
+    assert store.get("task-5") == {"id": 5, "status": "running"}
+    assert store.get_metrics()["spilled"] == 3
+
+
+def test_store_never_spills_unfinished_tasks(archive):
+    store = make_store(archive, max_hot_tasks=2, hot_ttl=0)
+    for i in range(5):
+        store[f"task-{i}"] = {"id": i}
+
+    assert store.spill_expired() == 0
+    assert len(store) == 5
+
+
+def test_store_spills_expired_finished_tasks(archive):
+    store = make_store(archive, max_hot_tasks=100, hot_ttl=0)
+    store["a"] = {"status": "completed"}
+    store["b"] = {"status": "running"}
+    store.finish("a", "completed")
+
+    assert store.spill_expired() == 1
+    assert list(store) == ["b"]
+    assert store["a"] == {"status": "completed"}
+    assert store.get_metrics()["archive_hits"] == 1
+
+
+def test_finished_counts_survive_spilling(archive):
+    store = make_store(archive, max_hot_tasks=100, hot_ttl=0)
+    for i in range(4):
+        store[f"task-{i}"] = {"id": i}
+    store.finish("task-0", "completed")
+    store.finish("task-0", "completed")  # Already finished, counted once
+    store.finish("task-1", "completed")
+    store.finish("task-2", "failed")
+
+    store.spill_expired()
+
+    assert len(store) == 1
+    assert store.finished_count("completed") == 2
+    assert store.finished_count("failed") == 1
+    assert store.get_metrics()["finished"] == {"completed": 2, "failed": 1}
+
+
+def test_store_delete_reaches_archived_tasks(archive):
+    store = make_store(archive, max_hot_tasks=100, hot_ttl=0)
+    store["a"] = {"status": "completed"}
+    store.finish("a")
+    store.spill_expired()
+
+    del store["a"]
+
+    assert "a" not in store
+    with pytest.raises(KeyError):
+        del store["a"]
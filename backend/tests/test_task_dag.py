@@ -0,0 +1,148 @@
+"""
+Tests for the orchestrator's task dependency graph
+Covers ready-queue ordering, release of dependents, failure blocking
+dependents and rejection of cycles and unknown dependencies.
+"""
+
+import pytest
+
+from services.task_dag import TaskDAG
+
+
+def drain(dag, lane=None):
+    order = []
+    while dag.has_ready(lane):
+        order.append(dag.pop_ready(lane))
+    return order
+
+
+def test_ready_tasks_pop_by_rank_then_ready_order():
+    dag = TaskDAG()
+    dag.add("low", rank=3)
+    dag.add("high-1", rank=1)
+    dag.add("medium", rank=2)
+    dag.add("high-2", rank=1)
+
+    assert drain(dag) == ["high-1", "high-2", "medium", "low"]
+    assert dag.pop_ready() is None
+
+
+def test_lanes_have_separate_ready_queues():
+    dag = TaskDAG()
+    dag.add("shared")
+    dag.add("pinned", lane="agent-1")
+
+    assert drain(dag, "agent-1") == ["pinned"]
+    assert drain(dag) == ["shared"]
+
+    dag.add("moved")
+    dag.set_lane("moved", "agent-2")
+    assert not dag.has_ready()
+    assert drain(dag, "agent-2") == ["moved"]
+
+
+def test_dependents_become_ready_once_every_dependency_completes():
+    dag = TaskDAG()
+    assert dag.add_many([
+        ("fetch", [], 0, None),
+        ("parse", [], 0, None),
+        ("report", ["fetch", "parse"], 0, None),
+    ]) == [True, True, False]
+    assert dag.unmet_dependencies("report") == 2
+
+    assert drain(dag) == ["fetch", "parse"]
+    assert dag.complete("fetch") == []
+    assert not dag.is_ready("report")
+
+    assert dag.complete("parse") == ["report"]
+    assert dag.is_ready("report")
+    assert dag.get_metrics()["released"] == 1
+
+
+def test_completed_dependency_is_already_met():
+    dag = TaskDAG()
+    dag.add("first")
+    dag.pop_ready()
+    dag.complete("first")
+
+    assert dag.add("second", ["first"]) is True
+    assert dag.pop_ready() == "second"
+
+
+def test_failed_task_keeps_dependents_blocked():
+    dag = TaskDAG()
+    dag.add_many([
+        ("a", [], 0, None),
+        ("b", [], 0, None),
+        ("c", ["a", "b"], 0, None),
+        ("d", ["c"], 0, None),
+    ])
+    drain(dag)
+
+    dag.fail("a")
+    assert dag.complete("b") == []
+
+    assert not dag.has_ready()
+    assert dag.unmet_dependencies("c") == 1
+    assert dag.unmet_dependencies("d") == 1
+    assert dag.mark_ready("c") is False
+    assert dag.add("e", ["a"]) is False
+    by_state = dag.get_metrics()["by_state"]
+    assert by_state["failed"] == 1
+    assert by_state["waiting"] == 3
+
+
+def test_failed_ready_task_leaves_the_ready_queue():
+    dag = TaskDAG()
+    dag.add("a")
+    dag.add("b")
+
+    dag.fail("a")
+
+    assert drain(dag) == ["b"]
+
+
+def test_mark_ready_requeues_a_task_for_retry():
+    dag = TaskDAG()
+    dag.add("a")
+    assert dag.pop_ready() == "a"
+
+    assert dag.mark_ready("a") is True
+    assert dag.pop_ready() == "a"
+
+
+def test_cycle_is_rejected_and_nothing_is_added():
+    dag = TaskDAG()
+    dag.add("existing")
+
+    with pytest.raises(ValueError, match="cycle"):
+        dag.add_many([
+            ("a", ["existing", "c"], 0, None),
+            ("b", ["a"], 0, None),
+            ("c", ["b"], 0, None),
+            ("free", [], 0, None),
+        ])
+
+    assert len(dag) == 1
+    assert "free" not in dag
+    assert drain(dag) == ["existing"]
+
+
+def test_self_dependency_is_a_cycle():
+    dag = TaskDAG()
+
+    with pytest.raises(ValueError, match="cycle"):
+        dag.add("a", ["a"])
+
+
+def test_unknown_dependency_and_duplicate_ids_are_rejected():
+    dag = TaskDAG()
+    dag.add("a")
+
+    with pytest.raises(ValueError, match="unknown task missing"):
+        dag.add("b", ["missing"])
+    with pytest.raises(ValueError, match="already exists"):
+        dag.add("a")
+    with pytest.raises(ValueError, match="already exists"):
+        dag.add_many([("x", [], 0, None), ("x", [], 0, None)])
+    assert len(dag) == 1
@@ -0,0 +1,124 @@
+"""
+Tests for in-process task dispatch
+Covers claiming, acknowledgement, lease expiry with redelivery, release
+and discard on InProcessDispatchQueue.
+"""
+
+import asyncio
+
+from services.task_dispatch import InProcessDispatchQueue
+
+
+def task(task_id):
+    return {"id": task_id, "input_prompt": f"prompt {task_id}"}
+
+
+async def test_claim_returns_tasks_in_publish_order_per_agent_type():
+    queue = InProcessDispatchQueue()
+    await queue.publish("finance", task("a"))
+    await queue.publish("marketing", task("b"))
+    await queue.publish("finance", task("c"))
+
+    first = await queue.claim("finance", timeout=0.1)
+    second = await queue.claim("finance", timeout=0.1)
+
+    assert (first.task_id, second.task_id) == ("a", "c")
+    assert first.task == task("a")
+    assert first.attempts == 1
+    assert await queue.claim("finance", timeout=0.01) is None
+
+
+async def test_publish_skips_tasks_already_queued_or_leased():
+    queue = InProcessDispatchQueue()
+
+    assert await queue.publish("finance", task("a")) is True
+    assert await queue.publish("finance", task("a")) is False
+    lease = await queue.claim("finance", timeout=0.1)
+    assert await queue.publish("finance", task("a")) is False
+
+    await queue.ack(lease)
+    assert await queue.publish("finance", task("a")) is True
+    assert queue.get_metrics()["duplicates"] == 2
+
+
+async def test_claim_wakes_up_when_a_task_is_published():
+    queue = InProcessDispatchQueue()
+
+    waiter = asyncio.ensure_future(queue.claim("finance", timeout=1.0))
+    await asyncio.sleep(0.01)
+    await queue.publish("finance", task("a"))
+
+    lease = await asyncio.wait_for(waiter, timeout=0.5)
+    assert lease.task_id == "a"
+
+
+async def test_acked_task_is_never_redelivered():
+    queue = InProcessDispatchQueue()
+    await queue.publish("finance", task("a"))
+    lease = await queue.claim("finance", lease_seconds=0.02, timeout=0.1)
+
+    assert await queue.ack(lease) is True
+    assert await queue.ack(lease) is False
+    await asyncio.sleep(0.03)
+
+    assert await queue.claim("finance", timeout=0.01) is None
+    metrics = queue.get_metrics()
+    assert metrics["acked"] == 1
+    assert metrics["expired"] == 0
+    assert metrics["leased"] == 0
+
+
+async def test_expired_lease_is_redelivered_ahead_of_newer_tasks():
+    queue = InProcessDispatchQueue()
+    await queue.publish("finance", task("a"))
+    lease = await queue.claim("finance", lease_seconds=0.02, timeout=0.1)
+    await queue.publish("finance", task("b"))
+    await asyncio.sleep(0.03)
+
+    redelivered = await queue.claim("finance", timeout=0.1)
+
+    assert redelivered.task_id == "a"
+    assert redelivered.attempts == 2
+    assert redelivered.lease_id != lease.lease_id
+    assert await queue.ack(lease) is False  # The expired lease no longer counts
+    assert queue.get_metrics()["expired"] == 1
+
+
+async def test_claim_waits_for_a_lease_to_expire():
+    queue = InProcessDispatchQueue()
+    await queue.publish("finance", task("a"))
+    await queue.claim("finance", lease_seconds=0.05, timeout=0.1)
+
+    redelivered = await queue.claim("finance", timeout=1.0)
+
+    assert redelivered is not None
+    assert redelivered.task_id == "a"
+    assert redelivered.attempts == 2
+
+
+async def test_released_task_goes_back_to_the_front():
+    queue = InProcessDispatchQueue()
+    await queue.publish("finance", task("a"))
+    await queue.publish("finance", task("b"))
+    lease = await queue.claim("finance", timeout=0.1)
+
+    assert await queue.release(lease) is True
+    assert await queue.release(lease) is False
+
+    again = await queue.claim("finance", timeout=0.1)
+    assert again.task_id == "a"
+    assert again.attempts == 2
+    assert queue.get_metrics()["released"] == 1
+
+
+async def test_discarded_task_is_not_claimed():
+    queue = InProcessDispatchQueue()
+    await queue.publish("finance", task("a"))
+    await queue.publish("finance", task("b"))
+
+    assert await queue.discard("finance", "a") is True
+    assert await queue.discard("finance", "a") is False
+
+    lease = await queue.claim("finance", timeout=0.1)
+    assert lease.task_id == "b"
+    assert await queue.claim("finance", timeout=0.01) is None
@@ -0,0 +1,120 @@
+"""
+Tests for batched trend analytics
+Checks every batched function against a direct per-series computation.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Import services.business_intelligence.trend_analytics without running the package __init__,
+# which builds every BI engine
+_package_dir = os.path.join(os.path.dirname(__file__), '..', 'services', 'business_intelligence')
+_spec = importlib.util.spec_from_file_location(
+    "business_intelligence", os.path.join(_package_dir, '__init__.py'), submodule_search_locations=[_package_dir]
+)
+sys.modules.setdefault("business_intelligence", importlib.util.module_from_spec(_spec))
+trend_analytics = importlib.import_module("business_intelligence.trend_analytics")
+
+SERIES = 900
+POINTS = 730
+PERIODS = (7, 30, 91)
+
+
+@pytest.fixture(scope="module")
+def series():
+    """Trend + noise, a third also with a weekly/monthly/quarterly cycle"""
+    rng = np.random.default_rng(3)
+    t = np.arange(POINTS)
+    slopes = rng.normal(0.05, 0.1, SERIES)[:, np.newaxis]
+    levels = rng.uniform(50, 500, SERIES)[:, np.newaxis]
+    matrix = levels + slopes * t + rng.normal(0, 2, (SERIES, POINTS))
+    periods = np.zeros(SERIES, dtype=int)
+    for i, period in enumerate(PERIODS):
+        rows = slice(i, SERIES, 3 * len(PERIODS))
+        periods[rows] = period
+        matrix[rows] += 15 * np.sin(2 * np.pi * t / period)
+    return matrix, periods
+
+
+@pytest.fixture(scope="module")
+def sample_rows():
+    return np.random.default_rng(5).choice(SERIES, 50, replace=False)
+
+
+def reference_holt(y, alpha, beta):
+    level, trend, sse = y[0], y[1] - y[0], 0.0
+    for observed in y[1:]:
+        sse += (observed - level - trend) ** 2
+        new_level = alpha * observed + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return level, trend, sse / (len(y) - 1)
+
+
+def test_linear_trend_matches_least_squares(series, sample_rows):
+    matrix, _ = series
+    t = np.arange(POINTS)
+    trend = trend_analytics.linear_trend(matrix)
+    for row in sample_rows:
+        y = matrix[row]
+        slope, intercept = np.polyfit(t, y, 1)
+        residuals = y - (intercept + slope * t)
+        r_squared = 1 - residuals @ residuals / ((y - y.mean()) @ (y - y.mean()))
+        assert np.isclose(trend.slope[row], slope)
+        assert np.isclose(trend.intercept[row], intercept)
+        assert np.isclose(trend.r_squared[row], r_squared)
+        assert np.isclose(trend.mse[row], residuals @ residuals / POINTS)
+
+
+def test_linear_trend_of_constant_series():
+    constant = trend_analytics.linear_trend(np.full((2, 10), 4.0))
+    assert np.allclose(constant.slope, 0)
+    assert np.allclose(constant.r_squared, 1)
+
+
+def test_exponential_smoothing_matches_holt(series, sample_rows):
+    matrix, _ = series
+    smoothing = trend_analytics.exponential_smoothing(matrix)
+    for row in sample_rows:
+        level, trend, mse = reference_holt(matrix[row].tolist(), 0.3, 0.1)
+        assert np.isclose(smoothing.level[row], level)
+        assert np.isclose(smoothing.trend[row], trend)
+        assert np.isclose(smoothing.mse[row], mse)
+
+
+def test_autocorrelation_matches_direct_sums(series, sample_rows):
+    matrix, _ = series
+    acf = trend_analytics.autocorrelation(matrix[sample_rows], 40)
+    for position, row in enumerate(sample_rows):
+        centered = matrix[row] - matrix[row].mean()
+        direct = np.array([centered[:POINTS - lag] @ centered[lag:] for lag in range(41)]) / (centered @ centered)
+        assert np.allclose(acf[position], direct)
+
+
+def test_detect_seasonality(series):
+    """Seasonal series get their period (or a multiple of it, within a point); trend + noise series get none"""
+    matrix, periods = series
+    seasonality = trend_analytics.detect_seasonality(matrix)
+    seasonal = periods > 0
+    true_periods = np.maximum(periods, 1)
+    multiples = np.maximum(np.round(seasonality.period / true_periods), 1) * true_periods
+    found = seasonality.detected & (np.abs(seasonality.period - multiples) <= 1)
+    assert found[seasonal].mean() > 0.95
+    assert seasonality.detected[~seasonal].mean() < 0.05
+
+
+def test_seasonal_forecast_of_noiseless_series():
+    """A seasonal series with a trend is forecast to within 5% of its amplitude"""
+    t = np.arange(POINTS + 5)
+    exact = 10 + 0.5 * t + 3 * np.sin(2 * np.pi * t / 7)
+    forecast = trend_analytics.seasonal_forecast(exact[:POINTS], horizon=5, period=7)[0]
+    assert abs(forecast - exact[-1]) < 0.05 * 3
+
+
+def test_growth_forecast():
+    assert np.isclose(trend_analytics.growth_forecast([100, 110, 121], 2)[0], 121 * 1.1 ** 2)
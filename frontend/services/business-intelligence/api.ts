@@ -420,10 +420,14 @@ export interface AlertData {
   }>;
 }
 
+// Suffix of stream events that carry only the fields changed since the last payload
+const DELTA_EVENT_SUFFIX = '_delta';
+
 class BusinessIntelligenceService {
   private apiClient = getFastAPIClient();
   private eventSource: EventSource | null = null;
   private listeners: Map<string, Array<(data: any) => void>> = new Map();
+  private latestPayloads: Map<string, any> = new Map();
 
   /**
    * Morning Briefing Operations
@@ -677,7 +681,7 @@ class BusinessIntelligenceService {
       this.disconnectRealtimeUpdates();
 
       const baseURL = this.apiClient.getBaseURL();
-      const eventURL = `${baseURL}/business-intelligence/stream/dashboard`;
+      const eventURL = `${baseURL}/business-intelligence/stream/dashboard?deltas=true`;
 
       if (typeof EventSource !== 'undefined') {
         this.eventSource = new EventSource(eventURL);
@@ -710,6 +714,7 @@ class BusinessIntelligenceService {
       this.eventSource.close();
       this.eventSource = null;
     }
+    this.latestPayloads.clear();
   }
 
   addListener(eventType: string, callback: (data: any) => void): void {
@@ -730,9 +735,21 @@ class BusinessIntelligenceService {
   }
 
   private handleRealtimeEvent(event: { type: string; data: any; timestamp: string }): void {
-    const callbacks = this.listeners.get(event.type);
+    let { type, data } = event;
+    if (type.endsWith(DELTA_EVENT_SUFFIX)) {
+      // Listeners always receive the full payload, rebuilt from the last one
+      type = type.slice(0, -DELTA_EVENT_SUFFIX.length);
+      const payload = { ...this.latestPayloads.get(type), ...data.changed };
+      data.removed.forEach((key: string) => delete payload[key]);
+      data = payload;
+    }
+    if (type !== 'heartbeat' && type !== 'error') {
+      this.latestPayloads.set(type, data);
+    }
+
+    const callbacks = this.listeners.get(type);
     if (callbacks) {
-      callbacks.forEach(callback => callback(event.data));
+      callbacks.forEach(callback => callback(data));
     }
   }
 